@@ -0,0 +1,183 @@
+# app/core/agent_view.py -- read-only, lazily evaluated views of the world for individual agents
+import math
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+class PerceptionScope(BaseModel):
+    """
+    Limits what an agent perceives of the world.
+
+    Attributes:
+        radius (Optional[float]): Objects with a `position` farther than this from the agent are not visible.
+        roles (Optional[List[str]]): The agent's roles; objects with `visible_to_roles` must share one.
+        topics (Optional[List[str]]): Objects with a `topic`/`topics` attribute must share one.
+    """
+    radius: Optional[float] = Field(default=None, description="Perception radius around the agent's position")
+    roles: Optional[List[str]] = Field(default=None, description="Roles the agent perceives as")
+    topics: Optional[List[str]] = Field(default=None, description="Topics the agent is interested in")
+
+    @classmethod
+    def from_agent(cls, agent: Dict[str, Any]) -> 'PerceptionScope':
+        """
+        Builds a scope from an agent's world model entry.
+
+        Reads `perception_radius`, `role`/`roles` and `topics` from the agent data.
+
+        Args:
+            agent (Dict[str, Any]): The agent's data in the world model.
+
+        Returns:
+            PerceptionScope: The agent's default perception scope.
+        """
+        roles = agent.get("roles")
+        if roles is None and agent.get("role") is not None:
+            roles = [agent["role"]]
+        return cls(radius=agent.get("perception_radius"), roles=roles, topics=agent.get("topics"))
+
+    def can_see(self, origin: Optional[Any], obj: Dict[str, Any]) -> bool:
+        """
+        Checks whether an object is visible from the agent's position under this scope.
+
+        Args:
+            origin (Optional[Any]): The agent's position, if it has one.
+            obj (Dict[str, Any]): The object's data.
+
+        Returns:
+            bool: True if the object is visible, False otherwise.
+        """
+        if self.radius is not None and origin is not None and (position := obj.get("position")) is not None:
+            if math.dist(origin, position) > self.radius:
+                return False
+        if self.roles is not None and (visible_to := obj.get("visible_to_roles")) is not None:
+            if not set(visible_to) & set(self.roles):
+                return False
+        if self.topics is not None:
+            object_topics = obj.get("topics") or ([obj["topic"]] if obj.get("topic") is not None else None)
+            if object_topics is not None and not set(object_topics) & set(self.topics):
+                return False
+        return True
+
+
+class AgentView(Mapping):
+    """
+    A read-only view of the world as seen by one agent.
+
+    Eager fields are read-only proxies over the world model's own dicts, so
+    building a view copies nothing. The world model replaces those dicts on
+    write instead of mutating them, which makes each view a stable snapshot.
+    Lazy fields (predictions, ontology info) are computed on first access and
+    memoized, so callers that never read them never pay for them. Iterating
+    the view (`items()`, `dict(view)`) reads every lazy field; use `to_dict`
+    for just the eager ones, or `eager_items` to read them without copying.
+    A view pickles as `to_dict`, since its proxies and lazy callables cannot
+    be pickled.
+
+    Attributes:
+        version (Any): An opaque token that is equal for two views of the same agent only if
+            their eager fields are equal too, or None if the view is not versioned.
+    """
+
+    __slots__ = ("_eager", "_lazy", "_resolved", "version")
+
+    def __init__(self, eager: Dict[str, Any], lazy: Dict[str, Callable[[], Any]], version: Any = None):
+        self._eager = eager
+        self._lazy = lazy
+        self._resolved: Dict[str, Any] = {}
+        self.version = version
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._eager:
+            return self._eager[key]
+        if key in self._resolved:
+            return self._resolved[key]
+        if key in self._lazy:
+            value = self._resolved[key] = self._lazy[key]()
+            return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._eager
+        yield from self._lazy
+
+    def __len__(self) -> int:
+        return len(self._eager) + len(self._lazy)
+
+    def __repr__(self) -> str:
+        return f"AgentView(eager={list(self._eager)}, lazy={list(self._lazy)})"
+
+    def eager_items(self) -> Iterator[Tuple[str, Any]]:
+        """Yields the eager fields as read-only proxies over the world's data, copying nothing."""
+        return iter(self._eager.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Copies the eager fields into plain dicts and lists, without computing any lazy field.
+
+        Returns:
+            Dict[str, Any]: The eager fields, safe to keep or pickle.
+        """
+        return {key: to_plain(value) for key, value in self._eager.items()}
+
+    def __reduce__(self):
+        return dict, (self.to_dict(),)
+
+
+def to_plain(value: Any) -> Any:
+    """
+    Copies an eager view field into plain dicts, so it can be kept or pickled.
+
+    Tuples stay tuples, so the copy still compares equal to the field it was made from.
+
+    Args:
+        value (Any): The field's value.
+
+    Returns:
+        Any: The copy.
+    """
+    if isinstance(value, MappingProxyType):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(to_plain(item) for item in value)
+    return value
+
+
+def build_agent_view(agent_id: Any, agent: Dict[str, Any], state: Dict[str, Any], objects: Dict[str, Dict[str, Any]],
+                     relationships: List[Dict[str, Any]], scope: PerceptionScope,
+                     lazy: Dict[str, Callable[[], Any]], version: Any = None) -> AgentView:
+    """
+    Builds an agent's view of the world, keeping only what its scope lets it see.
+
+    Args:
+        agent_id (Any): The agent's identifier.
+        agent (Dict[str, Any]): The agent's own data.
+        state (Dict[str, Any]): The global world state.
+        objects (Dict[str, Dict[str, Any]]): Candidate objects, e.g. narrowed by a spatial index.
+        relationships (List[Dict[str, Any]]): Candidate relationships.
+        scope (PerceptionScope): What the agent can perceive.
+        lazy (Dict[str, Callable[[], Any]]): Fields computed on first access.
+        version (Any): The view's version token; see `AgentView.version`.
+
+    Returns:
+        AgentView: The agent's view.
+    """
+    origin = agent.get("position")
+    visible_objects = {object_id: MappingProxyType(obj) for object_id, obj in objects.items() if scope.can_see(origin, obj)}
+    visible_ids = {str(agent_id), f"Agent_{agent_id}", *visible_objects}
+    visible_relationships = tuple(
+        MappingProxyType(r) for r in relationships
+        if str(r.get("subject")) in visible_ids or str(r.get("object")) in visible_ids
+    )
+    return AgentView(
+        eager={
+            "state": MappingProxyType(state),
+            "agent": MappingProxyType(agent),
+            "visible_objects": MappingProxyType(visible_objects),
+            "relationships": visible_relationships,
+        },
+        lazy=lazy,
+        version=version,
+    )
@@ -6,6 +6,40 @@ class Settings(BaseSettings):
     num_states: int = 5
     state_size: int = 10
     action_size: int = 5
+    embedding_backend: str = "torch"
+    embedding_cache_size: int = 10000
+    embedding_cache_dir: str = ""
+    vector_index_kind: str = "exact"
+    vector_index_max_elements: int = 10000
+    vector_index_ef_search: int = 64
+    triple_store_backend: str = "memory"
+    triple_store_dir: str = ""
+    triple_store_commit_interval: float = 1.0
+    ontology_sync_max_batch: int = 1000
+    ontology_sync_linger: float = 0.01
+    world_event_log_dir: str = ""
+    world_snapshot_interval: int = 1000
+    federated_round_interval: int = 0
+    federated_min_clients: int = 1
+    federated_mu: float = 0.0
+    federated_compression: str = "fp16"
+    federated_topk_ratio: float = 0.01
+    federated_workers: int = 0
+    federated_close_timeout: float = 30.0
+    warm_up_on_startup: bool = True
+    step_scheduler: str = "serial"
+    step_scheduler_workers: int = 0
+    message_mailbox_size: int = 1000
+    message_overflow_policy: str = "block"
+    message_bus_workers: int = 8
+    message_log_dir: str = ""
+    message_log_segment_bytes: int = 64 * 1024 * 1024
+    message_log_fsync_batch: int = 1000
+    message_log_fsync_interval: float = 1.0
+    message_log_retention_bytes: int = 0
+    message_log_retention_seconds: float = 0
+    message_log_compaction: str = "none"
+    message_history_limit: int = 1000
     ontology_path: str = "/Users/kinglerbercy/Projects/Apps/mas-repo/mabos-standalone/app/core/ontologies/mabos.owl"
 
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', extra='ignore')
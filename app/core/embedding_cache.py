@@ -0,0 +1,253 @@
+# app/core/embedding_cache.py -- content-addressed cache for sentence embeddings
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the store is then single-process only
+    fcntl = None
+
+KEY_SIZE = 16
+
+
+def embedding_key(model_name: str, text: str) -> bytes:
+    """
+    Returns the cache key for a text encoded by a given model.
+
+    Args:
+        model_name (str): The name of the embedding model.
+        text (str): The encoded text.
+
+    Returns:
+        bytes: A 16-byte BLAKE2b digest of the model name and text.
+    """
+    return hashlib.blake2b(f"{model_name}\0{text}".encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only embedding store backed by a memory-mapped float32 matrix.
+
+    Vectors live in `vectors.f32` and their keys, in row order, in `keys.bin`.
+    A key is appended only after its vector has been written, so a crash
+    never leaves a key pointing at an unwritten row. Opening the store only
+    reads the key file; vectors are paged in on demand.
+
+    Several processes (e.g. uvicorn workers) can share a store directory:
+    appends hold an exclusive `flock` on the directory's lock file and first
+    pick up the rows other processes appended, so rows are never written
+    twice and keys stay in row order. Lookups that miss re-read the tail of
+    the key file for rows appended elsewhere.
+    """
+
+    def __init__(self, directory: str, dim: int, initial_capacity: int = 4096):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self._lock_file = open(os.path.join(directory, "lock"), "ab")
+        self._rows: Dict[bytes, int] = {}
+        self._size = 0
+        self._vectors: Optional[np.memmap] = None
+        self._capacity = 0
+
+        with self._locked(exclusive=True):
+            if os.path.exists(self.keys_path):
+                size = os.path.getsize(self.keys_path)
+                if size % KEY_SIZE:
+                    # Drop a partially written trailing key
+                    os.truncate(self.keys_path, size - size % KEY_SIZE)
+            self._keys_file = open(self.keys_path, "ab")
+            self._read_new_keys()
+            self._map(max(initial_capacity, self._size))
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_new_keys(self) -> bool:
+        # Picks up keys appended since this process last looked, including by other processes
+        end = os.fstat(self._keys_file.fileno()).st_size // KEY_SIZE
+        if end <= self._size:
+            return False
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._size * KEY_SIZE)
+            keys = f.read((end - self._size) * KEY_SIZE)
+        for row in range(self._size, end):
+            start = (row - self._size) * KEY_SIZE
+            self._rows.setdefault(keys[start:start + KEY_SIZE], row)
+        self._size = end
+        if self._size > self._capacity:
+            self._map(self._size)
+        return True
+
+    def _map(self, capacity: int):
+        row_bytes = self.dim * np.dtype(np.float32).itemsize
+        with open(self.vectors_path, "ab"):
+            pass
+        if os.path.getsize(self.vectors_path) < capacity * row_bytes:
+            os.truncate(self.vectors_path, capacity * row_bytes)
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._capacity = os.path.getsize(self.vectors_path) // row_bytes
+        self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.dim))
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self._rows.get(key)
+        if row is None:
+            with self._locked(exclusive=False):
+                if not self._read_new_keys():
+                    return None
+            row = self._rows.get(key)
+            if row is None:
+                return None
+        return np.array(self._vectors[row])
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray):
+        with self._locked(exclusive=True):
+            self._read_new_keys()
+            new = list({key: vector for key, vector in zip(keys, vectors) if key not in self._rows}.items())
+            if not new:
+                return
+            if self._size + len(new) > self._capacity:
+                self._map(max(self._size + len(new), 2 * self._capacity))
+            start = self._size
+            for offset, (key, vector) in enumerate(new):
+                self._vectors[start + offset] = vector
+            for offset, (key, _) in enumerate(new):
+                self._rows[key] = start + offset
+            self._size += len(new)
+            self._keys_file.write(b"".join(key for key, _ in new))
+            self._keys_file.flush()
+
+    def flush(self):
+        self._vectors.flush()
+        self._keys_file.flush()
+        os.fsync(self._keys_file.fileno())
+
+    def close(self):
+        self.flush()
+        self._keys_file.close()
+        self._lock_file.close()
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache: a bounded in-memory LRU in front of an optional
+    on-disk store. Entries are keyed by model name plus a hash of the text; each
+    backend gets its own cache and its own directory under `cache_dir`.
+
+    Args:
+        model_name (str): The name of the embedding model.
+        max_entries (int): The maximum number of embeddings kept in memory.
+        cache_dir (Optional[str]): Root directory for the on-disk store; disabled if empty.
+        backend (str): The backend producing the embeddings, e.g. "torch" or "onnx".
+    """
+
+    def __init__(self, model_name: str, max_entries: int = 10000, cache_dir: Optional[str] = None, backend: str = "torch"):
+        self.model_name = model_name
+        self.backend = backend
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._store: Optional[DiskEmbeddingStore] = None
+        self._store_dir = None
+        if cache_dir:
+            self._store_dir = os.path.join(cache_dir, backend, model_name.replace("/", "__"))
+            meta_path = os.path.join(self._store_dir, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    self._store = DiskEmbeddingStore(self._store_dir, json.load(f)["dim"])
+
+    def _open_store(self, dim: int):
+        os.makedirs(self._store_dir, exist_ok=True)
+        with open(os.path.join(self._store_dir, "meta.json"), "w") as f:
+            json.dump({"model_name": self.model_name, "backend": self.backend, "dim": dim}, f)
+        self._store = DiskEmbeddingStore(self._store_dir, dim)
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        # Cached vectors are shared between callers, so keep them immutable
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Looks up cached embeddings for a list of texts.
+
+        Args:
+            texts (Sequence[str]): The texts to look up.
+
+        Returns:
+            List[Optional[np.ndarray]]: The cached embedding for each text, or None on a miss.
+        """
+        results = []
+        with self._lock:
+            for text in texts:
+                key = embedding_key(self.model_name, text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                elif self._store is not None and (vector := self._store.get(key)) is not None:
+                    self._remember(key, vector)
+                    vector = self._memory[key]
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                results.append(vector)
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray):
+        """
+        Stores embeddings for a list of texts in memory and, if enabled, on disk.
+
+        Args:
+            texts (Sequence[str]): The encoded texts.
+            vectors (np.ndarray): The embeddings, one row per text.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        keys = [embedding_key(self.model_name, text) for text in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._store_dir:
+                if self._store is None:
+                    self._open_store(vectors.shape[1])
+                self._store.put_many(keys, vectors)
+
+    def flush(self):
+        with self._lock:
+            if self._store is not None:
+                self._store.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._store) if self._store is not None else 0,
+        }
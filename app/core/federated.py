@@ -0,0 +1,300 @@
+# app/core/federated.py -- federated averaging rounds for FNRL policy heads
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+COMPRESSION_METHODS = ("none", "fp16", "topk")
+
+
+def compress_delta(delta: np.ndarray, method: str = "fp16", topk_ratio: float = 0.01) -> Dict[str, Any]:
+    """
+    Encodes a weight delta for exchange.
+
+    Args:
+        delta (np.ndarray): The weight delta.
+        method (str): "none", "fp16" (half precision) or "topk" (largest-magnitude entries, in half precision).
+        topk_ratio (float): The fraction of entries kept by "topk".
+
+    Returns:
+        Dict[str, Any]: The encoded delta.
+    """
+    if method == "none":
+        return {"method": method, "values": delta}
+    if method == "fp16":
+        return {"method": method, "values": delta.astype(np.float16)}
+    if method == "topk":
+        flat = delta.ravel()
+        k = max(1, int(flat.size * topk_ratio))
+        indices = np.argpartition(np.abs(flat), -k)[-k:] if k < flat.size else np.arange(flat.size)
+        return {"method": method, "shape": delta.shape, "indices": indices.astype(np.int32), "values": flat[indices].astype(np.float16)}
+    raise ValueError(f"Unknown compression method: {method}. Must be one of {COMPRESSION_METHODS}")
+
+
+def decompress_delta(payload: Dict[str, Any]) -> np.ndarray:
+    if payload["method"] == "topk":
+        delta = np.zeros(int(np.prod(payload["shape"])), dtype=np.float32)
+        delta[payload["indices"]] = payload["values"]
+        return delta.reshape(payload["shape"])
+    return payload["values"].astype(np.float32)
+
+
+def payload_nbytes(payload: Dict[str, Any]) -> int:
+    return sum(value.nbytes for value in payload.values() if isinstance(value, np.ndarray))
+
+
+def local_update(weight: np.ndarray, bias: np.ndarray, embeddings: np.ndarray, actions: np.ndarray,
+                 epochs: int, learning_rate: float, mu: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trains a softmax policy head on one client's examples, starting from the global head.
+
+    With `mu > 0` this is FedProx: a proximal term keeps the local head near
+    the global one. With `mu = 0` it is plain FedAvg local training.
+
+    Args:
+        weight (np.ndarray): The global (num_actions x hidden) weight.
+        bias (np.ndarray): The global bias.
+        embeddings (np.ndarray): The client's state embeddings.
+        actions (np.ndarray): The action index taken in each state.
+        epochs (int): Full-batch gradient steps.
+        learning_rate (float): The step size.
+        mu (float): The proximal term's strength.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The weight and bias deltas.
+    """
+    local_weight, local_bias = weight.copy(), bias.copy()
+    targets = np.eye(len(bias), dtype=np.float32)[actions]
+    for _ in range(epochs):
+        logits = embeddings @ local_weight.T + local_bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - targets) / len(actions)
+        local_weight -= learning_rate * (error.T @ embeddings + mu * (local_weight - weight))
+        local_bias -= learning_rate * (error.sum(axis=0) + mu * (local_bias - bias))
+    return local_weight - weight, local_bias - bias
+
+
+def _train_shard(task) -> Tuple[Dict[Hashable, Tuple[List[Dict[str, Any]], int]], int, int]:
+    # Runs in a worker process: local training for a shard of clients, then one compressed
+    # average delta per cluster, so the coordinator receives and sums one payload per worker.
+    clients, global_heads, config = task
+    sums: Dict[Hashable, List] = {}
+    for key, embeddings, actions in clients:
+        weight, bias = global_heads[key]
+        deltas = local_update(weight, bias, embeddings, actions, config["epochs"], config["learning_rate"], config["mu"])
+        count = len(actions)
+        entry = sums.setdefault(key, [np.zeros_like(weight), np.zeros_like(bias), 0])
+        entry[0] += count * deltas[0]
+        entry[1] += count * deltas[1]
+        entry[2] += count
+    partial: Dict[Hashable, Tuple[List[Dict[str, Any]], int]] = {}
+    raw_bytes = compressed_bytes = 0
+    for key, (weight_sum, bias_sum, count) in sums.items():
+        payloads = []
+        for delta in (weight_sum / count, bias_sum / count):
+            payload = compress_delta(delta, config["compression"], config["topk_ratio"])
+            raw_bytes += delta.nbytes
+            compressed_bytes += payload_nbytes(payload)
+            payloads.append(payload)
+        partial[key] = (payloads, count)
+    return partial, raw_bytes, compressed_bytes
+
+
+class FederatedTrainer:
+    """
+    Trains FNRL heads by federated rounds instead of per-example updates.
+
+    Agents are the clients: their examples are buffered until a round runs.
+    Each round embeds the buffered states with the shared base model, trains
+    every client locally from its cluster's global head in worker processes,
+    and averages the deltas per cluster weighted by example count (FedAvg,
+    or FedProx when `mu > 0`). Workers pre-aggregate their shard into one
+    average delta per cluster and send it back compressed; the coordinator
+    decompresses and combines the shards' payloads.
+
+    Rounds due by `maybe_run_round` run on a background thread, so the tick
+    that triggers one does not wait for it; `flush_rounds` waits for them,
+    and `close` waits at most `close_timeout` seconds before abandoning them.
+    Worker processes are spawned rather than forked, since the parent holds
+    torch and the other threads' locks.
+
+    Args:
+        fnrl: The FNRL model whose heads are trained.
+        round_interval (int): Ticks between rounds for `maybe_run_round`.
+        min_clients (int): Rounds are skipped until this many clients have data.
+        mu (float): The FedProx proximal strength; 0 for FedAvg.
+        local_epochs (int): Local gradient steps per client per round.
+        learning_rate (float): The local step size.
+        compression (str): How deltas are encoded: "none", "fp16" or "topk".
+        topk_ratio (float): The fraction of entries kept by "topk".
+        max_workers (Optional[int]): Worker processes; defaults to the CPU count.
+        close_timeout (Optional[float]): Seconds `close` waits for running rounds; None waits indefinitely.
+    """
+
+    def __init__(self, fnrl, round_interval: int = 10, min_clients: int = 1, mu: float = 0.0, local_epochs: int = 5,
+                 learning_rate: float = 0.1, compression: str = "fp16", topk_ratio: float = 0.01,
+                 max_workers: Optional[int] = None, close_timeout: Optional[float] = 30.0):
+        if compression not in COMPRESSION_METHODS:
+            raise ValueError(f"Unknown compression method: {compression}. Must be one of {COMPRESSION_METHODS}")
+        self.fnrl = fnrl
+        self.round_interval = round_interval
+        self.min_clients = min_clients
+        self.config = {"epochs": local_epochs, "learning_rate": learning_rate, "mu": mu,
+                       "compression": compression, "topk_ratio": topk_ratio}
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.close_timeout = close_timeout
+        self.rounds = 0
+        self.last_round_stats: Dict[str, Any] = {}
+        self._buffer: Dict[Hashable, Tuple[List[Any], List[int]]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._round_condition = threading.Condition()
+        self._requested = 0
+        self._completed = 0
+        self._round_error: Optional[BaseException] = None
+        self._runner: Optional[threading.Thread] = None
+
+    def add_examples(self, agent_id: Hashable, states: List[Any], actions: List[int]):
+        with self._lock:
+            client_states, client_actions = self._buffer.setdefault(agent_id, ([], []))
+            client_states.extend(states)
+            client_actions.extend(int(action) for action in actions)
+
+    def maybe_run_round(self, tick: int) -> bool:
+        """
+        Starts a round on the training thread if one is due at this tick and enough clients have data.
+
+        Args:
+            tick (int): The current world tick.
+
+        Returns:
+            bool: True if a round was started.
+        """
+        if self.round_interval <= 0 or tick % self.round_interval:
+            return False
+        with self._lock:
+            if len(self._buffer) < self.min_clients:
+                return False
+        with self._round_condition:
+            self._requested += 1
+            if self._runner is None:
+                self._runner = threading.Thread(target=self._run_rounds, name="federated-rounds", daemon=True)
+                self._runner.start()
+            self._round_condition.notify_all()
+        return True
+
+    def _run_rounds(self):
+        while True:
+            with self._round_condition:
+                while self._completed >= self._requested:
+                    self._round_condition.wait()
+                # Rounds requested while one was running are served by the next one
+                requested = self._requested
+            try:
+                self.run_round()
+            except Exception as error:
+                with self._round_condition:
+                    self._round_error = self._round_error or error
+            with self._round_condition:
+                self._completed = requested
+                self._round_condition.notify_all()
+
+    def flush_rounds(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the rounds started by `maybe_run_round` have finished.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the rounds finished, False on timeout.
+        """
+        with self._round_condition:
+            target = self._requested
+            done = self._round_condition.wait_for(lambda: self._completed >= target, timeout)
+            error, self._round_error = self._round_error, None
+        if error is not None:
+            raise error
+        return done
+
+    def run_round(self) -> Dict[str, Any]:
+        """
+        Runs one federated round over all clients with buffered examples.
+
+        Returns:
+            Dict[str, Any]: Round statistics: clients, clusters, examples and exchanged bytes.
+        """
+        with self._lock:
+            buffer, self._buffer = self._buffer, {}
+        if not buffer:
+            return {}
+        agent_ids = list(buffer)
+        embeddings = self.fnrl.embed([state for agent_id in agent_ids for state in buffer[agent_id][0]])
+        embeddings = embeddings.numpy().astype(np.float32)
+        clients, offset = [], 0
+        for agent_id in agent_ids:
+            states, actions = buffer[agent_id]
+            clients.append((self.fnrl.head_key(agent_id), embeddings[offset:offset + len(states)], np.asarray(actions)))
+            offset += len(states)
+        global_heads = {key: self.fnrl.get_head_weights(key) for key in {key for key, _, _ in clients}}
+
+        shard_count = min(len(clients), self.max_workers)
+        shard_size = -(-len(clients) // shard_count)
+        tasks = []
+        for start in range(0, len(clients), shard_size):
+            shard = clients[start:start + shard_size]
+            tasks.append((shard, {key: global_heads[key] for key in {key for key, _, _ in shard}}, self.config))
+        if len(tasks) == 1:
+            results = [_train_shard(tasks[0])]
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            results = list(self._executor.map(_train_shard, tasks))
+
+        totals: Dict[Hashable, List] = {}
+        raw_bytes = compressed_bytes = 0
+        for partial, shard_raw, shard_compressed in results:
+            raw_bytes += shard_raw
+            compressed_bytes += shard_compressed
+            for key, (payloads, count) in partial.items():
+                weight_sum, bias_sum = (count * decompress_delta(payload) for payload in payloads)
+                if key in totals:
+                    totals[key][0] += weight_sum
+                    totals[key][1] += bias_sum
+                    totals[key][2] += count
+                else:
+                    totals[key] = [weight_sum, bias_sum, count]
+        for key, (weight_sum, bias_sum, count) in totals.items():
+            weight, bias = global_heads[key]
+            self.fnrl.set_head_weights(key, weight + weight_sum / count, bias + bias_sum / count)
+
+        self.rounds += 1
+        self.last_round_stats = {
+            "round": self.rounds,
+            "clients": len(clients),
+            "clusters": len(totals),
+            "examples": offset,
+            "raw_bytes": raw_bytes,
+            "compressed_bytes": compressed_bytes,
+        }
+        return self.last_round_stats
+
+    def close(self):
+        """Waits up to `close_timeout` for running rounds, then shuts down the worker processes."""
+        finished = False
+        try:
+            finished = self.flush_rounds(self.close_timeout)
+        finally:
+            self._shutdown_executor(wait=finished)
+
+    def _shutdown_executor(self, wait: bool = True):
+        # A round that overran the close timeout is abandoned: its queued shards are cancelled
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
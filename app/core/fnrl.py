@@ -1,27 +1,378 @@
-# app/core/fnrl.py -- Federated Neural Reinforcement Learning model 
+# app/core/fnrl.py -- Federated Neural Reinforcement Learning model
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
 import numpy as np
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
+from transformers import AutoModel, AutoTokenizer
 import torch
 
+from app.core.startup import startup_registry
+
+
+def state_text(state: Any) -> str:
+    # States may be text or structured observations; the base model reads text
+    if isinstance(state, str):
+        return state
+    if isinstance(state, np.ndarray):
+        state = state.tolist()
+    if isinstance(state, (list, tuple)):
+        return " ".join(state_text(item) for item in state)
+    return str(state)
+
+
+class _LRUCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class PredictionBatcher:
+    """
+    Coalesces concurrent predict calls into batched forward passes.
+
+    A lone request is dispatched at once; requests queued behind it, or
+    behind a running batch, wait at most `max_delay` seconds for others to
+    join them. A batch is dispatched as soon as it holds `max_batch` requests.
+
+    Args:
+        predict_batch: Called with (agent_ids, states) and returning one row of probabilities per request.
+        max_batch (int): The largest batch dispatched at once.
+        max_delay (float): Seconds a batch of concurrent requests waits for more.
+    """
+
+    def __init__(self, predict_batch, max_batch: int = 1024, max_delay: float = 0.002):
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._requests: List[Tuple[Hashable, Any, Future]] = []
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+
+    def submit(self, agent_id: Hashable, state: Any) -> Future:
+        future: Future = Future()
+        with self._condition:
+            self._requests.append((agent_id, state, future))
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="fnrl-predict", daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+        return future
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._requests:
+                    self._condition.wait()
+                # A single caller gains nothing from waiting; callers arriving meanwhile queue for the next batch
+                if 1 < len(self._requests) < self.max_batch:
+                    self._condition.wait(self.max_delay)
+                batch, self._requests = self._requests[:self.max_batch], self._requests[self.max_batch:]
+            try:
+                results = self.predict_batch([agent_id for agent_id, _, _ in batch], [state for _, state, _ in batch])
+            except Exception as error:
+                for _, _, future in batch:
+                    future.set_exception(error)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+
 class FNRL:
-    def __init__(self, num_agents, model_name="distilbert-base-uncased"):
+    """
+    Action policies for many agents on top of one shared, frozen language model.
+
+    The base model is loaded once, on first use, and encodes states into
+    embeddings; each agent only owns a small linear head over them. This keeps
+    memory per agent at a few thousand parameters and lets predictions for any
+    number of agents share one forward pass of the base model:
+
+    - `predict_batch` encodes the distinct states once and applies every
+      agent's head in a single batched matrix product;
+    - `predict` goes through a micro-batcher, so concurrent callers are
+      coalesced into one `predict_batch` call;
+    - `train` enqueues examples for a background worker that groups them per
+      agent and steps each head with its own persistent AdamW optimizer;
+      `flush_training` waits for the queue to drain.
+
+    Token ids and base-model embeddings are cached per state text, since the
+    base model is frozen.
+
+    Agents assigned to a cluster share the cluster's head, so head memory
+    scales with the number of clusters. With a `federated` trainer attached,
+    `train` buffers examples for its next aggregation round instead.
+
+    Args:
+        num_agents (int): The number of agents whose heads are created up front (ids 0..num_agents-1).
+        model_name (str): The Hugging Face base model.
+        num_actions (int): The number of actions each head scores.
+        learning_rate (float): The learning rate of the per-agent optimizers.
+        cache_size (int): The number of state texts whose tokens and embeddings are cached.
+        max_batch (int): The largest batch the micro-batcher dispatches.
+        max_delay (float): Seconds a predict call waits to be batched with others.
+    """
+
+    def __init__(self, num_agents=0, model_name="distilbert-base-uncased", num_actions: int = 5,
+                 learning_rate: float = 1e-3, cache_size: int = 10000, max_batch: int = 1024, max_delay: float = 0.002):
         self.num_agents = num_agents
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.models = [AutoModelForSequenceClassification.from_pretrained(model_name) for _ in range(num_agents)]
-
-    def train(self, agent_id, states, actions):
-        model = self.models[agent_id]
-        inputs = self.tokenizer(states, return_tensors="pt", padding=True, truncation=True)
-        labels = torch.tensor(actions)
-        
-        optimizer = torch.optim.AdamW(model.parameters(), lr=1e-5)
-        loss = model(**inputs, labels=labels).loss
-        loss.backward()
-        optimizer.step()
-
-    def predict(self, agent_id, state):
-        model = self.models[agent_id]
-        inputs = self.tokenizer(state, return_tensors="pt")
+        self.model_name = model_name
+        self.num_actions = num_actions
+        self.learning_rate = learning_rate
+        self._tokenizer = None
+        self._base = None
+        self._load_lock = threading.Lock()
+        self._heads: Dict[Hashable, torch.nn.Linear] = {}
+        self._clusters: Dict[Hashable, Hashable] = {}
+        self.federated = None
+        self._optimizers: Dict[Hashable, torch.optim.Optimizer] = {}
+        self._heads_lock = threading.RLock()
+        self._token_cache = _LRUCache(cache_size)
+        self._embedding_cache = _LRUCache(cache_size)
+        self._batcher = PredictionBatcher(self.predict_batch, max_batch, max_delay)
+        self._training_queue: List[Tuple[Hashable, List[Any], List[int]]] = []
+        self._training_condition = threading.Condition()
+        self._submitted = 0
+        self._trained = 0
+        self._training_error: Optional[BaseException] = None
+        self._trainer: Optional[threading.Thread] = None
+
+    def _load(self):
+        if self._base is not None:
+            return
+        with self._load_lock:
+            if self._base is None:
+                with startup_registry.track("fnrl"):
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    base = AutoModel.from_pretrained(self.model_name)
+                    base.eval()
+                    base.requires_grad_(False)
+                    self._base = base
+                for agent_id in range(self.num_agents):
+                    self.head(agent_id)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._base is not None
+
+    @property
+    def tokenizer(self):
+        self._load()
+        return self._tokenizer
+
+    @property
+    def base_model(self):
+        self._load()
+        return self._base
+
+    @property
+    def hidden_size(self) -> int:
+        return self.base_model.config.hidden_size
+
+    def assign_cluster(self, agent_id: Hashable, cluster_id: Hashable):
+        """Makes an agent use its cluster's shared head from now on."""
+        with self._heads_lock:
+            self._clusters[agent_id] = ("cluster", cluster_id)
+
+    def head_key(self, agent_id: Hashable) -> Hashable:
+        return self._clusters.get(agent_id, agent_id)
+
+    def head(self, agent_id: Hashable) -> torch.nn.Linear:
+        """Returns the policy head used by an agent, creating it on first use."""
+        return self.head_by_key(self.head_key(agent_id))
+
+    def head_by_key(self, key: Hashable) -> torch.nn.Linear:
+        with self._heads_lock:
+            if (head := self._heads.get(key)) is None:
+                head = self._heads[key] = torch.nn.Linear(self.hidden_size, self.num_actions)
+            return head
+
+    def get_head_weights(self, key: Hashable) -> Tuple[np.ndarray, np.ndarray]:
+        with self._heads_lock:
+            head = self.head_by_key(key)
+            return head.weight.detach().numpy().copy(), head.bias.detach().numpy().copy()
+
+    def set_head_weights(self, key: Hashable, weight: np.ndarray, bias: np.ndarray):
+        with self._heads_lock, torch.no_grad():
+            head = self.head_by_key(key)
+            head.weight.copy_(torch.from_numpy(np.asarray(weight, dtype=np.float32)))
+            head.bias.copy_(torch.from_numpy(np.asarray(bias, dtype=np.float32)))
+
+    def remove_agent(self, agent_id: Hashable):
+        with self._heads_lock:
+            if self._clusters.pop(agent_id, None) is None:
+                self._heads.pop(agent_id, None)
+                self._optimizers.pop(agent_id, None)
+
+    def _token_ids(self, texts: Sequence[str]) -> List[List[int]]:
+        ids = [self._token_cache.get(text) for text in texts]
+        missing = [i for i, token_ids in enumerate(ids) if token_ids is None]
+        if missing:
+            encoded = self.tokenizer([texts[i] for i in missing], truncation=True)["input_ids"]
+            for i, token_ids in zip(missing, encoded):
+                self._token_cache.put(texts[i], token_ids)
+                ids[i] = token_ids
+        return ids
+
+    def embed(self, states: Sequence[Any]) -> torch.Tensor:
+        """
+        Encodes states with the shared base model, one forward pass for all uncached states.
+
+        Args:
+            states (Sequence[Any]): The states, as text or structured values.
+
+        Returns:
+            torch.Tensor: One embedding (the first token's hidden state) per state.
+        """
+        texts = [state_text(state) for state in states]
+        unique = list(dict.fromkeys(texts))
+        embeddings = {text: self._embedding_cache.get(text) for text in unique}
+        missing = [text for text, embedding in embeddings.items() if embedding is None]
+        if missing:
+            ids = self._token_ids(missing)
+            longest = max(len(token_ids) for token_ids in ids)
+            pad_id = self.tokenizer.pad_token_id or 0
+            input_ids = torch.full((len(ids), longest), pad_id, dtype=torch.long)
+            attention_mask = torch.zeros((len(ids), longest), dtype=torch.long)
+            for row, token_ids in enumerate(ids):
+                input_ids[row, :len(token_ids)] = torch.tensor(token_ids)
+                attention_mask[row, :len(token_ids)] = 1
+            with torch.no_grad():
+                hidden = self.base_model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state[:, 0]
+            for text, embedding in zip(missing, hidden):
+                embedding = embedding.clone()
+                self._embedding_cache.put(text, embedding)
+                embeddings[text] = embedding
+        return torch.stack([embeddings[text] for text in texts])
+
+    def predict_batch(self, agent_ids: Sequence[Hashable], states: Sequence[Any]) -> np.ndarray:
+        """
+        Predicts action probabilities for many agents in one batched inference.
+
+        Args:
+            agent_ids (Sequence[Hashable]): The agents, one per state.
+            states (Sequence[Any]): Each agent's current state.
+
+        Returns:
+            np.ndarray: An (n x num_actions) array of action probabilities.
+        """
+        embeddings = self.embed(states)
+        with self._heads_lock:
+            heads = [self.head(agent_id) for agent_id in agent_ids]
+            weights = torch.stack([head.weight.detach() for head in heads])
+            biases = torch.stack([head.bias.detach() for head in heads])
         with torch.no_grad():
-            logits = model(**inputs).logits
-        return torch.softmax(logits, dim=-1).numpy()
+            logits = torch.einsum("nah,nh->na", weights, embeddings) + biases
+            return torch.softmax(logits, dim=-1).numpy()
+
+    def predict(self, agent_id: Hashable, state: Any) -> np.ndarray:
+        """
+        Predicts one agent's action probabilities, batched with concurrent calls.
+
+        Args:
+            agent_id (Hashable): The agent.
+            state (Any): The agent's current state.
+
+        Returns:
+            np.ndarray: A (1 x num_actions) array of action probabilities.
+        """
+        return self._batcher.submit(agent_id, state).result()[None, :]
+
+    def train(self, agent_id: Hashable, states: List[Any], actions: List[int]):
+        """
+        Queues training examples for an agent; they are applied in the background.
+
+        Args:
+            agent_id (Hashable): The agent.
+            states (List[Any]): The observed states.
+            actions (List[int]): The action index taken in each state.
+        """
+        if self.federated is not None:
+            self.federated.add_examples(agent_id, states, actions)
+            return
+        with self._training_condition:
+            self._training_queue.append((agent_id, list(states), [int(action) for action in actions]))
+            self._submitted += 1
+            if self._trainer is None:
+                self._trainer = threading.Thread(target=self._run_training, name="fnrl-train", daemon=True)
+                self._trainer.start()
+            self._training_condition.notify_all()
+
+    def _run_training(self):
+        while True:
+            with self._training_condition:
+                while not self._training_queue:
+                    self._training_condition.wait()
+                batch, self._training_queue = self._training_queue, []
+                submitted = self._submitted
+            try:
+                self.train_batch(batch)
+            except Exception as error:
+                with self._training_condition:
+                    self._training_error = self._training_error or error
+            with self._training_condition:
+                self._trained = submitted
+                self._training_condition.notify_all()
+
+    def train_batch(self, examples: Sequence[Tuple[Hashable, List[Any], List[int]]]):
+        """
+        Takes one optimizer step per head over all of its queued examples.
+
+        Args:
+            examples (Sequence[Tuple[Hashable, List[Any], List[int]]]): (agent_id, states, actions) triples.
+        """
+        by_agent: Dict[Hashable, Tuple[List[Any], List[int]]] = {}
+        for agent_id, states, actions in examples:
+            agent_states, agent_actions = by_agent.setdefault(self.head_key(agent_id), ([], []))
+            agent_states.extend(states)
+            agent_actions.extend(actions)
+        all_states = [state for states, _ in by_agent.values() for state in states]
+        embeddings = self.embed(all_states)
+        offset = 0
+        for key, (states, actions) in by_agent.items():
+            agent_embeddings = embeddings[offset:offset + len(states)]
+            offset += len(states)
+            with self._heads_lock:
+                head = self.head_by_key(key)
+                if (optimizer := self._optimizers.get(key)) is None:
+                    optimizer = self._optimizers[key] = torch.optim.AdamW(head.parameters(), lr=self.learning_rate)
+                optimizer.zero_grad()
+                loss = torch.nn.functional.cross_entropy(head(agent_embeddings), torch.tensor(actions))
+                loss.backward()
+                optimizer.step()
+
+    def flush_training(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all queued training examples have been applied.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if training caught up, False on timeout.
+        """
+        with self._training_condition:
+            target = self._submitted
+            done = self._training_condition.wait_for(lambda: self._trained >= target, timeout)
+            error, self._training_error = self._training_error, None
+        if error is not None:
+            raise error
+        return done
@@ -0,0 +1,74 @@
+# app/core/hybrid_query.py -- score fusion and concurrent execution for hybrid symbolic+neural queries
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+# Shared by all knowledge bases; the neural leg spends its time in the encoder, which releases the GIL
+query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="kb-query")
+
+
+def reciprocal_rank_fusion(rankings: Dict[str, List[str]], k: int = 60, weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Fuses ranked key lists with (optionally weighted) reciprocal rank fusion.
+
+    Args:
+        rankings (Dict[str, List[str]]): Ranked keys per leg, best first.
+        k (int): The RRF smoothing constant.
+        weights (Optional[Dict[str, float]]): Per-leg weights; 1.0 when omitted.
+
+    Returns:
+        Dict[str, float]: The fused score per key.
+    """
+    scores: Dict[str, float] = {}
+    for leg, keys in rankings.items():
+        weight = (weights or {}).get(leg, 1.0)
+        for rank, key in enumerate(keys, start=1):
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return scores
+
+
+def weighted_fusion(leg_scores: Dict[str, Dict[str, float]], weights: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """
+    Fuses per-leg scores in [0, 1] by weighted sum.
+
+    Args:
+        leg_scores (Dict[str, Dict[str, float]]): Scores per key for each leg.
+        weights (Optional[Dict[str, float]]): Per-leg weights; 1.0 when omitted.
+
+    Returns:
+        Dict[str, float]: The fused score per key.
+    """
+    scores: Dict[str, float] = {}
+    for leg, leg_result in leg_scores.items():
+        weight = (weights or {}).get(leg, 1.0)
+        for key, score in leg_result.items():
+            scores[key] = scores.get(key, 0.0) + weight * score
+    return scores
+
+
+def run_legs(legs: Dict[str, Callable[[], Dict[str, Any]]], is_sufficient: Callable[[Dict[str, Any]], bool]) -> Dict[str, Dict[str, Any]]:
+    """
+    Runs query legs concurrently and stops as soon as one leg's result is sufficient on its own.
+
+    Legs that have not started yet when a sufficient result arrives are cancelled;
+    legs already running are left to finish in the background and their results
+    are discarded.
+
+    Args:
+        legs (Dict[str, Callable[[], Dict[str, Any]]]): The query legs by name.
+        is_sufficient (Callable[[Dict[str, Any]], bool]): Whether a single leg's result answers the query.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The result per leg; skipped legs map to an empty dict.
+    """
+    futures: Dict[Future, str] = {query_executor.submit(leg): name for name, leg in legs.items()}
+    results: Dict[str, Dict[str, Any]] = {name: {} for name in legs}
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[futures[future]] = future.result()
+        if pending and any(is_sufficient(results[futures[future]]) for future in done):
+            for future in pending:
+                future.cancel()
+            break
+    return results
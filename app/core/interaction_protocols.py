@@ -0,0 +1,454 @@
+# app/core/interaction_protocols.py -- FIPA interaction protocol state tracking, deadlines and contract-net rounds
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from app.core.timer_wheel import TimerWheel
+from app.models.message import ACLMessage, Performative
+
+FIPA_REQUEST = "fipa-request"
+FIPA_QUERY = "fipa-query"
+FIPA_CONTRACT_NET = "fipa-contract-net"
+
+# Per-participant conversation states, stored one byte each
+START, REQUESTED, AGREED, CALLED, PROPOSED, ACCEPTED, DONE, REFUSED, FAILED, REJECTED, TIMED_OUT, CANCELLED = range(12)
+TERMINAL_STATES = frozenset({DONE, REFUSED, FAILED, REJECTED, TIMED_OUT, CANCELLED})
+STATE_NAMES = ("start", "requested", "agreed", "called", "proposed", "accepted", "done", "refused", "failed",
+               "rejected", "timed-out", "cancelled")
+
+INITIATOR, PARTICIPANT = True, False
+
+# Seconds a contract-net initiator has, after the call for proposals, to accept or reject the proposals
+DECISION_TIMEOUT = 60.0
+
+# (state, performative, sent by the initiator) -> next state
+TRANSITIONS: Dict[str, Dict[Tuple[int, Performative, bool], int]] = {
+    FIPA_REQUEST: {
+        (START, Performative.REQUEST, INITIATOR): REQUESTED,
+        (REQUESTED, Performative.AGREE, PARTICIPANT): AGREED,
+        (REQUESTED, Performative.REFUSE, PARTICIPANT): REFUSED,
+        (REQUESTED, Performative.NOT_UNDERSTOOD, PARTICIPANT): FAILED,
+        (REQUESTED, Performative.INFORM, PARTICIPANT): DONE,
+        (REQUESTED, Performative.FAILURE, PARTICIPANT): FAILED,
+        (REQUESTED, Performative.CANCEL, INITIATOR): CANCELLED,
+        (AGREED, Performative.INFORM, PARTICIPANT): DONE,
+        (AGREED, Performative.FAILURE, PARTICIPANT): FAILED,
+        (AGREED, Performative.CANCEL, INITIATOR): CANCELLED,
+    },
+    FIPA_QUERY: {
+        (START, Performative.QUERY, INITIATOR): REQUESTED,
+        (REQUESTED, Performative.INFORM, PARTICIPANT): DONE,
+        (REQUESTED, Performative.REFUSE, PARTICIPANT): REFUSED,
+        (REQUESTED, Performative.FAILURE, PARTICIPANT): FAILED,
+        (REQUESTED, Performative.NOT_UNDERSTOOD, PARTICIPANT): FAILED,
+        (REQUESTED, Performative.CANCEL, INITIATOR): CANCELLED,
+    },
+    FIPA_CONTRACT_NET: {
+        (START, Performative.CFP, INITIATOR): CALLED,
+        (CALLED, Performative.PROPOSE, PARTICIPANT): PROPOSED,
+        (CALLED, Performative.REFUSE, PARTICIPANT): REFUSED,
+        (CALLED, Performative.NOT_UNDERSTOOD, PARTICIPANT): FAILED,
+        (CALLED, Performative.CANCEL, INITIATOR): CANCELLED,
+        (PROPOSED, Performative.ACCEPT_PROPOSAL, INITIATOR): ACCEPTED,
+        (PROPOSED, Performative.REJECT_PROPOSAL, INITIATOR): REJECTED,
+        (ACCEPTED, Performative.INFORM, PARTICIPANT): DONE,
+        (ACCEPTED, Performative.FAILURE, PARTICIPANT): FAILED,
+        (ACCEPTED, Performative.CANCEL, INITIATOR): CANCELLED,
+    },
+}
+INITIATING_PERFORMATIVES = {
+    Performative.REQUEST: FIPA_REQUEST,
+    Performative.QUERY: FIPA_QUERY,
+    Performative.CFP: FIPA_CONTRACT_NET,
+}
+
+
+class ProtocolViolation(ValueError):
+    """Raised when a message is not allowed by its conversation's protocol in the conversation's current state."""
+
+
+class Conversation:
+    """
+    The state of one conversation: a byte per participant plus the pending fan-in, if any.
+
+    Participants are numbered in the order they joined; `states[i]` is the
+    state of the thread between the initiator and participant `i`.
+    """
+
+    __slots__ = ("id", "protocol", "initiator", "participants", "states", "deadline", "waiter", "awaiting",
+                 "pending", "replies", "deciding")
+
+    def __init__(self, conversation_id: UUID, protocol: str, initiator: UUID):
+        self.id = conversation_id
+        self.protocol = protocol
+        self.initiator = initiator
+        self.participants: Dict[UUID, int] = {}
+        self.states = bytearray()
+        self.deadline: Optional[float] = None
+        self.waiter: Optional[asyncio.Future] = None
+        self.awaiting: FrozenSet[int] = frozenset()
+        self.pending = 0
+        self.replies: List[ACLMessage] = []
+        # Whether the deadline is the initiator's decision deadline rather than a reply-by deadline
+        self.deciding = False
+
+    def add_participants(self, participant_ids: Iterable[UUID], state: int):
+        for participant_id in participant_ids:
+            if participant_id not in self.participants:
+                self.participants[participant_id] = len(self.states)
+                self.states.append(state)
+
+    def state_of(self, participant_id: UUID) -> str:
+        return STATE_NAMES[self.states[self.participants[participant_id]]]
+
+    def finished(self) -> bool:
+        return all(state in TERMINAL_STATES for state in self.states)
+
+
+class ProtocolEngine:
+    """
+    Tracks FIPA request, query and contract-net conversations and enforces their deadlines.
+
+    Every message of a tracked conversation goes through `observe`, which
+    checks it against the protocol's transition table and advances the
+    state of the thread between the initiator and that participant. A
+    message the protocol does not allow (a late bid, a reply to a cancelled
+    request, ...) raises `ProtocolViolation`. `reply_by` deadlines live in a
+    timer wheel; when one passes, the participants that have not answered
+    are marked timed out and any fan-in waiting on them completes with the
+    replies received so far. Once a call for proposals ends, the initiator
+    has a decision deadline; proposals still open when it passes are
+    rejected. Finished conversations are dropped, and so are the
+    conversations whose initiator stops waiting (its coroutine is cancelled).
+
+    `call_for_proposals` and `request` are the initiator side: they send
+    the opening messages in one fan-out and collect the answers directly,
+    so thousands of bids never pass through the initiator's mailbox.
+
+    Args:
+        send (Callable[[Iterable[ACLMessage]], Awaitable[int]]): Enqueues messages for delivery, e.g. `MessageBus.fan_out`.
+        tick (float): The timer wheel's resolution in seconds.
+    """
+
+    def __init__(self, send: Callable[[Iterable[ACLMessage]], Awaitable[int]], tick: float = 0.05):
+        self.send = send
+        self.timers = TimerWheel(tick=tick, clock=time.time)
+        self.conversations: Dict[UUID, Conversation] = {}
+        self.violations = 0
+        self._ticker: Optional[asyncio.Task] = None
+        self._sends: set = set()
+
+    def _ensure_ticker(self):
+        if self._ticker is None or self._ticker.done():
+            try:
+                self._ticker = asyncio.get_running_loop().create_task(self._tick())
+            except RuntimeError:
+                # No running loop: deadlines are enforced when `expire_due` is called
+                self._ticker = None
+
+    async def _tick(self):
+        while len(self.timers):
+            await asyncio.sleep(self.timers.tick)
+            self.expire_due()
+
+    def _set_deadline(self, conversation: Conversation, reply_by: Optional[datetime]):
+        if reply_by is None:
+            return
+        conversation.deadline = reply_by.timestamp()
+        conversation.deciding = False
+        self.timers.schedule(conversation.id, conversation.deadline)
+        self._ensure_ticker()
+
+    def _set_decision_deadline(self, conversation: Conversation, timeout: float):
+        if conversation.id not in self.conversations or PROPOSED not in conversation.states:
+            return
+        conversation.deadline = time.time() + timeout
+        conversation.deciding = True
+        self.timers.schedule(conversation.id, conversation.deadline)
+        self._ensure_ticker()
+
+    def _drop(self, conversation: Conversation):
+        if conversation.waiter is not None and not conversation.waiter.done():
+            conversation.waiter.cancel()
+        conversation.waiter = None
+        conversation.pending = 0
+        self.timers.cancel(conversation.id)
+        self.conversations.pop(conversation.id, None)
+
+    def _wait_for(self, conversation: Conversation, participant_ids: Iterable[UUID], answered: FrozenSet[int]) -> asyncio.Future:
+        conversation.waiter = asyncio.get_running_loop().create_future()
+        conversation.awaiting = answered
+        conversation.pending = sum(1 for participant_id in participant_ids
+                                   if conversation.states[conversation.participants[participant_id]] not in answered)
+        conversation.replies = []
+        waiter = conversation.waiter
+        if conversation.pending == 0:
+            self._resolve(conversation)
+        return waiter
+
+    def _resolve(self, conversation: Conversation):
+        if conversation.waiter is not None and not conversation.waiter.done():
+            conversation.waiter.set_result(conversation.replies)
+        conversation.waiter = None
+        conversation.pending = 0
+
+    def _close_if_finished(self, conversation: Conversation):
+        if conversation.finished():
+            self._resolve(conversation)
+            self.timers.cancel(conversation.id)
+            self.conversations.pop(conversation.id, None)
+
+    def observe(self, message: ACLMessage) -> bool:
+        """
+        Checks a message against its conversation's protocol and advances the conversation.
+
+        Messages without a conversation id, or with a protocol this engine
+        does not know, are not tracked.
+
+        Args:
+            message (ACLMessage): A message about to be sent.
+
+        Returns:
+            bool: True if the message answered a pending fan-in and was handed to the
+            waiting initiator, so it need not be delivered to the initiator's mailbox.
+
+        Raises:
+            ProtocolViolation: If the protocol does not allow the message in the conversation's current state.
+        """
+        if message.conversation_id is None:
+            return False
+        conversation = self.conversations.get(message.conversation_id)
+        if conversation is None:
+            protocol = message.protocol or INITIATING_PERFORMATIVES.get(message.performative)
+            if protocol not in TRANSITIONS:
+                return False
+            if (START, message.performative, INITIATOR) not in TRANSITIONS[protocol]:
+                self.violations += 1
+                raise ProtocolViolation(f"{message.performative.value} cannot open a {protocol} conversation "
+                                        f"(conversation {message.conversation_id} is not active)")
+            conversation = self.conversations[message.conversation_id] = Conversation(
+                message.conversation_id, protocol, message.sender_id)
+
+        from_initiator = message.sender_id == conversation.initiator
+        participant_id = message.receiver_id if from_initiator else message.sender_id
+        if participant_id not in conversation.participants:
+            if not from_initiator:
+                self.violations += 1
+                raise ProtocolViolation(f"{participant_id} is not a participant of conversation {conversation.id}")
+            conversation.add_participants((participant_id,), START)
+        index = conversation.participants[participant_id]
+        state = conversation.states[index]
+        next_state = TRANSITIONS[conversation.protocol].get((state, message.performative, from_initiator))
+        if next_state is None:
+            self.violations += 1
+            raise ProtocolViolation(f"{message.performative.value} is not allowed in state {STATE_NAMES[state]} "
+                                    f"of {conversation.protocol} conversation {conversation.id}")
+        conversation.states[index] = next_state
+        if from_initiator:
+            self._set_deadline(conversation, message.reply_by)
+
+        consumed = False
+        if conversation.waiter is not None and not from_initiator:
+            consumed = True
+            conversation.replies.append(message)
+            if next_state in conversation.awaiting and state not in conversation.awaiting:
+                conversation.pending -= 1
+                if conversation.pending == 0:
+                    self._resolve(conversation)
+        self._close_if_finished(conversation)
+        return consumed
+
+    def expire_due(self, now: Optional[float] = None) -> int:
+        """
+        Times out the conversations whose reply-by or decision deadline has passed.
+
+        Proposals left open past the decision deadline are rejected, and the
+        bidders are sent REJECT_PROPOSAL when an event loop is running.
+
+        Args:
+            now (Optional[float]): The current epoch time; defaults to the clock.
+
+        Returns:
+            int: The number of conversations that timed out.
+        """
+        expired = self.timers.advance(now)
+        rejections = []
+        for conversation_id in expired:
+            conversation = self.conversations.get(conversation_id)
+            if conversation is None:
+                continue
+            for index, state in enumerate(conversation.states):
+                # Threads still waiting on the participant time out; proposals await the initiator's decision
+                if state in (REQUESTED, AGREED, CALLED, ACCEPTED):
+                    conversation.states[index] = TIMED_OUT
+            if conversation.deciding:
+                rejections.extend(self._reject_open_proposals(conversation))
+            self._resolve(conversation)
+            self._close_if_finished(conversation)
+        if rejections:
+            self._send_later(rejections)
+        return len(expired)
+
+    def _reject_open_proposals(self, conversation: Conversation) -> List[ACLMessage]:
+        rejections = []
+        for participant_id, index in conversation.participants.items():
+            if conversation.states[index] == PROPOSED:
+                conversation.states[index] = REJECTED
+                rejections.append(ACLMessage.trusted(
+                    sender_id=conversation.initiator, receiver_id=participant_id,
+                    performative=Performative.REJECT_PROPOSAL, content="decision deadline passed",
+                    conversation_id=conversation.id, protocol=FIPA_CONTRACT_NET,
+                ))
+        return rejections
+
+    def _send_later(self, messages: List[ACLMessage]):
+        try:
+            task = asyncio.get_running_loop().create_task(self.send(messages))
+        except RuntimeError:
+            return
+        self._sends.add(task)
+        task.add_done_callback(self._sends.discard)
+
+    async def call_for_proposals(self, initiator_id: UUID, participant_ids: Iterable[UUID], content: Any,
+                                 timeout: float, conversation_id: Optional[UUID] = None,
+                                 decision_timeout: float = DECISION_TIMEOUT) -> Tuple[UUID, List[ACLMessage]]:
+        """
+        Runs the call-for-proposals phase of a contract net.
+
+        Sends a CFP to every participant in one fan-out and waits until each
+        has proposed, refused, or the deadline has passed. The proposals then
+        stay open for `award` until the decision deadline.
+
+        Args:
+            initiator_id (UUID): The agent calling for proposals.
+            participant_ids (Iterable[UUID]): The agents invited to bid.
+            content (Any): The task description.
+            timeout (float): Seconds participants have to answer.
+            conversation_id (Optional[UUID]): The conversation id; a new one if omitted.
+            decision_timeout (float): Seconds the initiator then has to award the contract.
+
+        Returns:
+            Tuple[UUID, List[ACLMessage]]: The conversation id and the PROPOSE, REFUSE and
+            NOT_UNDERSTOOD answers received in time.
+        """
+        conversation_id = conversation_id or uuid4()
+        participant_ids = list(dict.fromkeys(participant_ids))
+        reply_by = datetime.now() + timedelta(seconds=timeout)
+        conversation = self.conversations[conversation_id] = Conversation(conversation_id, FIPA_CONTRACT_NET, initiator_id)
+        conversation.add_participants(participant_ids, CALLED)
+        waiter = self._wait_for(conversation, participant_ids, frozenset({PROPOSED, REFUSED, FAILED}))
+        self._set_deadline(conversation, reply_by)
+        template = ACLMessage(sender_id=initiator_id, receiver_id=initiator_id, performative=Performative.CFP,
+                              content=content, conversation_id=conversation_id, protocol=FIPA_CONTRACT_NET,
+                              reply_by=reply_by)
+        try:
+            await self.send(template.model_copy(update={"id": uuid4(), "receiver_id": participant_id})
+                            for participant_id in participant_ids)
+            self._close_if_finished(conversation)
+            replies = await waiter
+        except asyncio.CancelledError:
+            self._drop(conversation)
+            raise
+        self._set_decision_deadline(conversation, decision_timeout)
+        return conversation_id, replies
+
+    async def award(self, conversation_id: UUID, accepted_ids: Iterable[UUID], content: Any = None,
+                    timeout: float = 30.0) -> List[ACLMessage]:
+        """
+        Accepts some proposals of a contract net, rejects the rest, and waits for the results.
+
+        Args:
+            conversation_id (UUID): The contract net's conversation.
+            accepted_ids (Iterable[UUID]): The participants whose proposals are accepted.
+            content (Any): The content of the accept and reject messages.
+            timeout (float): Seconds the accepted participants have to report a result.
+
+        Returns:
+            List[ACLMessage]: The INFORM and FAILURE results received in time.
+
+        Raises:
+            ProtocolViolation: If the conversation is not active or an accepted participant has not proposed.
+        """
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            raise ProtocolViolation(f"Contract net {conversation_id} is not active")
+        accepted_ids = set(accepted_ids)
+        for participant_id in accepted_ids:
+            index = conversation.participants.get(participant_id)
+            if index is None or conversation.states[index] != PROPOSED:
+                raise ProtocolViolation(f"{participant_id} has no open proposal in contract net {conversation_id}")
+        reply_by = datetime.now() + timedelta(seconds=timeout)
+        messages = []
+        for participant_id, index in conversation.participants.items():
+            if conversation.states[index] != PROPOSED:
+                continue
+            accept = participant_id in accepted_ids
+            conversation.states[index] = ACCEPTED if accept else REJECTED
+            messages.append(ACLMessage.trusted(
+                id=uuid4(), sender_id=conversation.initiator, receiver_id=participant_id,
+                performative=Performative.ACCEPT_PROPOSAL if accept else Performative.REJECT_PROPOSAL,
+                content=content, conversation_id=conversation_id, protocol=FIPA_CONTRACT_NET,
+                reply_by=reply_by if accept else None,
+            ))
+        waiter = self._wait_for(conversation, accepted_ids, frozenset({DONE, FAILED}))
+        self._set_deadline(conversation, reply_by)
+        try:
+            await self.send(messages)
+            self._close_if_finished(conversation)
+            return await waiter
+        except asyncio.CancelledError:
+            self._drop(conversation)
+            raise
+
+    async def request(self, initiator_id: UUID, participant_id: UUID, content: Any, timeout: float,
+                      performative: Performative = Performative.REQUEST) -> Optional[ACLMessage]:
+        """
+        Sends a FIPA request or query and waits for its outcome.
+
+        Args:
+            initiator_id (UUID): The requesting agent.
+            participant_id (UUID): The agent asked.
+            content (Any): The request or query.
+            timeout (float): Seconds the participant has to answer.
+            performative (Performative): REQUEST or QUERY.
+
+        Returns:
+            Optional[ACLMessage]: The INFORM, FAILURE or REFUSE answer, or None if the deadline passed.
+        """
+        protocol = INITIATING_PERFORMATIVES[performative]
+        reply_by = datetime.now() + timedelta(seconds=timeout)
+        message = ACLMessage(sender_id=initiator_id, receiver_id=participant_id, performative=performative,
+                             content=content, conversation_id=uuid4(), protocol=protocol, reply_by=reply_by)
+        self.observe(message)
+        conversation = self.conversations[message.conversation_id]
+        waiter = self._wait_for(conversation, (participant_id,), frozenset({DONE, REFUSED, FAILED}))
+        try:
+            await self.send((message,))
+            replies = await waiter
+        except asyncio.CancelledError:
+            self._drop(conversation)
+            raise
+        # AGREE is an intermediate answer; the outcome is the last reply
+        return replies[-1] if replies and replies[-1].performative != Performative.AGREE else None
+
+    def state(self, conversation_id: UUID) -> Optional[Dict[str, Any]]:
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            return None
+        return {
+            "protocol": conversation.protocol,
+            "initiator": conversation.initiator,
+            "deadline": conversation.deadline,
+            "participants": {participant_id: STATE_NAMES[conversation.states[index]]
+                             for participant_id, index in conversation.participants.items()},
+        }
+
+    async def close(self):
+        if self._ticker is not None:
+            self._ticker.cancel()
+            await asyncio.gather(self._ticker, return_exceptions=True)
+            self._ticker = None
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
@@ -0,0 +1,269 @@
+# app/core/kinetic_engine.py -- transition dynamics between agent states, simulated exactly or by tau-leaping
+import numpy as np
+from pydantic import BaseModel, Field
+from typing import Optional, Sequence, Tuple
+
+
+class KineticRule(BaseModel):
+    """
+    A transition of agents from one state to another.
+
+    Without a catalyst, each agent in `source` moves to `target` at `rate`
+    per unit time. With a catalyst, the per-agent rate is scaled by the
+    fraction of the population in the catalyst state, as in infection-style
+    mass action (source + catalyst -> target + catalyst).
+
+    Attributes:
+        source (int): The state agents leave.
+        target (int): The state agents enter.
+        rate (float): The per-agent rate constant.
+        catalyst (Optional[int]): The state whose population drives the transition, if any.
+    """
+    source: int = Field(..., ge=0)
+    target: int = Field(..., ge=0)
+    rate: float = Field(..., ge=0)
+    catalyst: Optional[int] = Field(default=None, ge=0)
+
+
+def _expm(matrix: np.ndarray, order: int = 12) -> np.ndarray:
+    # Matrix exponential by scaling and squaring of a truncated Taylor series
+    norm = np.abs(matrix).sum(axis=1).max()
+    squarings = int(np.ceil(np.log2(norm))) + 1 if norm > 0.5 else 0
+    scaled = matrix / (2 ** squarings)
+    result = np.eye(len(matrix))
+    term = np.eye(len(matrix))
+    for k in range(1, order + 1):
+        term = term @ scaled / k
+        result = result + term
+    for _ in range(squarings):
+        result = result @ result
+    return result
+
+
+class KineticEngine:
+    """
+    Simulates populations of agents moving between states under kinetic rules.
+
+    Rules are compiled into arrays once, so propensities for any number of
+    population vectors are computed with a handful of array operations.
+    Three simulation modes are offered:
+
+    - `gillespie`: the exact stochastic simulation algorithm, run for many
+      replicates at once, one event per replicate per iteration;
+    - `tau_leap`: fixed time steps with Poisson-distributed firings, suited to
+      large populations where exact simulation fires too many events;
+    - `mean_field`: the deterministic expected trajectory.
+
+    Args:
+        num_states (int): The number of agent states.
+        rules (Sequence[KineticRule]): The transitions between states.
+    """
+
+    def __init__(self, num_states: int, rules: Sequence[KineticRule]):
+        self.num_states = num_states
+        self.rules = list(rules)
+        for rule in self.rules:
+            if max(rule.source, rule.target, rule.catalyst or 0) >= num_states:
+                raise ValueError(f"Rule {rule} refers to a state outside 0..{num_states - 1}")
+        self._sources = np.array([rule.source for rule in self.rules], dtype=np.intp)
+        self._targets = np.array([rule.target for rule in self.rules], dtype=np.intp)
+        self._catalysts = np.array([-1 if rule.catalyst is None else rule.catalyst for rule in self.rules], dtype=np.intp)
+        self._rates = np.array([rule.rate for rule in self.rules], dtype=np.float64)
+        self._catalysed = self._catalysts >= 0
+        # Net change in each state's population when a rule fires once
+        self.stoichiometry = np.zeros((len(self.rules), num_states), dtype=np.int64)
+        np.add.at(self.stoichiometry, (np.arange(len(self.rules)), self._sources), -1)
+        np.add.at(self.stoichiometry, (np.arange(len(self.rules)), self._targets), 1)
+        # Maps per-rule firings to the number of agents drawn from each state
+        self._consumption = np.zeros((len(self.rules), num_states), dtype=np.int64)
+        self._consumption[np.arange(len(self.rules)), self._sources] = 1
+
+    def _per_agent_rates(self, counts: np.ndarray) -> np.ndarray:
+        total = counts.sum(axis=-1, keepdims=True)
+        fractions = counts / np.where(total > 0, total, 1)
+        catalyst_fraction = np.where(self._catalysed, fractions[..., np.maximum(self._catalysts, 0)], 1.0)
+        return self._rates * catalyst_fraction
+
+    def propensities(self, counts) -> np.ndarray:
+        """
+        Computes how often each rule fires for one or many populations.
+
+        Args:
+            counts: Population counts per state, shaped (..., num_states).
+
+        Returns:
+            np.ndarray: Firing rates per rule, shaped (..., len(rules)).
+        """
+        counts = np.asarray(counts, dtype=np.float64)
+        return self._per_agent_rates(counts) * counts[..., self._sources]
+
+    def generator(self, counts=None) -> np.ndarray:
+        """
+        Builds the per-agent transition rate matrix.
+
+        Catalysed rules depend on the population, so `counts` is required when
+        any rule has a catalyst; the rates are then those of a single agent in
+        that population (the mean-field approximation).
+
+        Args:
+            counts: Population counts per state.
+
+        Returns:
+            np.ndarray: A (num_states x num_states) generator whose rows sum to zero.
+        """
+        if counts is None:
+            if self._catalysed.any():
+                raise ValueError("Population counts are required for rules with a catalyst")
+            counts = np.ones(self.num_states)
+        rates = self._per_agent_rates(np.asarray(counts, dtype=np.float64))
+        generator = np.zeros((self.num_states, self.num_states))
+        np.add.at(generator, (self._sources, self._targets), rates)
+        np.add.at(generator, (self._sources, self._sources), -rates)
+        return generator
+
+    def transition_matrix(self, dt: float, counts=None) -> np.ndarray:
+        """
+        Computes the probabilities of moving between states within a time step.
+
+        Args:
+            dt (float): The time step.
+            counts: Population counts per state; required when rules have catalysts.
+
+        Returns:
+            np.ndarray: A row-stochastic (num_states x num_states) matrix.
+        """
+        return _expm(self.generator(counts) * dt)
+
+    def gillespie(self, initial_counts, t_end: float, num_samples: int = 101, replicates: int = 1,
+                  seed: Optional[int] = None, max_events: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Runs the exact stochastic simulation algorithm for many replicates at once.
+
+        Args:
+            initial_counts: Starting population counts per state.
+            t_end (float): The simulated time span.
+            num_samples (int): The number of evenly spaced sample times, including 0 and t_end.
+            replicates (int): The number of independent runs.
+            seed (Optional[int]): The random seed.
+            max_events (Optional[int]): Stop after this many events per replicate.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The sample times, and counts shaped (num_samples, replicates, num_states).
+        """
+        rng = np.random.default_rng(seed)
+        times = np.linspace(0.0, t_end, num_samples)
+        counts = np.tile(np.asarray(initial_counts, dtype=np.int64), (replicates, 1))
+        trajectory = np.empty((num_samples, replicates, self.num_states), dtype=np.int64)
+        clock = np.zeros(replicates)
+        next_sample = np.zeros(replicates, dtype=np.intp)
+        active = np.arange(replicates)
+        events = 0
+        while len(active):
+            propensities = self.propensities(counts[active])
+            total = propensities.sum(axis=1)
+            exhausted = total <= 0
+            waits = rng.exponential(1.0 / np.where(exhausted, 1.0, total))
+            arrival = np.where(exhausted, np.inf, clock[active] + waits)
+            if max_events is not None and events >= max_events:
+                arrival[:] = np.inf
+            # The current state holds for every sample time before the next event
+            recorded_until = np.searchsorted(times, arrival, side="left")
+            while True:
+                pending = next_sample[active] < recorded_until
+                if not pending.any():
+                    break
+                rows = active[pending]
+                trajectory[next_sample[rows], rows] = counts[rows]
+                next_sample[rows] += 1
+            firing = arrival <= t_end
+            if firing.any():
+                thresholds = rng.random(firing.sum()) * total[firing]
+                chosen = (np.cumsum(propensities[firing], axis=1) < thresholds[:, None]).sum(axis=1)
+                chosen = np.minimum(chosen, len(self.rules) - 1)
+                rows = active[firing]
+                counts[rows] += self.stoichiometry[chosen]
+                clock[rows] = arrival[firing]
+            active = active[firing]
+            events += 1
+        return times, trajectory
+
+    def tau_leap(self, initial_counts, t_end: float, tau: float, replicates: int = 1,
+                 seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Simulates with fixed time steps, firing each rule a Poisson number of times per step.
+
+        Firings that would take more agents out of a state than it holds are
+        scaled down, so populations never go negative.
+
+        Args:
+            initial_counts: Starting population counts per state.
+            t_end (float): The simulated time span.
+            tau (float): The time step.
+            replicates (int): The number of independent runs.
+            seed (Optional[int]): The random seed.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The step times, and counts shaped (steps + 1, replicates, num_states).
+        """
+        rng = np.random.default_rng(seed)
+        steps = int(np.ceil(t_end / tau))
+        counts = np.tile(np.asarray(initial_counts, dtype=np.int64), (replicates, 1))
+        trajectory = np.empty((steps + 1, replicates, self.num_states), dtype=np.int64)
+        trajectory[0] = counts
+        for step in range(1, steps + 1):
+            firings = rng.poisson(self.propensities(counts) * tau)
+            demand = firings @ self._consumption
+            scale = np.where(demand > counts, counts / np.maximum(demand, 1), 1.0)
+            firings = np.floor(firings * scale[:, self._sources]).astype(np.int64)
+            counts = counts + firings @ self.stoichiometry
+            trajectory[step] = counts
+        return np.arange(steps + 1) * tau, trajectory
+
+    def mean_field(self, initial_counts, t_end: float, dt: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Integrates the expected population over time.
+
+        Args:
+            initial_counts: Starting population counts per state.
+            t_end (float): The simulated time span.
+            dt (float): The time step.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The step times, and expected counts shaped (steps + 1, num_states).
+        """
+        steps = int(np.ceil(t_end / dt))
+        counts = np.asarray(initial_counts, dtype=np.float64)
+        trajectory = np.empty((steps + 1, self.num_states))
+        trajectory[0] = counts
+        for step in range(1, steps + 1):
+            # Exact within a step for the population frozen at its start
+            counts = counts @ self.transition_matrix(dt, counts)
+            trajectory[step] = counts
+        return np.arange(steps + 1) * dt, trajectory
+
+    def forecast(self, initial_counts, t_end: float, method: str = "tau_leap", dt: float = 1.0,
+                 replicates: int = 100, seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Forecasts the mean population per state over time.
+
+        Args:
+            initial_counts: Starting population counts per state.
+            t_end (float): The forecast horizon.
+            method (str): "gillespie", "tau_leap" or "mean_field".
+            dt (float): The step or sampling interval.
+            replicates (int): The number of stochastic runs averaged.
+            seed (Optional[int]): The random seed.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The times, and mean counts shaped (len(times), num_states).
+        """
+        if method == "mean_field":
+            return self.mean_field(initial_counts, t_end, dt)
+        if method == "tau_leap":
+            times, trajectory = self.tau_leap(initial_counts, t_end, dt, replicates, seed)
+        elif method == "gillespie":
+            times, trajectory = self.gillespie(initial_counts, t_end, int(np.ceil(t_end / dt)) + 1, replicates, seed)
+        else:
+            raise ValueError(f"Unknown forecast method: {method}. Must be 'gillespie', 'tau_leap' or 'mean_field'")
+        return times, trajectory.mean(axis=1)
+
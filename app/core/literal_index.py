@@ -0,0 +1,145 @@
+# app/core/literal_index.py -- inverted index over the literal objects of an RDF graph
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from rdflib import Literal
+
+Triple = Tuple[object, object, object]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into case-folded word tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        List[str]: The tokens, in order of appearance.
+    """
+    return _TOKEN_PATTERN.findall(text.casefold())
+
+
+def triple_order(triple: Triple) -> Tuple[str, str, str]:
+    """Sort key giving triples a stable order (by the N3 form of subject, predicate and object)."""
+    return tuple(term.n3() for term in triple)
+
+
+class LiteralIndex:
+    """
+    Secondary index over triples whose object is a Literal.
+
+    Keeps three structures in sync with the graph:
+    an exact index keyed by the case-folded literal, a token index for
+    keyword search, and a sorted token vocabulary for prefix search.
+    Triples are also grouped by subject so removing a subject is cheap.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, Set[Triple]] = {}
+        self._postings: Dict[str, Set[Triple]] = {}
+        self._vocabulary: List[str] = []
+        self._by_subject: Dict[object, Set[Triple]] = {}
+
+    def add(self, subject, predicate, obj):
+        if not isinstance(obj, Literal):
+            return
+        triple = (subject, predicate, obj)
+        text = str(obj)
+        self._exact.setdefault(text.casefold(), set()).add(triple)
+        for token in set(tokenize(text)):
+            if token not in self._postings:
+                self._postings[token] = set()
+                insort(self._vocabulary, token)
+            self._postings[token].add(triple)
+        self._by_subject.setdefault(subject, set()).add(triple)
+
+    def remove(self, subject, predicate, obj):
+        if not isinstance(obj, Literal):
+            return
+        triple = (subject, predicate, obj)
+        text = str(obj)
+        self._discard(self._exact, text.casefold(), triple)
+        for token in set(tokenize(text)):
+            if self._discard(self._postings, token, triple):
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+        self._discard(self._by_subject, subject, triple)
+
+    def remove_subject(self, subject):
+        for triple in list(self._by_subject.get(subject, ())):
+            self.remove(*triple)
+
+    @staticmethod
+    def _discard(index: Dict, key, triple: Triple) -> bool:
+        """Removes a triple from a posting set; returns True if the set became empty and was dropped."""
+        postings = index.get(key)
+        if postings is None:
+            return False
+        postings.discard(triple)
+        if not postings:
+            del index[key]
+            return True
+        return False
+
+    def lookup(self, value, ignore_case: bool = False) -> List[Triple]:
+        """
+        Finds triples whose literal equals the value.
+
+        Args:
+            value: The literal value; a plain string matches untyped literals only, like `Literal(value)` would.
+            ignore_case (bool): Whether to match the lexical form case-insensitively, whatever the datatype.
+
+        Returns:
+            List[Triple]: The matching triples, in `triple_order`.
+        """
+        candidates = self._exact.get(str(value).casefold(), ())
+        if not ignore_case:
+            literal = value if isinstance(value, Literal) else Literal(value)
+            candidates = [triple for triple in candidates if triple[2] == literal]
+        return sorted(candidates, key=triple_order)
+
+    def _prefix_postings(self, prefix: str) -> Set[Triple]:
+        matches: Set[Triple] = set()
+        position = bisect_left(self._vocabulary, prefix)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(prefix):
+            matches |= self._postings[self._vocabulary[position]]
+            position += 1
+        return matches
+
+    def search(self, text: str, prefix: bool = False, match_all: bool = True, limit: Optional[int] = None) -> List[Triple]:
+        """
+        Finds triples whose literal contains the tokens of the text.
+
+        Args:
+            text (str): The keywords to search for.
+            prefix (bool): Whether the last token matches any token it is a prefix of.
+            match_all (bool): Whether every token must match (AND) or any token (OR).
+            limit (Optional[int]): The maximum number of triples to return.
+
+        Returns:
+            List[Triple]: The matching triples, in `triple_order`, so a limit always keeps the same ones.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        candidate_sets = [self._postings.get(token, set()) for token in tokens[:-1]]
+        candidate_sets.append(self._prefix_postings(tokens[-1]) if prefix else self._postings.get(tokens[-1], set()))
+        if match_all:
+            candidate_sets.sort(key=len)
+            matches = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+        else:
+            matches = set().union(*candidate_sets)
+        results = sorted(matches, key=triple_order)
+        return results[:limit] if limit is not None else results
+
+    def rebuild(self, triples: Iterable[Triple]):
+        """Rebuilds the index from scratch, e.g. after the graph was loaded from disk."""
+        self.__init__()
+        for triple in triples:
+            self.add(*triple)
+
+    def __len__(self) -> int:
+        return sum(len(triples) for triples in self._by_subject.values())
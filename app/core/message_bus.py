@@ -0,0 +1,285 @@
+# app/core/message_bus.py -- per-agent bounded mailboxes drained by a pool of asyncio workers
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest", "reject")
+
+
+class MailboxFull(Exception):
+    """Raised when a message cannot be enqueued because the receiver's mailbox is full."""
+
+
+class Mailbox:
+    __slots__ = ("messages", "capacity", "scheduled", "space_waiters", "removed")
+
+    def __init__(self, capacity: int):
+        self.messages: Deque[Any] = deque()
+        self.capacity = capacity
+        self.scheduled = False
+        self.space_waiters: Deque[asyncio.Future] = deque()
+        self.removed = False
+
+    def full(self) -> bool:
+        return len(self.messages) >= self.capacity
+
+
+class MessageBus:
+    """
+    Delivers messages through one bounded mailbox per receiver.
+
+    Senders return as soon as a message is enqueued; a fixed pool of worker
+    tasks drains the mailboxes and calls `handler` for each message. A
+    mailbox is drained by at most one worker at a time, so every receiver
+    sees its messages in the order they were sent, while different receivers
+    are served concurrently. Handlers that send replies only enqueue them,
+    so request/reply chains never nest on the caller's coroutine.
+    Handlers must reply with `reply`, never `send`: a worker waiting for space
+    in a mailbox that only workers drain can deadlock the pool.
+
+    When a mailbox is full the overflow policy decides what happens:
+    "block" makes `send` wait for space (backpressure), "drop_oldest"
+    evicts the oldest queued message, "drop_newest" discards the new one
+    and "reject" raises `MailboxFull`.
+
+    Args:
+        handler (Callable[[Any], Awaitable[None]]): Processes one delivered message.
+        mailbox_size (int): The capacity of each receiver's mailbox.
+        overflow (str): The overflow policy.
+        workers (int): The number of worker tasks draining mailboxes.
+        batch_size (int): Messages a worker takes from one mailbox before yielding it to others.
+        receiver (Callable[[Any], Hashable]): Returns the mailbox key for a message.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[None]], mailbox_size: int = 1000, overflow: str = "block",
+                 workers: int = 8, batch_size: int = 64,
+                 receiver: Callable[[Any], Hashable] = lambda message: message.receiver_id):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}. Must be one of {OVERFLOW_POLICIES}")
+        self.handler = handler
+        self.mailbox_size = mailbox_size
+        self.overflow = overflow
+        self.num_workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.receiver = receiver
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+        self._mailboxes: Dict[Hashable, Mailbox] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending = 0
+        self._idle: Optional[asyncio.Event] = None
+        self._error: Optional[BaseException] = None
+
+    def start(self):
+        """Starts the worker pool on the running event loop; safe to call more than once."""
+        if self._workers:
+            return
+        loop = asyncio.get_running_loop()
+        if self._ready is None:
+            self._ready = asyncio.Queue()
+            self._idle = asyncio.Event()
+            if self._pending == 0:
+                self._idle.set()
+        self._workers = [loop.create_task(self._work()) for _ in range(self.num_workers)]
+
+    def _mailbox(self, key: Hashable) -> Mailbox:
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            mailbox = self._mailboxes[key] = Mailbox(self.mailbox_size)
+        return mailbox
+
+    def _enqueue(self, mailbox: Mailbox, message: Any):
+        mailbox.messages.append(message)
+        self._pending += 1
+        self._idle.clear()
+        if not mailbox.scheduled:
+            mailbox.scheduled = True
+            self._ready.put_nowait(mailbox)
+
+    def post(self, message: Any) -> bool:
+        """
+        Enqueues a message without waiting.
+
+        Under the "block" policy a full mailbox raises `MailboxFull`; use `send` to wait for space instead.
+
+        Args:
+            message (Any): The message to deliver.
+
+        Returns:
+            bool: False if the message was dropped by the "drop_newest" policy.
+
+        Raises:
+            MailboxFull: If the mailbox is full and the policy is "block" or "reject".
+        """
+        self.start()
+        mailbox = self._mailbox(self.receiver(message))
+        if mailbox.full():
+            if self.overflow == "drop_oldest":
+                mailbox.messages.popleft()
+                self._message_done()
+                self.dropped += 1
+            elif self.overflow == "drop_newest":
+                self.dropped += 1
+                return False
+            else:
+                raise MailboxFull(f"Mailbox for {self.receiver(message)} is full ({mailbox.capacity} messages)")
+        self._enqueue(mailbox, message)
+        return True
+
+    def reply(self, message: Any) -> bool:
+        """
+        Enqueues a message sent from a handler, without waiting.
+
+        Under the "block" policy the message goes past the mailbox's capacity
+        instead of waiting for space, since the workers that would make space
+        may all be waiting too; backpressure applies to external senders only.
+        Other policies apply as in `post`.
+
+        Args:
+            message (Any): The message to deliver.
+
+        Returns:
+            bool: False if the message was dropped by the "drop_newest" policy.
+
+        Raises:
+            MailboxFull: If the mailbox is full and the policy is "reject".
+        """
+        if self.overflow != "block":
+            return self.post(message)
+        self.start()
+        self._enqueue(self._mailbox(self.receiver(message)), message)
+        return True
+
+    async def send(self, message: Any) -> bool:
+        """
+        Enqueues a message, waiting for mailbox space under the "block" policy.
+
+        Args:
+            message (Any): The message to deliver.
+
+        Returns:
+            bool: False if the message was dropped by the "drop_newest" policy.
+        """
+        if self.overflow != "block":
+            return self.post(message)
+        self.start()
+        key = self.receiver(message)
+        # Looked up again after each wait, in case the mailbox was removed meanwhile
+        while (mailbox := self._mailbox(key)).full():
+            waiter = asyncio.get_running_loop().create_future()
+            mailbox.space_waiters.append(waiter)
+            await waiter
+        self._enqueue(mailbox, message)
+        return True
+
+    async def fan_out(self, messages: Iterable[Any]) -> int:
+        """
+        Enqueues many messages at once; workers then deliver them concurrently.
+
+        Messages whose mailbox has space are enqueued immediately; under the
+        "block" policy the rest wait for space together rather than one by one.
+
+        Args:
+            messages (Iterable[Any]): The messages to deliver.
+
+        Returns:
+            int: The number of messages enqueued.
+        """
+        accepted = 0
+        blocked = []
+        for message in messages:
+            try:
+                accepted += self.post(message)
+            except MailboxFull:
+                if self.overflow != "block":
+                    raise
+                blocked.append(message)
+        if blocked:
+            accepted += sum(await asyncio.gather(*(self.send(message) for message in blocked)))
+        return accepted
+
+    def _message_done(self):
+        self._pending -= 1
+        if self._pending == 0:
+            self._idle.set()
+
+    async def _work(self):
+        while True:
+            mailbox = await self._ready.get()
+            for _ in range(self.batch_size):
+                # The mailbox may have been removed, and emptied, while the handler awaited
+                if mailbox.removed or not mailbox.messages:
+                    break
+                message = mailbox.messages.popleft()
+                while mailbox.space_waiters:
+                    waiter = mailbox.space_waiters.popleft()
+                    if not waiter.done():
+                        waiter.set_result(None)
+                        break
+                try:
+                    await self.handler(message)
+                    self.delivered += 1
+                except Exception as error:
+                    self.failed += 1
+                    logger.exception("Message handler failed for %r", message)
+                    self._error = self._error or error
+                finally:
+                    self._message_done()
+            if mailbox.messages and not mailbox.removed:
+                self._ready.put_nowait(mailbox)
+            else:
+                mailbox.scheduled = False
+
+    async def join(self):
+        """
+        Waits until every enqueued message, including replies enqueued by handlers, has been handled.
+
+        Raises:
+            Exception: The first error raised by the handler since the last join.
+        """
+        if self._idle is not None:
+            await self._idle.wait()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    async def stop(self, drain: bool = True):
+        """
+        Stops the worker pool.
+
+        Args:
+            drain (bool): Whether to deliver the queued messages first.
+        """
+        if drain and self._workers:
+            await self._idle.wait()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def remove_mailbox(self, key: Hashable):
+        """Discards a receiver's mailbox and its undelivered messages; blocked senders get a new mailbox."""
+        mailbox = self._mailboxes.pop(key, None)
+        if mailbox is not None:
+            mailbox.removed = True
+            for _ in range(len(mailbox.messages)):
+                self._message_done()
+            mailbox.messages.clear()
+            while mailbox.space_waiters:
+                waiter = mailbox.space_waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "mailboxes": len(self._mailboxes),
+            "pending": self._pending,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -0,0 +1,287 @@
+# app/core/message_codec.py -- compact binary wire format for ACLMessage and Message
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Tuple, Union
+from uuid import SafeUUID, UUID
+
+from app.models.message import ACLMessage, Message, Performative, construct_trusted
+
+VERSION = 1
+KIND_ACL, KIND_MESSAGE = 0, 1
+CONTENT_STR, CONTENT_BYTES, CONTENT_JSON = 0, 1, 2
+
+# version, kind, flags, performative, content kind, id, sender, receiver, timestamp (ns), content length
+HEADER = struct.Struct("<BBHBB16s16s16sqI")
+TIME_FIELD = struct.Struct("<q")
+STRING_LENGTH = struct.Struct("<H")
+
+# Optional-field flags, in the order the fields follow the header
+HAS_CONVERSATION_ID = 1 << 0
+HAS_REPLY_BY = 1 << 1
+HAS_REPLY_TO = 1 << 2
+HAS_REPLY_WITH = 1 << 3
+HAS_IN_REPLY_TO = 1 << 4
+HAS_LANGUAGE = 1 << 5
+HAS_ONTOLOGY = 1 << 6
+HAS_PROTOCOL = 1 << 7
+UTC_TIMESTAMP = 1 << 8
+UTC_REPLY_BY = 1 << 9
+
+STRING_FIELDS = (
+    (HAS_REPLY_WITH, "reply_with"),
+    (HAS_IN_REPLY_TO, "in_reply_to"),
+    (HAS_LANGUAGE, "language"),
+    (HAS_ONTOLOGY, "ontology"),
+    (HAS_PROTOCOL, "protocol"),
+)
+STRING_FLAGS = HAS_REPLY_WITH | HAS_IN_REPLY_TO | HAS_LANGUAGE | HAS_ONTOLOGY | HAS_PROTOCOL
+DEFAULT_LANGUAGE = {KIND_ACL: "English", KIND_MESSAGE: "english"}
+
+PERFORMATIVES = tuple(Performative)
+PERFORMATIVE_CODES = {performative: code for code, performative in enumerate(PERFORMATIVES)}
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_nanoseconds(moment: datetime) -> Tuple[int, bool]:
+    # Exact integer arithmetic; naive datetimes are kept as wall-clock time, aware ones as UTC
+    aware = moment.tzinfo is not None
+    delta = moment - (EPOCH_UTC if aware else EPOCH)
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000_000 + delta.microseconds * 1_000, aware
+
+
+def _from_nanoseconds(nanoseconds: int, aware: bool) -> datetime:
+    return (EPOCH_UTC if aware else EPOCH) + timedelta(microseconds=nanoseconds // 1_000)
+
+
+def _encode_content(content: Any) -> Tuple[int, bytes]:
+    if isinstance(content, str):
+        return CONTENT_STR, content.encode()
+    if isinstance(content, (bytes, bytearray)):
+        return CONTENT_BYTES, bytes(content)
+    return CONTENT_JSON, json.dumps(content, separators=(",", ":")).encode()
+
+
+def _decode_content(kind: int, payload: bytes) -> Any:
+    if kind == CONTENT_STR:
+        return payload.decode()
+    if kind == CONTENT_BYTES:
+        return payload
+    return json.loads(payload)
+
+
+def encode(message: Union[ACLMessage, Message]) -> bytes:
+    """
+    Encodes a message in the binary wire format.
+
+    UUIDs travel as their raw 16 bytes, timestamps as epoch nanoseconds and
+    the performative as a one-byte code. Optional fields that are unset, and
+    a default language, take no space at all.
+
+    Args:
+        message (Union[ACLMessage, Message]): The message to encode.
+
+    Returns:
+        bytes: The encoded message.
+    """
+    if isinstance(message, ACLMessage):
+        kind, receiver_id = KIND_ACL, message.receiver_id
+    else:
+        kind, receiver_id = KIND_MESSAGE, message.recipient_id
+    timestamp, utc = _to_nanoseconds(message.timestamp)
+    flags = UTC_TIMESTAMP if utc else 0
+    tail = []
+    if message.conversation_id is not None:
+        flags |= HAS_CONVERSATION_ID
+        tail.append(message.conversation_id.bytes)
+    if kind == KIND_ACL:
+        if message.reply_by is not None:
+            reply_by, reply_by_utc = _to_nanoseconds(message.reply_by)
+            flags |= HAS_REPLY_BY | (UTC_REPLY_BY if reply_by_utc else 0)
+            tail.append(TIME_FIELD.pack(reply_by))
+    elif message.reply_to is not None:
+        flags |= HAS_REPLY_TO
+        tail.append(message.reply_to.bytes)
+    for flag, name in STRING_FIELDS:
+        value = getattr(message, name, None)
+        if value is None or (name == "language" and value == DEFAULT_LANGUAGE[kind]):
+            continue
+        flags |= flag
+        value = value.encode()
+        tail.append(STRING_LENGTH.pack(len(value)))
+        tail.append(value)
+    content_kind, content = _encode_content(message.content)
+    header = HEADER.pack(VERSION, kind, flags, PERFORMATIVE_CODES[message.performative], content_kind,
+                         message.id.bytes, message.sender_id.bytes, receiver_id.bytes, timestamp, len(content))
+    return b"".join((header, *tail, content))
+
+
+_interned_uuids: Dict[bytes, UUID] = {}
+MAX_INTERNED_UUIDS = 65536
+UNKNOWN_SAFETY = SafeUUID.unknown
+
+
+def _uuid(raw: bytes, new=object.__new__, set_attribute=object.__setattr__, from_bytes=int.from_bytes) -> UUID:
+    # UUID(bytes=...) re-validates its input; these bytes came from UUID.bytes
+    value = new(UUID)
+    set_attribute(value, "int", from_bytes(raw, "big"))
+    set_attribute(value, "is_safe", UNKNOWN_SAFETY)
+    return value
+
+
+def _interned_uuid(raw: bytes) -> UUID:
+    # Agent and conversation ids recur across messages, so decode each one once
+    value = _interned_uuids.get(raw)
+    if value is None:
+        if len(_interned_uuids) >= MAX_INTERNED_UUIDS:
+            _interned_uuids.clear()
+        value = _interned_uuids[raw] = _uuid(raw)
+    return value
+
+
+class EncodedMessage:
+    """
+    An encoded message whose fields are decoded only when first read.
+
+    Routing code (mailboxes, topic fan-out, logs) can read the receiver,
+    performative or conversation id without paying for the other fields or
+    the content. It has the same attributes as the message it encodes, so
+    trusted internal consumers can use it directly; `to_model` builds the
+    pydantic model when one is needed.
+    """
+
+    __slots__ = ("kind", "_data", "_header", "_content_offset", "id", "sender_id", "receiver_id", "performative",
+                 "timestamp", "conversation_id", "reply_by", "reply_to", "reply_with", "in_reply_to", "language",
+                 "ontology", "protocol", "content")
+
+    def __init__(self, data: bytes):
+        self._header = header = HEADER.unpack_from(data)
+        if header[0] != VERSION:
+            raise ValueError(f"Unsupported message encoding version: {header[0]}")
+        self.kind = header[1]
+        self._data = data
+        self._content_offset = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for slots not decoded yet
+        header = self._header
+        if name == "id":
+            value = _uuid(header[5])
+        elif name == "sender_id":
+            value = _interned_uuid(header[6])
+        elif name == "receiver_id":
+            value = _interned_uuid(header[7])
+        elif name == "performative":
+            value = PERFORMATIVES[header[3]]
+        elif name == "timestamp":
+            value = _from_nanoseconds(header[8], bool(header[2] & UTC_TIMESTAMP))
+        elif name == "content":
+            value = self._decode_content()
+        elif name in self.__slots__ and not name.startswith("_"):
+            self._decode_tail()
+            return getattr(self, name)
+        else:
+            raise AttributeError(name)
+        setattr(self, name, value)
+        return value
+
+    def _decode_tail(self):
+        data, flags = self._data, self._header[2]
+        offset = HEADER.size
+        self.conversation_id = self.reply_by = self.reply_to = None
+        if flags & HAS_CONVERSATION_ID:
+            self.conversation_id = _interned_uuid(bytes(data[offset:offset + 16]))
+            offset += 16
+        if flags & HAS_REPLY_BY:
+            self.reply_by = _from_nanoseconds(TIME_FIELD.unpack_from(data, offset)[0], bool(flags & UTC_REPLY_BY))
+            offset += TIME_FIELD.size
+        if flags & HAS_REPLY_TO:
+            self.reply_to = _uuid(bytes(data[offset:offset + 16]))
+            offset += 16
+        self.reply_with = self.in_reply_to = self.language = self.ontology = self.protocol = None
+        if flags & STRING_FLAGS:
+            for flag, name in STRING_FIELDS:
+                if flags & flag:
+                    length = STRING_LENGTH.unpack_from(data, offset)[0]
+                    offset += STRING_LENGTH.size
+                    setattr(self, name, bytes(data[offset:offset + length]).decode())
+                    offset += length
+        if self.language is None:
+            self.language = DEFAULT_LANGUAGE[self.kind]
+        self._content_offset = offset
+
+    def _decode_content(self) -> Any:
+        if self._content_offset is None:
+            self._decode_tail()
+        offset = self._content_offset
+        return _decode_content(self._header[4], bytes(self._data[offset:offset + self._header[9]]))
+
+    def to_model(self, validate: bool = True) -> Union[ACLMessage, Message]:
+        """
+        Builds the pydantic model for this message.
+
+        Args:
+            validate (bool): Whether to run validation; pass False only for trusted internal traffic.
+
+        Returns:
+            Union[ACLMessage, Message]: The message.
+        """
+        header = self._header
+        if self._content_offset is None:
+            self._decode_tail()
+        message_id, sender_id, receiver_id = _uuid(header[5]), _interned_uuid(header[6]), _interned_uuid(header[7])
+        performative = PERFORMATIVES[header[3]]
+        timestamp = _from_nanoseconds(header[8], bool(header[2] & UTC_TIMESTAMP))
+        if self.kind == KIND_ACL:
+            fields = {
+                "id": message_id, "sender_id": sender_id, "receiver_id": receiver_id, "performative": performative,
+                "content": self._decode_content(), "conversation_id": self.conversation_id,
+                "reply_with": self.reply_with, "in_reply_to": self.in_reply_to, "reply_by": self.reply_by,
+                "language": self.language, "ontology": self.ontology, "protocol": self.protocol,
+                "timestamp": timestamp,
+            }
+            model = ACLMessage
+        else:
+            fields = {
+                "id": message_id, "sender_id": sender_id, "recipient_id": receiver_id,
+                "content": self._decode_content(), "timestamp": timestamp, "conversation_id": self.conversation_id,
+                "reply_to": self.reply_to, "language": self.language, "ontology": self.ontology,
+                "protocol": self.protocol, "performative": performative,
+            }
+            model = Message
+        return model(**fields) if validate else construct_trusted(model, fields)
+
+
+def decode(data: bytes, validate: bool = True) -> Union[ACLMessage, Message]:
+    """
+    Decodes a message produced by `encode`.
+
+    Args:
+        data (bytes): The encoded message.
+        validate (bool): Whether to run pydantic validation; pass False only for trusted internal traffic.
+
+    Returns:
+        Union[ACLMessage, Message]: The message, of the type it was encoded from.
+    """
+    return EncodedMessage(data).to_model(validate)
+
+
+def peek(data: bytes) -> EncodedMessage:
+    """Wraps an encoded message so individual fields can be read without decoding the rest."""
+    return EncodedMessage(data)
+
+
+def encoded_size(data: bytes) -> int:
+    """Returns the length of the encoded message at the start of `data`, for reading concatenated messages."""
+    header = HEADER.unpack_from(data)
+    flags, content_length = header[2], header[-1]
+    offset = HEADER.size
+    offset += 16 if flags & HAS_CONVERSATION_ID else 0
+    offset += TIME_FIELD.size if flags & HAS_REPLY_BY else 0
+    offset += 16 if flags & HAS_REPLY_TO else 0
+    for flag, _ in STRING_FIELDS:
+        if flags & flag:
+            offset += STRING_LENGTH.size + STRING_LENGTH.unpack_from(data, offset)[0]
+    return offset + content_length
@@ -0,0 +1,515 @@
+# app/core/message_log.py -- segmented, indexed, durable log of agent messages
+import json
+import os
+import threading
+import time
+import struct
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from uuid import UUID
+
+import numpy as np
+
+from app.core import message_codec
+from app.core.config import settings
+from app.models.message import ACLMessage, Message
+
+# Record header: offset, payload length, CRC32 of the payload
+_RECORD = struct.Struct("<QII")
+_SEGMENT_SUFFIX = ".log"
+_INDEX_SUFFIX = ".idx"
+_OFFSETS_FILE = "consumer-offsets.json"
+_NO_CONVERSATION = bytes(16)
+
+# One fixed-width index entry per record, so an index file can be mapped straight into an array
+INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("position", "<u8"),
+    ("receiver", "V16"),
+    ("conversation", "V16"),
+    ("appended", "<i8"),
+])
+
+COMPACTION_POLICIES = ("none", "consumed")
+
+LoggedMessage = Union[ACLMessage, Message]
+
+
+def _index_entry(offset: int, position: int, payload: bytes, appended: int) -> tuple:
+    # The receiver and conversation come straight from the encoded header, without decoding the message
+    header = message_codec.HEADER.unpack_from(payload)
+    conversation = _NO_CONVERSATION
+    if header[2] & message_codec.HAS_CONVERSATION_ID:
+        conversation = payload[message_codec.HEADER.size:message_codec.HEADER.size + 16]
+    return offset, position, header[7], conversation, appended
+
+
+class _Segment:
+    def __init__(self, directory: str, base_offset: int):
+        self.base_offset = base_offset
+        self.log_path = os.path.join(directory, f"{base_offset:020d}{_SEGMENT_SUFFIX}")
+        self.index_path = os.path.join(directory, f"{base_offset:020d}{_INDEX_SUFFIX}")
+        self.entries = np.zeros(0, dtype=INDEX_DTYPE)
+        self.size = 0
+
+    @property
+    def next_offset(self) -> int:
+        return int(self.entries["offset"][-1]) + 1 if len(self.entries) else self.base_offset
+
+    def scan(self) -> Tuple[np.ndarray, int]:
+        # Rebuilds the index from the log, stopping at the first torn or corrupt record
+        entries, position = [], 0
+        appended = int(os.path.getmtime(self.log_path) * 1e9)
+        with open(self.log_path, "rb") as log:
+            while True:
+                header = log.read(_RECORD.size)
+                if len(header) < _RECORD.size:
+                    break
+                offset, length, crc = _RECORD.unpack(header)
+                payload = log.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                entries.append(_index_entry(offset, position, payload, appended))
+                position += _RECORD.size + length
+        return np.array(entries, dtype=INDEX_DTYPE), position
+
+    def load(self):
+        """Maps a sealed segment's index, rebuilding the index file if it is missing or torn."""
+        self.size = os.path.getsize(self.log_path)
+        index_size = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else -1
+        if index_size <= 0 or index_size % INDEX_DTYPE.itemsize:
+            entries, self.size = self.scan()
+            with open(self.index_path, "wb") as index_file:
+                index_file.write(entries.tobytes())
+            os.truncate(self.log_path, self.size)
+        if os.path.getsize(self.index_path):
+            self.entries = np.memmap(self.index_path, dtype=INDEX_DTYPE, mode="r")
+        else:
+            self.entries = np.zeros(0, dtype=INDEX_DTYPE)
+
+    def read(self, positions: np.ndarray) -> Iterator[Tuple[int, bytes]]:
+        with open(self.log_path, "rb") as log:
+            for position in positions:
+                log.seek(int(position))
+                offset, length, _ = _RECORD.unpack(log.read(_RECORD.size))
+                yield offset, log.read(length)
+
+    def remove(self):
+        self.entries = np.zeros(0, dtype=INDEX_DTYPE)
+        for path in (self.log_path, self.index_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class MessageLog:
+    """
+    Durable, append-only log of agent messages, split into segment files.
+
+    Every message gets a monotonically increasing offset. Records are stored
+    in the binary wire format of `message_codec` behind a (offset, length,
+    CRC32) header, so a torn write at the end of the log is detected and
+    truncated on open. Each segment has a fixed-width index file with the
+    record's offset, file position, receiver and conversation id; sealed
+    segments' indexes are memory-mapped, so lookups by receiver or
+    conversation are vectorized scans of the index instead of reads of the
+    messages themselves.
+
+    Consumers (e.g. agents) commit the offset of the last message they
+    processed and resume after it following a restart. Writes are fsynced in
+    batches: after `fsync_batch` records or `fsync_interval` seconds,
+    whichever comes first, and on `flush`. A background timer fsyncs records
+    and committed offsets left over when appends stop, so the interval bounds
+    the data at risk even for a quiet log.
+
+    Sealed segments are deleted once the log exceeds `retention_bytes` or
+    their last append is older than `retention_seconds`. With the "consumed"
+    compaction policy, `compact` rewrites sealed segments without the
+    messages their receiver has already committed past.
+
+    Args:
+        directory (str): Where segments, indexes and consumer offsets are stored; created if missing.
+        segment_bytes (int): The size at which the active segment is sealed and a new one started.
+        fsync_batch (int): Records appended between fsyncs.
+        fsync_interval (float): Seconds between fsyncs while records are being appended.
+        retention_bytes (int): The total log size kept; 0 keeps everything.
+        retention_seconds (float): How long sealed segments are kept; 0 keeps them forever.
+        compaction (str): "none", or "consumed" to drop messages their receiver has processed.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, fsync_batch: int = 1000,
+                 fsync_interval: float = 1.0, retention_bytes: int = 0, retention_seconds: float = 0,
+                 compaction: str = "none"):
+        if compaction not in COMPACTION_POLICIES:
+            raise ValueError(f"Unknown compaction policy: {compaction}. Must be one of {COMPACTION_POLICIES}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.retention_bytes = retention_bytes
+        self.retention_seconds = retention_seconds
+        self.compaction = compaction
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        self._sync_timer: Optional[threading.Timer] = None
+        self._offsets_path = os.path.join(directory, _OFFSETS_FILE)
+        self._offsets: Dict[str, int] = {}
+        if os.path.exists(self._offsets_path):
+            with open(self._offsets_path) as offsets_file:
+                self._offsets = json.load(offsets_file)
+        self._offsets_dirty = False
+
+        base_offsets = sorted(int(name[:-len(_SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+                              if name.endswith(_SEGMENT_SUFFIX))
+        self._segments: List[_Segment] = []
+        for base_offset in base_offsets[:-1]:
+            segment = _Segment(directory, base_offset)
+            segment.load()
+            self._segments.append(segment)
+        self._open_active(base_offsets[-1] if base_offsets else 0, recover=bool(base_offsets))
+
+    def _open_active(self, base_offset: int, recover: bool = False):
+        # The active segment's index lives in a growable in-memory array and is appended to its file as records are written
+        segment = _Segment(self.directory, base_offset)
+        if recover:
+            entries, segment.size = segment.scan()
+            os.truncate(segment.log_path, segment.size)
+            with open(segment.index_path, "wb") as index_file:
+                index_file.write(entries.tobytes())
+        else:
+            entries = np.zeros(0, dtype=INDEX_DTYPE)
+        self._active_entries = np.zeros(max(1024, 2 * len(entries)), dtype=INDEX_DTYPE)
+        self._active_entries[:len(entries)] = entries
+        self._active_count = len(entries)
+        segment.entries = self._active_entries[:self._active_count]
+        self._segments.append(segment)
+        self._log_file = open(segment.log_path, "ab")
+        self._index_file = open(segment.index_path, "ab")
+        self._next_offset = segment.next_offset
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    @property
+    def _active(self) -> _Segment:
+        return self._segments[-1]
+
+    @property
+    def next_offset(self) -> int:
+        return self._next_offset
+
+    def append(self, message: LoggedMessage) -> int:
+        """
+        Appends a message to the log.
+
+        Args:
+            message (LoggedMessage): The ACLMessage or Message to store.
+
+        Returns:
+            int: The message's offset.
+        """
+        payload = message_codec.encode(message)
+        with self._lock:
+            segment = self._active
+            offset = self._next_offset
+            self._log_file.write(_RECORD.pack(offset, len(payload), zlib.crc32(payload)))
+            self._log_file.write(payload)
+            entry = np.array([_index_entry(offset, segment.size, payload, time.time_ns())], dtype=INDEX_DTYPE)
+            self._index_file.write(entry.tobytes())
+            if self._active_count == len(self._active_entries):
+                self._active_entries = np.concatenate([self._active_entries, np.zeros_like(self._active_entries)])
+            self._active_entries[self._active_count] = entry[0]
+            self._active_count += 1
+            segment.entries = self._active_entries[:self._active_count]
+            segment.size += _RECORD.size + len(payload)
+            self._next_offset = offset + 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            else:
+                self._schedule_sync()
+            if segment.size >= self.segment_bytes:
+                self._roll()
+        return offset
+
+    def _schedule_sync(self):
+        if self._sync_timer is None and self.fsync_interval > 0:
+            self._sync_timer = threading.Timer(self.fsync_interval, self._timed_sync)
+            self._sync_timer.daemon = True
+            self._sync_timer.start()
+
+    def _timed_sync(self):
+        with self._lock:
+            self._sync_timer = None
+            if not self._log_file.closed and (self._unsynced or self._offsets_dirty):
+                self._sync()
+
+    def _cancel_sync_timer(self):
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+
+    def _sync(self):
+        for log_file in (self._log_file, self._index_file):
+            log_file.flush()
+            os.fsync(log_file.fileno())
+        if self._offsets_dirty:
+            with open(self._offsets_path + ".tmp", "w") as offsets_file:
+                json.dump(self._offsets, offsets_file)
+                offsets_file.flush()
+                os.fsync(offsets_file.fileno())
+            os.replace(self._offsets_path + ".tmp", self._offsets_path)
+            self._offsets_dirty = False
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _roll(self):
+        self._sync()
+        self._log_file.close()
+        self._index_file.close()
+        self._active.load()
+        self._open_active(self._next_offset)
+        self.enforce_retention()
+
+    def flush(self):
+        """Writes buffered records and committed offsets to disk and fsyncs them."""
+        with self._lock:
+            self._sync()
+
+    def _read(self, segment: _Segment, positions: np.ndarray) -> Iterator[Tuple[int, LoggedMessage]]:
+        if segment is self._active:
+            self._log_file.flush()
+        for offset, payload in segment.read(positions):
+            # Records passed their checksum and were encoded by this log
+            yield offset, message_codec.decode(payload, validate=False)
+
+    def _lookup(self, field: str, key: UUID, after: int, limit: Optional[int]) -> List[Tuple[int, LoggedMessage]]:
+        needle = np.frombuffer(key.bytes, dtype="V16")[0]
+        found: List[Tuple[int, LoggedMessage]] = []
+        with self._lock:
+            for segment in self._segments:
+                entries = segment.entries
+                if not len(entries) or int(entries["offset"][-1]) <= after:
+                    continue
+                matches = (entries[field] == needle) & (entries["offset"] > after)
+                positions = entries["position"][matches]
+                if limit is not None:
+                    positions = positions[:limit - len(found)]
+                found.extend(self._read(segment, positions))
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def messages_for(self, receiver_id: UUID, after: int = -1, limit: Optional[int] = None) -> List[Tuple[int, LoggedMessage]]:
+        """
+        Finds the messages addressed to a receiver, using the index.
+
+        Args:
+            receiver_id (UUID): The receiver.
+            after (int): Only messages with a larger offset are returned.
+            limit (Optional[int]): The maximum number of messages.
+
+        Returns:
+            List[Tuple[int, LoggedMessage]]: Pairs of offset and message, oldest first.
+        """
+        return self._lookup("receiver", receiver_id, after, limit)
+
+    def conversation(self, conversation_id: UUID, limit: Optional[int] = None) -> List[Tuple[int, LoggedMessage]]:
+        """
+        Finds the messages of a conversation, using the index.
+
+        Args:
+            conversation_id (UUID): The conversation.
+            limit (Optional[int]): The maximum number of messages.
+
+        Returns:
+            List[Tuple[int, LoggedMessage]]: Pairs of offset and message, oldest first.
+        """
+        return self._lookup("conversation", conversation_id, -1, limit)
+
+    def read(self, after: int = -1, limit: Optional[int] = None) -> Iterator[Tuple[int, LoggedMessage]]:
+        """
+        Reads messages in offset order.
+
+        Args:
+            after (int): Only messages with a larger offset are read.
+            limit (Optional[int]): The maximum number of messages.
+
+        Returns:
+            Iterator[Tuple[int, LoggedMessage]]: Pairs of offset and message.
+        """
+        remaining = limit
+        for segment in list(self._segments):
+            entries = segment.entries
+            if not len(entries) or int(entries["offset"][-1]) <= after:
+                continue
+            positions = entries["position"][entries["offset"] > after]
+            if remaining is not None:
+                positions = positions[:remaining]
+                remaining -= len(positions)
+            yield from self._read(segment, positions)
+            if remaining == 0:
+                return
+
+    def committed(self, consumer: str) -> int:
+        """Returns the offset a consumer last committed, or -1 if it has not committed yet."""
+        return self._offsets.get(consumer, -1)
+
+    def commit(self, consumer: str, offset: int):
+        """
+        Records that a consumer has processed every message up to an offset.
+
+        The offset is persisted with the next fsync.
+
+        Args:
+            consumer (str): The consumer, e.g. an agent id.
+            offset (int): The offset of the last processed message.
+        """
+        with self._lock:
+            if offset > self._offsets.get(consumer, -1):
+                self._offsets[consumer] = offset
+                self._offsets_dirty = True
+                self._schedule_sync()
+
+    def poll(self, receiver_id: UUID, limit: Optional[int] = None) -> List[Tuple[int, LoggedMessage]]:
+        """
+        Returns a receiver's messages after the offset it last committed, so it resumes where it left off.
+
+        Args:
+            receiver_id (UUID): The receiver, which is also the consumer name.
+            limit (Optional[int]): The maximum number of messages.
+
+        Returns:
+            List[Tuple[int, LoggedMessage]]: Pairs of offset and message; commit the last offset once processed.
+        """
+        return self.messages_for(receiver_id, self.committed(str(receiver_id)), limit)
+
+    def enforce_retention(self) -> int:
+        """
+        Deletes sealed segments beyond the retention limits, oldest first.
+
+        Returns:
+            int: The number of segments deleted.
+        """
+        removed = 0
+        with self._lock:
+            cutoff = time.time_ns() - int(self.retention_seconds * 1e9) if self.retention_seconds else None
+            while len(self._segments) > 1:
+                oldest = self._segments[0]
+                too_big = self.retention_bytes and sum(segment.size for segment in self._segments) > self.retention_bytes
+                too_old = cutoff is not None and (not len(oldest.entries) or int(oldest.entries["appended"].max()) < cutoff)
+                if not (too_big or too_old):
+                    break
+                oldest.remove()
+                self._segments.pop(0)
+                removed += 1
+        return removed
+
+    def compact(self) -> int:
+        """
+        Rewrites sealed segments according to the compaction policy.
+
+        Under "consumed", a message is dropped once its receiver has committed
+        an offset at or past it. Offsets of the remaining messages do not change.
+
+        Returns:
+            int: The number of messages dropped.
+        """
+        if self.compaction == "none":
+            return 0
+        dropped = 0
+        with self._lock:
+            for segment in self._segments[:-1]:
+                entries = np.array(segment.entries)
+                receivers, inverse = np.unique(entries["receiver"], return_inverse=True)
+                committed = np.array([self.committed(str(UUID(bytes=bytes(receiver)))) for receiver in receivers],
+                                     dtype=np.int64)
+                keep = entries["offset"].astype(np.int64) > committed[inverse]
+                if keep.all():
+                    continue
+                dropped += int((~keep).sum())
+                records = list(segment.read(entries["position"][keep]))
+                kept = entries[keep]
+                position = 0
+                with open(segment.log_path + ".tmp", "wb") as log_file:
+                    for i, (offset, payload) in enumerate(records):
+                        log_file.write(_RECORD.pack(offset, len(payload), zlib.crc32(payload)))
+                        log_file.write(payload)
+                        kept["position"][i] = position
+                        position += _RECORD.size + len(payload)
+                    log_file.flush()
+                    os.fsync(log_file.fileno())
+                with open(segment.index_path + ".tmp", "wb") as index_file:
+                    index_file.write(kept.tobytes())
+                    index_file.flush()
+                    os.fsync(index_file.fileno())
+                segment.entries = np.zeros(0, dtype=INDEX_DTYPE)
+                os.replace(segment.log_path + ".tmp", segment.log_path)
+                os.replace(segment.index_path + ".tmp", segment.index_path)
+                segment.load()
+        return dropped
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "messages": sum(len(segment.entries) for segment in self._segments),
+                "bytes": sum(segment.size for segment in self._segments),
+                "next_offset": self._next_offset,
+                "consumers": len(self._offsets),
+            }
+
+    def close(self):
+        with self._lock:
+            self._cancel_sync_timer()
+            if not self._log_file.closed:
+                self._sync()
+                self._log_file.close()
+                self._index_file.close()
+
+
+# Logs opened by open_message_log, one per name and process, since two writers would interleave offsets
+_open_logs: Dict[str, MessageLog] = {}
+_open_logs_lock = threading.Lock()
+
+
+def open_message_log(name: str) -> Optional[MessageLog]:
+    """
+    Opens the named message log under settings.message_log_dir, once per process.
+
+    Args:
+        name (str): The log's subdirectory, one per component.
+
+    Returns:
+        Optional[MessageLog]: The log, or None when settings.message_log_dir is not set.
+    """
+    if not settings.message_log_dir:
+        return None
+    with _open_logs_lock:
+        log = _open_logs.get(name)
+        if log is None:
+            log = _open_logs[name] = MessageLog(
+                os.path.join(settings.message_log_dir, name),
+                segment_bytes=settings.message_log_segment_bytes,
+                fsync_batch=settings.message_log_fsync_batch,
+                fsync_interval=settings.message_log_fsync_interval,
+                retention_bytes=settings.message_log_retention_bytes,
+                retention_seconds=settings.message_log_retention_seconds,
+                compaction=settings.message_log_compaction,
+            )
+        return log
+
+
+def close_message_log(name: str):
+    """Fsyncs and closes the named log if `open_message_log` opened it; the next open reopens it."""
+    with _open_logs_lock:
+        log = _open_logs.pop(name, None)
+    if log is not None:
+        log.close()
+
+
+def close_message_logs():
+    """Fsyncs and closes every log opened by `open_message_log`, e.g. on shutdown."""
+    with _open_logs_lock:
+        logs = list(_open_logs.values())
+        _open_logs.clear()
+    for log in logs:
+        log.close()
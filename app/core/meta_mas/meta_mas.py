@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from meta_agents import MetaAgent
 from meta_agents import RequirementsAnalysisAgent
@@ -10,10 +10,23 @@ from meta_agents import DeploymentAgent
 from meta_agents import IntegrationAgent
 from meta_agents import MonitoringAgent
 from meta_agents import OptimizationAgent
+from app.core.step_scheduler import StepScheduler, create_scheduler
+
+
+def _decide(agent):
+    agent.reason()
+    agent.plan()
+    return agent
+
+
+def _act(agent):
+    agent.execute()
+    return agent
 
 
 class MetaMAS:
-    def __init__(self):
+    def __init__(self, scheduler: Optional[StepScheduler] = None):
+        self.scheduler: StepScheduler = scheduler or create_scheduler()
         self.agents: List[MetaAgent] = [
             RequirementsAnalysisAgent("ReqAnalyzer"),
             DomainModelingAgent("DomainModeler"),
@@ -28,10 +41,9 @@ class MetaMAS:
 
     def run_meta_mas(self):
         while not self.goal_achieved():
-            for agent in self.agents:
-                agent.reason()
-                agent.plan()
-                agent.execute()
+            # Every agent finishes reasoning and planning before any agent acts
+            self.agents = self.scheduler.map(_decide, self.agents)
+            self.agents = self.scheduler.map(_act, self.agents)
             self.facilitate_communication()
             self.update_global_state()
 
@@ -0,0 +1,136 @@
+# app/core/model_registry.py -- process-wide registry of lazily loaded embedding models
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.embedding_cache import EmbeddingCache
+from app.core.startup import startup_registry
+
+BACKENDS = ("torch", "onnx", "quantized")
+
+
+def _resident_memory_bytes() -> Optional[int]:
+    """Returns the resident set size of this process, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelRegistry:
+    """
+    Loads each SentenceTransformer model once per process, on first use.
+
+    Models are keyed by (model_name, backend). Every SentenceTransformerWrapper
+    asking for the same key gets the same instance, and the same EmbeddingCache,
+    so creating a KnowledgeBase no longer loads transformer weights.
+
+    Backends:
+        torch: The default PyTorch model.
+        onnx: The sentence-transformers ONNX Runtime backend for CPU inference.
+        quantized: The PyTorch model with int8 dynamic quantization of its Linear layers.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], Any] = {}
+        self._caches: Dict[Tuple[str, str], EmbeddingCache] = {}
+        self._stats: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Guards the dicts only; each model loads under its own lock, so a cold load blocks nothing else
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def get_model(self, model_name: str, backend: str = "torch") -> Any:
+        """
+        Returns the shared model instance, loading it on first call.
+
+        Args:
+            model_name (str): The sentence-transformers model name or path.
+            backend (str): One of "torch", "onnx" or "quantized".
+
+        Returns:
+            Any: The loaded SentenceTransformer.
+        """
+        key = (model_name, backend)
+        if (model := self._models.get(key)) is not None:
+            return model
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            if (model := self._models.get(key)) is None:
+                with startup_registry.track(f"embeddings:{model_name}"):
+                    model = self._load(model_name, backend)
+                with self._lock:
+                    self._models[key] = model
+        return model
+
+    def get_cache(self, model_name: str, backend: str = "torch") -> EmbeddingCache:
+        """
+        Returns the shared embedding cache for a model on a backend.
+
+        Backends produce slightly different embeddings (quantization, ONNX
+        kernels), so each (model_name, backend) pair has its own cache.
+
+        Args:
+            model_name (str): The sentence-transformers model name or path.
+            backend (str): One of "torch", "onnx" or "quantized".
+
+        Returns:
+            EmbeddingCache: The cache used by every wrapper of this model and backend.
+        """
+        key = (model_name, backend)
+        with self._lock:
+            if (cache := self._caches.get(key)) is None:
+                settings = get_settings()
+                cache = EmbeddingCache(model_name, max_entries=settings.embedding_cache_size,
+                                       cache_dir=settings.embedding_cache_dir, backend=backend)
+                self._caches[key] = cache
+        return cache
+
+    def _load(self, model_name: str, backend: str) -> Any:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend: {backend}. Must be one of {BACKENDS}")
+        from sentence_transformers import SentenceTransformer
+
+        rss_before = _resident_memory_bytes()
+        start = time.perf_counter()
+        if backend == "onnx":
+            model = SentenceTransformer(model_name, device="cpu", backend="onnx")
+        else:
+            model = SentenceTransformer(model_name, device="cpu" if backend == "quantized" else None)
+            if backend == "quantized":
+                import torch
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        load_time = time.perf_counter() - start
+        rss_after = _resident_memory_bytes()
+
+        stats = {
+            "model_name": model_name,
+            "backend": backend,
+            "load_time_seconds": round(load_time, 3),
+            "resident_memory_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        }
+        with self._lock:
+            self._stats[(model_name, backend)] = stats
+        return model
+
+    def is_loaded(self, model_name: str, backend: str = "torch") -> bool:
+        return (model_name, backend) in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Reports load time and resident memory for every loaded model.
+
+        Returns:
+            Dict[str, Any]: The per-model stats and the current process RSS.
+        """
+        return {
+            "models": list(self._stats.values()),
+            "caches": {f"{name}:{backend}": cache.stats() for (name, backend), cache in self._caches.items()},
+            "process_resident_memory_bytes": _resident_memory_bytes(),
+        }
+
+
+model_registry = ModelRegistry()
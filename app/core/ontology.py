@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from rdflib import OWL, RDF, RDFS, Graph
 from owlready2 import World
 from .ontology_loader import OntologyLoader
+from .sparql_cache import prepare_query
 from app.core.domain_ontology_generator import DomainOntologyGenerator
 from app.core.custom_inference import CustomInference
 
@@ -51,8 +52,8 @@ class Ontology(BaseModel):
     def get_properties(self) -> List[str]:
         return [prop.name for prop in self.world.properties()]
 
-    def query_ontology(self, query: str) -> List[Dict[str, Any]]:
-        results = self.graph.query(query)
+    def query_ontology(self, query: str, bindings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        results = self.graph.query(prepare_query(query), initBindings=bindings or {})
         return [dict(zip(row.labels, row)) for row in results]
         
         
@@ -2,6 +2,7 @@ from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from rdflib import Graph
 from owlready2 import World
+from app.core.sparql_cache import prepare_query
 
 class OntologyLoader(BaseModel):
     def __init__(self, world: Optional[World] = None, graph: Optional[Graph] = None):
@@ -44,12 +45,13 @@ class OntologyLoader(BaseModel):
             raise RuntimeError("Ontology not loaded.")
         return [str(p) for p in self.onto.properties()]
 
-    def query_ontology(self, query: str) -> List[Dict[str, Any]]:
+    def query_ontology(self, query: str, bindings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         Query the ontology using SPARQL.
 
         Args:
             query (str): The SPARQL query string.
+            bindings (Optional[Dict[str, Any]]): Values for query variables.
 
         Returns:
             List[Dict[str, Any]]: A list of query results.
@@ -57,7 +59,7 @@ class OntologyLoader(BaseModel):
         if not self.graph:
             raise RuntimeError("Graph not initialized.")
         try:
-            results = self.graph.query(query)
+            results = self.graph.query(prepare_query(query), initBindings=bindings or {})
             return [{str(var): str(value) for var, value in result.items()} for result in results]
         except Exception as e:
             raise RuntimeError(f"Failed to query ontology: {e}")
\ No newline at end of file
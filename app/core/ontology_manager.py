@@ -1,13 +1,52 @@
 from owlready2 import *
-from typing import List
+import threading
+from typing import Any, Dict, List, Optional
 from app.core.ontology_types import OntologyStructure, QueryResult
+from app.core.sparql_cache import SPARQLQueryCache
+from app.core.startup import startup_registry
+from rdflib import URIRef
 
 class OntologyManager:
     def __init__(self, ontology_path: str):
         self.ontology_path = ontology_path
-        self.world = World()
-        self.onto = self.world.get_ontology(f"file://{ontology_path}").load()
-        self.graph = self.world.as_rdflib_graph()
+        # owlready2 is not thread-safe; loading, writes and queries share this lock
+        self.lock = threading.RLock()
+        self._world = None
+        self._onto = None
+        self._graph = None
+        # Prepared queries with results cached until the next write
+        self.queries = SPARQLQueryCache(lambda: self.graph, namespaces=lambda: {"onto": self.onto.base_iri}, lock=self.lock)
+
+    def load(self):
+        """Loads the ontology on first use; later calls return the loaded ontology."""
+        if self._onto is None:
+            with self.lock:
+                if self._onto is None:
+                    with startup_registry.track("ontology"):
+                        world = World()
+                        onto = world.get_ontology(f"file://{self.ontology_path}").load()
+                        self._graph = world.as_rdflib_graph()
+                        self._world = world
+                        self._onto = onto
+        return self._onto
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._onto is not None
+
+    @property
+    def world(self) -> World:
+        self.load()
+        return self._world
+
+    @property
+    def onto(self):
+        return self.load()
+
+    @property
+    def graph(self):
+        self.load()
+        return self._graph
 
     def update_ontology_from_generated(self, generated_ontology: OntologyStructure):
         with self.onto:
@@ -32,13 +71,80 @@ class OntologyManager:
             for axiom in generated_ontology['axioms']:
                 self.onto.add_annotation_property(axiom)
 
+        self.queries.invalidate()
         self.save_ontology()
 
     def save_ontology(self):
         self.onto.save(file=self.ontology_path, format="rdfxml")
 
-    def query_ontology(self, sparql_query: str) -> QueryResult:
-        return list(self.graph.query(sparql_query))
+    def query_ontology(self, sparql_query: str, bindings: Optional[Dict[str, Any]] = None) -> QueryResult:
+        """
+        Runs a SPARQL query, reusing its prepared plan and, until the ontology changes, its results.
+
+        Args:
+            sparql_query (str): The query; the `onto:` prefix maps to the ontology's base IRI.
+            bindings (Optional[Dict[str, Any]]): Values for query variables, so one query text serves all values.
+
+        Returns:
+            QueryResult: The result rows.
+        """
+        return self.queries.query(sparql_query, bindings)
+
+    def individual_iri(self, name: str) -> URIRef:
+        return URIRef(self.onto.base_iri + name)
+
+    def add_individual(self, name: str, class_name: str):
+        self.apply_updates({name: ({class_name}, {})})
+
+    def update_property(self, subject: str, predicate: str, value: Any):
+        self.apply_updates({subject: (set(), {predicate: value})})
+
+    def apply_updates(self, updates: Dict[str, tuple]):
+        """
+        Applies updates for many individuals in one ontology transaction.
+
+        Every individual is created and classified before any property is set,
+        so a new property whose values name individuals of the same batch is
+        typed as an object property whatever order the updates come in.
+
+        Args:
+            updates (Dict[str, tuple]): Maps each individual's name to a pair of the class
+                names it should belong to and the property values to set on it.
+        """
+        with self.lock, self.onto:
+            individuals = {name: self._get_individual(name, class_names) for name, (class_names, _) in updates.items()}
+            for name, (_, properties) in updates.items():
+                for predicate, value in properties.items():
+                    self._set_property(individuals[name], predicate, value)
+            self.queries.invalidate()
+
+    def _get_individual(self, name: str, class_names) -> Thing:
+        individual = self.onto[name]
+        for class_name in class_names:
+            cls = self.onto[class_name] or types.new_class(class_name, (Thing,))
+            if individual is None:
+                individual = cls(name)
+            elif cls not in individual.is_a:
+                individual.is_a.append(cls)
+        if individual is None:
+            individual = Thing(name, namespace=self.onto)
+        return individual
+
+    def _set_property(self, individual: Thing, predicate: str, value: Any):
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        prop = self.onto[predicate]
+        if prop is None:
+            # Values naming existing individuals make an object property, anything else a data property
+            is_object = bool(values) and all(isinstance(v, str) and isinstance(self.onto[v], Thing) for v in values)
+            prop = types.new_class(predicate, (ObjectProperty if is_object else DataProperty,))
+        if isinstance(prop, ObjectPropertyClass):
+            values = [self.onto[str(v)] or Thing(str(v), namespace=self.onto) for v in values]
+        else:
+            values = [v if isinstance(v, (str, int, float, bool)) else str(v) for v in values]
+        if FunctionalProperty in prop.is_a:
+            setattr(individual, prop.python_name, values[0] if values else None)
+        else:
+            setattr(individual, prop.python_name, values)
 
     def get_class_hierarchy(self) -> List[str]:
         return [c.name for c in self.onto.classes()]
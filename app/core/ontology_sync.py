@@ -0,0 +1,132 @@
+# app/core/ontology_sync.py -- write-behind synchronization of world updates into the ontology
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.core.ontology_manager import OntologyManager
+
+
+class OntologyWriteBehind:
+    """
+    Buffers ontology writes and applies them in batches on a background thread.
+
+    Updates are coalesced per individual: repeated writes to the same property
+    before the next batch keep only the latest value. Coalescing reorders
+    writes, so a batch creates all of its individuals before it sets any
+    property (see `OntologyManager.apply_updates`). The worker waits up to
+    `linger` seconds for more updates before applying a batch, and applies at
+    most `max_batch` individuals per ontology transaction.
+
+    `flush()` is the read-your-writes barrier: it blocks until every update
+    enqueued before the call has been applied. Callers that query the ontology
+    after writing to it should flush first.
+
+    Args:
+        ontology_manager (OntologyManager): The ontology to write to.
+        max_batch (int): The maximum number of individuals applied per transaction.
+        linger (float): Seconds to wait for more updates before applying a batch.
+    """
+
+    def __init__(self, ontology_manager: OntologyManager, max_batch: int = 1000, linger: float = 0.01):
+        self.ontology_manager = ontology_manager
+        self.max_batch = max_batch
+        self.linger = linger
+        # name -> (sequence number of its oldest unapplied update, class names, properties)
+        self._pending: Dict[str, Tuple[int, Set[str], Dict[str, Any]]] = {}
+        self._condition = threading.Condition()
+        self._enqueued = 0
+        self._applied = 0
+        self._flush_waiters = 0
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._worker: Optional[threading.Thread] = None
+
+    def add_individual(self, name: str, class_name: str):
+        self._enqueue(name, class_name=class_name)
+
+    def update_property(self, subject: str, predicate: str, value: Any):
+        self._enqueue(subject, properties={predicate: value})
+
+    def update_properties(self, subject: str, properties: Dict[str, Any]):
+        self._enqueue(subject, properties=properties)
+
+    def _enqueue(self, name: str, class_name: Optional[str] = None, properties: Optional[Dict[str, Any]] = None):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Ontology write-behind queue is closed")
+            self._enqueued += 1
+            _, class_names, pending_properties = self._pending.setdefault(name, (self._enqueued, set(), {}))
+            if class_name is not None:
+                class_names.add(class_name)
+            if properties:
+                pending_properties.update(properties)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="ontology-write-behind", daemon=True)
+                self._worker.start()
+            self._condition.notify_all()
+
+    def _take_batch(self) -> Tuple[Dict[str, Tuple[Set[str], Dict[str, Any]]], int]:
+        # Pending entries are ordered by their oldest update, so taking from the
+        # front means every update before the first remaining entry is covered.
+        names = list(self._pending)[:self.max_batch]
+        batch = {name: self._pending.pop(name)[1:] for name in names}
+        applied_through = next(iter(self._pending.values()))[0] - 1 if self._pending else self._enqueued
+        return batch, applied_through
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                if not self._closed and not self._flush_waiters and len(self._pending) < self.max_batch:
+                    self._condition.wait(self.linger)
+                batch, applied_through = self._take_batch()
+            try:
+                self.ontology_manager.apply_updates(batch)
+            except Exception as error:
+                with self._condition:
+                    self._error = self._error or error
+            with self._condition:
+                self._applied = applied_through
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until all updates enqueued before this call are applied.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the updates were applied, False on timeout.
+
+        Raises:
+            Exception: The first error raised while applying a batch since the last flush.
+        """
+        with self._condition:
+            target = self._enqueued
+            self._flush_waiters += 1
+            self._condition.notify_all()
+            try:
+                done = self._condition.wait_for(lambda: self._applied >= target, timeout)
+            finally:
+                self._flush_waiters -= 1
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+        return done
+
+    @property
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def close(self, timeout: Optional[float] = None):
+        """Applies the remaining updates and stops the worker."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
@@ -1,20 +1,48 @@
 import numpy as np
-from typing import List, Union, Any
-from sentence_transformers import SentenceTransformer
-from pydantic import BaseModel, Field
+from typing import List, Union, Any, Optional
+from pydantic import BaseModel
+from app.core.config import get_settings
+from app.core.embedding_cache import EmbeddingCache
+from app.core.model_registry import model_registry
+
+# The embedding model used unless a caller picks another one; warm-up loads this one
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
 class SentenceTransformerWrapper(BaseModel):
-    model: Any = Field(default_factory=lambda: SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2"))
+    model_name: str = DEFAULT_EMBEDDING_MODEL
+    backend: str = "torch"
+    cache: Optional[EmbeddingCache] = None
     
     class Config:
         arbitrary_types_allowed = True
     
-    def __init__(self, model_name: str = 'sentence-transformers/all-MiniLM-L6-v2'):
-        super().__init__()
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, use_cache: bool = True, backend: Optional[str] = None):
+        super().__init__(model_name=model_name, backend=backend or get_settings().embedding_backend)
+        if use_cache:
+            self.cache = model_registry.get_cache(model_name, self.backend)
+
+    @property
+    def model(self) -> Any:
+        # Weights are shared process-wide and only loaded on first use
+        return model_registry.get_model(self.model_name, self.backend)
     
     def encode(self, sentences: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
-        return self.model.encode(sentences, batch_size=batch_size)
+        if self.cache is None:
+            return self.model.encode(sentences, batch_size=batch_size)
+
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        embeddings = self.cache.get_many(texts)
+        if missing := [i for i, embedding in enumerate(embeddings) if embedding is None]:
+            # Encode each distinct missing text once
+            missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = np.asarray(self.model.encode(missing_texts, batch_size=batch_size), dtype=np.float32)
+            self.cache.put_many(missing_texts, encoded)
+            by_text = dict(zip(missing_texts, encoded))
+            for i in missing:
+                embeddings[i] = by_text[texts[i]]
+        if isinstance(sentences, str):
+            return embeddings[0]
+        return np.stack(embeddings) if embeddings else np.empty((0, self.get_embedding_dimension()), dtype=np.float32)
 
     def cosine_similarity(self, embedding1: np.ndarray, embedding2: np.ndarray) -> float:
         return np.dot(embedding1, embedding2) / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2))
@@ -0,0 +1,106 @@
+# app/core/sparql_cache.py -- prepared SPARQL plans and version-invalidated result caching
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional
+
+from rdflib import Graph
+from rdflib.plugins.sparql import prepareQuery
+from rdflib.plugins.sparql.sparql import Query
+
+_plans: "OrderedDict[Hashable, Query]" = OrderedDict()
+_plans_lock = threading.Lock()
+MAX_PLANS = 512
+
+
+def prepare_query(query: str, namespaces: Optional[Mapping[str, Any]] = None) -> Query:
+    """
+    Parses and algebra-compiles a SPARQL query once per process.
+
+    Args:
+        query (str): The SPARQL query text; use variables plus `initBindings` instead of formatting values in.
+        namespaces (Optional[Mapping[str, Any]]): Prefixes available to the query.
+
+    Returns:
+        Query: The prepared query, shared by every caller with the same text and prefixes.
+    """
+    key = (query, tuple(sorted((prefix, str(uri)) for prefix, uri in (namespaces or {}).items())))
+    with _plans_lock:
+        if (plan := _plans.get(key)) is not None:
+            _plans.move_to_end(key)
+            return plan
+    plan = prepareQuery(query, initNs=dict(namespaces or {}))
+    with _plans_lock:
+        _plans[key] = plan
+        while len(_plans) > MAX_PLANS:
+            _plans.popitem(last=False)
+    return plan
+
+
+class SPARQLQueryCache:
+    """
+    Runs prepared, parameterized SPARQL queries against a graph and caches their results.
+
+    Results are keyed by query text, bindings and the graph version. Writers
+    call `invalidate()` after changing the graph, which bumps the version so
+    every cached result is discarded at once; unchanged graphs answer repeated
+    queries from memory without touching the SPARQL engine.
+
+    Args:
+        graph (Callable[[], Graph]): Returns the graph to query; called per query so the graph can load lazily.
+        max_results (int): The number of result sets kept.
+        namespaces (Optional[Callable[[], Mapping[str, Any]]]): Returns prefixes available to queries.
+        lock (Optional[threading.RLock]): Held while the graph is queried, for graphs that are not thread-safe.
+    """
+
+    def __init__(self, graph: Callable[[], Graph], max_results: int = 4096,
+                 namespaces: Optional[Callable[[], Mapping[str, Any]]] = None, lock: Optional[threading.RLock] = None):
+        self._graph = graph
+        self._namespaces = namespaces
+        self._graph_lock = lock
+        self.max_results = max_results
+        self.version = 0
+        self._results: "OrderedDict[Hashable, List[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._results.clear()
+
+    def query(self, query: str, bindings: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        Runs a query, answering from the cache when the graph has not changed.
+
+        Args:
+            query (str): The SPARQL query text.
+            bindings (Optional[Dict[str, Any]]): Values for the query's variables, passed as `initBindings`.
+
+        Returns:
+            List[Any]: The result rows.
+        """
+        key = (query, tuple(sorted(bindings.items())) if bindings else ())
+        with self._lock:
+            version = self.version
+            if (rows := self._results.get(key)) is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return list(rows)
+            self.misses += 1
+        plan = prepare_query(query, self._namespaces() if self._namespaces else None)
+        if self._graph_lock is not None:
+            with self._graph_lock:
+                rows = list(self._graph().query(plan, initBindings=bindings or {}))
+        else:
+            rows = list(self._graph().query(plan, initBindings=bindings or {}))
+        with self._lock:
+            # A write during the query makes these rows stale; don't cache them
+            if version == self.version:
+                self._results[key] = rows
+                while len(self._results) > self.max_results:
+                    self._results.popitem(last=False)
+        return list(rows)
+
+    def stats(self) -> Dict[str, int]:
+        return {"version": self.version, "results": len(self._results), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,102 @@
+# app/core/startup.py -- tracks lazy initialization and warm-up of heavy subsystems
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+COLD, WARMING, WARM, FAILED = "cold", "warming", "warm", "failed"
+
+
+class StartupRegistry:
+    """
+    Records when heavy subsystems (ontology, models, ...) are loaded and how long it took.
+
+    Subsystems load lazily on first use and report through `track`, so their
+    status is accurate whether they were loaded by a request or by the
+    background warm-up. Warm-up functions registered with `register` are run
+    by `warm_up`, typically in a background task right after the application
+    starts serving.
+    """
+
+    def __init__(self):
+        self.process_started = time.time()
+        self._subsystems: Dict[str, Dict[str, Any]] = {}
+        self._warmups: Dict[str, Callable[[], Any]] = {}
+        self._required: List[str] = []
+        self._phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, warm_up: Callable[[], Any], required: bool = True):
+        """
+        Declares a subsystem and how to warm it up.
+
+        Args:
+            name (str): The subsystem name, as passed to `track` by its loader.
+            warm_up (Callable[[], Any]): Loads the subsystem; must be safe to call more than once.
+            required (bool): Whether readiness waits for this subsystem.
+        """
+        with self._lock:
+            self._warmups[name] = warm_up
+            self._subsystems.setdefault(name, {"status": COLD, "seconds": None, "error": None})
+            if required and name not in self._required:
+                self._required.append(name)
+
+    @contextmanager
+    def track(self, name: str):
+        """Times a subsystem's loading and records whether it succeeded."""
+        with self._lock:
+            self._subsystems[name] = {"status": WARMING, "seconds": None, "error": None}
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as error:
+            with self._lock:
+                self._subsystems[name] = {"status": FAILED, "seconds": round(time.perf_counter() - start, 3), "error": repr(error)}
+            raise
+        with self._lock:
+            self._subsystems[name] = {"status": WARM, "seconds": round(time.perf_counter() - start, 3), "error": None}
+
+    def record_phase(self, name: str, seconds: float):
+        with self._lock:
+            self._phases[name] = round(seconds, 3)
+
+    def warm_up(self, names: Optional[List[str]] = None):
+        """
+        Loads the registered subsystems, in registration order, recording failures instead of raising.
+
+        Args:
+            names (Optional[List[str]]): The subsystems to warm; all registered ones if None.
+        """
+        for name in names or list(self._warmups):
+            try:
+                self._warmups[name]()
+            except Exception as error:
+                with self._lock:
+                    if self._subsystems[name]["status"] != FAILED:
+                        self._subsystems[name] = {"status": FAILED, "seconds": None, "error": repr(error)}
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(self._subsystems[name]["status"] == WARM for name in self._required)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Reports each subsystem's status and load time, and the startup phase timings.
+
+        Returns:
+            Dict[str, Any]: Readiness, uptime, per-subsystem status and phase timings.
+        """
+        with self._lock:
+            subsystems = {name: dict(info) for name, info in self._subsystems.items()}
+            phases = dict(self._phases)
+            required = list(self._required)
+        return {
+            "ready": all(subsystems[name]["status"] == WARM for name in required),
+            "uptime_seconds": round(time.time() - self.process_started, 3),
+            "required": required,
+            "subsystems": subsystems,
+            "phases": phases,
+        }
+
+
+startup_registry = StartupRegistry()
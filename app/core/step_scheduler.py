@@ -0,0 +1,162 @@
+# app/core/step_scheduler.py -- pluggable executors for stepping agents phase by phase
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+from app.core.config import settings
+
+
+class StepScheduler:
+    """
+    Runs one phase of an agent step over many agents.
+
+    `map` returns results in input order and only returns once every item is
+    done, so consecutive `map` calls act as a barrier between phases. Which
+    agents run in parallel never changes the order results are applied in.
+    `amap` is the same barrier for callers already running on an event loop.
+    """
+
+    def map(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        raise NotImplementedError
+
+    async def amap(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        # The blocking map runs in a worker thread so the event loop keeps serving
+        return await asyncio.to_thread(self.map, fn, items)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SerialScheduler(StepScheduler):
+    """Runs every item in the calling thread."""
+
+    def map(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        return [fn(item) for item in items]
+
+
+class ThreadPoolScheduler(StepScheduler):
+    """
+    Runs items on a thread pool; suited to agents that wait on I/O or LLM calls.
+
+    Args:
+        max_workers (Optional[int]): The number of worker threads.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-step")
+
+    def map(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        return list(self._executor.map(fn, items))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def _run_shard(task):
+    fn, shard = task
+    return [fn(item) for item in shard]
+
+
+class ProcessPoolScheduler(StepScheduler):
+    """
+    Runs items on a process pool for CPU-bound reasoning.
+
+    Items are split into contiguous shards, one task per shard, so each worker
+    process receives a partition of agents instead of one agent per task. `fn`
+    and the items must be picklable, and since workers operate on copies,
+    phase functions must return the updated agent for the caller to keep.
+
+    Args:
+        max_workers (Optional[int]): The number of worker processes; defaults to the CPU count.
+        shards_per_worker (int): How many shards to cut per worker, for load balancing.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, shards_per_worker: int = 4):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shards_per_worker = shards_per_worker
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+    def map(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        if not items:
+            return []
+        shard_count = min(len(items), self.max_workers * self.shards_per_worker)
+        shard_size = -(-len(items) // shard_count)
+        shards = [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+        results = []
+        for shard_results in self._executor.map(_run_shard, [(fn, shard) for shard in shards]):
+            results.extend(shard_results)
+        return results
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class AsyncioScheduler(StepScheduler):
+    """
+    Runs items as asyncio tasks with bounded concurrency.
+
+    Coroutine functions are awaited directly; plain functions run in the
+    default thread pool via `asyncio.to_thread`. Use `amap` from async code;
+    `map` called while an event loop is running in the calling thread runs the
+    items on a private loop in another thread and blocks until they are done.
+
+    Args:
+        concurrency (int): The maximum number of items in flight.
+    """
+
+    def __init__(self, concurrency: int = 100):
+        self.concurrency = concurrency
+
+    async def amap(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(item):
+            async with semaphore:
+                if asyncio.iscoroutinefunction(fn):
+                    return await fn(item)
+                return await asyncio.to_thread(fn, item)
+
+        return list(await asyncio.gather(*(run(item) for item in items)))
+
+    def map(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.amap(fn, items))
+        # asyncio.run cannot nest inside a running loop (e.g. FastAPI's)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent-step-loop") as executor:
+            return executor.submit(asyncio.run, self.amap(fn, items)).result()
+
+
+def create_scheduler(kind: Optional[str] = None, **kwargs) -> StepScheduler:
+    """
+    Creates a step scheduler by name.
+
+    Args:
+        kind (Optional[str]): One of "serial", "thread", "process" or "asyncio"; defaults to
+            `settings.step_scheduler`.
+        **kwargs: Extra arguments for the scheduler constructor. When omitted,
+            `settings.step_scheduler_workers` (if set) is used as the pool size or concurrency.
+
+    Returns:
+        StepScheduler: The new scheduler.
+    """
+    schedulers = {
+        "serial": SerialScheduler,
+        "thread": ThreadPoolScheduler,
+        "process": ProcessPoolScheduler,
+        "asyncio": AsyncioScheduler,
+    }
+    kind = kind or settings.step_scheduler
+    if kind not in schedulers:
+        raise ValueError(f"Unknown step scheduler: {kind}. Must be one of {list(schedulers)}")
+    if not kwargs and settings.step_scheduler_workers > 0 and kind != "serial":
+        kwargs = {"concurrency" if kind == "asyncio" else "max_workers": settings.step_scheduler_workers}
+    return schedulers[kind](**kwargs)
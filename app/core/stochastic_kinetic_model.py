@@ -1,22 +1,260 @@
-# app/core/stochastic_kinetic_model.py - 
+# app/core/stochastic_kinetic_model.py -
 # models state probabilities for agents using a stochastic kinetic approach
 import numpy as np
+from typing import Dict, Hashable, List, Optional, Sequence
+
+from app.core.kinetic_engine import KineticEngine
+
 
 class StochasticKineticModel:
-    def __init__(self, num_agents, num_states):
-        self.num_agents = num_agents
+    """
+    Per-agent state distributions updated from observation likelihoods.
+
+    Distributions are kept as log-probabilities in one (agents x states)
+    matrix, so repeated updates with small likelihoods do not underflow, and
+    a batch of observations for any number of agents is applied with a few
+    whole-array NumPy operations. Rows are addressed by agent key once agents
+    are registered with `add_agent`, or by row index otherwise. The matrix
+    grows geometrically as agents are added; removing an agent moves the last
+    row into its slot.
+
+    With a kinetic engine, predictions advance each distribution by the
+    engine's transition dynamics over `dt` instead of returning the current mode.
+    The population those dynamics depend on, and the transition matrix for
+    each `dt`, are computed once per time step: observations within a step do
+    not refresh them, and `invalidate` (called when the world advances a
+    tick) or a change of agents or engine does.
+
+    Args:
+        num_agents (int): The number of anonymous agents (rows 0..num_agents-1) to start with.
+        num_states (int): The number of states per agent.
+        engine (Optional[KineticEngine]): The transition dynamics between states.
+    """
+
+    def __init__(self, num_agents, num_states, engine: Optional[KineticEngine] = None):
         self.num_states = num_states
-        self.state_probabilities = np.ones((num_agents, num_states)) / num_states
-
-    def update(self, observations):
-        # Update state probabilities based on observations
-        for agent_id, agent_obs in enumerate(observations):
-            for state_id, state_obs in enumerate(agent_obs):
-                self.state_probabilities[agent_id][state_id] *= state_obs
-            
-            # Normalize the probabilities for each agent
-            self.state_probabilities[agent_id] /= np.sum(self.state_probabilities[agent_id])
-
-    def predict_next_state(self):
+        self._engine = engine
+        self._population: Optional[np.ndarray] = None
+        self._transitions: Dict[float, np.ndarray] = {}
+        self._log_probabilities = np.full((max(num_agents, 1), num_states), -np.log(num_states))
+        self._size = num_agents
+        self._rows: Dict[Hashable, int] = {}
+        self._keys: List[Optional[Hashable]] = [None] * num_agents
+
+    @property
+    def engine(self) -> Optional[KineticEngine]:
+        return self._engine
+
+    @engine.setter
+    def engine(self, engine: Optional[KineticEngine]):
+        self._engine = engine
+        self.invalidate()
+
+    def invalidate(self):
+        """Drops the cached population and transition matrices, e.g. at the start of a new time step."""
+        self._population = None
+        self._transitions.clear()
+
+    @property
+    def num_agents(self) -> int:
+        return self._size
+
+    @property
+    def log_probabilities(self) -> np.ndarray:
+        return self._log_probabilities[:self._size]
+
+    @property
+    def state_probabilities(self) -> np.ndarray:
+        return np.exp(self.log_probabilities)
+
+    def _reserve(self, size: int):
+        capacity = self._log_probabilities.shape[0]
+        if size <= capacity:
+            return
+        grown = np.full((max(size, 2 * capacity), self.num_states), -np.log(self.num_states))
+        grown[:self._size] = self._log_probabilities[:self._size]
+        self._log_probabilities = grown
+
+    def resize(self, num_agents: int):
+        """Grows or shrinks to a number of rows; new rows start uniform."""
+        self._reserve(num_agents)
+        self._log_probabilities[self._size:num_agents] = -np.log(self.num_states)
+        for key in self._keys[num_agents:]:
+            self._rows.pop(key, None)
+        self._keys = self._keys[:num_agents] + [None] * (num_agents - len(self._keys))
+        self._size = num_agents
+        self.invalidate()
+
+    def add_agent(self, key: Hashable) -> int:
+        """
+        Registers an agent with a uniform distribution, returning its row.
+
+        Args:
+            key (Hashable): The agent's identifier.
+
+        Returns:
+            int: The agent's row index.
+        """
+        if key in self._rows:
+            return self._rows[key]
+        self._reserve(self._size + 1)
+        row = self._size
+        self._log_probabilities[row] = -np.log(self.num_states)
+        self._rows[key] = row
+        self._keys.append(key)
+        self._size += 1
+        self.invalidate()
+        return row
+
+    def remove_agent(self, key: Hashable) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        last = self._size - 1
+        if row != last:
+            self._log_probabilities[row] = self._log_probabilities[last]
+            moved = self._keys[last]
+            self._keys[row] = moved
+            if moved is not None:
+                self._rows[moved] = row
+        self._keys.pop()
+        self._size = last
+        self.invalidate()
+        return True
+
+    def rows(self, agents: Optional[Sequence] = None) -> np.ndarray:
+        """
+        Resolves agent keys or row indices to row indices.
+
+        Args:
+            agents (Optional[Sequence]): Registered agent keys or row indices; all rows if None.
+
+        Returns:
+            np.ndarray: The row indices.
+        """
+        if agents is None:
+            return np.arange(self._size)
+        return np.fromiter((self._row(agent) for agent in agents), dtype=np.intp, count=len(agents))
+
+    def _row(self, agent) -> int:
+        row = self._rows.get(agent)
+        if row is not None:
+            return row
+        if isinstance(agent, (int, np.integer)) and not isinstance(agent, bool):
+            return int(agent)
+        raise KeyError(agent)
+
+    def validate_observation(self, observation) -> np.ndarray:
+        """
+        Checks one agent's observation before it is queued for a batch update.
+
+        Args:
+            observation: The likelihood of each of the num_states states.
+
+        Returns:
+            np.ndarray: The observation as a float array of shape (num_states,).
+
+        Raises:
+            ValueError: If the observation is not num_states finite, non-negative numbers.
+        """
+        try:
+            likelihoods = np.asarray(observation, dtype=np.float64)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"An observation must be {self.num_states} numbers: {e}") from e
+        if likelihoods.shape != (self.num_states,):
+            raise ValueError(f"An observation must have shape ({self.num_states},), not {likelihoods.shape}")
+        if not np.all(np.isfinite(likelihoods)) or np.any(likelihoods < 0):
+            raise ValueError("An observation's likelihoods must be finite and non-negative")
+        return likelihoods
+
+    def update(self, observations, agents: Optional[Sequence] = None):
+        """
+        Multiplies agents' distributions by observation likelihoods and renormalizes.
+
+        Args:
+            observations: An (n x num_states) array of non-negative likelihoods.
+            agents (Optional[Sequence]): The n agent keys or row indices the observations belong to;
+                rows 0..n-1 if None. Repeated agents receive the product of their observations.
+        """
+        observations = np.asarray(observations, dtype=np.float64).reshape(-1, self.num_states)
+        with np.errstate(divide="ignore"):
+            self.update_log(np.log(observations), agents)
+
+    def update_log(self, log_observations, agents: Optional[Sequence] = None):
+        """
+        Like `update`, but with log-likelihoods.
+
+        An observation that rules out every state carries no usable evidence,
+        so the affected agent's distribution is left unchanged.
+
+        Args:
+            log_observations: An (n x num_states) array of log-likelihoods.
+            agents (Optional[Sequence]): The n agent keys or row indices; rows 0..n-1 if None.
+        """
+        log_observations = np.asarray(log_observations, dtype=np.float64).reshape(-1, self.num_states)
+        rows = np.arange(len(log_observations)) if agents is None else self.rows(agents)
+        if len(rows) and rows.max() >= self._size:
+            self.resize(int(rows.max()) + 1)
+        unique_rows = np.unique(rows)
+        if len(unique_rows) == len(rows):
+            updated = self._log_probabilities[rows] + log_observations
+            rows_out = rows
+        else:
+            updated = self._log_probabilities[unique_rows]
+            np.add.at(updated, np.searchsorted(unique_rows, rows), log_observations)
+            rows_out = unique_rows
+        peak = updated.max(axis=1, keepdims=True)
+        supported = np.isfinite(peak[:, 0])
+        with np.errstate(invalid="ignore"):
+            normalizer = peak + np.log(np.exp(updated - peak).sum(axis=1, keepdims=True))
+        self._log_probabilities[rows_out[supported]] = (updated - normalizer)[supported]
+
+    def population(self) -> np.ndarray:
+        # Expected number of agents in each state
+        return self.state_probabilities.sum(axis=0)
+
+    def transition_matrix(self, dt: float = 1.0) -> np.ndarray:
+        """
+        Returns the engine's transition matrix over `dt` for the current time step.
+
+        Args:
+            dt (float): The time step.
+
+        Returns:
+            np.ndarray: A row-stochastic (num_states x num_states) matrix.
+        """
+        matrix = self._transitions.get(dt)
+        if matrix is None:
+            if self._population is None:
+                self._population = self.population()
+            matrix = self._transitions[dt] = self._engine.transition_matrix(dt, self._population)
+        return matrix
+
+    def forecast_distribution(self, agents: Optional[Sequence] = None, dt: float = 1.0) -> np.ndarray:
+        """
+        Forecasts agents' state distributions after a time step.
+
+        Args:
+            agents (Optional[Sequence]): Agent keys or row indices; all agents if None.
+            dt (float): The time step.
+
+        Returns:
+            np.ndarray: The forecast distributions, one row per agent.
+        """
+        probabilities = np.exp(self._log_probabilities[self.rows(agents)])
+        if self.engine is None:
+            return probabilities
+        return probabilities @ self.transition_matrix(dt)
+
+    def predict_next_state(self, agents: Optional[Sequence] = None, dt: float = 1.0):
         # Predict the next state for each agent
-        return np.argmax(self.state_probabilities, axis=1)
\ No newline at end of file
+        if self.engine is None:
+            return np.argmax(self._log_probabilities[self.rows(agents)], axis=1)
+        return np.argmax(self.forecast_distribution(agents, dt), axis=1)
+
+    def predict_agent_state(self, agent, dt: float = 1.0):
+        # Predict the next state for a single agent
+        row = self._row(agent)
+        if self.engine is None:
+            return int(np.argmax(self._log_probabilities[row]))
+        return int(np.argmax(self.forecast_distribution([row], dt)[0]))
@@ -0,0 +1,85 @@
+# app/core/timer_wheel.py -- hashed timing wheel for large numbers of cancellable deadlines
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TimerWheel:
+    """
+    Tracks deadlines in a fixed ring of slots, one slot per tick.
+
+    Scheduling and cancelling are O(1) whatever the number of pending
+    deadlines, and `advance` only visits the slots of the ticks that passed,
+    so tens of thousands of reply-by deadlines cost a handful of dict
+    operations each instead of a sorted structure or one asyncio timer apiece.
+    Deadlines further away than one turn of the wheel stay in their slot
+    until the turn in which they are due.
+
+    Args:
+        tick (float): The wheel's resolution in seconds.
+        slots (int): The number of slots in the ring.
+        clock (Callable[[], float]): The time source, in seconds.
+    """
+
+    def __init__(self, tick: float = 0.01, slots: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self._slots: List[Dict[Hashable, int]] = [{} for _ in range(slots)]
+        self._timers: Dict[Hashable, Tuple[int, int]] = {}
+        self._current = self._tick_of(clock())
+
+    def _tick_of(self, moment: float) -> int:
+        return int(moment / self.tick)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """
+        Schedules a key to expire at a deadline, replacing any deadline it already had.
+
+        Args:
+            key (Hashable): What expires, e.g. a conversation id.
+            deadline (float): The deadline on the wheel's clock.
+        """
+        self.cancel(key)
+        due = max(self._tick_of(deadline), self._current + 1)
+        slot = due % len(self._slots)
+        self._slots[slot][key] = due
+        self._timers[key] = (slot, due)
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        del self._slots[timer[0]][key]
+        return True
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """
+        Moves the wheel to the current time.
+
+        Args:
+            now (Optional[float]): The current time; read from the clock if omitted.
+
+        Returns:
+            List[Hashable]: The keys whose deadlines have passed, which are no longer scheduled.
+        """
+        target = self._tick_of(self.clock() if now is None else now)
+        expired = []
+        if target <= self._current:
+            return expired
+        # Past one full turn every slot is visited once; due ticks decide what expires
+        for current in range(self._current + 1, min(target, self._current + len(self._slots)) + 1):
+            slot = self._slots[current % len(self._slots)]
+            if not slot:
+                continue
+            due_keys = [key for key, due in slot.items() if due <= target]
+            for key in due_keys:
+                del slot[key]
+                del self._timers[key]
+            expired.extend(due_keys)
+        self._current = target
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
@@ -0,0 +1,159 @@
+# app/core/topic_router.py -- hierarchical topic subscriptions with * and # wildcards
+from typing import Dict, Hashable, List, Set
+
+SEPARATOR = "."
+SINGLE_WILDCARD = "*"
+MULTI_WILDCARD = "#"
+
+
+class _Node:
+    __slots__ = ("children", "subscribers")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.subscribers: Set[Hashable] = set()
+
+
+class TopicRouter:
+    """
+    Matches dotted topics (e.g. "orders.eu.created") against subscription patterns.
+
+    Patterns are stored in a trie with one level per topic segment. In a
+    pattern, "*" matches exactly one segment and "#" matches zero or more
+    segments, so "orders.*" matches "orders.created" and "orders.#" matches
+    "orders", "orders.created" and "orders.eu.created". Matching walks only
+    the branches that can match the topic, so its cost depends on the topic's
+    depth and the wildcards along it rather than on the number of
+    subscriptions. Results are cached per topic until subscriptions change.
+
+    Args:
+        max_cached_topics (int): The number of topics whose matches are cached.
+    """
+
+    def __init__(self, max_cached_topics: int = 10000):
+        self._root = _Node()
+        self._patterns: Dict[Hashable, Set[str]] = {}
+        self._matches: Dict[str, frozenset] = {}
+        self.max_cached_topics = max_cached_topics
+
+    @staticmethod
+    def _segments(topic: str) -> List[str]:
+        if not topic:
+            raise ValueError("Topic must not be empty")
+        return topic.split(SEPARATOR)
+
+    def subscribe(self, subscriber: Hashable, pattern: str) -> bool:
+        """
+        Subscribes to every topic matching a pattern.
+
+        Args:
+            subscriber (Hashable): The subscriber, e.g. an agent id.
+            pattern (str): The topic pattern, possibly with "*" and "#" segments.
+
+        Returns:
+            bool: False if the subscriber already had this subscription.
+        """
+        node = self._root
+        for segment in self._segments(pattern):
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _Node()
+            node = child
+        if subscriber in node.subscribers:
+            return False
+        node.subscribers.add(subscriber)
+        self._patterns.setdefault(subscriber, set()).add(pattern)
+        self._matches.clear()
+        return True
+
+    def unsubscribe(self, subscriber: Hashable, pattern: str) -> bool:
+        """
+        Removes one subscription, pruning trie branches left empty.
+
+        Args:
+            subscriber (Hashable): The subscriber.
+            pattern (str): The pattern it subscribed with.
+
+        Returns:
+            bool: False if there was no such subscription.
+        """
+        path = [self._root]
+        segments = self._segments(pattern)
+        for segment in segments:
+            node = path[-1].children.get(segment)
+            if node is None:
+                return False
+            path.append(node)
+        if subscriber not in path[-1].subscribers:
+            return False
+        path[-1].subscribers.discard(subscriber)
+        patterns = self._patterns[subscriber]
+        patterns.discard(pattern)
+        if not patterns:
+            del self._patterns[subscriber]
+        for depth in range(len(segments), 0, -1):
+            node = path[depth]
+            if node.subscribers or node.children:
+                break
+            del path[depth - 1].children[segments[depth - 1]]
+        self._matches.clear()
+        return True
+
+    def unsubscribe_all(self, subscriber: Hashable) -> int:
+        """Removes every subscription a subscriber holds and returns how many there were."""
+        patterns = list(self._patterns.get(subscriber, ()))
+        for pattern in patterns:
+            self.unsubscribe(subscriber, pattern)
+        return len(patterns)
+
+    def subscriptions(self, subscriber: Hashable) -> Set[str]:
+        return set(self._patterns.get(subscriber, ()))
+
+    def match(self, topic: str) -> frozenset:
+        """
+        Finds the subscribers of every pattern matching a topic.
+
+        Args:
+            topic (str): A concrete topic, without wildcards.
+
+        Returns:
+            frozenset: The matching subscribers, each once.
+        """
+        cached = self._matches.get(topic)
+        if cached is not None:
+            return cached
+        segments = self._segments(topic)
+        matched: Set[Hashable] = set()
+        stack = [(self._root, 0)]
+        visited = set()
+        while stack:
+            node, depth = stack.pop()
+            if (id(node), depth) in visited:
+                continue
+            visited.add((id(node), depth))
+            if depth == len(segments):
+                matched.update(node.subscribers)
+                hash_child = node.children.get(MULTI_WILDCARD)
+                if hash_child is not None:
+                    stack.append((hash_child, depth))
+                continue
+            for key in (segments[depth], SINGLE_WILDCARD):
+                child = node.children.get(key)
+                if child is not None:
+                    stack.append((child, depth + 1))
+            hash_child = node.children.get(MULTI_WILDCARD)
+            if hash_child is not None:
+                # "#" consumes any number of the remaining segments, including none
+                for consumed in range(depth, len(segments) + 1):
+                    stack.append((hash_child, consumed))
+        result = frozenset(matched)
+        if len(self._matches) >= self.max_cached_topics:
+            self._matches.clear()
+        self._matches[topic] = result
+        return result
+
+    def __len__(self) -> int:
+        return sum(len(patterns) for patterns in self._patterns.values())
+
+    def __contains__(self, subscriber: Hashable) -> bool:
+        return subscriber in self._patterns
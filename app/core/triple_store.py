@@ -0,0 +1,352 @@
+# app/core/triple_store.py -- pluggable rdflib store backends, including an embedded SQLite store
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from weakref import WeakSet
+
+from rdflib import Graph, Literal, URIRef
+from rdflib.store import NO_STORE, VALID_STORE, Store
+from rdflib.util import from_n3
+
+from app.core.literal_index import LiteralIndex, Triple, tokenize
+
+# Every open SQLite store, so pending writes can be flushed at shutdown
+_open_stores: "WeakSet[SQLiteStore]" = WeakSet()
+
+
+def _to_n3(term) -> str:
+    return term.n3()
+
+
+class SQLiteStore(Store):
+    """
+    An rdflib store persisted in a single SQLite database.
+
+    Triples are stored as N3 strings in a WITHOUT ROWID table whose primary
+    key and two secondary indexes cover every bound/unbound triple pattern.
+    Triples with a literal object are also written to a `literals` table with
+    an FTS5 index over the case-folded value, in the same transaction, so the
+    literal index is persisted with the graph (see `SQLiteLiteralIndex`).
+    An `items` table keeps serialized records next to the graph for owners
+    that hold more than triples, such as a knowledge base's item maps.
+
+    Writes are batched: they accumulate in an open transaction and are
+    committed every `batch_size` changes, `commit_interval` seconds after the
+    first uncommitted write, or on `commit()`/`close()`. The database runs in
+    WAL mode with a bounded page cache, so opening an existing store is just
+    opening the file; nothing is re-parsed or re-indexed.
+
+    Args:
+        configuration (Optional[str]): Path to the database file; opened immediately if given.
+        batch_size (int): The number of writes buffered per transaction.
+        commit_interval (float): The longest time in seconds a write stays uncommitted; 0 disables the timer.
+        cache_size_kib (int): The SQLite page cache size in KiB.
+        mmap_size (int): The number of bytes of the database file to memory-map.
+    """
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration: Optional[str] = None, identifier=None, batch_size: int = 10000,
+                 commit_interval: float = 1.0, cache_size_kib: int = 65536, mmap_size: int = 256 * 1024 * 1024):
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending = 0
+        self._write_lock = threading.RLock()
+        self._commit_timer: Optional[threading.Timer] = None
+        self._namespace: Dict[str, URIRef] = {}
+        self._prefix: Dict[URIRef, str] = {}
+        super().__init__(configuration, identifier)
+
+    def open(self, configuration: str, create: bool = True) -> Optional[int]:
+        if not create and not os.path.exists(configuration):
+            return NO_STORE
+        if directory := os.path.dirname(configuration):
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(configuration, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        self._conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        literals_exist = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'literals'").fetchone() is not None
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS triples (s TEXT NOT NULL, p TEXT NOT NULL, o TEXT NOT NULL, PRIMARY KEY (s, p, o)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+            CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+            CREATE TABLE IF NOT EXISTS namespaces (prefix TEXT PRIMARY KEY, uri TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS items (kind TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (kind, id)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS literals (id INTEGER PRIMARY KEY, s TEXT NOT NULL, p TEXT NOT NULL, o TEXT NOT NULL,
+                                                 folded TEXT NOT NULL, UNIQUE (s, p, o));
+            CREATE INDEX IF NOT EXISTS literals_folded ON literals (folded);
+            CREATE VIRTUAL TABLE IF NOT EXISTS literals_fts USING fts5(
+                folded, content='literals', content_rowid='id', tokenize="unicode61 remove_diacritics 0 tokenchars '_'");
+            CREATE TRIGGER IF NOT EXISTS literals_insert AFTER INSERT ON literals BEGIN
+                INSERT INTO literals_fts (rowid, folded) VALUES (new.id, new.folded);
+            END;
+            CREATE TRIGGER IF NOT EXISTS literals_delete AFTER DELETE ON literals BEGIN
+                INSERT INTO literals_fts (literals_fts, rowid, folded) VALUES ('delete', old.id, old.folded);
+            END;
+        """)
+        if not literals_exist and self._conn.execute("SELECT EXISTS (SELECT 1 FROM triples)").fetchone()[0]:
+            self._backfill_literals()
+        for prefix, uri in self._conn.execute("SELECT prefix, uri FROM namespaces"):
+            self._namespace[prefix] = URIRef(uri)
+            self._prefix[URIRef(uri)] = prefix
+        _open_stores.add(self)
+        return VALID_STORE
+
+    def _backfill_literals(self):
+        # One-off for databases written before literals were indexed in the store
+        cursor = self._conn.execute("SELECT s, p, o FROM triples WHERE substr(o, 1, 1) = '\"'")
+        while rows := cursor.fetchmany(10000):
+            self._conn.executemany("INSERT OR IGNORE INTO literals (s, p, o, folded) VALUES (?, ?, ?, ?)",
+                                   [(s, p, o, str(from_n3(o)).casefold()) for s, p, o in rows])
+        self._conn.commit()
+
+    def close(self, commit_pending_transaction: bool = True) -> None:
+        with self._write_lock:
+            if self._conn is None:
+                return
+            # Batching is internal to the store, so buffered writes are always flushed;
+            # call rollback() explicitly to discard them.
+            self.commit()
+            self._conn.close()
+            self._conn = None
+        _open_stores.discard(self)
+
+    def _written(self, count: int = 1):
+        self._pending += count
+        if self._pending >= self.batch_size:
+            self.commit()
+        elif self.commit_interval > 0 and self._commit_timer is None:
+            self._commit_timer = threading.Timer(self.commit_interval, self.commit)
+            self._commit_timer.daemon = True
+            self._commit_timer.start()
+
+    def _cancel_commit_timer(self):
+        if self._commit_timer is not None:
+            if self._commit_timer is not threading.current_thread():
+                self._commit_timer.cancel()
+            self._commit_timer = None
+
+    def commit(self) -> None:
+        with self._write_lock:
+            self._cancel_commit_timer()
+            if self._conn is not None:
+                self._conn.commit()
+            self._pending = 0
+
+    def rollback(self) -> None:
+        with self._write_lock:
+            self._cancel_commit_timer()
+            if self._conn is not None:
+                self._conn.rollback()
+            self._pending = 0
+
+    @staticmethod
+    def _literal_row(s, p, o) -> tuple:
+        return _to_n3(s), _to_n3(p), _to_n3(o), str(o).casefold()
+
+    def add(self, triple, context, quoted: bool = False) -> None:
+        s, p, o = triple
+        with self._write_lock:
+            self._conn.execute("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", (_to_n3(s), _to_n3(p), _to_n3(o)))
+            if isinstance(o, Literal):
+                self._conn.execute("INSERT OR IGNORE INTO literals (s, p, o, folded) VALUES (?, ?, ?, ?)", self._literal_row(s, p, o))
+            self._written()
+        super().add(triple, context, quoted)
+
+    def addN(self, quads) -> None:
+        quads = list(quads)
+        rows = [(_to_n3(s), _to_n3(p), _to_n3(o)) for s, p, o, _ in quads]
+        literal_rows = [self._literal_row(s, p, o) for s, p, o, _ in quads if isinstance(o, Literal)]
+        with self._write_lock:
+            self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", rows)
+            if literal_rows:
+                self._conn.executemany("INSERT OR IGNORE INTO literals (s, p, o, folded) VALUES (?, ?, ?, ?)", literal_rows)
+            self._written(len(rows))
+
+    @staticmethod
+    def _where(triple_pattern):
+        clauses, params = [], []
+        for column, term in zip(("s", "p", "o"), triple_pattern):
+            if term is not None:
+                clauses.append(f"{column} = ?")
+                params.append(_to_n3(term))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def remove(self, triple_pattern, context=None) -> None:
+        where, params = self._where(triple_pattern)
+        with self._write_lock:
+            cursor = self._conn.execute(f"DELETE FROM triples{where}", params)
+            self._conn.execute(f"DELETE FROM literals{where}", params)
+            self._written(max(cursor.rowcount, 1))
+        super().remove(triple_pattern, context)
+
+    def triples(self, triple_pattern, context=None) -> Iterator:
+        # Rows are streamed from the cursor; collect them first if the graph is modified during iteration
+        where, params = self._where(triple_pattern)
+        for s, p, o in self._conn.execute(f"SELECT s, p, o FROM triples{where}", params):
+            yield (from_n3(s), from_n3(p), from_n3(o)), iter(())
+
+    def __len__(self, context=None) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def is_empty(self) -> bool:
+        """Returns whether the store holds no triples, without counting them."""
+        return not self._conn.execute("SELECT EXISTS (SELECT 1 FROM triples)").fetchone()[0]
+
+    def literal_rows(self, sql: str, params: tuple) -> Iterator[Triple]:
+        for s, p, o in self._conn.execute(sql, params):
+            yield from_n3(s), from_n3(p), from_n3(o)
+
+    def put_items(self, kind: str, items: Iterable[Tuple[str, str]]) -> None:
+        """
+        Writes serialized records, replacing any with the same kind and id.
+
+        Args:
+            kind (str): The record kind, e.g. "symbolic" or "neural".
+            items (Iterable[Tuple[str, str]]): The (id, data) pairs to write.
+        """
+        rows = [(kind, item_id, data) for item_id, data in items]
+        if not rows:
+            return
+        with self._write_lock:
+            self._conn.executemany("INSERT OR REPLACE INTO items (kind, id, data) VALUES (?, ?, ?)", rows)
+            self._written(len(rows))
+
+    def delete_item(self, kind: str, item_id: str) -> None:
+        with self._write_lock:
+            self._conn.execute("DELETE FROM items WHERE kind = ? AND id = ?", (kind, item_id))
+            self._written()
+
+    def items(self, kind: str) -> Iterator[Tuple[str, str]]:
+        """Yields the (id, data) pairs of a kind of record."""
+        yield from self._conn.execute("SELECT id, data FROM items WHERE kind = ?", (kind,))
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix: str, namespace: URIRef, override: bool = True) -> None:
+        namespace = URIRef(namespace)
+        if self._namespace.get(prefix) == namespace:
+            return
+        bound_prefix = self._prefix.get(namespace)
+        if not override and (prefix in self._namespace or bound_prefix is not None):
+            return
+        if bound_prefix is not None and bound_prefix != prefix:
+            self._namespace.pop(bound_prefix, None)
+            self._conn.execute("DELETE FROM namespaces WHERE prefix = ?", (bound_prefix,))
+        if (bound_namespace := self._namespace.get(prefix)) is not None:
+            self._prefix.pop(bound_namespace, None)
+        self._namespace[prefix] = namespace
+        self._prefix[namespace] = prefix
+        with self._write_lock:
+            self._conn.execute("INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)", (prefix, str(namespace)))
+            self._written()
+
+    def namespace(self, prefix: str) -> Optional[URIRef]:
+        return self._namespace.get(prefix)
+
+    def prefix(self, namespace: URIRef) -> Optional[str]:
+        return self._prefix.get(URIRef(namespace))
+
+    def namespaces(self):
+        yield from self._namespace.items()
+
+
+class SQLiteLiteralIndex(LiteralIndex):
+    """
+    The literal index of a graph on a `SQLiteStore`, read from the store's own tables.
+
+    The store indexes literal objects as it writes them, in the same
+    transaction, so the index survives restarts and opening a large store
+    does not rebuild anything. `add`, `remove` and `remove_subject` are
+    therefore no-ops here; lookups and keyword searches are SQL queries
+    against the `literals` table and its FTS5 index.
+
+    Args:
+        store (SQLiteStore): The open store holding the graph.
+    """
+
+    def __init__(self, store: SQLiteStore):
+        self.store = store
+
+    def add(self, subject, predicate, obj):
+        pass
+
+    def remove(self, subject, predicate, obj):
+        pass
+
+    def remove_subject(self, subject):
+        pass
+
+    def rebuild(self, triples):
+        pass
+
+    def lookup(self, value, ignore_case: bool = False) -> List[Triple]:
+        sql, params = "SELECT s, p, o FROM literals WHERE folded = ?", (str(value).casefold(),)
+        if not ignore_case:
+            sql += " AND o = ?"
+            params += (_to_n3(value if isinstance(value, Literal) else Literal(value)),)
+        return list(self.store.literal_rows(sql + " ORDER BY s, p, o", params))
+
+    def search(self, text: str, prefix: bool = False, match_all: bool = True, limit: Optional[int] = None) -> List[Triple]:
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        # Tokens are runs of word characters, so quoting them is enough to make them literal FTS5 terms
+        terms = [f'"{token}"' for token in tokens]
+        if prefix:
+            terms[-1] += "*"
+        sql = ("SELECT literals.s, literals.p, literals.o FROM literals_fts JOIN literals ON literals.id = literals_fts.rowid "
+               "WHERE literals_fts MATCH ? ORDER BY literals.s, literals.p, literals.o")
+        params: tuple = ((" AND " if match_all else " OR ").join(terms),)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return list(self.store.literal_rows(sql, params))
+
+    def __len__(self) -> int:
+        return self.store._conn.execute("SELECT COUNT(*) FROM literals").fetchone()[0]
+
+
+def graph_is_empty(graph: Graph) -> bool:
+    """Returns whether a graph holds no triples; for SQLite stores this does not count them."""
+    if isinstance(graph.store, SQLiteStore):
+        return graph.store.is_empty()
+    return not len(graph)
+
+
+def close_stores():
+    """Commits and closes every open SQLite store, e.g. at application shutdown."""
+    for store in list(_open_stores):
+        store.close()
+
+
+def open_graph(backend: str = "memory", path: Optional[str] = None, **store_options) -> Graph:
+    """
+    Opens an RDF graph on the given store backend.
+
+    Args:
+        backend (str): "memory" for rdflib's default in-memory store, or "sqlite".
+        path (Optional[str]): The database file for persistent backends.
+        **store_options: Extra options for the store, e.g. batch_size, commit_interval or cache_size_kib.
+
+    Returns:
+        Graph: The opened graph. Call `graph.close()` to flush pending writes.
+    """
+    if backend == "memory":
+        return Graph()
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("A path is required for the sqlite triple store backend")
+        return Graph(store=SQLiteStore(path, **store_options))
+    raise ValueError(f"Unknown triple store backend: {backend}. Must be 'memory' or 'sqlite'")
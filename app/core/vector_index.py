@@ -0,0 +1,265 @@
+# app/core/vector_index.py -- vector indexes backing neural retrieval in the KnowledgeBase
+from abc import ABC, abstractmethod
+
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.config import get_settings
+
+try:
+    import hnswlib
+except ImportError:  # Approximate search is optional
+    hnswlib = None
+
+Vector = Union[np.ndarray, Sequence[float]]
+
+
+def normalize(vectors: Vector) -> np.ndarray:
+    """
+    Converts vectors to a contiguous float32 array with unit L2 norm per row.
+
+    Args:
+        vectors (Vector): A single vector or a 2D batch of vectors.
+
+    Returns:
+        np.ndarray: The normalized vectors, always 2D.
+    """
+    matrix = np.ascontiguousarray(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex(ABC):
+    """
+    Interface for a keyed vector index searched by cosine similarity.
+
+    Keys are the ids of the neural knowledge items. Adding an existing key
+    replaces its vector, so callers can treat `add` as an upsert.
+    """
+
+    def add(self, key: str, vector: Vector):
+        self.add_batch([key], normalize(vector))
+
+    @abstractmethod
+    def add_batch(self, keys: Sequence[str], vectors: Vector):
+        """Adds or replaces the vectors of many keys at once."""
+
+    @abstractmethod
+    def remove(self, key: str):
+        """Removes a key; unknown keys are ignored."""
+
+    @abstractmethod
+    def search(self, query: Vector, top_k: Optional[int] = None, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """
+        Finds the keys most similar to a query vector.
+
+        Args:
+            query (Vector): The query vector.
+            top_k (Optional[int]): The maximum number of results; all if None.
+            threshold (Optional[float]): Only results with a larger similarity are returned.
+
+        Returns:
+            List[Tuple[str, float]]: Pairs of key and cosine similarity, most similar first.
+        """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Returns the number of indexed keys."""
+
+    @abstractmethod
+    def __contains__(self, key: str) -> bool:
+        """Returns whether a key is indexed."""
+
+
+class ExactVectorIndex(VectorIndex):
+    """
+    Exact cosine search over a contiguous, pre-normalized float32 matrix.
+
+    Rows are kept dense: removing a key moves the last row into its slot, so a
+    query is a single matrix-vector product over `len(self)` rows.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self._capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._rows: Dict[str, int] = {}
+        if dim is not None:
+            self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+
+    def _ensure_capacity(self, dim: int, required: int):
+        if self._matrix is None:
+            self.dim = dim
+            self._capacity = max(self._capacity, required)
+            self._matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+        elif dim != self.dim:
+            raise ValueError(f"Vector dimension {dim} does not match index dimension {self.dim}")
+        if required > self._capacity:
+            while self._capacity < required:
+                self._capacity *= 2
+            matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+            matrix[:len(self._keys)] = self._matrix[:len(self._keys)]
+            self._matrix = matrix
+
+    def add_batch(self, keys: Sequence[str], vectors: Vector):
+        vectors = normalize(vectors)
+        if len(keys) != len(vectors):
+            raise ValueError("Number of keys and vectors must match")
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self._rows]
+        self._ensure_capacity(vectors.shape[1], len(self._keys) + len(new_keys))
+        for key, vector in zip(keys, vectors):
+            row = self._rows.get(key)
+            if row is None:
+                row = len(self._keys)
+                self._rows[key] = row
+                self._keys.append(key)
+            self._matrix[row] = vector
+
+    def remove(self, key: str):
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self._keys) - 1
+        if row != last:
+            moved_key = self._keys[last]
+            self._matrix[row] = self._matrix[last]
+            self._keys[row] = moved_key
+            self._rows[moved_key] = row
+        self._keys.pop()
+
+    def search(self, query: Vector, top_k: Optional[int] = None, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        size = len(self._keys)
+        if size == 0:
+            return []
+        scores = self._matrix[:size] @ normalize(query)[0]
+        candidates = np.arange(size)
+        if threshold is not None:
+            candidates = np.flatnonzero(scores > threshold)
+        if top_k is not None and top_k < len(candidates):
+            partition = np.argpartition(-scores[candidates], top_k)[:top_k]
+            candidates = candidates[partition]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._keys[i], float(scores[i])) for i in order]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+
+class HNSWVectorIndex(VectorIndex):
+    """
+    Approximate cosine search backed by an hnswlib HNSW graph.
+
+    Removal marks the element as deleted and frees its label for reuse, so the
+    index stays in sync with incremental adds and removes without rebuilds.
+    """
+
+    def __init__(self, dim: Optional[int] = None, max_elements: int = 10000, ef_construction: int = 200, M: int = 16, ef_search: int = 64):
+        if hnswlib is None:
+            raise ImportError("hnswlib is required for HNSWVectorIndex; install it with `pip install hnswlib`")
+        self.dim = dim
+        self.max_elements = max_elements
+        self.ef_construction = ef_construction
+        self.M = M
+        self.ef_search = ef_search
+        self._index = None
+        self._labels: Dict[str, int] = {}
+        self._keys: Dict[int, str] = {}
+        self._free_labels: List[int] = []
+        self._next_label = 0
+        if dim is not None:
+            self._init_index(dim)
+
+    def _init_index(self, dim: int):
+        self.dim = dim
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=self.max_elements, ef_construction=self.ef_construction, M=self.M, allow_replace_deleted=True)
+        self._index.set_ef(self.ef_search)
+
+    def add_batch(self, keys: Sequence[str], vectors: Vector):
+        vectors = normalize(vectors)
+        if len(keys) != len(vectors):
+            raise ValueError("Number of keys and vectors must match")
+        if self._index is None:
+            self._init_index(vectors.shape[1])
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dim}")
+
+        labels = []
+        for key in keys:
+            label = self._labels.get(key)
+            if label is None:
+                if self._free_labels:
+                    label = self._free_labels.pop()
+                else:
+                    label = self._next_label
+                    self._next_label += 1
+                self._labels[key] = label
+                self._keys[label] = key
+            labels.append(label)
+
+        required = self._next_label
+        if required > self._index.get_max_elements():
+            self._index.resize_index(max(required, 2 * self._index.get_max_elements()))
+        self._index.add_items(vectors, np.asarray(labels), replace_deleted=True)
+
+    def remove(self, key: str):
+        label = self._labels.pop(key, None)
+        if label is None:
+            return
+        del self._keys[label]
+        self._index.mark_deleted(label)
+        self._free_labels.append(label)
+
+    def search(self, query: Vector, top_k: Optional[int] = None, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        size = len(self._labels)
+        if size == 0:
+            return []
+        k = size if top_k is None else min(top_k, size)
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(normalize(query), k=k)
+        results = []
+        for label, distance in zip(labels[0], distances[0]):
+            similarity = 1.0 - float(distance)
+            if threshold is not None and similarity <= threshold:
+                continue
+            results.append((self._keys[int(label)], similarity))
+        return results
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._labels
+
+
+VECTOR_INDEX_KINDS = ("exact", "hnsw")
+
+
+def create_vector_index(kind: Optional[str] = None, dim: Optional[int] = None, **kwargs) -> VectorIndex:
+    """
+    Creates a vector index by name.
+
+    Args:
+        kind (Optional[str]): Either "exact" or "hnsw"; settings.vector_index_kind if omitted.
+        dim (Optional[int]): The embedding dimension; inferred from the first add if omitted.
+        **kwargs: Extra arguments for the index constructor.
+
+    Returns:
+        VectorIndex: The new index.
+    """
+    if kind is None:
+        settings = get_settings()
+        kind = settings.vector_index_kind
+        if kind == "hnsw":
+            kwargs.setdefault("max_elements", settings.vector_index_max_elements)
+            kwargs.setdefault("ef_search", settings.vector_index_ef_search)
+    if kind == "exact":
+        return ExactVectorIndex(dim=dim, **kwargs)
+    if kind == "hnsw":
+        return HNSWVectorIndex(dim=dim, **kwargs)
+    raise ValueError(f"Unknown vector index kind: {kind}. Must be one of {VECTOR_INDEX_KINDS}")
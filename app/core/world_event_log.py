@@ -0,0 +1,271 @@
+# app/core/world_event_log.py -- append-only event log and snapshots of WorldModel mutations
+import bisect
+import json
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+
+# Record header: tick, payload length, CRC32 of the payload
+_HEADER = struct.Struct("<QII")
+_SNAPSHOT_PREFIX = "snapshot-"
+_SNAPSHOT_SUFFIX = ".json"
+
+Event = Tuple[str, tuple]
+
+
+def encode_value(value: Any) -> Any:
+    """
+    Maps a recorded value onto JSON types.
+
+    JSON types are kept as they are. The Python types JSON has no form for
+    become single-key objects tagged with a `$` name: UUIDs, tuples, numpy
+    arrays, and dicts with non-string keys or keys starting with `$`.
+
+    Args:
+        value (Any): The value to encode.
+
+    Returns:
+        Any: The JSON-serializable form of the value.
+
+    Raises:
+        TypeError: If the value, or anything it contains, is of another type.
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, UUID):
+        return {"$uuid": str(value)}
+    if isinstance(value, list):
+        return [encode_value(item) for item in value]
+    if isinstance(value, tuple):
+        return {"$tuple": [encode_value(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) and not key.startswith("$") for key in value):
+            return {key: encode_value(item) for key, item in value.items()}
+        return {"$dict": [[encode_value(key), encode_value(item)] for key, item in value.items()]}
+    if isinstance(value, np.ndarray):
+        return {"$ndarray": [str(value.dtype), value.tolist()]}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot record a {type(value).__name__} in the world event log")
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        tag, value = next(iter(obj.items()))
+        if tag == "$uuid":
+            return UUID(value)
+        if tag == "$tuple":
+            return tuple(value)
+        if tag == "$dict":
+            return {key: item for key, item in value}
+        if tag == "$ndarray":
+            return np.array(value[1], dtype=value[0])
+    return obj
+
+
+def dumps(value: Any) -> bytes:
+    """Serializes a value with `encode_value` to UTF-8 JSON."""
+    return json.dumps(encode_value(value), separators=(",", ":")).encode()
+
+
+def loads(data: bytes) -> Any:
+    """Deserializes a value written by `dumps`."""
+    return json.loads(data, object_hook=_decode_object)
+
+
+def empty_world() -> Dict[str, Any]:
+    return {"tick": 0, "state": {}, "agents": {}, "objects": {}, "relationships": []}
+
+
+def apply_event(world: Dict[str, Any], kind: str, args: tuple):
+    """
+    Applies one recorded mutation to a plain-dict world, copy-on-write like WorldModel.
+
+    Args:
+        world (Dict[str, Any]): The world with "state", "agents", "objects" and "relationships" entries.
+        kind (str): The mutation, named after the WorldModel method that made it.
+        args (tuple): The mutation's arguments.
+    """
+    if kind == "update_state":
+        world["state"] = {**world["state"], **args[0]}
+    elif kind == "add_agent":
+        world["agents"][args[0]] = dict(args[1])
+    elif kind == "update_agent":
+        if args[0] in world["agents"]:
+            world["agents"][args[0]] = {**world["agents"][args[0]], **args[1]}
+    elif kind == "remove_agent":
+        world["agents"].pop(args[0], None)
+    elif kind == "add_object":
+        world["objects"][args[0]] = dict(args[1])
+    elif kind == "update_object":
+        if args[0] in world["objects"]:
+            world["objects"][args[0]] = {**world["objects"][args[0]], **args[1]}
+    elif kind == "add_relationship":
+        world["relationships"].append(args[0])
+    else:
+        raise ValueError(f"Unknown world event: {kind}")
+
+
+class WorldEventLog:
+    """
+    Append-only binary log of world mutations with periodic snapshots.
+
+    Every record is a fixed header (tick, length, CRC32) followed by the
+    event as JSON (see `encode_value`), so a reader can skip or stop at a
+    tick without decoding payloads, and a torn record at the end of the file is detected and
+    truncated on open. Snapshots store the full world at a tick together with
+    the log offset where the following events start, so the world at any tick
+    is rebuilt from the nearest earlier snapshot plus the events after it.
+
+    Args:
+        directory (str): Where the log and snapshots are stored; created if missing.
+        snapshot_interval (int): Ticks between automatic snapshots; 0 disables them.
+    """
+
+    def __init__(self, directory: str, snapshot_interval: int = 1000):
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, "events.log")
+        self._snapshots: List[Tuple[int, str]] = sorted(
+            (int(name[len(_SNAPSHOT_PREFIX):-len(_SNAPSHOT_SUFFIX)]), os.path.join(directory, name))
+            for name in os.listdir(directory)
+            if name.startswith(_SNAPSHOT_PREFIX) and name.endswith(_SNAPSHOT_SUFFIX)
+        )
+        self._last_tick = 0
+        valid_end = 0
+        if os.path.exists(self.log_path):
+            for tick, _, end in self._scan(0):
+                self._last_tick, valid_end = tick, end
+            if valid_end != os.path.getsize(self.log_path):
+                os.truncate(self.log_path, valid_end)
+        self._file = open(self.log_path, "ab")
+
+    @property
+    def last_tick(self) -> int:
+        return max(self._last_tick, self._snapshots[-1][0] if self._snapshots else 0)
+
+    @property
+    def has_history(self) -> bool:
+        """Whether anything has been recorded, e.g. by an earlier run of the process."""
+        return bool(self._snapshots) or self._file.tell() > 0
+
+    def append(self, tick: int, kind: str, *args):
+        """
+        Records a mutation made at a tick.
+
+        Ticks must not decrease: readers stop at the first record past the tick
+        they rebuild, so an older tick after newer ones would hide everything
+        after it.
+
+        Args:
+            tick (int): The world tick the mutation belongs to.
+            kind (str): The mutation, named after the WorldModel method that made it.
+            *args: The mutation's arguments.
+
+        Raises:
+            ValueError: If the tick is older than the last recorded one.
+            TypeError: If an argument holds a value `encode_value` cannot encode.
+        """
+        if tick < self.last_tick:
+            raise ValueError(f"World event at tick {tick} is older than the last recorded tick {self.last_tick}; "
+                             f"restore the world from the log before recording new events")
+        payload = dumps([kind, list(args)])
+        self._file.write(_HEADER.pack(tick, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._last_tick = tick
+
+    def flush(self):
+        self._file.flush()
+
+    def _scan(self, offset: int, until_tick: Optional[int] = None) -> Iterator[Tuple[int, bytes, int]]:
+        with open(self.log_path, "rb") as log:
+            log.seek(offset)
+            while True:
+                header = log.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                tick, length, crc = _HEADER.unpack(header)
+                if until_tick is not None and tick > until_tick:
+                    return
+                payload = log.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                offset += _HEADER.size + length
+                yield tick, payload, offset
+
+    def events(self, offset: int = 0, until_tick: Optional[int] = None) -> Iterator[Tuple[int, Event]]:
+        """
+        Reads recorded events in order.
+
+        Args:
+            offset (int): The log offset to start reading at.
+            until_tick (Optional[int]): Stop before the first event after this tick.
+
+        Returns:
+            Iterator[Tuple[int, Event]]: Pairs of tick and (kind, args).
+        """
+        self.flush()
+        for tick, payload, _ in self._scan(offset, until_tick):
+            kind, args = loads(payload)
+            yield tick, (kind, tuple(args))
+
+    def snapshot(self, world: Dict[str, Any]):
+        """
+        Writes a snapshot of the world at its current tick.
+
+        Args:
+            world (Dict[str, Any]): The world with "tick", "state", "agents", "objects" and "relationships" entries.
+        """
+        self.flush()
+        tick = world["tick"]
+        path = os.path.join(self.directory, f"{_SNAPSHOT_PREFIX}{tick:012d}{_SNAPSHOT_SUFFIX}")
+        record = {**world, "log_offset": self._file.tell()}
+        with open(path + ".tmp", "wb") as snapshot_file:
+            snapshot_file.write(dumps(record))
+        os.replace(path + ".tmp", path)
+        position = bisect.bisect_left(self._snapshots, tick, key=lambda snapshot: snapshot[0])
+        if position < len(self._snapshots) and self._snapshots[position][0] == tick:
+            self._snapshots[position] = (tick, path)
+        else:
+            self._snapshots.insert(position, (tick, path))
+
+    def should_snapshot(self, tick: int) -> bool:
+        if not self.snapshot_interval:
+            return False
+        last_snapshot = self._snapshots[-1][0] if self._snapshots else 0
+        return tick - last_snapshot >= self.snapshot_interval
+
+    def world_at(self, tick: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Rebuilds the world as it was at the end of a tick.
+
+        Loads the latest snapshot taken at or before the tick and replays only
+        the events recorded after it.
+
+        Args:
+            tick (Optional[int]): The tick; defaults to the latest recorded tick.
+
+        Returns:
+            Dict[str, Any]: The world with "tick", "state", "agents", "objects" and "relationships" entries.
+        """
+        tick = self.last_tick if tick is None else tick
+        position = bisect.bisect_right(self._snapshots, tick, key=lambda snapshot: snapshot[0])
+        if position:
+            with open(self._snapshots[position - 1][1], "rb") as snapshot_file:
+                world = loads(snapshot_file.read())
+            offset = world.pop("log_offset")
+        else:
+            world, offset = empty_world(), 0
+        for _, (kind, args) in self.events(offset, until_tick=tick):
+            apply_event(world, kind, args)
+        world["tick"] = tick
+        return world
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
@@ -0,0 +1,239 @@
+# app/core/world_index.py -- secondary indexes over WorldModel objects and relationships
+import math
+from itertools import product
+from typing import Any, Collection, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+Cell = Tuple[int, ...]
+
+# Stands for a value that cannot be indexed; None is a legitimate attribute value
+_UNHASHABLE = object()
+
+
+def _hashable(value: Any) -> Hashable:
+    if isinstance(value, list):
+        value = tuple(value)
+    try:
+        hash(value)
+    except TypeError:
+        return _UNHASHABLE
+    return value
+
+
+class SpatialGrid:
+    """
+    Uniform grid over object positions for radius queries.
+
+    Each position is bucketed into the cell `floor(coordinate / cell_size)` per
+    dimension, so a radius query only visits the cells overlapping the query's
+    bounding box and then checks exact distances. Positions may have any number
+    of dimensions, but all positions in one grid should have the same number.
+
+    Args:
+        cell_size (float): The edge length of a grid cell; ideally close to typical query radii.
+    """
+
+    def __init__(self, cell_size: float = 10.0):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._positions: Dict[str, Tuple[float, ...]] = {}
+
+    def _cell(self, position: Sequence[float]) -> Cell:
+        return tuple(math.floor(coordinate / self.cell_size) for coordinate in position)
+
+    def insert(self, key: str, position: Sequence[float]):
+        position = tuple(position)
+        # Validates the position before anything is changed, so a bad one leaves the grid as it was
+        cell = self._cell(position)
+        previous = self._positions.get(key)
+        if previous is not None:
+            if previous == position:
+                return
+            self.remove(key)
+        self._positions[key] = position
+        self._cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key: str):
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        cell = self._cell(position)
+        keys = self._cells.get(cell)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._cells[cell]
+
+    def cell_of(self, key: str) -> Optional[Cell]:
+        """Returns the cell a key is stored in, or None if it has no position."""
+        position = self._positions.get(key)
+        return None if position is None else self._cell(position)
+
+    def cells_overlapping(self, center: Sequence[float], radius: float, candidates: Collection[Cell]) -> Iterable[Cell]:
+        """
+        Returns the cells overlapping a radius query's bounding box.
+
+        Args:
+            center (Sequence[float]): The query point.
+            radius (float): The query radius.
+            candidates (Collection[Cell]): The cells worth visiting, e.g. the occupied ones.
+
+        Returns:
+            Iterable[Cell]: Every cell of the box, or only the candidates inside it when those are fewer.
+        """
+        low = self._cell([c - radius for c in center])
+        high = self._cell([c + radius for c in center])
+        cell_count = math.prod(h - l + 1 for l, h in zip(low, high))
+        if cell_count > len(candidates):
+            # Sparse grid or huge radius: visiting the candidates is cheaper than the box
+            return [cell for cell in candidates if all(l <= c <= h for c, l, h in zip(cell, low, high))]
+        return product(*(range(l, h + 1) for l, h in zip(low, high)))
+
+    def within(self, center: Sequence[float], radius: float) -> List[str]:
+        """
+        Finds the keys whose position lies within a radius of a point.
+
+        Args:
+            center (Sequence[float]): The query point.
+            radius (float): The maximum distance, inclusive.
+
+        Returns:
+            List[str]: The matching keys.
+        """
+        matches = []
+        for cell in self.cells_overlapping(center, radius, self._cells):
+            for key in self._cells.get(cell, ()):
+                if math.dist(center, self._positions[key]) <= radius:
+                    matches.append(key)
+        return matches
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+
+class AttributeIndex:
+    """
+    Hash index from attribute values to the keys of the records holding them.
+
+    List values are indexed as tuples; other unhashable values are not indexed.
+
+    Args:
+        attributes (Iterable[str]): The attributes to index.
+    """
+
+    def __init__(self, attributes: Iterable[str] = ()):
+        self._values: Dict[str, Dict[Hashable, Set[str]]] = {attribute: {} for attribute in attributes}
+
+    @property
+    def attributes(self) -> List[str]:
+        return list(self._values)
+
+    def add_attribute(self, attribute: str, records: Dict[str, Dict[str, Any]]):
+        """
+        Starts indexing an attribute, indexing the existing records.
+
+        Args:
+            attribute (str): The attribute to index.
+            records (Dict[str, Dict[str, Any]]): The records already stored, by key.
+        """
+        if attribute in self._values:
+            return
+        self._values[attribute] = {}
+        for key, record in records.items():
+            self._add_value(attribute, key, record)
+
+    def _add_value(self, attribute: str, key: str, record: Dict[str, Any]):
+        if attribute in record and (value := _hashable(record[attribute])) is not _UNHASHABLE:
+            self._values[attribute].setdefault(value, set()).add(key)
+
+    def _remove_value(self, attribute: str, key: str, record: Dict[str, Any]):
+        if attribute not in record or (value := _hashable(record[attribute])) is _UNHASHABLE:
+            return
+        keys = self._values[attribute].get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._values[attribute][value]
+
+    def update(self, key: str, old: Optional[Dict[str, Any]], new: Dict[str, Any]):
+        """
+        Re-indexes a record whose attributes changed.
+
+        Args:
+            key (str): The record's key.
+            old (Optional[Dict[str, Any]]): The previous record, or None for a new record.
+            new (Dict[str, Any]): The current record.
+        """
+        for attribute in self._values:
+            if old is not None and old.get(attribute) == new.get(attribute) and (attribute in old) == (attribute in new):
+                continue
+            if old is not None:
+                self._remove_value(attribute, key, old)
+            self._add_value(attribute, key, new)
+
+    def lookup(self, attribute: str, value: Any) -> Optional[Set[str]]:
+        """
+        Finds the keys of records whose attribute equals the value.
+
+        Args:
+            attribute (str): The attribute.
+            value (Any): The value to match.
+
+        Returns:
+            Optional[Set[str]]: The matching keys, or None if the attribute is not indexed or the value
+                is unhashable, in which case the caller has to scan.
+        """
+        values = self._values.get(attribute)
+        if values is None or (value := _hashable(value)) is _UNHASHABLE:
+            return None
+        return set(values.get(value, ()))
+
+
+class RelationshipIndex:
+    """
+    Subject, predicate and object hash indexes over a list of relationships.
+
+    Relationships are referenced by their position in the list, so the list
+    must only be appended to. Terms are compared by their string form, which
+    matches how relationships are written to the ontology.
+    """
+
+    def __init__(self):
+        self._by_term: Dict[str, Dict[str, List[int]]] = {"subject": {}, "predicate": {}, "object": {}}
+
+    def add(self, position: int, relationship: Dict[str, Any]):
+        for field, index in self._by_term.items():
+            if field in relationship:
+                index.setdefault(str(relationship[field]), []).append(position)
+
+    def find(self, subject: Optional[Any] = None, predicate: Optional[Any] = None, object: Optional[Any] = None) -> Optional[List[int]]:
+        """
+        Finds the positions of relationships matching every given term.
+
+        Args:
+            subject (Optional[Any]): The subject to match.
+            predicate (Optional[Any]): The predicate to match.
+            object (Optional[Any]): The object to match.
+
+        Returns:
+            Optional[List[int]]: The matching positions in insertion order, or None if no term was given.
+        """
+        candidates = [
+            self._by_term[field].get(str(term), [])
+            for field, term in (("subject", subject), ("predicate", predicate), ("object", object))
+            if term is not None
+        ]
+        if not candidates:
+            return None
+        candidates.sort(key=len)
+        matches = set(candidates[0]).intersection(*candidates[1:])
+        return sorted(matches)
+
+    def rebuild(self, relationships: List[Dict[str, Any]]):
+        self.__init__()
+        for position, relationship in enumerate(relationships):
+            self.add(position, relationship)
@@ -1,21 +1,44 @@
+import os
 import uuid
-from pydantic import BaseModel, Field
-from typing import Dict, Any, List
+import numpy as np
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Dict, Any, List, Optional, Set
 from uuid import UUID
+from app.core.config import settings
 from app.core.ontology_manager import OntologyManager
+from app.core.ontology_sync import OntologyWriteBehind
 from app.models.organization import Organization
 from app.services.organization_service import OrganizationService
 from app.core.stochastic_kinetic_model import StochasticKineticModel
+from app.core.kinetic_engine import KineticEngine, KineticRule
 from app.core.fnrl import FNRL
+from app.core.federated import FederatedTrainer
+from app.core.agent_view import AgentView, PerceptionScope, build_agent_view
+from app.core.world_index import AttributeIndex, RelationshipIndex, SpatialGrid
+from app.core.world_event_log import WorldEventLog
 from app.core.mdd_mas.togaf_mdd_models import EnterpriseArchitecture
 from app.core.mdd_mas.tropos_mdd_model import TroposModel
 
+# Scopes whose versions agent views depend on; see view_version()
+WORLD_SCOPE, STATE_SCOPE, OBJECTS_SCOPE, UNPLACED_SCOPE = "world", "state", "objects", "unplaced"
+
+AGENT_PROPERTIES_QUERY = """
+SELECT ?property ?value
+WHERE {
+    ?agent ?property ?value .
+}
+"""
+
 class WorldModel(BaseModel):
     id: UUID = Field(default_factory=uuid.uuid4)
     state: Dict[str, Any] = Field(default_factory=dict)
     agents: Dict[UUID, Dict[str, Any]] = Field(default_factory=dict)
     objects: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
     relationships: List[Dict[str, Any]] = Field(default_factory=list)
+    tick: int = 0
+    # The subdirectory of settings.world_event_log_dir holding this world model's history; defaults to its
+    # id, so only world models given a stable name find their history again after a restart
+    event_log_name: Optional[str] = None
     ontology_manager: OntologyManager = None
     organization_service: OrganizationService = Field(default_factory=OrganizationService)
     stochastic_kinetic_model: StochasticKineticModel = None
@@ -25,13 +48,39 @@ class WorldModel(BaseModel):
     # Tropos models
     tropos_models: Dict[UUID, TroposModel] = Field(default_factory=dict)
 
+    # Object attributes to keep hash indexes for, in addition to the spatial index on `position`
+    indexed_attributes: List[str] = Field(default_factory=list)
+    grid_cell_size: float = 10.0
+
+    # Ontology query results per agent, dropped whenever that agent's properties change
+    _ontology_info_cache: Dict[UUID, Any] = PrivateAttr(default_factory=dict)
+    _spatial_index: SpatialGrid = PrivateAttr()
+    _unplaced_objects: Set[str] = PrivateAttr(default_factory=set)
+    _attribute_index: AttributeIndex = PrivateAttr()
+    _relationship_index: RelationshipIndex = PrivateAttr(default_factory=RelationshipIndex)
+    # Ontology writes are applied in the background; see flush()
+    _ontology_sync: OntologyWriteBehind = PrivateAttr()
+    # Every mutation is recorded here when settings.world_event_log_dir is set
+    _event_log: Optional[WorldEventLog] = PrivateAttr(default=None)
+    # Observations are applied to the kinetic model in one batch per tick
+    _pending_observations: List[tuple] = PrivateAttr(default_factory=list)
+    # The mutation counter, and its value at the last change of each scope: the global state, an agent
+    # ("agent", id), a grid cell ("cell", cell), unplaced objects, or any object
+    _version: int = PrivateAttr(default=0)
+    _scope_versions: Dict[Any, int] = PrivateAttr(default_factory=dict)
+    _cell_versions: Dict[tuple, int] = PrivateAttr(default_factory=dict)
+
     class Config:
         arbitrary_types_allowed = True
         
     def __init__(self, **data):
         super().__init__(**data)
-        ontology_path = "/Users/kinglerbercy/Projects/Apps/mas-repo/mabos-standalone/app/core/ontologies/mabos.owl"
-        self.ontology_manager = OntologyManager(ontology_path)
+        # The ontology and FNRL base model load on first use; see app.core.startup
+        self.ontology_manager = OntologyManager(settings.ontology_path)
+        self._ontology_sync = OntologyWriteBehind(self.ontology_manager, settings.ontology_sync_max_batch, settings.ontology_sync_linger)
+        if settings.world_event_log_dir:
+            self._event_log = WorldEventLog(os.path.join(settings.world_event_log_dir, self.event_log_name or str(self.id)),
+                                            settings.world_snapshot_interval)
         
         # Initialize StochasticKineticModel and FNRL
         num_agents = len(self.agents)
@@ -40,77 +89,420 @@ class WorldModel(BaseModel):
         action_size = 5  # Adjust based on your action space
         
         self.agents = {}
+        self._spatial_index = SpatialGrid(self.grid_cell_size)
+        self._attribute_index = AttributeIndex(self.indexed_attributes)
+        for object_id, object_data in self.objects.items():
+            self._index_object(object_id, None, object_data)
+        self._relationship_index.rebuild(self.relationships)
         self.stochastic_kinetic_model = StochasticKineticModel(num_agents, num_states)
-        self.fnrl_model = FNRL(num_agents=1)
+        self.fnrl_model = FNRL(num_actions=action_size)
+        if settings.federated_round_interval > 0:
+            self.fnrl_model.federated = FederatedTrainer(
+                self.fnrl_model,
+                round_interval=settings.federated_round_interval,
+                min_clients=settings.federated_min_clients,
+                mu=settings.federated_mu,
+                compression=settings.federated_compression,
+                topk_ratio=settings.federated_topk_ratio,
+                max_workers=settings.federated_workers or None,
+                close_timeout=settings.federated_close_timeout,
+            )
+        if self._event_log is not None and self._event_log.has_history:
+            # Continue from the recorded history instead of writing tick 0 after it
+            self.restore()
+
+    # State, agent and object dicts are replaced rather than mutated on update,
+    # so agent views holding references to them remain consistent snapshots.
+    def _record(self, kind: str, *args):
+        # Raises ValueError rather than record a tick older than the log's last one
+        if self._event_log is not None:
+            self._event_log.append(self.tick, kind, *args)
+
+    def _touch(self, *scopes):
+        self._version += 1
+        for scope in scopes:
+            self._scope_versions[scope] = self._version
+
+    def _touch_cells(self, *cells):
+        # None stands for "no position": the object is among the unplaced ones every radius view includes
+        self._touch(OBJECTS_SCOPE)
+        for cell in cells:
+            if cell is None:
+                self._scope_versions[UNPLACED_SCOPE] = self._version
+            else:
+                self._cell_versions[cell] = self._version
+
+    def view_version(self, agent_id: UUID, scope: Optional[PerceptionScope] = None) -> int:
+        """
+        Returns a version that changes whenever the agent's view (its eager fields) may have changed.
+
+        Every mutation records the scopes it touched: the global state, one
+        agent, the grid cells an object left or entered. An agent's view
+        depends only on the state, itself, and the cells its perception
+        radius overlaps (or all objects, without a radius), so mutations
+        elsewhere leave its version unchanged. It is conservative: an update
+        in an overlapping cell but outside the radius also changes it.
+
+        Args:
+            agent_id (UUID): The agent's identifier.
+            scope (Optional[PerceptionScope]): What the agent can perceive; derived from the agent's data if omitted.
+
+        Returns:
+            int: The view's version; compare it with the one seen at the last perception.
+        """
+        versions = self._scope_versions
+        agent = self.agents.get(agent_id, {})
+        scope = scope or PerceptionScope.from_agent(agent)
+        version = max(versions.get(WORLD_SCOPE, 0), versions.get(STATE_SCOPE, 0), versions.get(("agent", agent_id), 0))
+        if scope.radius is not None and agent.get("position") is not None:
+            cell_versions = self._cell_versions
+            cells = self._spatial_index.cells_overlapping(agent["position"], scope.radius, cell_versions)
+            version = max(version, versions.get(UNPLACED_SCOPE, 0), max((cell_versions.get(cell, 0) for cell in cells), default=0))
+        else:
+            version = max(version, versions.get(OBJECTS_SCOPE, 0))
+        return version
 
     def update_state(self, updates: Dict[str, Any]):
-        self.state.update(updates)
-        for key, value in updates.items():
-            self.ontology_manager.update_property("WorldState", key, value)
+        self._record("update_state", updates)
+        self.state = {**self.state, **updates}
+        self._touch(STATE_SCOPE)
+        self._ontology_sync.update_properties("WorldState", updates)
 
     def add_agent(self, agent_id: UUID, agent_data: Dict[str, Any]):
-        self.agents[agent_id] = agent_data
-        self.ontology_manager.add_individual(f"Agent_{agent_id}", "Agent")
-        for key, value in agent_data.items():
-            self.ontology_manager.update_property(f"Agent_{agent_id}", key, value)
+        self._record("add_agent", agent_id, agent_data)
+        self.agents[agent_id] = dict(agent_data)
+        self._touch(("agent", agent_id))
+        self.stochastic_kinetic_model.add_agent(agent_id)
+        if agent_data.get('cluster') is not None:
+            self.fnrl_model.assign_cluster(agent_id, agent_data['cluster'])
+        self._ontology_info_cache.pop(agent_id, None)
+        self._ontology_sync.add_individual(f"Agent_{agent_id}", "Agent")
+        self._ontology_sync.update_properties(f"Agent_{agent_id}", agent_data)
 
     def update_agent(self, agent_id: UUID, updates: Dict[str, Any]):
         if agent_id in self.agents:
-            self.agents[agent_id].update(updates)
-            for key, value in updates.items():
-                self.ontology_manager.update_property(f"Agent_{agent_id}", key, value)
-        
-        # Update StochasticKineticModel
-        observations = [self.agents[agent_id].get('observation', [0] * self.stochastic_kinetic_model.num_states)]
-        self.update_stochastic_kinetic_model(observations)
+            # Reject a malformed observation before anything changes, so it cannot spoil the queued batch
+            if 'observation' in updates:
+                observation = self.stochastic_kinetic_model.validate_observation(updates['observation'])
+            self._record("update_agent", agent_id, updates)
+            self.agents[agent_id] = {**self.agents[agent_id], **updates}
+            self._touch(("agent", agent_id))
+            self._ontology_info_cache.pop(agent_id, None)
+            self._ontology_sync.update_properties(f"Agent_{agent_id}", updates)
+
+            # Queue the observation for the StochasticKineticModel's next batch update; the model only
+            # knows registered agents
+            if 'observation' in updates:
+                self._pending_observations.append((agent_id, observation))
         
-        # Train FNRL model
-        states = [self.agents[agent_id].get('state', [0] * self.fnrl_model.models[0].input_shape[2])]
-        actions = [self.agents[agent_id].get('action', [0] * self.fnrl_model.models[0].output_shape[1])]
-        self.train_fnrl_model(list(self.agents.keys()).index(agent_id), states, actions)
+        # Queue an FNRL training example; training runs in the background
+        if 'state' in updates and isinstance(updates.get('action'), int):
+            self.train_fnrl_model(agent_id, [updates['state']], [updates['action']])
+
+    def remove_agent(self, agent_id: UUID) -> bool:
+        if agent_id not in self.agents:
+            return False
+        self._record("remove_agent", agent_id)
+        del self.agents[agent_id]
+        self._touch(("agent", agent_id))
+        self._apply_observations()
+        self.stochastic_kinetic_model.remove_agent(agent_id)
+        self.fnrl_model.remove_agent(agent_id)
+        self._ontology_info_cache.pop(agent_id, None)
+        return True
 
     def add_object(self, object_id: str, object_data: Dict[str, Any]):
-        self.objects[object_id] = object_data
-        self.ontology_manager.add_individual(f"Object_{object_id}", "Object")
-        for key, value in object_data.items():
-            self.ontology_manager.update_property(f"Object_{object_id}", key, value)
+        self._record("add_object", object_id, object_data)
+        previous = self.objects.get(object_id)
+        self.objects[object_id] = dict(object_data)
+        self._index_object(object_id, previous, self.objects[object_id])
+        self._ontology_sync.add_individual(f"Object_{object_id}", "Object")
+        self._ontology_sync.update_properties(f"Object_{object_id}", object_data)
 
     def update_object(self, object_id: str, updates: Dict[str, Any]):
         if object_id in self.objects:
-            self.objects[object_id].update(updates)
-            for key, value in updates.items():
-                self.ontology_manager.update_property(f"Object_{object_id}", key, value)
+            self._record("update_object", object_id, updates)
+            previous = self.objects[object_id]
+            self.objects[object_id] = {**previous, **updates}
+            self._index_object(object_id, previous, self.objects[object_id])
+            self._ontology_sync.update_properties(f"Object_{object_id}", updates)
 
     def add_relationship(self, relationship: Dict[str, Any]):
+        self._record("add_relationship", relationship)
         self.relationships.append(relationship)
+        self._relationship_index.add(len(self.relationships) - 1, relationship)
         subject = relationship["subject"]
         predicate = relationship["predicate"]
         object = relationship["object"]
-        self.ontology_manager.update_property(subject, predicate, object)
-
-    def get_agent_view(self, agent_id: UUID) -> Dict[str, Any]:
-        agent_view = {
-        "state": self.state,
-        "agent": self.agents.get(agent_id, {}),
-        "visible_objects": self.objects,
-        "relationships": self.relationships,
-        "predicted_next_state": self.predict_next_state()[list(self.agents.keys()).index(agent_id)],
-        "predicted_action": self.predict_action(list(self.agents.keys()).index(agent_id), self.agents[agent_id].get('state', [0] * self.fnrl_model.models[0].input_shape[2])).tolist()
-    }
-    
-        # Query the ontology for additional information
-        agent_query = f"""
-        SELECT ?property ?value
-        WHERE {{
-            Agent_{agent_id} ?property ?value .
-        }}
-        """
-        agent_info = self.ontology_manager.query_ontology(agent_query)
-        agent_view["ontology_info"] = agent_info
-        
-        return agent_view
+        self._touch_related(str(subject), str(object))
+        self._ontology_sync.update_property(subject, predicate, object)
+        if str(subject).startswith("Agent_"):
+            self._ontology_info_cache.clear()
+
+    def _touch_related(self, *terms: str):
+        # A relationship shows up in the views of the agents and objects it names
+        for term in terms:
+            if term in self.objects:
+                self._touch_cells(self._spatial_index.cell_of(term))
+            try:
+                agent_id = UUID(term[len("Agent_"):] if term.startswith("Agent_") else term)
+            except ValueError:
+                continue
+            if agent_id in self.agents:
+                self._touch(("agent", agent_id))
+
+    def _index_object(self, object_id: str, previous: Optional[Dict[str, Any]], object_data: Dict[str, Any]):
+        previous_cell = self._spatial_index.cell_of(object_id)
+        self._update_object_indexes(object_id, previous, object_data)
+        self._touch_cells(previous_cell, self._spatial_index.cell_of(object_id))
+
+    def _update_object_indexes(self, object_id: str, previous: Optional[Dict[str, Any]], object_data: Dict[str, Any]):
+        position = object_data.get("position")
+        if previous is None or previous.get("position") != position:
+            self._spatial_index.remove(object_id)
+            self._unplaced_objects.discard(object_id)
+            try:
+                self._spatial_index.insert(object_id, position)
+            except TypeError:  # No position, or not a coordinate sequence
+                self._unplaced_objects.add(object_id)
+        self._attribute_index.update(object_id, previous, object_data)
+
+    def index_attribute(self, attribute: str):
+        """
+        Starts keeping a hash index on an object attribute, so `find_objects` can use it.
+
+        Args:
+            attribute (str): The object attribute to index.
+        """
+        if attribute not in self.indexed_attributes:
+            self.indexed_attributes.append(attribute)
+        self._attribute_index.add_attribute(attribute, self.objects)
+
+    def objects_near(self, position: List[float], radius: float) -> Dict[str, Dict[str, Any]]:
+        """
+        Finds objects whose position lies within a radius of a point.
+
+        Args:
+            position (List[float]): The query point.
+            radius (float): The maximum distance, inclusive.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The matching objects, by id.
+        """
+        return {object_id: self.objects[object_id] for object_id in self._spatial_index.within(position, radius)}
+
+    def find_objects(self, **attributes: Any) -> Dict[str, Dict[str, Any]]:
+        """
+        Finds objects whose attributes equal all the given values.
+
+        Indexed attributes are answered from their index; any others are
+        checked against the objects matched by the indexed ones, or by a scan
+        if none of the attributes are indexed.
+
+        Args:
+            **attributes: The attribute values to match.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The matching objects, by id.
+        """
+        candidates: Optional[Set[str]] = None
+        unindexed = {}
+        for attribute, value in attributes.items():
+            matches = self._attribute_index.lookup(attribute, value)
+            if matches is None:
+                unindexed[attribute] = value
+            else:
+                candidates = matches if candidates is None else candidates & matches
+        object_ids = self.objects.keys() if candidates is None else candidates
+        return {
+            object_id: self.objects[object_id] for object_id in object_ids
+            if all(attribute in self.objects[object_id] and self.objects[object_id][attribute] == value
+                   for attribute, value in unindexed.items())
+        }
+
+    def find_relationships(self, subject: Optional[Any] = None, predicate: Optional[Any] = None, object: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Finds relationships matching every given subject, predicate and object.
+
+        Args:
+            subject (Optional[Any]): The subject to match.
+            predicate (Optional[Any]): The predicate to match.
+            object (Optional[Any]): The object to match.
+
+        Returns:
+            List[Dict[str, Any]]: The matching relationships in insertion order; all of them if no term is given.
+        """
+        positions = self._relationship_index.find(subject, predicate, object)
+        if positions is None:
+            return list(self.relationships)
+        return [self.relationships[position] for position in positions]
+
+    def get_agent_view(self, agent_id: UUID, scope: Optional[PerceptionScope] = None) -> AgentView:
+        """
+        Returns a read-only view of the world as seen by one agent.
+
+        Only objects within the agent's perception scope, and relationships
+        touching the agent or those objects, are included. Nothing is copied;
+        predictions and ontology info are computed only if read. The view's
+        version pairs this world model's id with `view_version`.
+
+        Args:
+            agent_id (UUID): The agent's identifier.
+            scope (Optional[PerceptionScope]): What the agent can perceive; derived from
+                the agent's `perception_radius`, `role(s)` and `topics` if omitted.
+
+        Returns:
+            AgentView: The agent's view of the world.
+        """
+        agent = self.agents.get(agent_id, {})
+        scope = scope or PerceptionScope.from_agent(agent)
+        objects = self.objects
+        if scope.radius is not None and agent.get("position") is not None:
+            objects = self.objects_near(agent["position"], scope.radius)
+            objects.update((object_id, self.objects[object_id]) for object_id in self._unplaced_objects)
+        relationship_ids = {str(agent_id), f"Agent_{agent_id}", *objects}
+        positions = set()
+        for term in relationship_ids:
+            positions.update(self._relationship_index.find(subject=term))
+            positions.update(self._relationship_index.find(object=term))
+        relationships = [self.relationships[position] for position in sorted(positions)]
+        return build_agent_view(
+            agent_id, agent, self.state, objects, relationships, scope,
+            lazy={
+                "predicted_next_state": lambda: self.predict_agent_state(agent_id),
+                "predicted_action": lambda: self.predict_action(agent_id, agent.get('state', '')).tolist(),
+                "ontology_info": lambda: self._get_agent_ontology_info(agent_id),
+            },
+            version=(self.id, self.view_version(agent_id, scope)),
+        )
+
+    def _get_agent_ontology_info(self, agent_id: UUID) -> Any:
+        if agent_id not in self._ontology_info_cache:
+            # Query the ontology for additional information
+            self.flush()
+            self._ontology_info_cache[agent_id] = self.ontology_manager.query_ontology(
+                AGENT_PROPERTIES_QUERY, {"agent": self.ontology_manager.individual_iri(f"Agent_{agent_id}")})
+        return self._ontology_info_cache[agent_id]
+
+    def advance_tick(self) -> int:
+        """
+        Ends the current tick, snapshotting the world when the snapshot interval is reached.
+
+        Returns:
+            int: The new tick.
+        """
+        self._apply_observations()
+        self.stochastic_kinetic_model.invalidate()
+        self.tick += 1
+        if self.fnrl_model.federated is not None:
+            self.fnrl_model.federated.maybe_run_round(self.tick)
+        if self._event_log is not None:
+            self._event_log.flush()
+            if self._event_log.should_snapshot(self.tick):
+                self._event_log.snapshot(self._world_dict())
+        return self.tick
+
+    def _world_dict(self) -> Dict[str, Any]:
+        return {"tick": self.tick, "state": self.state, "agents": self.agents, "objects": self.objects, "relationships": self.relationships}
+
+    def world_at(self, tick: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Rebuilds the world as it was at the end of a past tick from the event log.
+
+        Args:
+            tick (Optional[int]): The tick to rebuild; defaults to the latest recorded tick.
+
+        Returns:
+            Dict[str, Any]: The "tick", "state", "agents", "objects" and "relationships" at that tick.
+        """
+        if self._event_log is None:
+            raise RuntimeError("World event log is disabled; set world_event_log_dir to enable history")
+        return self._event_log.world_at(tick)
+
+    def get_agent_view_at(self, agent_id: UUID, tick: int, scope: Optional[PerceptionScope] = None) -> AgentView:
+        """
+        Returns what an agent saw at the end of a past tick.
+
+        Predictions and ontology info are not recorded, so the view only has
+        the state, agent, visible objects and relationships.
+
+        Args:
+            agent_id (UUID): The agent's identifier.
+            tick (int): The tick to look at.
+            scope (Optional[PerceptionScope]): What the agent can perceive; derived from the agent's data if omitted.
+
+        Returns:
+            AgentView: The agent's view at that tick.
+        """
+        world = self.world_at(tick)
+        agent = world["agents"].get(agent_id, {})
+        return build_agent_view(agent_id, agent, world["state"], world["objects"], world["relationships"],
+                                scope or PerceptionScope.from_agent(agent), lazy={})
+
+    def restore(self, tick: Optional[int] = None):
+        """
+        Warm-starts the world from the event log instead of re-running the simulation.
+
+        Loads the latest snapshot at or before the tick, replays the events after it,
+        rebuilds the indexes and queues the restored entities for the ontology.
+        Runs automatically when the world model opens a log with history. After
+        restoring a tick older than the log's last one, recording new mutations
+        raises ValueError, since the log cannot hold two histories.
+
+        Args:
+            tick (Optional[int]): The tick to restore; defaults to the latest recorded tick.
+        """
+        world = self.world_at(tick)
+        self._touch(WORLD_SCOPE)
+        self.tick = world["tick"]
+        self.state = world["state"]
+        self.agents = world["agents"]
+        self.objects = world["objects"]
+        self.relationships = world["relationships"]
+        self._ontology_info_cache.clear()
+        self._spatial_index = SpatialGrid(self.grid_cell_size)
+        self._unplaced_objects = set()
+        self._attribute_index = AttributeIndex(self.indexed_attributes)
+        for object_id, object_data in self.objects.items():
+            self._index_object(object_id, None, object_data)
+        self._relationship_index.rebuild(self.relationships)
+        self._pending_observations = []
+        self.stochastic_kinetic_model = StochasticKineticModel(0, self.stochastic_kinetic_model.num_states, self.stochastic_kinetic_model.engine)
+        for agent_id in self.agents:
+            self.stochastic_kinetic_model.add_agent(agent_id)
+        self._ontology_sync.update_properties("WorldState", self.state)
+        for agent_id, agent_data in self.agents.items():
+            self._ontology_sync.add_individual(f"Agent_{agent_id}", "Agent")
+            self._ontology_sync.update_properties(f"Agent_{agent_id}", agent_data)
+        for object_id, object_data in self.objects.items():
+            self._ontology_sync.add_individual(f"Object_{object_id}", "Object")
+            self._ontology_sync.update_properties(f"Object_{object_id}", object_data)
+        for relationship in self.relationships:
+            self._ontology_sync.update_property(relationship["subject"], relationship["predicate"], relationship["object"])
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all world updates made so far are written to the ontology.
+
+        Args:
+            timeout (Optional[float]): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the ontology is up to date, False on timeout.
+        """
+        return self._ontology_sync.flush(timeout)
+
+    def close(self):
+        self._ontology_sync.close()
+        try:
+            if self.fnrl_model.federated is not None:
+                self.fnrl_model.federated.close()
+        finally:
+            if self._event_log is not None:
+                self._event_log.close()
 
     def query_world_knowledge(self, query: str) -> List[Any]:
+        self.flush()
         return self.ontology_manager.query_ontology(query)
         
     def create_organization(self, organization_data: Dict[str, Any]) -> Organization:
@@ -134,17 +526,83 @@ class WorldModel(BaseModel):
         agents = self.organization_service.get_agents_with_role(organization_name, role)
         return [self.agents[agent.id] for agent in agents]
     
-    def update_stochastic_kinetic_model(self, observations):
-        self.stochastic_kinetic_model.update(observations)
+    def update_stochastic_kinetic_model(self, observations, agent_ids: Optional[List[UUID]] = None):
+        self._apply_observations()
+        self.stochastic_kinetic_model.update(observations, agent_ids)
+
+    def _apply_observations(self):
+        if self._pending_observations:
+            agent_ids, observations = zip(*self._pending_observations)
+            self._pending_observations = []
+            self.stochastic_kinetic_model.update(observations, agent_ids)
 
-    def predict_next_state(self):
-        return self.stochastic_kinetic_model.predict_next_state()
+    def _check_agents(self, agent_ids):
+        for agent_id in agent_ids:
+            if agent_id not in self.agents:
+                raise KeyError(f"Unknown agent: {agent_id}")
+
+    def predict_next_state(self, agent_ids: Optional[List[UUID]] = None):
+        if agent_ids is not None:
+            self._check_agents(agent_ids)
+        self._apply_observations()
+        return self.stochastic_kinetic_model.predict_next_state(agent_ids)
+
+    def predict_agent_state(self, agent_id: UUID) -> int:
+        self._check_agents([agent_id])
+        self._apply_observations()
+        return self.stochastic_kinetic_model.predict_agent_state(agent_id)
+
+    def set_kinetic_rules(self, rules: List[KineticRule]):
+        """
+        Declares the transition dynamics between agent states used for predictions and forecasts.
+
+        Args:
+            rules (List[KineticRule]): The transitions between states.
+        """
+        self.stochastic_kinetic_model.engine = KineticEngine(self.stochastic_kinetic_model.num_states, rules)
+
+    def forecast_population(self, t_end: float, method: str = "tau_leap", dt: float = 1.0, replicates: int = 100,
+                            seed: Optional[int] = None):
+        """
+        Forecasts how many agents will be in each state over time.
+
+        The simulation starts from each agent's most likely current state.
+
+        Args:
+            t_end (float): The forecast horizon.
+            method (str): "gillespie", "tau_leap" or "mean_field".
+            dt (float): The step or sampling interval.
+            replicates (int): The number of stochastic runs averaged.
+            seed (Optional[int]): The random seed.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The times, and mean counts per state at each time.
+        """
+        engine = self.stochastic_kinetic_model.engine
+        if engine is None:
+            raise ValueError("No kinetic rules declared; call set_kinetic_rules first")
+        self._apply_observations()
+        current_states = np.argmax(self.stochastic_kinetic_model.log_probabilities, axis=1)
+        return engine.forecast(np.bincount(current_states, minlength=engine.num_states), t_end, method, dt, replicates, seed)
 
     def train_fnrl_model(self, agent_id, states, actions):
         self.fnrl_model.train(agent_id, states, actions)
 
     def predict_action(self, agent_id, state):
         return self.fnrl_model.predict(agent_id, state)
+
+    def predict_actions(self, agent_ids: Optional[List[UUID]] = None):
+        """
+        Predicts action probabilities for many agents in one batched inference.
+
+        Args:
+            agent_ids (Optional[List[UUID]]): The agents; all agents if None.
+
+        Returns:
+            np.ndarray: One row of action probabilities per agent.
+        """
+        agent_ids = list(self.agents) if agent_ids is None else agent_ids
+        return self.fnrl_model.predict_batch(agent_ids, [self.agents[agent_id].get('state', '') for agent_id in agent_ids])
     
     def add_enterprise_architecture(self, ea: EnterpriseArchitecture):
         self.enterprise_architectures[ea.id] = ea
@@ -1,18 +1,37 @@
-from functools import lru_cache
+import threading
+from typing import Optional
+from .startup import startup_registry
 from .world_model import WorldModel
 
-@lru_cache(maxsize=None)
+# The process-wide world model; the lock makes concurrent first calls (e.g. the warm-up
+# thread and a request) build only one
+_world_model: Optional[WorldModel] = None
+_world_model_lock = threading.Lock()
+
 def get_world_model() -> WorldModel:
     """
-    Returns a singleton instance of WorldModel.
-    
-    The @lru_cache decorator with maxsize=None ensures that this function
-    is only called once, and the same WorldModel instance is returned
-    for subsequent calls.
+    Returns the singleton instance of WorldModel, building it on first use.
     """
-    return WorldModel(
-        # You can add any initial configuration here
-        # For example:
-        # initial_state={'time': 0},
-        # ontology_path='path/to/your/ontology.owl'
-    )
\ No newline at end of file
+    global _world_model
+    if _world_model is not None:
+        return _world_model
+    with _world_model_lock:
+        if _world_model is None:
+            with startup_registry.track("world_model"):
+                _world_model = WorldModel(
+                    # A stable name, so the shared world model resumes its recorded history after a restart
+                    event_log_name="default",
+                    # You can add any initial configuration here
+                    # For example:
+                    # initial_state={'time': 0},
+                    # ontology_path='path/to/your/ontology.owl'
+                )
+        return _world_model
+
+def close_world_model():
+    """Closes the world model if it was built, e.g. at application shutdown; the next call builds a new one."""
+    global _world_model
+    with _world_model_lock:
+        world_model, _world_model = _world_model, None
+    if world_model is not None:
+        world_model.close()
@@ -1,10 +1,12 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Set
 from uuid import UUID
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, field_validator
 from durable.lang import post 
+from app.core.agent_view import AgentView, to_plain
 #from app.core.world_model import WorldModel# Import post from durable_rules
 
 from .belief import Belief
+from .belief_store import BeliefStore
 from .desire import Desire
 from .intention import Intention
 from .action import Action
@@ -20,19 +22,31 @@ class Agent(BaseModel):
     Attributes:
         agent_id (str): The unique identifier of the agent.
         name (str): The name of the agent.
-        beliefs (List[Belief]): The agent's current beliefs about the world.
+        beliefs (BeliefStore): The agent's current beliefs about the world, keyed by description.
         desires (List[Desire]): The agent's current desires.
         intentions (List[Intention]): The agent's current intentions.
         available_actions (List[Action]): Actions available to the agent.
         roles (List[Role]): Roles assigned to the agent.
+        current_state (Dict[str, Any]): The most recent observations perceived by the agent.
+
+    The agent tracks which of its beliefs, desires, intentions and actions changed
+    since its last cycle, so `run_cycle` only re-runs the stages whose inputs changed.
+    Code that mutates those objects in place should call `notify_changed`.
     """
     agent_id: str = Field(..., description="The unique identifier of the agent")
     name: str = Field(..., description="The name of the agent")
-    beliefs: List[Belief] = Field(default_factory=list, description="The agent's current beliefs about the world")
+    beliefs: BeliefStore = Field(default_factory=BeliefStore, description="The agent's current beliefs about the world")
     desires: List[Desire] = Field(default_factory=list, description="The agent's current desires")
     intentions: List[Intention] = Field(default_factory=list, description="The agent's current intentions")
     available_actions: List[Action] = Field(default_factory=list, description="Actions available to the agent")
     roles: List[AgentRole] = Field(default_factory=list, description="Roles assigned to the agent")
+    current_state: Dict[str, Any] = Field(default_factory=dict, description="The most recent observations perceived by the agent")
+
+    _changed_beliefs: Set[str] = PrivateAttr(default_factory=set)
+    _desires_changed: bool = PrivateAttr(default=True)
+    _intentions_changed: bool = PrivateAttr(default=True)
+    _plan_dependencies: Optional[Set[str]] = PrivateAttr(default=None)
+    _perceived_version: Any = PrivateAttr(default=None)
 
     @field_validator('agent_type', check_fields=False)
     def validate_agent_type(cls, value):
@@ -59,6 +73,77 @@ class Agent(BaseModel):
         """
         self.roles.remove(role)
 
+    def notify_changed(self, beliefs: Iterable[str] = (), desires: bool = False, intentions: bool = False, actions: bool = False):
+        """
+        Record changes to the agent's mental state that subsequent cycles depend on.
+
+        Args:
+            beliefs (Iterable[str]): Descriptions of beliefs that were added, removed or updated.
+            desires (bool): Whether any desire was added, removed or updated.
+            intentions (bool): Whether any intention or its actions changed.
+            actions (bool): Whether the available actions changed.
+        """
+        self._changed_beliefs.update(beliefs)
+        self._desires_changed = self._desires_changed or desires
+        self._intentions_changed = self._intentions_changed or intentions
+        if actions:
+            self._plan_dependencies = None
+            self._intentions_changed = True
+
+    def has_pending_changes(self) -> bool:
+        """
+        Check whether any input of the agent's cycle changed since it last ran.
+
+        Returns:
+            bool: True if `run_cycle` has work to do, False otherwise.
+        """
+        return bool(self._changed_beliefs) or self._desires_changed or self._intentions_changed
+
+    def deliberation_dependencies(self) -> Optional[Set[str]]:
+        """
+        Belief descriptions that deliberation reads, or None if it depends on every belief.
+
+        Returns:
+            Optional[Set[str]]: The belief descriptions deliberation subscribes to.
+        """
+        return set()
+
+    def planning_dependencies(self) -> Optional[Set[str]]:
+        """
+        Belief descriptions that planning and execution read, or None if they depend on every belief.
+
+        Returns:
+            Optional[Set[str]]: The belief descriptions planning subscribes to.
+        """
+        if self._plan_dependencies is None:
+            self._plan_dependencies = {
+                key for action in self.available_actions for key in (*action.preconditions, *action.effects)
+            }
+        return self._plan_dependencies
+
+    def run_cycle(self) -> List[Dict[str, Any]]:
+        """
+        Run the deliberate, plan and execute stages whose inputs changed since the last cycle.
+
+        Returns:
+            List[Dict[str, Any]]: The actions produced by execution, if it ran.
+        """
+        def affected(dependencies: Optional[Set[str]], changed: Set[str]) -> bool:
+            return bool(changed) and (dependencies is None or not dependencies.isdisjoint(changed))
+
+        changed_beliefs, self._changed_beliefs = self._changed_beliefs, set()
+        desires_changed, self._desires_changed = self._desires_changed, False
+
+        if desires_changed or affected(self.deliberation_dependencies(), changed_beliefs):
+            self.deliberate()
+
+        intentions_changed, self._intentions_changed = self._intentions_changed, False
+        if not intentions_changed and not affected(self.planning_dependencies(), changed_beliefs):
+            return []
+        self.plan()
+        # Beliefs set during execution are picked up by the next cycle
+        return self.execute() or []
+
     def post_fact(self, fact: Dict[str, Any]):
         """
         Post a fact to the rules engine.
@@ -84,7 +169,8 @@ class Agent(BaseModel):
         Args:
             belief (Belief): The belief to add.
         """
-        self.beliefs.append(belief)
+        if self.beliefs.upsert(belief):
+            self.notify_changed(beliefs=[belief.description])
 
     def remove_belief(self, belief: Belief):
         """
@@ -93,7 +179,8 @@ class Agent(BaseModel):
         Args:
             belief (Belief): The belief to remove.
         """
-        self.beliefs.remove(belief)
+        if self.beliefs.discard(belief.description):
+            self.notify_changed(beliefs=[belief.description])
 
     def add_desire(self, desire: Desire):
         """
@@ -103,6 +190,7 @@ class Agent(BaseModel):
             desire (Desire): The desire to add.
         """
         self.desires.append(desire)
+        self.notify_changed(desires=True)
 
     def remove_desire(self, desire: Desire):
         """
@@ -112,6 +200,7 @@ class Agent(BaseModel):
             desire (Desire): The desire to remove.
         """
         self.desires.remove(desire)
+        self.notify_changed(desires=True)
 
     def add_intention(self, intention: Intention):
         """
@@ -121,6 +210,7 @@ class Agent(BaseModel):
             intention (Intention): The intention to add.
         """
         self.intentions.append(intention)
+        self.notify_changed(intentions=True)
 
     def remove_intention(self, intention: Intention):
         """
@@ -130,6 +220,7 @@ class Agent(BaseModel):
             intention (Intention): The intention to remove.
         """
         self.intentions.remove(intention)
+        self.notify_changed(intentions=True)
 
     def add_action(self, action: Action):
         """
@@ -139,6 +230,7 @@ class Agent(BaseModel):
             action (Action): The action to add.
         """
         self.available_actions.append(action)
+        self.notify_changed(actions=True)
 
     def remove_action(self, action: Action):
         """
@@ -148,6 +240,7 @@ class Agent(BaseModel):
             action (Action): The action to remove.
         """
         self.available_actions.remove(action)
+        self.notify_changed(actions=True)
 
     def deliberate(self):
         """
@@ -172,13 +265,13 @@ class Agent(BaseModel):
             if intention.status == "active":
                 if applicable_actions := [
                     action for action in self.available_actions 
-                    if action.is_applicable(lambda key: next((b.certainty for b in self.beliefs if b.description == key), None))
+                    if action.is_applicable(self.beliefs.certainty)
                 ]:
                     # Select the first applicable action for now
                     selected_action = applicable_actions[0]
                     
                     # Check if the selected action achieves the intention's goal
-                    if selected_action.is_completed(lambda key: next((b.certainty for b in self.beliefs if b.description == key), None)):
+                    if selected_action.is_completed(self.beliefs.certainty):
                         intention.complete_intention()
                     else:
                         # Add the selected action to the intention's action list
@@ -194,10 +287,74 @@ class Agent(BaseModel):
         for intention in self.intentions:
             for action in intention.actions:
                 action.execute(
-                    get_belief=lambda key: next((b.certainty for b in self.beliefs if b.description == key), None),
-                    set_belief=lambda key, value: self.add_belief(Belief(description=key, certainty=value))
+                    get_belief=self.beliefs.certainty,
+                    set_belief=self._set_belief_certainty
                 )
 
+    def _set_belief_certainty(self, key: str, certainty: float):
+        """
+        Set the certainty of a belief, creating it if needed; unchanged values are not reported as changes.
+
+        Args:
+            key (str): The belief description.
+            certainty (float): The new certainty.
+        """
+        if self.beliefs.update_certainty(key, certainty, source="action"):
+            self.notify_changed(beliefs=[key])
+
+    def _requested_action(self, request: Any) -> Optional[Action]:
+        # A request names an available action by id or description, directly or as {"action": name}
+        name = request.get("action") if isinstance(request, dict) else request
+        return next((action for action in self.available_actions if name in (action.action_id, action.description)), None)
+
+    def can_handle_request(self, request: Any) -> bool:
+        """
+        Check whether the agent can perform a requested action now.
+
+        Args:
+            request (Any): The action's id or description, or a dict naming it under "action".
+
+        Returns:
+            bool: True if the action is available and its preconditions hold.
+        """
+        action = self._requested_action(request)
+        return action is not None and action.is_applicable(self.beliefs.certainty)
+
+    async def propose(self, task: Any) -> Dict[str, Any]:
+        """
+        Bid on a task in a contract net.
+
+        Args:
+            task (Any): The task, named as for `can_handle_request`.
+
+        Returns:
+            Dict[str, Any]: The bidding agent, the action it would perform, and its cost: the number of
+            the action's effects that do not hold yet.
+        """
+        action = self._requested_action(task)
+        if action is None:
+            raise ValueError(f"Agent {self.agent_id} cannot perform the task: {task}")
+        cost = sum(self.beliefs.certainty(key) != value for key, value in action.effects.items())
+        return {"agent_id": self.agent_id, "action": action.action_id, "cost": cost}
+
+    async def execute_request(self, request: Any) -> Dict[str, Any]:
+        """
+        Perform a requested action, applying its effects to the agent's beliefs.
+
+        Args:
+            request (Any): The action, named as for `can_handle_request`.
+
+        Returns:
+            Dict[str, Any]: The action performed and its effects.
+
+        Raises:
+            ValueError: If the action is unavailable or its preconditions do not hold.
+        """
+        action = self._requested_action(request)
+        if action is None or not action.execute(get_belief=self.beliefs.certainty, set_belief=self._set_belief_certainty):
+            raise ValueError(f"Agent {self.agent_id} cannot perform the request: {request}")
+        return {"action": action.action_id, "effects": dict(action.effects)}
+
     def revise_beliefs(self, new_belief: Belief):
         """
         Revise beliefs based on new information.
@@ -205,10 +362,7 @@ class Agent(BaseModel):
         Args:
             new_belief (Belief): The new belief to revise with.
         """
-        if existing_belief := next((b for b in self.beliefs if b.description == new_belief.description), None):
-            existing_belief.update(new_belief)
-        else:
-            self.add_belief(new_belief)
+        self.add_belief(new_belief)
 
     def select_desires(self):
         """
@@ -278,6 +432,7 @@ class Agent(BaseModel):
         """
         self.intentions.remove(intention)
         self.plans = [p for p in self.plans if p.goal_id != intention.goal.id]
+        self.notify_changed(intentions=True)
 
     def update_intention_status(self, intention: Intention, new_status: str):
         """
@@ -288,17 +443,40 @@ class Agent(BaseModel):
             new_status (str): The new status to set.
         """
         intention.update_status(new_status)
+        self.notify_changed(intentions=True)
 
 
     def perceive(self, observations):
         """
         Perceive the environment and update the agent's beliefs.
 
+        Only observations whose value differs from the previous perception
+        are turned into belief updates. An AgentView contributes only its eager
+        fields, so its lazy predictions and ontology info are not computed here.
+        A view with the same version as the last one perceived is skipped; the
+        fields of any other are compared through its proxies, and only changed
+        fields are copied into `current_state`.
+
         Args:
             observations: The observations from the environment.
         """
-        self.current_state = observations
-        self.update_beliefs(self.current_state)
+        if isinstance(observations, AgentView):
+            if observations.version is not None and observations.version == self._perceived_version:
+                return
+            self._perceived_version = observations.version
+            items = observations.eager_items()
+        else:
+            self._perceived_version = None
+            items = observations.items()
+        current_state, delta = {}, {}
+        for key, value in items:
+            if key in self.current_state and self.current_state[key] == value:
+                current_state[key] = self.current_state[key]
+            else:
+                current_state[key] = delta[key] = to_plain(value)
+        self.current_state = current_state
+        if delta:
+            self.update_beliefs(delta)
 
     def update_beliefs(self, current_state):
         """
@@ -307,12 +485,8 @@ class Agent(BaseModel):
         Args:
             current_state: The current state of the agent.
         """
-        for key, value in current_state.items():
-            belief = next((b for b in self.beliefs if b.name == key), None)
-            if belief:
-                belief.value = value
-            else:
-                self.beliefs.append(Belief(name=key, value=value))
+        changed = [key for key, value in current_state.items() if self.beliefs.update_value(key, value, source="perception")]
+        self.notify_changed(beliefs=changed)
 
     def decide(self):
         """
@@ -402,9 +576,9 @@ class EnvironmentalAgent(Agent):
             for intention in self.intentions:
                 if intention.status == "active" and intention.goal in role.responsibilities:
                     for action in intention.actions:
-                        if action.is_applicable(lambda key: next((b.certainty for b in self.beliefs if b.description == key), None)):
+                        if action.is_applicable(self.beliefs.certainty):
                             action.execute(
-                                get_belief=lambda key: next((b.certainty for b in self.beliefs if b.description == key), None),
+                                get_belief=self.beliefs.certainty,
                                 set_belief=lambda key, value: self.revise_beliefs(Belief(description=key, certainty=value))
                             )
                             break
@@ -433,6 +607,7 @@ class ProactiveAgent(Agent):
         """
         self.goals.append(goal)
         self.goals.sort(key=lambda g: g.priority, reverse=True)
+        self.notify_changed(desires=True)
 
     def remove_goal(self, goal: Goal):
         """
@@ -442,6 +617,14 @@ class ProactiveAgent(Agent):
             goal (Goal): The goal to remove.
         """
         self.goals.remove(goal)
+        self.notify_changed(desires=True)
+
+    def deliberation_dependencies(self) -> Optional[Set[str]]:
+        # Goal achievability is evaluated against the full belief set
+        return None
+
+    def planning_dependencies(self) -> Optional[Set[str]]:
+        return None
 
     def deliberate(self):
         """
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional
 from pydantic import BaseModel, Field
 
 class Belief(BaseModel):
@@ -9,10 +9,12 @@ class Belief(BaseModel):
         description (str): Description of the belief.
         certainty (float): Certainty level of the belief (0-1).
         value (Any): The value associated with the belief.
+        source (Optional[str]): Where the belief came from (e.g. perception, message, inference).
     """
     description: str = Field(..., description="Description of the belief")
     certainty: float = Field(..., ge=0, le=1, description="Certainty level of the belief (0-1)")
     value: Any = Field(..., description="The value associated with the belief")
+    source: Optional[str] = Field(default=None, description="Where the belief came from (e.g. perception, message, inference)")
     
     def update_certainty(self, new_certainty: float):
         """
@@ -0,0 +1,217 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from pydantic import GetCoreSchemaHandler
+from pydantic_core import core_schema
+from .belief import Belief
+
+CERTAINTY_BANDS = 10
+
+
+def certainty_band(certainty: float) -> int:
+    """
+    Maps a certainty in [0, 1] to one of `CERTAINTY_BANDS` equal-width bands.
+
+    Args:
+        certainty (float): The certainty level.
+
+    Returns:
+        int: The band index, 0 for the lowest band.
+    """
+    return min(int(certainty * CERTAINTY_BANDS), CERTAINTY_BANDS - 1)
+
+
+class BeliefStore:
+    """
+    Keyed store of an agent's beliefs.
+
+    Beliefs are keyed by description, so lookups are O(1) and adding a belief
+    with an existing description updates it instead of appending a duplicate.
+    Secondary indexes group belief descriptions by certainty band and by source.
+
+    The store iterates like the list it replaces, so code that loops over
+    `agent.beliefs` keeps working. Beliefs mutated in place must be written
+    back through `upsert`, `update_certainty` or `update_value` so the indexes
+    stay in sync. In pydantic models the store validates from, serializes to
+    and has the JSON schema of a list of beliefs.
+    """
+
+    __slots__ = ("_beliefs", "_by_band", "_by_source", "_indexed")
+
+    def __init__(self, beliefs: Iterable[Belief] = ()):
+        self._beliefs: Dict[str, Belief] = {}
+        self._by_band: List[Set[str]] = [set() for _ in range(CERTAINTY_BANDS)]
+        self._by_source: Dict[Optional[str], Set[str]] = {}
+        # The band and source each belief is indexed under, which go stale if the belief is mutated in place
+        self._indexed: Dict[str, Tuple[int, Optional[str]]] = {}
+        for belief in beliefs:
+            self.upsert(belief)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        belief_list = handler.generate_schema(List[Belief])
+        from_list = core_schema.no_info_after_validator_function(cls, belief_list)
+        return core_schema.json_or_python_schema(
+            json_schema=from_list,
+            python_schema=core_schema.union_schema([core_schema.is_instance_schema(cls), from_list]),
+            serialization=core_schema.plain_serializer_function_ser_schema(list, return_schema=belief_list),
+        )
+
+    def _index(self, belief: Belief):
+        band = certainty_band(belief.certainty)
+        self._indexed[belief.description] = (band, belief.source)
+        self._by_band[band].add(belief.description)
+        self._by_source.setdefault(belief.source, set()).add(belief.description)
+
+    def _unindex(self, description: str):
+        band, source = self._indexed.pop(description)
+        self._by_band[band].discard(description)
+        descriptions = self._by_source.get(source)
+        if descriptions is not None:
+            descriptions.discard(description)
+            if not descriptions:
+                del self._by_source[source]
+
+    def upsert(self, belief: Belief) -> bool:
+        """
+        Adds a belief, replacing any belief with the same description.
+
+        Upserting a stored belief that was mutated in place re-indexes it.
+
+        Args:
+            belief (Belief): The belief to store.
+
+        Returns:
+            bool: True if the store changed or the belief is the stored one, False if an
+                identical but distinct belief was already stored.
+        """
+        existing = self._beliefs.get(belief.description)
+        if existing is not None:
+            if existing is not belief and (existing.certainty == belief.certainty and existing.value == belief.value and existing.source == belief.source):
+                return False
+            self._unindex(belief.description)
+        self._beliefs[belief.description] = belief
+        self._index(belief)
+        return True
+
+    def append(self, belief: Belief):
+        self.upsert(belief)
+
+    def remove(self, belief: Belief):
+        self.discard(belief.description)
+
+    def discard(self, description: str) -> bool:
+        """
+        Removes the belief with the given description, if present.
+
+        Args:
+            description (str): The belief description.
+
+        Returns:
+            bool: True if a belief was removed, False otherwise.
+        """
+        if self._beliefs.pop(description, None) is None:
+            return False
+        self._unindex(description)
+        return True
+
+    def get_belief(self, description: str) -> Optional[Belief]:
+        return self._beliefs.get(description)
+
+    def get(self, description: str, default: Any = None) -> Any:
+        """
+        Returns the value of the belief with the given description.
+
+        Args:
+            description (str): The belief description.
+            default (Any): Returned when no such belief exists.
+
+        Returns:
+            Any: The belief's value, or the default.
+        """
+        belief = self._beliefs.get(description)
+        return default if belief is None else belief.value
+
+    def certainty(self, description: str) -> Optional[float]:
+        belief = self._beliefs.get(description)
+        return None if belief is None else belief.certainty
+
+    def update_certainty(self, description: str, certainty: float, source: Optional[str] = None) -> bool:
+        """
+        Sets a belief's certainty, creating the belief if needed.
+
+        Args:
+            description (str): The belief description.
+            certainty (float): The new certainty level (0-1).
+            source (Optional[str]): The source recorded on a newly created belief.
+
+        Returns:
+            bool: True if the store changed, False otherwise.
+        """
+        belief = self._beliefs.get(description)
+        if belief is None:
+            return self.upsert(Belief(description=description, certainty=certainty, value=certainty, source=source))
+        if belief.certainty == certainty:
+            return False
+        self._unindex(description)
+        belief.update_certainty(certainty)
+        self._index(belief)
+        return True
+
+    def update_value(self, description: str, value: Any, certainty: float = 1.0, source: Optional[str] = None) -> bool:
+        """
+        Sets a belief's value, creating the belief with the given certainty if needed.
+
+        Args:
+            description (str): The belief description.
+            value (Any): The new value.
+            certainty (float): The certainty of a newly created belief.
+            source (Optional[str]): The source recorded on a newly created belief.
+
+        Returns:
+            bool: True if the store changed, False otherwise.
+        """
+        belief = self._beliefs.get(description)
+        if belief is None:
+            return self.upsert(Belief(description=description, certainty=certainty, value=value, source=source))
+        if belief.value == value:
+            return False
+        belief.update_value(value)
+        return True
+
+    def with_certainty(self, minimum: float = 0.0, maximum: float = 1.0) -> List[Belief]:
+        """
+        Returns beliefs whose certainty lies in [minimum, maximum], scanning only the overlapping bands.
+
+        Args:
+            minimum (float): The lowest certainty to include.
+            maximum (float): The highest certainty to include.
+
+        Returns:
+            List[Belief]: The matching beliefs.
+        """
+        matches = []
+        for band in range(certainty_band(minimum), certainty_band(maximum) + 1):
+            for description in self._by_band[band]:
+                belief = self._beliefs[description]
+                if minimum <= belief.certainty <= maximum:
+                    matches.append(belief)
+        return matches
+
+    def from_source(self, source: Optional[str]) -> List[Belief]:
+        return [self._beliefs[description] for description in self._by_source.get(source, ())]
+
+    def items(self):
+        return self._beliefs.items()
+
+    def __iter__(self) -> Iterator[Belief]:
+        return iter(list(self._beliefs.values()))
+
+    def __len__(self) -> int:
+        return len(self._beliefs)
+
+    def __contains__(self, item) -> bool:
+        if isinstance(item, Belief):
+            return item.description in self._beliefs
+        return item in self._beliefs
+
+    def __repr__(self) -> str:
+        return f"BeliefStore({list(self._beliefs.values())!r})"
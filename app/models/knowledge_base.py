@@ -1,7 +1,15 @@
-from pydantic import BaseModel, Field
-from typing import Dict, Any, Union, List, Optional
+import os
+import threading
+from itertools import islice
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Dict, Any, Union, List, Optional, Iterable
 from rdflib import Graph, Literal, URIRef
-from ..core.sentence_transformer import SentenceTransformerWrapper
+from ..core.sentence_transformer import DEFAULT_EMBEDDING_MODEL, SentenceTransformerWrapper
+from ..core.vector_index import VectorIndex, create_vector_index
+from ..core.literal_index import LiteralIndex
+from ..core.triple_store import SQLiteLiteralIndex, SQLiteStore, open_graph
+from ..core.config import get_settings
+from ..core.hybrid_query import reciprocal_rank_fusion, weighted_fusion, run_legs
 
 class KnowledgeItem(BaseModel):
     """
@@ -26,15 +34,24 @@ class KnowledgeBase(BaseModel):
         id (str): The unique identifier of the knowledge base.
         symbolic_kb (Dict[str, KnowledgeItem]): The symbolic knowledge items.
         neural_kb (Dict[str, KnowledgeItem]): The neural knowledge items.
-        graph (Graph): The RDF graph representing the symbolic knowledge.
+        graph (Graph): The RDF graph representing the symbolic knowledge. Persisted per knowledge base
+            when the `triple_store_backend` setting is not "memory", together with both item maps, so
+            a reopened knowledge base has its items and vector index back.
         sentence_transformer (SentenceTransformerWrapper): The sentence transformer model for encoding text.
+        vector_index (VectorIndex): The index over neural knowledge embeddings used for similarity search,
+            exact or HNSW per the `vector_index_kind` setting.
+        literal_index (LiteralIndex): The inverted index over literal values in the RDF graph.
     """
     id: str
     symbolic_kb: Dict[str, KnowledgeItem] = Field(default_factory=dict)
     neural_kb: Dict[str, KnowledgeItem] = Field(default_factory=dict)
     graph: Graph = Field(default_factory=Graph, exclude=True)
-    sentence_transformer: SentenceTransformerWrapper = Field(default_factory=lambda: SentenceTransformerWrapper('all-MiniLM-L6-v2'), exclude=True)
-    
+    sentence_transformer: SentenceTransformerWrapper = Field(default_factory=lambda: SentenceTransformerWrapper(DEFAULT_EMBEDDING_MODEL), exclude=True)
+    vector_index: VectorIndex = Field(default_factory=create_vector_index, exclude=True)
+    literal_index: LiteralIndex = Field(default_factory=LiteralIndex, exclude=True)
+    # Guards the graph and indexes; query legs run on worker threads and may outlive the query that started them
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
     model_config = {
         "arbitrary_types_allowed": True,
         "json_encoders": {
@@ -42,6 +59,37 @@ class KnowledgeBase(BaseModel):
         }
     }
 
+    def model_post_init(self, __context: Any):
+        settings = get_settings()
+        if settings.triple_store_backend != "memory" and "graph" not in self.model_fields_set:
+            path = os.path.join(settings.triple_store_dir or ".", f"{self.id}.sqlite")
+            self.graph = open_graph(settings.triple_store_backend, path, commit_interval=settings.triple_store_commit_interval)
+            if isinstance(self.graph.store, SQLiteStore):
+                # The store keeps its literal index on disk, so there is nothing to rebuild
+                self.literal_index = SQLiteLiteralIndex(self.graph.store)
+                self._load_items(self.graph.store)
+
+    def _load_items(self, store: SQLiteStore):
+        """Restores the item maps and the vector index from a reopened store."""
+        for item_id, data in store.items("symbolic"):
+            self.symbolic_kb[item_id] = KnowledgeItem.model_validate_json(data)
+        self._index_neural_knowledge([KnowledgeItem.model_validate_json(data) for _, data in store.items("neural")],
+                                     persist=False)
+
+    def _persist_items(self, kind: str, items: List[KnowledgeItem]):
+        if isinstance(self.graph.store, SQLiteStore):
+            self.graph.store.put_items(kind, [(item.id, item.model_dump_json()) for item in items])
+
+    def _forget_item(self, kind: str, item_id: str):
+        if isinstance(self.graph.store, SQLiteStore):
+            self.graph.store.delete_item(kind, item_id)
+
+    def close(self):
+        """
+        Flushes pending writes and closes the RDF graph's store.
+        """
+        self.graph.close(commit_pending_transaction=True)
+
     def add_symbolic_knowledge(self, item: KnowledgeItem):
         """
         Adds a symbolic knowledge item to the knowledge base.
@@ -49,8 +97,10 @@ class KnowledgeBase(BaseModel):
         Args:
             item (KnowledgeItem): The knowledge item to add.
         """
-        self.symbolic_kb[item.id] = item
-        self._add_to_graph(item)
+        with self._lock:
+            self.symbolic_kb[item.id] = item
+            self._add_to_graph(item)
+            self._persist_items("symbolic", [item])
 
     def add_neural_knowledge(self, item: KnowledgeItem):
         """
@@ -61,7 +111,81 @@ class KnowledgeBase(BaseModel):
         """
         if isinstance(item.content, str):
             item.embedding = self.sentence_transformer.encode(item.content).tolist()
-        self.neural_kb[item.id] = item
+        with self._lock:
+            self.neural_kb[item.id] = item
+            if item.embedding:
+                self.vector_index.add(item.id, item.embedding)
+            else:
+                self.vector_index.remove(item.id)
+            self._persist_items("neural", [item])
+
+    def encode_neural_knowledge(self, items: List[KnowledgeItem], batch_size: int = 64):
+        """
+        Fills in the embeddings of text knowledge items, encoding them in batches.
+
+        Texts are sorted by length before batching so each forward pass pads
+        as little as possible. Only the items are modified, not the knowledge
+        base, so this can run off the event loop while the knowledge base is
+        being queried.
+
+        Args:
+            items (List[KnowledgeItem]): The knowledge items to encode.
+            batch_size (int): The number of texts encoded per forward pass.
+        """
+        text_items = sorted((item for item in items if isinstance(item.content, str)), key=lambda item: len(item.content))
+        for start in range(0, len(text_items), batch_size):
+            batch = text_items[start:start + batch_size]
+            embeddings = self.sentence_transformer.encode([item.content for item in batch], batch_size=batch_size)
+            for item, embedding in zip(batch, embeddings):
+                item.embedding = embedding.tolist()
+
+    def _index_neural_knowledge(self, items: List[KnowledgeItem], persist: bool = True):
+        with self._lock:
+            for item in items:
+                self.neural_kb[item.id] = item
+                if not item.embedding:
+                    self.vector_index.remove(item.id)
+            if indexed := [item for item in items if item.embedding]:
+                self.vector_index.add_batch([item.id for item in indexed], [item.embedding for item in indexed])
+            if persist:
+                self._persist_items("neural", items)
+
+    def add_neural_knowledge_batch(self, items: List[KnowledgeItem], batch_size: int = 64):
+        """
+        Adds many neural knowledge items, encoding their text in batches.
+
+        The resulting embeddings are written to the vector index in one call.
+
+        Args:
+            items (List[KnowledgeItem]): The knowledge items to add.
+            batch_size (int): The number of texts encoded per forward pass.
+        """
+        self.encode_neural_knowledge(items, batch_size=batch_size)
+        self._index_neural_knowledge(items)
+
+    def add_neural_knowledge_stream(self, items: Iterable[KnowledgeItem], batch_size: int = 64, chunk_size: int = 1024) -> int:
+        """
+        Adds neural knowledge items from an iterator, encoding them a chunk at a time.
+
+        Items are encoded in chunks of `chunk_size` as they arrive, but none is
+        added until the iterator is exhausted: if it raises (e.g. on an invalid
+        item), the knowledge base is left unchanged.
+
+        Args:
+            items (Iterable[KnowledgeItem]): The knowledge items to add.
+            batch_size (int): The number of texts encoded per forward pass.
+            chunk_size (int): The number of items buffered before encoding.
+
+        Returns:
+            int: The number of items added.
+        """
+        staged = []
+        iterator = iter(items)
+        while chunk := list(islice(iterator, chunk_size)):
+            self.encode_neural_knowledge(chunk, batch_size=batch_size)
+            staged.extend(chunk)
+        self._index_neural_knowledge(staged)
+        return len(staged)
 
     def get_symbolic_knowledge(self, item_id: str) -> Optional[KnowledgeItem]:
         """
@@ -94,9 +218,11 @@ class KnowledgeBase(BaseModel):
         Args:
             item_id (str): The ID of the knowledge item to remove.
         """
-        if item_id in self.symbolic_kb:
-            del self.symbolic_kb[item_id]
-            self._remove_from_graph(item_id)
+        with self._lock:
+            if item_id in self.symbolic_kb:
+                del self.symbolic_kb[item_id]
+                self._remove_from_graph(item_id)
+                self._forget_item("symbolic", item_id)
 
     def remove_neural_knowledge(self, item_id: str):
         """
@@ -105,79 +231,154 @@ class KnowledgeBase(BaseModel):
         Args:
             item_id (str): The ID of the knowledge item to remove.
         """
-        if item_id in self.neural_kb:
-            del self.neural_kb[item_id]
-
-    def query(self, query: str) -> Dict[str, Any]:
+        with self._lock:
+            if item_id in self.neural_kb:
+                del self.neural_kb[item_id]
+                self.vector_index.remove(item_id)
+                self._forget_item("neural", item_id)
+
+    def query(self, query: str, limit: Optional[int] = None, threshold: float = 0.5, fusion: str = "rrf",
+              weights: Optional[Dict[str, float]] = None, early_stop_confidence: float = 0.95, match: str = "exact") -> Dict[str, Any]:
         """
         Queries the knowledge base for relevant knowledge items.
 
+        The symbolic and neural legs run concurrently with `limit` and `threshold`
+        pushed down into each. If a leg that scores its results (the neural
+        leg's similarity) alone returns `limit` items with confidence of at
+        least `early_stop_confidence`, the other leg is not waited for. This
+        blocks, so call it off the event loop from async code.
+
         Args:
             query (str): The query string.
+            limit (Optional[int]): The maximum number of results per leg and in the combined ranking.
+            threshold (float): The minimum similarity for neural results.
+            fusion (str): How to fuse the legs, either "rrf" (reciprocal rank) or "weighted".
+            weights (Optional[Dict[str, float]]): Per-leg fusion weights keyed by "symbolic" and "neural".
+            early_stop_confidence (float): The confidence a leg's results must reach to stop early.
+            match (str): How the symbolic leg matches literals: "exact", "iexact", "keyword" or "prefix".
 
         Returns:
-            Dict[str, Any]: The query results containing symbolic and neural knowledge items.
+            Dict[str, Any]: The query results containing symbolic, neural and fused combined knowledge items.
         """
-        symbolic_results = self._query_symbolic(query)
-        neural_results = self._query_neural(query)
-        return self._integrate_results(symbolic_results, neural_results)
-
-    def _query_symbolic(self, query: str) -> Dict[str, Any]:
+        def is_sufficient(results: Dict[str, Any]) -> bool:
+            # Symbolic hits carry no confidence, so they never end the query on their own
+            confident = [r for r in results.values() if r.get('similarity', 0.0) >= early_stop_confidence]
+            return limit is not None and len(confident) >= limit
+
+        results = run_legs({
+            'symbolic': lambda: self._query_symbolic(query, limit=limit, match=match),
+            'neural': lambda: self._query_neural(query, limit=limit, threshold=threshold),
+        }, is_sufficient)
+        return self._integrate_results(results['symbolic'], results['neural'], limit=limit, fusion=fusion, weights=weights)
+
+    def _query_symbolic(self, query: str, limit: Optional[int] = None, match: str = "exact") -> Dict[str, Any]:
         """
         Queries the symbolic knowledge base for relevant knowledge items.
 
+        Lookups go through the literal index rather than scanning the graph.
+
         Args:
             query (str): The query string.
+            limit (Optional[int]): The maximum number of results to return.
+            match (str): "exact" for literals equal to `Literal(query)` (case and datatype
+                included), "iexact" for literals whose value equals the query ignoring case,
+                "keyword" for literals containing every query token, "prefix" to also let
+                the last token match as a prefix.
 
         Returns:
             Dict[str, Any]: The symbolic query results.
         """
+        if match not in ("exact", "iexact", "keyword", "prefix"):
+            raise ValueError(f"Unknown match mode: {match}. Must be 'exact', 'iexact', 'keyword' or 'prefix'")
+
         results = {}
-        for triple in self.graph.triples((None, None, Literal(query))):
-            subject, predicate, _ = triple
-            results[str(subject)] = {
-                'predicate': str(predicate),
-                'value': query
-            }
+        with self._lock:
+            if match in ("exact", "iexact"):
+                triples = self.literal_index.lookup(query, ignore_case=match == "iexact")
+            else:
+                triples = self.literal_index.search(query, prefix=match == "prefix")
+            for subject, predicate, obj in triples:
+                results[str(subject)] = {
+                    'predicate': str(predicate),
+                    'value': str(obj)
+                }
+                if limit is not None and len(results) >= limit:
+                    break
         return results
 
-    def _query_neural(self, query: str) -> Dict[str, Any]:
+    def search_literals(self, text: str, prefix: bool = False, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Searches literal values in the RDF graph by keyword.
+
+        Args:
+            text (str): The keywords to search for; all must match.
+            prefix (bool): Whether the last keyword may match as a prefix.
+            limit (Optional[int]): The maximum number of results to return.
+
+        Returns:
+            List[Dict[str, Any]]: The matching subject, predicate and value triples.
+        """
+        with self._lock:
+            return [
+                {'subject': str(subject), 'predicate': str(predicate), 'value': str(obj)}
+                for subject, predicate, obj in self.literal_index.search(text, prefix=prefix, limit=limit)
+            ]
+
+    def _query_neural(self, query: str, limit: Optional[int] = None, threshold: float = 0.5) -> Dict[str, Any]:
         """
         Queries the neural knowledge base for relevant knowledge items.
 
         Args:
             query (str): The query string.
+            limit (Optional[int]): The maximum number of results to return.
+            threshold (float): The minimum similarity of a result.
 
         Returns:
-            Dict[str, Any]: The neural query results.
+            Dict[str, Any]: The neural query results, ordered by descending similarity.
         """
         query_embedding = self.sentence_transformer.encode(query)
         results = {}
-        for key, item in self.neural_kb.items():
-            if item.embedding:
-                similarity = self.sentence_transformer.cosine_similarity(query_embedding, item.embedding)
-                if similarity > 0.5:  # Adjust threshold as needed
-                    results[key] = {
-                        'value': item.content,
-                        'similarity': float(similarity)
-                    }
+        with self._lock:
+            for key, similarity in self.vector_index.search(query_embedding, top_k=limit, threshold=threshold):
+                results[key] = {
+                    'value': self.neural_kb[key].content,
+                    'similarity': similarity
+                }
         return results
 
-    def _integrate_results(self, symbolic_results: Dict[str, Any], neural_results: Dict[str, Any]) -> Dict[str, Any]:
+    def _integrate_results(self, symbolic_results: Dict[str, Any], neural_results: Dict[str, Any], limit: Optional[int] = None,
+                           fusion: str = "rrf", weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """
         Integrates the symbolic and neural query results.
 
         Args:
             symbolic_results (Dict[str, Any]): The symbolic query results.
             neural_results (Dict[str, Any]): The neural query results.
+            limit (Optional[int]): The maximum number of combined results.
+            fusion (str): How to fuse the legs, either "rrf" (reciprocal rank) or "weighted".
+            weights (Optional[Dict[str, float]]): Per-leg fusion weights keyed by "symbolic" and "neural".
 
         Returns:
-            Dict[str, Any]: The integrated query results.
+            Dict[str, Any]: The integrated query results, with `combined` ordered by fused score.
         """
+        if fusion == "rrf":
+            scores = reciprocal_rank_fusion({'symbolic': list(symbolic_results), 'neural': list(neural_results)}, weights=weights)
+        elif fusion == "weighted":
+            scores = weighted_fusion({
+                'symbolic': {key: 1.0 for key in symbolic_results},
+                'neural': {key: result['similarity'] for key, result in neural_results.items()},
+            }, weights=weights)
+        else:
+            raise ValueError(f"Unknown fusion method: {fusion}. Must be 'rrf' or 'weighted'")
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
         return {
             'symbolic': symbolic_results,
             'neural': neural_results,
-            'combined': symbolic_results | neural_results
+            'combined': {
+                key: {**symbolic_results.get(key, {}), **neural_results.get(key, {}), 'score': scores[key]}
+                for key in ranked
+            }
         }
 
     def _add_to_graph(self, item: KnowledgeItem):
@@ -193,8 +394,11 @@ class KnowledgeBase(BaseModel):
                 predicate = URIRef(key)
                 obj = Literal(value)
                 self.graph.add((subject, predicate, obj))
+                self.literal_index.add(subject, predicate, obj)
         else:
-            self.graph.add((subject, URIRef('hasContent'), Literal(item.content)))
+            obj = Literal(item.content)
+            self.graph.add((subject, URIRef('hasContent'), obj))
+            self.literal_index.add(subject, URIRef('hasContent'), obj)
 
     def _remove_from_graph(self, item_id: str):
         """
@@ -205,6 +409,7 @@ class KnowledgeBase(BaseModel):
         """
         subject = URIRef(item_id)
         self.graph.remove((subject, None, None))
+        self.literal_index.remove_subject(subject)
 
     def find_most_similar(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -218,14 +423,8 @@ class KnowledgeBase(BaseModel):
             List[Dict[str, Any]]: The top similar knowledge items.
         """
         query_embedding = self.sentence_transformer.encode(query)
-        similarities = []
-        for key, item in self.neural_kb.items():
-            if item.embedding:
-                similarity = self.sentence_transformer.cosine_similarity(query_embedding, item.embedding)
-                similarities.append((key, similarity, item))
-        
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return [
-            {'id': key, 'similarity': similarity, 'content': item.content}
-            for key, similarity, item in similarities[:top_k]
-        ]
\ No newline at end of file
+        with self._lock:
+            return [
+                {'id': key, 'similarity': similarity, 'content': self.neural_kb[key].content}
+                for key, similarity in self.vector_index.search(query_embedding, top_k=top_k)
+            ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from urllib import request
 
 from app.core.reasoner import OWLReasoner
@@ -6,6 +6,7 @@ from app.core.reasoner import RDFSReasoner
 from pydantic import BaseModel
 from rdflib import Graph, Literal, URIRef
 from app.core.ontology import Ontology
+from app.core.triple_store import graph_is_empty, open_graph
 from wikipediaapi import Wikipedia
 from arango import ArangoClient
 import psycopg2
@@ -43,16 +44,20 @@ class KnowledgeRepresentation(BaseModel):
     """
     Represents a knowledge representation using an ontology and an RDF graph.
     """
-    def __init__(self, ontology: Ontology):
+    def __init__(self, ontology: Ontology, store_path: Optional[str] = None):
         """
         Initializes a new instance of the KnowledgeRepresentation class.
 
         Args:
             ontology (Ontology): The ontology to use for the knowledge representation.
+            store_path (Optional[str]): An SQLite file to persist the graph in. The ontology
+                is only parsed into it the first time; later opens reuse the stored triples.
         """
         self.ontology = ontology
-        self.graph = Graph()
-        self.graph.parse(ontology.file_path)
+        self.graph = open_graph("sqlite", store_path) if store_path else Graph()
+        if graph_is_empty(self.graph):
+            self.graph.parse(ontology.file_path)
+            self.graph.commit()
 
     def add_knowledge(self, knowledge: Dict[str, Any]):
         """
@@ -16,6 +16,34 @@ class Performative(str, Enum):
     PROPOSE = "propose"
     ACCEPT_PROPOSAL = "accept-proposal"
     REJECT_PROPOSAL = "reject-proposal"
+    CFP = "cfp"
+    CONFIRM = "confirm"
+    FAILURE = "failure"
+    NOT_UNDERSTOOD = "not-understood"
+    CANCEL = "cancel"
+
+def construct_trusted(model, fields: dict, fields_set: Optional[set] = None):
+    """
+    Builds a model instance from already-typed fields without validation.
+
+    Does what `model_construct` does once defaults are resolved, without
+    re-inspecting the default factories on every call. Only for internal
+    traffic whose fields were produced by this code base.
+
+    Args:
+        model: The pydantic model class.
+        fields (dict): Every field of the model, already typed.
+        fields_set (Optional[set]): The fields set explicitly; all of them if None.
+
+    Returns:
+        The model instance.
+    """
+    instance = model.__new__(model)
+    object.__setattr__(instance, "__dict__", fields)
+    object.__setattr__(instance, "__pydantic_fields_set__", set(fields) if fields_set is None else fields_set)
+    object.__setattr__(instance, "__pydantic_extra__", None)
+    object.__setattr__(instance, "__pydantic_private__", None)
+    return instance
 
 class Message(BaseModel):
     """
@@ -36,6 +64,15 @@ class Message(BaseModel):
     def __str__(self):
         return f"Message from {self.sender_id} to {self.recipient_id}: {self.content}"
 
+    def to_bytes(self) -> bytes:
+        from app.core.message_codec import encode
+        return encode(self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, validate: bool = True) -> 'Message':
+        from app.core.message_codec import decode
+        return decode(data, validate)
+
 class ACLMessage(BaseModel):
     """
     Represents a message in the agent communication language (ACL).
@@ -96,6 +133,45 @@ class ACLMessage(BaseModel):
         data['timestamp'] = datetime.fromisoformat(data['timestamp'])
         return cls(**data)
 
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the ACLMessage in the compact binary wire format.
+
+        Returns:
+            bytes: The encoded message.
+        """
+        from app.core.message_codec import encode
+        return encode(self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, validate: bool = True) -> 'ACLMessage':
+        """
+        Decodes an ACLMessage from the binary wire format.
+
+        Args:
+            data (bytes): The encoded message.
+            validate (bool): Whether to run validation; pass False only for trusted internal traffic.
+
+        Returns:
+            ACLMessage: The decoded message.
+        """
+        from app.core.message_codec import decode
+        return decode(data, validate)
+
+    @classmethod
+    def trusted(cls, **fields) -> 'ACLMessage':
+        """
+        Builds an ACLMessage without validation, for internal traffic whose fields are already typed.
+
+        Args:
+            **fields: The message fields; unset fields take their defaults.
+
+        Returns:
+            ACLMessage: The message.
+        """
+        return construct_trusted(cls, {**_TRUSTED_DEFAULTS, "id": uuid4(), "timestamp": datetime.now(), **fields},
+                                 set(fields))
+
     def to_message(self) -> Message:
         """
         Converts the ACLMessage object to a Message object.
@@ -107,7 +183,7 @@ class ACLMessage(BaseModel):
             id=self.id,
             sender_id=self.sender_id,
             recipient_id=self.receiver_id,
-            content=str(self.content),
+            content=self.content if isinstance(self.content, str) else str(self.content),
             timestamp=self.timestamp,
             conversation_id=self.conversation_id,
             reply_to=UUID(self.in_reply_to) if self.in_reply_to else None,
@@ -140,4 +216,7 @@ class ACLMessage(BaseModel):
             language=message.language,
             ontology=message.ontology,
             protocol=message.protocol
-        )
\ No newline at end of file
+        )
+
+_TRUSTED_DEFAULTS = {name: field.default for name, field in ACLMessage.model_fields.items()
+                     if not field.is_required() and field.default_factory is None}
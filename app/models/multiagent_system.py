@@ -1,13 +1,42 @@
-from typing import Dict, List, Optional, Any
+import os
+from typing import Dict, List, Optional, Any, Tuple
 from uuid import UUID, uuid4
 from app.models.agent import Agent
-from app.models.message import Message
+from app.models.message import Message, Performative
+from app.core.message_log import MessageLog, close_message_log, open_message_log
 from app.core.world_model import WorldModel
+from app.core.step_scheduler import StepScheduler, create_scheduler
+
+DELIVERY_CONSUMER = "multiagent_system"
+
+
+def _perceive(task):
+    agent, view = task
+    agent.perceive(view)
+    return agent
+
+
+def _decide(agent):
+    return agent, agent.run_cycle()
+
 
 class MultiAgentSystem:
-    def __init__(self, num_agents: int, num_states: int, state_size: int, action_size: int, ontology_path: str):
+    def __init__(self, num_agents: int, num_states: int, state_size: int, action_size: int, ontology_path: str,
+                 scheduler: Optional[StepScheduler] = None, message_log: Optional[MessageLog] = None,
+                 name: Optional[str] = None):
+        self.id = uuid4()
+        # Scopes the message log and its delivery offsets to this system; a stable name resumes them after a restart
+        self.name = name or str(self.id)
         self.agents: Dict[UUID, Agent] = {}
+        self.scheduler: StepScheduler = scheduler or create_scheduler()
+        # A scheduler passed in belongs to the caller, which closes it
+        self._owns_scheduler = scheduler is None
         self.message_queue: List[Message] = []
+        # When set, messages are persisted and delivered from the log instead of message_queue
+        self._message_log_name = os.path.join("multiagent_system", self.name)
+        self._owns_message_log = message_log is None
+        self.message_log: Optional[MessageLog] = message_log or open_message_log(self._message_log_name)
+        self._delivery_consumer = f"{DELIVERY_CONSUMER}:{self.name}"
         self.world_model: WorldModel = WorldModel(
             num_agents=num_agents,
             num_states=num_states,
@@ -15,6 +44,8 @@ class MultiAgentSystem:
             action_size=action_size,
             ontology_path=ontology_path
         )
+        # The world model's view version of each agent at its last perception; see WorldModel.view_version
+        self._perceived_versions: Dict[UUID, int] = {}
 
     def add_agent(self, agent: Agent) -> Agent:
         agent_id = uuid4()
@@ -29,24 +60,48 @@ class MultiAgentSystem:
     def remove_agent(self, agent_id: UUID) -> bool:
         if agent_id in self.agents:
             del self.agents[agent_id]
-            del self.world_model.agents[agent_id]
+            self.world_model.remove_agent(agent_id)
+            self._perceived_versions.pop(agent_id, None)
             return True
         return False
 
     def list_agents(self) -> List[Agent]:
         return list(self.agents.values())
 
-    def send_message(self, sender_id: UUID, receiver_id: UUID, content: str):
-        message = Message(sender_id=sender_id, receiver_id=receiver_id, content=content)
-        self.message_queue.append(message)
+    def send_message(self, sender_id: UUID, receiver_id: UUID, content: str,
+                     performative: Performative = Performative.INFORM):
+        message = Message(sender_id=sender_id, recipient_id=receiver_id, content=content, performative=performative)
+        if self.message_log is not None:
+            self.message_log.append(message)
+        else:
+            self.message_queue.append(message)
 
     def process_messages(self):
+        if self.message_log is not None:
+            self._deliver_logged_messages()
+            return
         for message in self.message_queue:
-            receiver = self.agents.get(message.receiver_id)
+            receiver = self.agents.get(message.recipient_id)
             if receiver:
                 receiver.receive_message(message)
         self.message_queue.clear()
 
+    def _deliver_logged_messages(self):
+        # Each agent commits its own offset, so after a restart delivery resumes where every agent left off
+        log = self.message_log
+        last_offset = log.committed(self._delivery_consumer)
+        delivered: Dict[UUID, int] = {}
+        for offset, message in log.read(after=last_offset):
+            receiver = self.agents.get(message.recipient_id)
+            if receiver and offset > log.committed(str(message.recipient_id)):
+                receiver.receive_message(message)
+                delivered[message.recipient_id] = offset
+            last_offset = offset
+        for agent_id, offset in delivered.items():
+            log.commit(str(agent_id), offset)
+        log.commit(self._delivery_consumer, last_offset)
+        log.flush()
+
     def update_world_model(self, updates: Dict[str, Any]):
         self.world_model.update_state(updates)
 
@@ -54,14 +109,52 @@ class MultiAgentSystem:
         return self.world_model.get_agent_view(agent_id)
 
     def step(self):
-        for agent in self.agents.values():
-            agent_view = self.get_agent_world_view(agent.agent_id)
-            agent.perceive(agent_view)
-            agent.deliberate()
-            agent.plan()
-            actions = agent.execute()
-            self.process_agent_actions(agent.agent_id, actions)
+        """
+        Advance the system by one tick in three phases separated by barriers.
+
+        Perceive: agents whose view may have changed since their last perception perceive it.
+        Decide: agents with pending changes run their cycle on the scheduler.
+        Act: the resulting actions are applied to the world serially, in agent order.
+
+        An agent re-perceives only if the world model's version of its view moved
+        since its last perception (a change to the state, to itself, or near it,
+        made here or anywhere else), and runs only the cycle stages whose inputs
+        changed, so idle agents are skipped.
+        Because the world is only mutated in the act phase, every agent perceives
+        the same world within a tick regardless of the scheduler used.
+        """
+        stale, views = self._perception_tasks()
+        self._perceived(stale, self.scheduler.map(_perceive, views))
+        pending = self._pending_agents()
+        self._decided(pending, self.scheduler.map(_decide, [self.agents[agent_id] for agent_id in pending]))
+
+    async def astep(self):
+        """Same as `step`, for callers on an event loop: the phases are awaited on the scheduler's `amap`."""
+        stale, views = self._perception_tasks()
+        self._perceived(stale, await self.scheduler.amap(_perceive, views))
+        pending = self._pending_agents()
+        self._decided(pending, await self.scheduler.amap(_decide, [self.agents[agent_id] for agent_id in pending]))
+
+    def _perception_tasks(self) -> Tuple[Dict[UUID, int], List[tuple]]:
+        # The agents whose view version moved, with that version, and their (agent, view) tasks
+        versions = {agent_id: self.world_model.view_version(agent_id) for agent_id in self.agents}
+        stale = {agent_id: version for agent_id, version in versions.items() if self._perceived_versions.get(agent_id) != version}
+        return stale, [(self.agents[agent_id], self.get_agent_world_view(agent_id)) for agent_id in stale]
+
+    def _perceived(self, stale: Dict[UUID, int], agents: List[Agent]):
+        for (agent_id, version), agent in zip(stale.items(), agents):
+            self.agents[agent_id] = agent
+            self._perceived_versions[agent_id] = version
+
+    def _pending_agents(self) -> List[UUID]:
+        return [agent_id for agent_id, agent in self.agents.items() if agent.has_pending_changes()]
+
+    def _decided(self, pending: List[UUID], decisions: List[tuple]):
+        for agent_id, (agent, actions) in zip(pending, decisions):
+            self.agents[agent_id] = agent
+            self.process_agent_actions(agent_id, actions)
         self.process_messages()
+        self.world_model.advance_tick()
 
     def process_agent_actions(self, agent_id: UUID, actions: List[Dict[str, Any]]):
         for action in actions:
@@ -76,4 +169,16 @@ class MultiAgentSystem:
 
     def run(self, steps: int):
         for _ in range(steps):
-            self.step()
\ No newline at end of file
+            self.step()
+
+    async def arun(self, steps: int):
+        for _ in range(steps):
+            await self.astep()
+
+    def close(self):
+        """Shuts down the default scheduler's workers, closes the message log it opened and the world model."""
+        if self._owns_scheduler:
+            self.scheduler.close()
+        if self._owns_message_log and self.message_log is not None:
+            close_message_log(self._message_log_name)
+        self.world_model.close()
\ No newline at end of file
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
+from functools import lru_cache
 from typing import List
 from uuid import UUID
-from app.models.message import Message
+from app.core.world_model_provider import get_world_model
+from app.models.message import Message, Performative
 from app.services.agent_communication_service import AgentCommunicationService
 from app.services.human_communication_service import HumanCommunicationService
 from app.services.agent_service import AgentService
@@ -9,11 +11,10 @@ from app.services.knowledge_base_service import KnowledgeBaseService
 
 router = APIRouter()
 
-def get_agent_communication_service(
-    agent_service: AgentService = Depends(),
-    knowledge_base_service: KnowledgeBaseService = Depends()
-) -> AgentCommunicationService:
-    return AgentCommunicationService(agent_service, knowledge_base_service)
+# One service per process: its message bus owns the agents' mailboxes and worker pool
+@lru_cache(maxsize=None)
+def get_agent_communication_service() -> AgentCommunicationService:
+    return AgentCommunicationService(AgentService(get_world_model()), KnowledgeBaseService())
 
 def get_human_communication_service(
     agent_service: AgentService = Depends()
@@ -29,7 +30,7 @@ async def send_agent_message(
     service: AgentCommunicationService = Depends(get_agent_communication_service)
 ):
     try:
-        await service.send_message(sender_id, recipient_id, content, performative)
+        await service.send_message(sender_id, recipient_id, Performative(performative), content)
         return {"message": "Message sent successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
@@ -42,7 +43,7 @@ async def broadcast_agent_message(
     service: AgentCommunicationService = Depends(get_agent_communication_service)
 ):
     try:
-        await service.broadcast_message(sender_id, content, performative)
+        await service.broadcast_message(sender_id, Performative(performative), content)
         return {"message": "Broadcast message sent successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -55,7 +56,7 @@ async def publish_agent_message(
     performative: str,
     service: AgentCommunicationService = Depends(get_agent_communication_service)
 ):
-    await service.publish_message(sender_id, topic, content, performative)
+    await service.publish_message(sender_id, topic, Performative(performative), content)
     return {"message": "Message published successfully"}
 
 @router.post("/agent/subscribe")
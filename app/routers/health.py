@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.core.startup import startup_registry
+
+router = APIRouter()
+
+@router.get("/live")
+async def liveness():
+    return {"status": "alive", "uptime_seconds": startup_registry.status()["uptime_seconds"]}
+
+@router.get("/ready")
+async def readiness():
+    status = startup_registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@router.get("/startup")
+async def startup_timings():
+    return startup_registry.status()
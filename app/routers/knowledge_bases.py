@@ -1,15 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+import asyncio
+import json
+from functools import partial
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
+from typing import List, Dict, Any, AsyncIterator, Optional, Literal
 from app.models.knowledge_base import KnowledgeBase, KnowledgeItem
 from app.services.knowledge_base_service import KnowledgeBaseService
+from app.core.model_registry import model_registry
 
 router = APIRouter()
 knowledge_service = KnowledgeBaseService()
 
+NDJSON_CHUNK_SIZE = 1024
+
+async def _iter_ndjson_items(request: Request) -> AsyncIterator[KnowledgeItem]:
+    buffer = b""
+    line_number = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_ndjson_line(line, line_number)
+    if buffer.strip():
+        yield _parse_ndjson_line(buffer, line_number + 1)
+
+def _parse_ndjson_line(line: bytes, line_number: int) -> KnowledgeItem:
+    try:
+        return KnowledgeItem(**json.loads(line))
+    except (ValueError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid knowledge item on line {line_number}: {e}")
+
 @router.post("/knowledge_bases/", response_model=KnowledgeBase)
 async def create_knowledge_base():
     return knowledge_service.create_knowledge_base()
 
+@router.get("/knowledge_bases/models")
+async def get_embedding_model_stats():
+    return model_registry.stats()
+
 @router.get("/knowledge_bases/{kb_id}", response_model=KnowledgeBase)
 async def get_knowledge_base(kb_id: str):
     if not (kb := knowledge_service.get_knowledge_base(kb_id)):
@@ -34,9 +64,29 @@ async def add_neural_knowledge(kb_id: str, item: KnowledgeItem):
         raise HTTPException(status_code=404, detail="Knowledge base not found")
     return kb
 
+@router.post("/knowledge_bases/{kb_id}/neural/batch")
+async def add_neural_knowledge_batch(kb_id: str, request: Request, batch_size: int = 64):
+    if not knowledge_service.get_knowledge_base(kb_id):
+        raise HTTPException(status_code=404, detail="Knowledge base not found")
+    # The whole body is parsed before anything is added, so an invalid line leaves the knowledge base unchanged
+    items = [item async for item in _iter_ndjson_items(request)]
+    # Encoding is CPU-bound; keep it off the event loop
+    added = await asyncio.get_running_loop().run_in_executor(
+        None, partial(knowledge_service.add_neural_knowledge_stream, kb_id, items, batch_size=batch_size, chunk_size=NDJSON_CHUNK_SIZE))
+    return {"kb_id": kb_id, "added": added}
+
 @router.post("/knowledge_bases/{kb_id}/query")
-async def query_knowledge_base(kb_id: str, query: str):
-    result = knowledge_service.query_knowledge_base(kb_id, query)
+async def query_knowledge_base(kb_id: str, query: str, limit: Optional[int] = None, threshold: float = 0.5, fusion: Literal["rrf", "weighted"] = "rrf", match: Literal["exact", "iexact", "keyword", "prefix"] = "exact"):
+    # The legs run on worker threads and the fan-in blocks, so keep it off the event loop
+    result = await asyncio.get_running_loop().run_in_executor(
+        None, partial(knowledge_service.query_knowledge_base, kb_id, query, limit=limit, threshold=threshold, fusion=fusion, match=match))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Knowledge base not found")
+    return result
+
+@router.get("/knowledge_bases/{kb_id}/search")
+async def search_literals(kb_id: str, q: str, prefix: bool = False, limit: Optional[int] = None):
+    result = knowledge_service.search_literals(kb_id, q, prefix=prefix, limit=limit)
     if result is None:
         raise HTTPException(status_code=404, detail="Knowledge base not found")
     return result
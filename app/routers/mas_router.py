@@ -1,3 +1,4 @@
+from functools import lru_cache
 from fastapi import APIRouter, Depends, HTTPException
 from typing import List, Dict, Any
 from uuid import UUID
@@ -10,7 +11,9 @@ router = APIRouter()
 
 settings = get_settings()
 
-def get_mas_service():
+# One service per process: its MAS owns scheduler workers and a world model with background threads
+@lru_cache(maxsize=None)
+def get_mas_service() -> MASService:
     return MASService(
         num_agents=settings.num_agents,
         num_states=settings.num_states,
@@ -47,12 +50,12 @@ async def send_message(sender_id: UUID, receiver_id: UUID, content: str, mas_ser
 
 @router.post("/mas/step/")
 async def step_mas(mas_service: MASService = Depends(get_mas_service)):
-    mas_service.step()
+    await mas_service.astep()
     return {"message": "MAS stepped successfully"}
 
 @router.post("/mas/run/")
 async def run_mas(steps: int, mas_service: MASService = Depends(get_mas_service)):
-    mas_service.run(steps)
+    await mas_service.arun(steps)
     return {"message": f"MAS ran for {steps} steps"}
 
 @router.post("/check_consistency")
@@ -2,13 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any, List
 from uuid import UUID
 from app.services.world_model_service import WorldModelService
-from app.core.world_model import WorldModel
+from app.core.world_model_provider import get_world_model
 
 router = APIRouter()
 
 def get_world_model_service():
-    world_model = WorldModel()  # You might want to use dependency injection to get a singleton instance
-    return WorldModelService(world_model)
+    return WorldModelService(get_world_model())
 
 @router.get("/state")
 async def get_state(service: WorldModelService = Depends(get_world_model_service)):
@@ -1,17 +1,33 @@
-from typing import Dict, Any, List
-from uuid import UUID
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
+from app.core.config import settings
+from app.core.interaction_protocols import ProtocolEngine, ProtocolViolation
+from app.core.message_bus import MessageBus
+from app.core.topic_router import TopicRouter
 from app.models.agent import Agent
 from app.models.message import ACLMessage, Performative
 from app.services.agent_service import AgentService
 from app.services.knowledge_base_service import KnowledgeBaseService
 
 class AgentCommunicationService:
-    def __init__(self, agent_service: AgentService, knowledge_base_service: KnowledgeBaseService):
+    def __init__(self, agent_service: AgentService, knowledge_base_service: KnowledgeBaseService,
+                 bus: Optional[MessageBus] = None):
         self.agent_service = agent_service
         self.knowledge_base_service = knowledge_base_service
-        self.subscribed_topics: Dict[str, List[UUID]] = {}
+        self.topics = TopicRouter()
+        self.bus = bus or MessageBus(
+            self._deliver_message,
+            mailbox_size=settings.message_mailbox_size,
+            overflow=settings.message_overflow_policy,
+            workers=settings.message_bus_workers,
+        )
+        # Tracks request, query and contract-net conversations and their reply-by deadlines
+        self.protocols = ProtocolEngine(self.bus.fan_out)
 
-    async def send_message(self, sender_id: UUID, receiver_id: UUID, performative: Performative, content: Any):
+    async def send_message(self, sender_id: UUID, receiver_id: UUID, performative: Performative, content: Any,
+                           conversation_id: Optional[UUID] = None, protocol: Optional[str] = None,
+                           reply_by: Optional[datetime] = None) -> ACLMessage:
         sender = self.agent_service.get_agent(sender_id)
         receiver = self.agent_service.get_agent(receiver_id)
         if not sender or not receiver:
@@ -21,9 +37,38 @@ class AgentCommunicationService:
             sender_id=sender_id,
             receiver_id=receiver_id,
             performative=performative,
-            content=content
+            content=content,
+            conversation_id=conversation_id,
+            protocol=protocol,
+            reply_by=reply_by
+        )
+        # Raises ProtocolViolation (a ValueError) if the conversation's protocol does not allow this message
+        if not self.protocols.observe(message):
+            # Returns once the message is in the receiver's mailbox; a bus worker delivers it
+            await self.bus.send(message)
+        return message
+
+    async def reply(self, message: ACLMessage, performative: Performative, content: Any) -> Optional[ACLMessage]:
+        # Replies stay in the message's conversation; late or out-of-protocol replies are dropped
+        response = ACLMessage.trusted(
+            sender_id=message.receiver_id,
+            receiver_id=message.sender_id,
+            performative=performative,
+            content=content,
+            conversation_id=message.conversation_id,
+            protocol=message.protocol,
+            in_reply_to=message.reply_with,
+            language=message.language,
+            ontology=message.ontology
         )
-        await self._deliver_message(message)
+        try:
+            if self.protocols.observe(response):
+                return response
+        except ProtocolViolation:
+            return None
+        # Replies are sent from bus workers, which must not wait for mailbox space
+        self.bus.reply(response)
+        return response
 
     async def _deliver_message(self, message: ACLMessage):
         if receiver := self.agent_service.get_agent(message.receiver_id):
@@ -31,7 +76,7 @@ class AgentCommunicationService:
 
     async def _process_message(self, receiver: 'Agent', message: ACLMessage):
         # Update the agent's beliefs based on the message
-        await self.knowledge_base_service.update_beliefs(receiver.id, message.content)
+        await self.knowledge_base_service.update_beliefs(receiver.agent_id, message.content)
 
         # Handle the message based on its performative
         if message.performative == Performative.REQUEST:
@@ -42,32 +87,63 @@ class AgentCommunicationService:
             await self._handle_query(receiver, message)
         elif message.performative == Performative.PROPOSE:
             await self._handle_proposal(receiver, message)
+        elif message.performative == Performative.CFP:
+            await self._handle_cfp(receiver, message)
+        elif message.performative == Performative.ACCEPT_PROPOSAL:
+            await self._handle_accept_proposal(receiver, message)
         # Add more handlers for other performatives
 
-    async def broadcast_message(self, sender_id: UUID, performative: Performative, content: Any):
+    async def _fan_out(self, sender_id: UUID, receiver_ids: List[UUID], performative: Performative, content: Any) -> int:
+        # Validate once, then make shallow per-receiver copies: no re-validation, and every
+        # receiver shares the same content object instead of its own serialized copy
+        template = ACLMessage(sender_id=sender_id, receiver_id=sender_id, performative=performative, content=content)
+        return await self.bus.fan_out(
+            template.model_copy(update={"id": uuid4(), "receiver_id": receiver_id}) for receiver_id in receiver_ids
+        )
+
+    async def broadcast_message(self, sender_id: UUID, performative: Performative, content: Any) -> int:
         sender = self.agent_service.get_agent(sender_id)
         if not sender:
             raise ValueError("Sender not found")
 
-        all_agents = self.agent_service.get_all_agents()
-        for receiver in all_agents:
-            if receiver.id != sender_id:
-                await self.send_message(sender_id, receiver.id, performative, content)
+        receiver_ids = [UUID(receiver.agent_id) for receiver in self.agent_service.get_all_agents()]
+        return await self._fan_out(sender_id, [receiver_id for receiver_id in receiver_ids if receiver_id != sender_id],
+                                   performative, content)
+
+    async def publish_message(self, sender_id: UUID, topic: str, performative: Performative, content: Any) -> int:
+        receiver_ids = [receiver_id for receiver_id in self.topics.match(topic)
+                        if self.agent_service.get_agent(receiver_id)]
+        return await self._fan_out(sender_id, receiver_ids, performative, content)
+
+    def subscribe_to_topic(self, agent_id: UUID, topic: str) -> bool:
+        # Topics are dotted; "*" matches one segment and "#" any number, e.g. "orders.#"
+        return self.topics.subscribe(agent_id, topic)
 
-    async def publish_message(self, sender_id: UUID, topic: str, performative: Performative, content: Any):
-        if topic in self.subscribed_topics:
-            for receiver_id in self.subscribed_topics[topic]:
-                await self.send_message(sender_id, receiver_id, performative, content)
+    def unsubscribe_from_topic(self, agent_id: UUID, topic: str) -> bool:
+        return self.topics.unsubscribe(agent_id, topic)
 
-    def subscribe_to_topic(self, agent_id: UUID, topic: str):
-        if topic not in self.subscribed_topics:
-            self.subscribed_topics[topic] = []
-        if agent_id not in self.subscribed_topics[topic]:
-            self.subscribed_topics[topic].append(agent_id)
+    def remove_agent(self, agent_id: UUID) -> int:
+        self.bus.remove_mailbox(agent_id)
+        return self.topics.unsubscribe_all(agent_id)
 
-    def unsubscribe_from_topic(self, agent_id: UUID, topic: str):
-        if topic in self.subscribed_topics and agent_id in self.subscribed_topics[topic]:
-            self.subscribed_topics[topic].remove(agent_id)
+    async def join(self):
+        await self.bus.join()
+
+    async def call_for_proposals(self, initiator_id: UUID, participant_ids: Iterable[UUID], task: Any,
+                                 timeout: float) -> Tuple[UUID, List[ACLMessage]]:
+        if not self.agent_service.get_agent(initiator_id):
+            raise ValueError("Initiator not found")
+        participant_ids = [participant_id for participant_id in participant_ids
+                           if participant_id != initiator_id and self.agent_service.get_agent(participant_id)]
+        return await self.protocols.call_for_proposals(initiator_id, participant_ids, task, timeout)
+
+    async def award_contract(self, conversation_id: UUID, accepted_ids: Iterable[UUID], content: Any = None,
+                             timeout: float = 30.0) -> List[ACLMessage]:
+        return await self.protocols.award(conversation_id, accepted_ids, content, timeout)
+
+    async def close(self):
+        await self.bus.stop()
+        await self.protocols.close()
 
     # Implement handlers for different performatives
     async def _handle_request(self, receiver: 'Agent', message: ACLMessage):
@@ -80,19 +156,17 @@ class AgentCommunicationService:
             response = await receiver.execute_request(request)
 
             # Send the response back to the sender
-            await self.send_message(
-                receiver.id,
-                message.sender_id,
+            await self.reply(
+                message,
                 Performative.INFORM,
                 response
             )
         else:
             # If the receiver cannot handle the request, send a failure response
-            await self.send_message(
-                receiver.id,
-                message.sender_id,
+            await self.reply(
+                message,
                 Performative.FAILURE,
-                f"Agent {receiver.id} cannot handle the request: {request}"
+                f"Agent {receiver.agent_id} cannot handle the request: {request}"
             )
 
     async def _handle_inform(self, receiver: 'Agent', message: ACLMessage):
@@ -102,12 +176,13 @@ class AgentCommunicationService:
         # Process the received information
         await receiver.process_information(information)
 
-        # Optionally, send an acknowledgement back to the sender
-        await self.send_message(
-            receiver.id,
-            message.sender_id,
+        # Optionally, send an acknowledgement back to the sender; protocol informs end their conversation instead
+        if message.protocol is not None:
+            return
+        await self.reply(
+            message,
             Performative.CONFIRM,
-            f"Information received and processed by {receiver.id}"
+            f"Information received and processed by {receiver.agent_id}"
         )
 
     async def _handle_query(self, receiver: 'Agent', message: ACLMessage):
@@ -120,19 +195,17 @@ class AgentCommunicationService:
             result = await receiver.execute_query(query)
 
             # Send the query result back to the sender
-            await self.send_message(
-                receiver.id,
-                message.sender_id,
+            await self.reply(
+                message,
                 Performative.INFORM,
                 result
             )
         else:
             # If the receiver cannot handle the query, send a failure response
-            await self.send_message(
-                receiver.id,
-                message.sender_id,
+            await self.reply(
+                message,
                 Performative.FAILURE,
-                f"Agent {receiver.id} cannot handle the query: {query}"
+                f"Agent {receiver.agent_id} cannot handle the query: {query}"
             )
 
     async def _handle_proposal(self, receiver: 'Agent', message: ACLMessage):
@@ -146,25 +219,40 @@ class AgentCommunicationService:
 
             if decision.accepted:
                 # If the proposal is accepted, send an accept-proposal message back to the sender
-                await self.send_message(
-                    receiver.id,
-                    message.sender_id,
+                await self.reply(
+                    message,
                     Performative.ACCEPT_PROPOSAL,
                     decision.content
                 )
             else:
                 # If the proposal is rejected, send a reject-proposal message back to the sender
-                await self.send_message(
-                    receiver.id,
-                    message.sender_id,
+                await self.reply(
+                    message,
                     Performative.REJECT_PROPOSAL,
                     decision.content
                 )
         else:
             # If the receiver cannot handle the proposal, send a failure response
-            await self.send_message(
-                receiver.id,
-                message.sender_id,
+            await self.reply(
+                message,
                 Performative.FAILURE,
-                f"Agent {receiver.id} cannot handle the proposal: {proposal}"
+                f"Agent {receiver.agent_id} cannot handle the proposal: {proposal}"
             )
+
+    async def _handle_cfp(self, receiver: 'Agent', message: ACLMessage):
+        # Bid on the task if the receiver can perform it, otherwise refuse
+        task = message.content
+        if receiver.can_handle_request(task):
+            bid = await receiver.propose(task)
+            await self.reply(message, Performative.PROPOSE, bid)
+        else:
+            await self.reply(message, Performative.REFUSE, f"Agent {receiver.agent_id} cannot perform the task: {task}")
+
+    async def _handle_accept_proposal(self, receiver: 'Agent', message: ACLMessage):
+        # The receiver's proposal won; perform the task named in the acceptance and report the outcome
+        try:
+            result = await receiver.execute_request(message.content)
+        except Exception as e:
+            await self.reply(message, Performative.FAILURE, f"Agent {receiver.agent_id} failed to perform the task: {e}")
+        else:
+            await self.reply(message, Performative.INFORM, result)
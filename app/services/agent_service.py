@@ -3,17 +3,19 @@ import uuid
 from typing import List, Optional, Dict, Any
 from app.models.agent import Agent, Belief, Intention
 from app.core.reasoner import Reasoner
-from app.models.knowledge_base import KnowledgeBase
+from app.services.knowledge_base_service import open_knowledge_base
 from app.core.config import get_settings
 
 settings = get_settings()
 
+AGENT_KNOWLEDGE_BASE_ID = "agents"
+
 
 class AgentService:
     def __init__(self, world_model):
         self.id = str(uuid.uuid4())
         self.agents: Dict[str, Agent] = {}
-        self.knowledge_base = KnowledgeBase(id=str(uuid.uuid4()))
+        self.knowledge_base = open_knowledge_base(AGENT_KNOWLEDGE_BASE_ID)
         self.reasoner = Reasoner(self.knowledge_base, api_key=settings.openai_api_key)
         self.world_model = world_model
 
@@ -27,6 +29,9 @@ class AgentService:
     def get_agent(self, agent_id: str) -> Optional[Agent]:
         return self.agents.get(agent_id)
 
+    def get_all_agents(self) -> List[Agent]:
+        return list(self.agents.values())
+
     def update_agent(self, agent_id: UUID, update_data: Dict[str, Any]) -> Agent:
         if agent := self.agents.get(str(agent_id)):
             for key, value in update_data.items():
@@ -1,5 +1,8 @@
-from typing import Dict, List, Any
+from collections import deque
+from typing import Deque, Dict, List, Any
 from uuid import UUID
+from app.core.config import settings
+from app.core.message_log import open_message_log
 from app.models.message import ACLMessage, Performative
 from app.models.agent import Agent
 from app.models.message import Message
@@ -10,7 +13,10 @@ class HumanCommunicationService:
     def __init__(self, agent_service: AgentService, llm_service: LLMService):
         self.agent_service = agent_service
         self.llm_service = llm_service
-        self.human_messages: Dict[UUID, List[ACLMessage]] = {}
+        # Persisted and indexed by receiver when settings.message_log_dir is set; otherwise only recent history is kept.
+        # The log is opened once per process and shared by every instance; main.lifespan closes it
+        self.message_log = open_message_log("human")
+        self.human_messages: Dict[UUID, Deque[ACLMessage]] = {}
 
     async def send_message_to_human(self, agent_id: UUID, human_id: UUID, content: Any):
         agent = self.agent_service.get_agent(agent_id)
@@ -27,12 +33,17 @@ class HumanCommunicationService:
             content=human_friendly_content
         )
 
+        if self.message_log is not None:
+            self.message_log.append(message)
+            return
         if human_id not in self.human_messages:
-            self.human_messages[human_id] = []
+            self.human_messages[human_id] = deque(maxlen=settings.message_history_limit)
         self.human_messages[human_id].append(message)
 
     async def get_messages_for_human(self, human_id: UUID) -> List[ACLMessage]:
-        return self.human_messages.get(human_id, [])
+        if self.message_log is not None:
+            return [message for _, message in self.message_log.messages_for(human_id)]
+        return list(self.human_messages.get(human_id, ()))
 
     async def send_message_to_agent(self, human_id: UUID, agent_id: UUID, content: str):
         agent = self.agent_service.get_agent(agent_id)
@@ -1,24 +1,70 @@
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any, Optional
+import os
 import re
+import threading
 import uuid
 from app.core.reasoner import Reasoner
 import numpy as np
-from app.core.sentence_transformer import SentenceTransformer
 from app.models.knowledge_base import KnowledgeBase, KnowledgeItem
 from app.models.knowledge_base import KnowledgeBase
 from app.core.reasoning_engine import ReasoningEngine
+from app.core.config import get_settings
+
+DEFAULT_KNOWLEDGE_BASE_ID = "default"
+
+# Shared by every service instance, so each knowledge base (and its store) is opened once per process
+_knowledge_bases: Dict[str, KnowledgeBase] = {}
+_knowledge_bases_lock = threading.Lock()
+
+
+def open_knowledge_base(kb_id: str) -> KnowledgeBase:
+    """
+    Returns the process-wide knowledge base with the given id, opening it on first use.
+
+    With a persistent triple store backend the id names the store file, so a
+    stable id reopens the same knowledge base after a restart.
+
+    Args:
+        kb_id (str): The knowledge base id.
+
+    Returns:
+        KnowledgeBase: The knowledge base.
+    """
+    with _knowledge_bases_lock:
+        if (kb := _knowledge_bases.get(kb_id)) is None:
+            kb = _knowledge_bases[kb_id] = KnowledgeBase(id=kb_id)
+    return kb
+
+
+def close_knowledge_bases():
+    """Flushes and closes every open knowledge base, e.g. at application shutdown."""
+    with _knowledge_bases_lock:
+        for kb in _knowledge_bases.values():
+            kb.close()
+        _knowledge_bases.clear()
+
+
+def _persisted_knowledge_base_ids() -> List[str]:
+    settings = get_settings()
+    if settings.triple_store_backend == "memory":
+        return []
+    directory = settings.triple_store_dir or "."
+    if not os.path.isdir(directory):
+        return []
+    return [name[:-len(".sqlite")] for name in os.listdir(directory) if name.endswith(".sqlite")]
+
 
 class KnowledgeBaseService:
     def __init__(self):
-        self.knowledge_base = KnowledgeBase(id=str(uuid.uuid4()))  # Ensure this is correctly initialized
+        self.knowledge_bases = _knowledge_bases
+        for kb_id in _persisted_knowledge_base_ids():
+            open_knowledge_base(kb_id)
+        self.knowledge_base = open_knowledge_base(DEFAULT_KNOWLEDGE_BASE_ID)
         api_key = "your_api_key"  # Replace with your actual API key
         self.reasoning_engine = Reasoner(knowledge_base=self.knowledge_base, api_key=api_key)
 
     def create_knowledge_base(self) -> KnowledgeBase:
-        kb_id = str(uuid.uuid4())
-        new_kb = KnowledgeBase(id=kb_id)
-        self.knowledge_bases[kb_id] = new_kb
-        return new_kb
+        return open_knowledge_base(str(uuid.uuid4()))
 
     def get_knowledge_base(self, kb_id: str) -> KnowledgeBase:
         return self.knowledge_bases.get(kb_id)
@@ -38,11 +84,29 @@ class KnowledgeBaseService:
             kb.add_neural_knowledge(item)
         return kb
 
-    def query_knowledge_base(self, kb_id: str, query: str) -> Dict[str, Any]:
+    def add_neural_knowledge_batch(self, kb_id: str, items: List[KnowledgeItem], batch_size: int = 64) -> KnowledgeBase:
+        kb = self.knowledge_bases.get(kb_id)
+        if kb:
+            kb.add_neural_knowledge_batch(items, batch_size=batch_size)
+        return kb
+
+    def add_neural_knowledge_stream(self, kb_id: str, items: Iterable[KnowledgeItem], batch_size: int = 64, chunk_size: int = 1024) -> Optional[int]:
+        kb = self.knowledge_bases.get(kb_id)
+        if not kb:
+            return None
+        return kb.add_neural_knowledge_stream(items, batch_size=batch_size, chunk_size=chunk_size)
+
+    def query_knowledge_base(self, kb_id: str, query: str, limit: Optional[int] = None, threshold: float = 0.5, fusion: str = "rrf", match: str = "exact") -> Dict[str, Any]:
+        kb = self.knowledge_bases.get(kb_id)
+        if not kb:
+            return None
+        return kb.query(query, limit=limit, threshold=threshold, fusion=fusion, match=match)
+
+    def search_literals(self, kb_id: str, text: str, prefix: bool = False, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         kb = self.knowledge_bases.get(kb_id)
         if not kb:
             return None
-        return kb.query(query)
+        return kb.search_literals(text, prefix=prefix, limit=limit)
 
     def reason(self, kb_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
         kb = self.knowledge_bases.get(kb_id)
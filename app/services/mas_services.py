@@ -11,6 +11,8 @@ from app.core.explanation_generator import ExplanationGenerator
 
 class MASService:
     def __init__(self, num_agents: int, num_states: int, state_size: int, action_size: int, ontology_path: str):
+        # A stable name, so the shared system resumes its message log after a restart
+        self.mas = MultiAgentSystem(num_agents, num_states, state_size, action_size, ontology_path, name="default")
         self.consistency_checker = ConsistencyChecker(knowledge_base, ontology)
         self.temporal_reasoning = TemporalReasoning(knowledge_base)
         self.distributed_knowledge = DistributedKnowledge(db_integration)
@@ -37,4 +39,13 @@ class MASService:
         self.mas.step()
 
     def run(self, steps: int):
-        self.mas.run(steps)
\ No newline at end of file
+        self.mas.run(steps)
+
+    async def astep(self):
+        await self.mas.astep()
+
+    async def arun(self, steps: int):
+        await self.mas.arun(steps)
+
+    def close(self):
+        self.mas.close()
\ No newline at end of file
@@ -5,10 +5,14 @@ from app.core.ontology_loader import OntologyLoader
 class OntologyService:
     def __init__(self):
         self.ontology = None
+        self.loader = None
+        self._query_results: Dict[tuple, List[Dict[str, Any]]] = {}
 
     def load_ontology(self, ontology_path: str) -> Ontology:
         loader = OntologyLoader()
         loader.load_ontology(ontology_path)
+        self.loader = loader
+        self._query_results = {}
         self.ontology = Ontology(
             concepts=[Concept(name=str(cls)) for cls in loader.get_classes()],
             relationships=[Relationship(name=str(prop), domain=str(loader.get_property_domain_range(prop)[0]), range=str(loader.get_property_domain_range(prop)[1])) for prop in loader.get_properties()],
@@ -38,9 +42,11 @@ class OntologyService:
         self.ontology.relationships.append(relationship)
         return self.ontology
 
-    def query_ontology(self, query: str) -> List[Dict[str, Any]]:
+    def query_ontology(self, query: str, bindings: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         if not self.ontology:
             raise ValueError("Ontology not loaded.")
-        loader = OntologyLoader()
-        loader.load_ontology(self.ontology.ontology_path)
-        return loader.query_ontology(query)
\ No newline at end of file
+        # The loaded ontology only changes through load_ontology, which clears these results
+        key = (query, tuple(sorted(bindings.items())) if bindings else ())
+        if key not in self._query_results:
+            self._query_results[key] = self.loader.query_ontology(query, bindings)
+        return list(self._query_results[key])
\ No newline at end of file
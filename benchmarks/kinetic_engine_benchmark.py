@@ -0,0 +1,54 @@
+# benchmarks/kinetic_engine_benchmark.py -- timings for the kinetic engine and StochasticKineticModel
+# Run from the repository root: python -m benchmarks.kinetic_engine_benchmark
+import argparse
+import time
+
+import numpy as np
+
+from app.core.kinetic_engine import KineticEngine, KineticRule
+from app.core.stochastic_kinetic_model import StochasticKineticModel
+
+
+def sir_engine() -> KineticEngine:
+    # Susceptible (0) -> Infected (1) -> Recovered (2) -> Susceptible
+    return KineticEngine(3, [
+        KineticRule(source=0, target=1, rate=0.3, catalyst=1),
+        KineticRule(source=1, target=2, rate=0.1),
+        KineticRule(source=2, target=0, rate=0.01),
+    ])
+
+
+def timed(label: str, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    print(f"{label:<48} {time.perf_counter() - start:8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the kinetic engine")
+    parser.add_argument("--population", type=int, default=100_000)
+    parser.add_argument("--steps", type=int, default=5_000)
+    parser.add_argument("--replicates", type=int, default=100)
+    args = parser.parse_args()
+
+    engine = sir_engine()
+    initial = [args.population - 100, 100, 0]
+    dt = 0.1
+    t_end = args.steps * dt
+
+    timed(f"mean_field  {args.steps} steps", engine.mean_field, initial, t_end, dt)
+    timed(f"tau_leap    {args.steps} steps x {args.replicates} runs", engine.tau_leap, initial, t_end, dt, args.replicates, 0)
+    small = [990, 10, 0]
+    timed(f"gillespie   pop 1000 x {args.replicates} runs", engine.gillespie, small, t_end, args.steps + 1, args.replicates, 0)
+
+    model = StochasticKineticModel(0, 3, engine)
+    for agent in range(args.population):
+        model.add_agent(agent)
+    observations = np.random.default_rng(0).random((args.population, 3))
+    timed(f"skm update  {args.population} agents", model.update, observations)
+    timed(f"skm predict {args.population} agents", model.predict_next_state)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,52 @@
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from fastapi import FastAPI
-from app.routers import agents, goals, plans, knowledge_bases, actions, tasks, planning, communication, mas_router, version_control, world_model_router
-from app.core.world_model_provider import get_world_model
-from app.core.world_model import WorldModel
+from app.routers import agents, goals, plans, knowledge_bases, actions, tasks, planning, communication, mas_router, version_control, world_model_router, health
+from app.core.config import settings
+from app.core.message_log import close_message_logs
+from app.core.model_registry import model_registry
+from app.core.sentence_transformer import DEFAULT_EMBEDDING_MODEL
+from app.core.startup import startup_registry
+from app.core.triple_store import close_stores
+from app.core.world_model_provider import close_world_model, get_world_model
 from app.services.agent_service import AgentService
+from app.services.knowledge_base_service import close_knowledge_bases
 from app.services.world_model_service import WorldModelService
 from app.routers.mdd_mas import router as mdd_router
 from app.routers.togaf_mdd import router as togaf_router
 from app.routers.tropos_mdd import router as tropos_router
 
-app = FastAPI()
+startup_registry.record_phase("imports", time.perf_counter() - _import_started)
+
+# Heavy components (WorldModel, ontology, FNRL base model, embedding model) are built
+# on first use; the warm-up below loads them in the background once the app is serving.
+startup_registry.register("world_model", get_world_model)
+startup_registry.register("ontology", lambda: get_world_model().ontology_manager.load())
+startup_registry.register("fnrl", lambda: get_world_model().fnrl_model.base_model)
+startup_registry.register(f"embeddings:{DEFAULT_EMBEDDING_MODEL}",
+                          lambda: model_registry.get_model(DEFAULT_EMBEDDING_MODEL, settings.embedding_backend),
+                          required=False)
 
-# Initialize WorldModel
-world_model = WorldModel()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_registry.record_phase("app_startup", time.perf_counter() - _import_started)
+    if settings.warm_up_on_startup:
+        asyncio.get_running_loop().run_in_executor(None, startup_registry.warm_up)
+    yield
+    if communication.get_agent_communication_service.cache_info().currsize:
+        await communication.get_agent_communication_service().close()
+    if mas_router.get_mas_service.cache_info().currsize:
+        mas_router.get_mas_service().close()
+    close_world_model()
+    close_knowledge_bases()
+    close_stores()
+    close_message_logs()
 
-# Initialize services
-agent_service = AgentService(world_model)
-world_model_service = WorldModelService(world_model)
+app = FastAPI(lifespan=lifespan)
 
 # Include routers
 app.include_router(agents.router, prefix="/api/v1/agents", tags=["agents"])
@@ -35,17 +66,21 @@ app.include_router(mdd_router, prefix="/api/v1/mdd", tags=["MDD"])
 app.include_router(togaf_router, prefix="/api/v1/togaf", tags=["TOGAF"])
 # Tropos router
 app.include_router(tropos_router, prefix="/api/v1/tropos", tags=["Tropos"])
+# Health checks
+app.include_router(health.router, prefix="/health", tags=["health"])
 # Dependency to get the WorldModel
 def get_world_model_dependency():
     return get_world_model()
 
 # Dependency to get the AgentService
+@lru_cache(maxsize=None)
 def get_agent_service():
-    return agent_service
+    return AgentService(get_world_model())
 
 # Dependency to get the WorldModelService
+@lru_cache(maxsize=None)
 def get_world_model_service():
-    return world_model_service
+    return WorldModelService(get_world_model())
 
 if __name__ == "__main__":
     import uvicorn
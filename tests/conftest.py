@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+# The tests never download models, and the ontology ships with the repo
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("ONTOLOGY_PATH", os.path.join(os.path.dirname(__file__), "..", "app", "core", "ontologies", "mabos.owl"))
+
+from app.core.config import get_settings
+from app.core.model_registry import model_registry
+from app.core.sentence_transformer import DEFAULT_EMBEDDING_MODEL
+
+EMBEDDING_DIM = 32
+
+
+class FakeEmbeddingModel:
+    """Bag-of-words embeddings: texts sharing words are similar, identical texts are identical."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, sentences, batch_size=32):
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        self.calls.append(len(texts))
+        vectors = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, hashlib.blake2b(word.encode(), digest_size=2).digest()[0] % EMBEDDING_DIM] += 1.0
+        return vectors[0] if isinstance(sentences, str) else vectors
+
+
+@pytest.fixture
+def fake_embeddings():
+    """Registers a fake model in place of the default embedding model, with a fresh cache."""
+    key = (DEFAULT_EMBEDDING_MODEL, get_settings().embedding_backend)
+    model = model_registry._models[key] = FakeEmbeddingModel()
+    model_registry._caches.pop(key, None)
+    yield model
+    model_registry._models.pop(key, None)
+    model_registry._caches.pop(key, None)
+
+
+@pytest.fixture
+def world_model():
+    """A fresh world model, closed afterwards so its background threads stop."""
+    from app.core.world_model import WorldModel
+
+    world_model = WorldModel()
+    yield world_model
+    world_model.close()
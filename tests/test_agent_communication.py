@@ -0,0 +1,82 @@
+import asyncio
+from uuid import UUID, uuid4
+
+import pytest
+
+from app.core.message_bus import MessageBus
+from app.models.action import Action
+from app.models.agent import Agent
+from app.models.message import Performative
+from app.services.agent_communication_service import AgentCommunicationService
+
+DELIVER = {"action": "deliver"}
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=10))
+
+
+class Directory:
+    """Stands in for an AgentService: agents keyed by UUID."""
+
+    def __init__(self, agents):
+        self.agents = {UUID(agent.agent_id): agent for agent in agents}
+
+    def get_agent(self, agent_id):
+        return self.agents.get(agent_id)
+
+    def get_all_agents(self):
+        return list(self.agents.values())
+
+
+class Beliefs:
+    """Stands in for the knowledge base service the communication service reports message contents to."""
+
+    def __init__(self):
+        self.updates = []
+
+    async def update_beliefs(self, agent_id, content):
+        self.updates.append(content)
+
+
+def courier(name, loaded):
+    agent = Agent(agent_id=str(uuid4()), name=name)
+    agent._set_belief_certainty("loaded", 1.0 if loaded else 0.0)
+    agent.add_action(Action(action_id="deliver", description="Deliver the parcel",
+                            preconditions={"loaded": 1.0}, effects={"delivered": 1.0}))
+    return agent
+
+
+def test_agents_bid_for_and_perform_requested_actions():
+    agent = courier("courier", loaded=True)
+    assert agent.can_handle_request("deliver") and agent.can_handle_request("Deliver the parcel")
+    assert not agent.can_handle_request("fly") and not courier("idle", loaded=False).can_handle_request(DELIVER)
+    assert run(agent.propose(DELIVER)) == {"agent_id": agent.agent_id, "action": "deliver", "cost": 1}
+    assert run(agent.execute_request(DELIVER)) == {"action": "deliver", "effects": {"delivered": 1.0}}
+    assert agent.beliefs.certainty("delivered") == 1.0 and run(agent.propose(DELIVER))["cost"] == 0
+    with pytest.raises(ValueError):
+        run(agent.execute_request("fly"))
+
+
+def test_a_contract_net_runs_through_the_service():
+    initiator, ready, unloaded = Agent(agent_id=str(uuid4()), name="shop"), courier("ready", True), courier("unloaded", False)
+
+    async def scenario():
+        service = AgentCommunicationService(Directory([initiator, ready, unloaded]), Beliefs(),
+                                            bus=MessageBus(lambda message: service._deliver_message(message)))
+        try:
+            conversation_id, answers = await service.call_for_proposals(
+                UUID(initiator.agent_id), [UUID(ready.agent_id), UUID(unloaded.agent_id)], DELIVER, timeout=5)
+            results = await service.award_contract(conversation_id, [UUID(ready.agent_id)], DELIVER, timeout=5)
+            return answers, results
+        finally:
+            await service.close()
+
+    answers, results = run(scenario())
+    by_sender = {str(answer.sender_id): answer for answer in answers}
+    assert by_sender[ready.agent_id].performative == Performative.PROPOSE
+    assert by_sender[ready.agent_id].content == {"agent_id": ready.agent_id, "action": "deliver", "cost": 1}
+    assert by_sender[unloaded.agent_id].performative == Performative.REFUSE
+    [result] = results
+    assert result.performative == Performative.INFORM and result.content == {"action": "deliver", "effects": {"delivered": 1.0}}
+    assert ready.beliefs.certainty("delivered") == 1.0 and unloaded.beliefs.certainty("delivered") is None
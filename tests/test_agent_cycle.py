@@ -0,0 +1,124 @@
+from typing import List
+
+import pytest
+from pydantic import PrivateAttr
+
+from app.core.agent_view import AgentView
+from app.models.action import Action
+from app.models.agent import Agent
+from app.models.belief import Belief
+from app.models.desire import Desire
+from app.models.multiagent_system import MultiAgentSystem
+
+
+class CountingAgent(Agent):
+    """Records which stages of the cycle ran."""
+
+    _calls: List[str] = PrivateAttr(default_factory=list)
+
+    def perceive(self, observations):
+        self._calls.append("perceive")
+        super().perceive(observations)
+
+    def deliberate(self):
+        self._calls.append("deliberate")
+        super().deliberate()
+
+    def plan(self):
+        self._calls.append("plan")
+        super().plan()
+
+    def calls(self) -> List[str]:
+        calls, self._calls = self._calls, []
+        return calls
+
+
+@pytest.fixture
+def agent():
+    agent = CountingAgent(agent_id="a", name="a")
+    agent.run_cycle()
+    agent.calls()
+    return agent
+
+
+def test_an_idle_agent_runs_nothing(agent):
+    assert not agent.has_pending_changes()
+    assert agent.run_cycle() == []
+    assert agent.calls() == []
+
+
+def test_only_stages_reading_a_changed_belief_rerun(agent):
+    agent.add_action(Action(action_id="enter", description="enter", preconditions={"door_open": 1.0},
+                            effects={"inside": 1.0}))
+    agent.run_cycle()
+    assert agent.calls() == ["plan"]
+
+    agent.add_belief(Belief(description="weather", certainty=1.0, value="sunny"))
+    assert agent.has_pending_changes()
+    agent.run_cycle()
+    assert agent.calls() == []
+
+    agent.add_belief(Belief(description="door_open", certainty=1.0, value=True))
+    agent.run_cycle()
+    assert agent.calls() == ["plan"]
+
+
+def test_a_desire_change_deliberates_without_planning(agent):
+    agent.add_desire(Desire(desire_id="d", description="explore", priority=1.0, status="suspended"))
+    agent.run_cycle()
+    assert agent.calls() == ["deliberate"]
+    agent.run_cycle()
+    assert agent.calls() == []
+
+
+def test_execution_reports_only_real_belief_changes(agent):
+    agent.add_belief(Belief(description="door_open", certainty=1.0, value=True))
+    agent._set_belief_certainty("door_open", 1.0)
+    agent._set_belief_certainty("inside", 0.5)
+    assert agent._changed_beliefs == {"door_open", "inside"}
+    agent.run_cycle()
+    agent._set_belief_certainty("inside", 0.5)
+    assert not agent.has_pending_changes()
+
+
+def test_perception_updates_only_changed_observations(agent):
+    agent.perceive({"x": 1, "y": 2})
+    assert agent._changed_beliefs == {"x", "y"}
+    agent.run_cycle()
+    agent.perceive({"x": 1, "y": 3})
+    assert agent._changed_beliefs == {"y"}
+    assert agent.beliefs.get("y") == 3
+
+
+def test_perceiving_a_view_never_computes_lazy_fields(agent):
+    def unavailable():
+        raise AssertionError("lazy field computed")
+
+    agent.perceive(AgentView({"state": {"tick": 1}}, {"ontology_info": unavailable}))
+    assert agent.beliefs.get("state") == {"tick": 1}
+
+
+@pytest.fixture
+def mas():
+    mas = MultiAgentSystem(num_agents=0, num_states=4, state_size=4, action_size=2, ontology_path="")
+    yield mas
+    mas.world_model.close()
+
+
+def test_step_reperceives_only_agents_whose_view_moved(mas):
+    first = mas.add_agent(CountingAgent(agent_id="", name="first"))
+    second = mas.add_agent(CountingAgent(agent_id="", name="second"))
+    ids = list(mas.agents)
+    mas.step()
+    assert "perceive" in first.calls() and "perceive" in second.calls()
+
+    mas.step()
+    assert first.calls() == [] and second.calls() == []
+
+    mas.world_model.update_agent(ids[0], {"mood": "curious"})
+    mas.step()
+    assert first.calls()[0] == "perceive" and second.calls() == []
+
+    mas.update_world_model({"weather": "rain"})
+    mas.step()
+    assert first.calls()[0] == "perceive" and second.calls()[0] == "perceive"
@@ -0,0 +1,89 @@
+import pickle
+from types import MappingProxyType
+from uuid import uuid4
+
+import pytest
+
+from app.core.agent_view import AgentView, PerceptionScope, to_plain
+from app.models.agent import Agent
+
+
+def test_scopes_filter_by_radius_roles_and_topics():
+    scope = PerceptionScope(radius=5, roles=["buyer"], topics=["orders"])
+    assert scope.can_see([0, 0], {"position": [3, 4]})
+    assert not scope.can_see([0, 0], {"position": [6, 0]})
+    assert scope.can_see(None, {"position": [60, 0]})
+    assert not scope.can_see([0, 0], {"visible_to_roles": ["seller"]})
+    assert scope.can_see([0, 0], {"visible_to_roles": ["seller", "buyer"], "topic": "orders"})
+    assert not scope.can_see([0, 0], {"topics": ["billing"]})
+    assert PerceptionScope.from_agent({"role": "buyer", "perception_radius": 2}).roles == ["buyer"]
+
+
+def test_lazy_fields_are_computed_once_and_only_when_read():
+    calls = []
+    view = AgentView({"state": MappingProxyType({"tick": 1})}, {"forecast": lambda: calls.append(1) or "rain"})
+    assert view.to_dict() == {"state": {"tick": 1}} and calls == []
+    assert view["forecast"] == view["forecast"] == "rain" and calls == [1]
+    assert pickle.loads(pickle.dumps(view)) == {"state": {"tick": 1}}
+    with pytest.raises(KeyError):
+        view["missing"]
+
+
+def test_plain_copies_compare_equal_to_their_proxies():
+    relationships = (MappingProxyType({"subject": "a"}),)
+    copy = to_plain(relationships)
+    assert copy == relationships and type(copy[0]) is dict
+    assert to_plain(MappingProxyType({"nested": MappingProxyType({"x": 1})})) == {"nested": {"x": 1}}
+
+
+@pytest.fixture
+def world(world_model):
+    agent_id = uuid4()
+    world_model.add_agent(agent_id, {"position": [0, 0], "perception_radius": 5})
+    world_model.add_object("near", {"position": [1, 1]})
+    world_model.add_object("far", {"position": [100, 100]})
+    world_model.add_object("unplaced", {"colour": "red"})
+    return world_model, agent_id
+
+
+def test_views_hold_only_visible_objects_and_stay_stable(world):
+    world_model, agent_id = world
+    view = world_model.get_agent_view(agent_id)
+    assert set(view["visible_objects"]) == {"near", "unplaced"}
+    with pytest.raises(TypeError):
+        view["state"]["weather"] = "rain"
+    world_model.update_object("near", {"position": [2, 2]})
+    assert view["visible_objects"]["near"]["position"] == [1, 1]
+
+
+def test_view_versions_move_only_with_visible_changes(world):
+    world_model, agent_id = world
+    version = world_model.get_agent_view(agent_id).version
+    assert world_model.get_agent_view(agent_id).version == version
+    world_model.update_object("far", {"colour": "blue"})
+    assert world_model.get_agent_view(agent_id).version == version
+    world_model.update_object("near", {"colour": "blue"})
+    moved = world_model.get_agent_view(agent_id).version
+    assert moved != version
+    world_model.update_state({"weather": "rain"})
+    assert world_model.get_agent_view(agent_id).version != moved
+
+
+def test_perception_skips_seen_versions_and_copies_only_changed_fields(world):
+    world_model, agent_id = world
+    agent = Agent(agent_id=str(agent_id), name="viewer")
+    agent.perceive(world_model.get_agent_view(agent_id))
+    state = agent.current_state
+    assert set(state) == {"state", "agent", "visible_objects", "relationships"}
+    assert type(state["visible_objects"]["near"]) is dict
+    agent.run_cycle()
+
+    agent.perceive(world_model.get_agent_view(agent_id))
+    assert agent.current_state is state and not agent.has_pending_changes()
+
+    world_model.update_state({"weather": "rain"})
+    agent.perceive(world_model.get_agent_view(agent_id))
+    assert agent._changed_beliefs == {"state"}
+    assert agent.current_state["visible_objects"] is state["visible_objects"]
+    assert agent.current_state["state"] == {"weather": "rain"}
+    pickle.dumps(agent)
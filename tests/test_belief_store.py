@@ -0,0 +1,66 @@
+from app.models.agent import Agent, ProactiveAgent
+from app.models.belief import Belief
+from app.models.belief_store import BeliefStore, certainty_band
+
+
+def belief(description, certainty=1.0, value=None, source=None):
+    return Belief(description=description, certainty=certainty, value=value, source=source)
+
+
+def descriptions(beliefs):
+    return sorted(b.description for b in beliefs)
+
+
+def test_certainty_bands_cover_the_unit_interval():
+    assert certainty_band(0.0) == 0 and certainty_band(0.55) == 5 and certainty_band(1.0) == 9
+
+
+def test_upsert_replaces_by_description():
+    store = BeliefStore([belief("a", 0.2), belief("b", 0.9, source="perception")])
+    assert not store.upsert(belief("a", 0.2))
+    assert store.upsert(belief("a", 0.95, source="perception"))
+    assert len(store) == 2 and store.certainty("a") == 0.95
+    assert descriptions(store.with_certainty(0.9, 1.0)) == ["a", "b"]
+    assert store.with_certainty(0.0, 0.5) == []
+    assert descriptions(store.from_source("perception")) == ["a", "b"]
+    assert store.from_source(None) == []
+
+
+def test_upserting_a_belief_mutated_in_place_reindexes_it():
+    store = BeliefStore()
+    stored = belief("a", 0.1, source="message")
+    store.upsert(stored)
+    stored.certainty = 0.8
+    stored.source = "inference"
+    assert store.upsert(stored)
+    assert descriptions(store.with_certainty(0.8, 1.0)) == ["a"]
+    assert store.with_certainty(0.0, 0.2) == []
+    assert descriptions(store.from_source("inference")) == ["a"] and store.from_source("message") == []
+    assert store.discard("a") and store.with_certainty() == []
+
+
+def test_updates_move_beliefs_between_bands():
+    store = BeliefStore()
+    assert store.update_certainty("a", 0.3, source="action")
+    assert not store.update_certainty("a", 0.3)
+    assert store.update_certainty("a", 0.7)
+    assert descriptions(store.with_certainty(0.6, 0.8)) == ["a"] and store.with_certainty(0.2, 0.4) == []
+    assert store.update_value("a", "open") and not store.update_value("a", "open")
+    assert store.get("a") == "open" and store.get("missing", 0) == 0
+
+
+def test_agents_validate_and_serialize_beliefs_as_a_list():
+    agent = Agent(agent_id="a", name="a", beliefs=[{"description": "x", "certainty": 0.5, "value": 1}])
+    assert isinstance(agent.beliefs, BeliefStore)
+    dumped = agent.model_dump()["beliefs"]
+    assert dumped == [{"description": "x", "certainty": 0.5, "value": 1, "source": None}]
+    restored = Agent.model_validate_json(agent.model_dump_json())
+    assert isinstance(restored.beliefs, BeliefStore) and restored.beliefs.certainty("x") == 0.5
+    assert Agent(agent_id="b", name="b", beliefs=agent.beliefs).beliefs is agent.beliefs
+
+
+def test_agent_json_schemas_describe_beliefs_as_a_list():
+    for mode in ("validation", "serialization"):
+        schema = ProactiveAgent.model_json_schema(mode=mode)
+        beliefs = schema["properties"]["beliefs"]
+        assert beliefs["type"] == "array" and beliefs["items"] == {"$ref": "#/$defs/Belief"}
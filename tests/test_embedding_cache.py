@@ -0,0 +1,90 @@
+import multiprocessing
+
+import numpy as np
+
+from app.core.embedding_cache import KEY_SIZE, DiskEmbeddingStore, EmbeddingCache, embedding_key
+from app.core.sentence_transformer import SentenceTransformerWrapper
+
+
+def vectors(count, dim=4, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def test_keys_depend_on_model_and_text():
+    assert len(embedding_key("model", "text")) == KEY_SIZE
+    assert embedding_key("model", "text") == embedding_key("model", "text")
+    assert embedding_key("model", "text") != embedding_key("other", "text")
+    assert embedding_key("model", "text") != embedding_key("model", "texts")
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = EmbeddingCache("model", max_entries=2)
+    cache.put_many(["a", "b"], vectors(2))
+    cache.get_many(["a"])
+    cache.put_many(["c"], vectors(1))
+    a, b, c = cache.get_many(["a", "b", "c"])
+    assert a is not None and b is None and c is not None
+    assert not a.flags.writeable
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+
+def test_disk_cache_survives_a_new_instance(tmp_path):
+    data = vectors(3)
+    cache = EmbeddingCache("org/model", max_entries=10, cache_dir=str(tmp_path), backend="onnx")
+    cache.put_many(["a", "b", "c"], data)
+    cache.flush()
+    assert (tmp_path / "onnx" / "org__model" / "meta.json").exists()
+
+    reopened = EmbeddingCache("org/model", max_entries=10, cache_dir=str(tmp_path), backend="onnx")
+    np.testing.assert_array_equal(np.stack(reopened.get_many(["a", "b", "c"])), data)
+    assert EmbeddingCache("org/model", cache_dir=str(tmp_path), backend="torch").get_many(["a"]) == [None]
+
+
+def test_store_truncates_a_torn_key_and_grows(tmp_path):
+    store = DiskEmbeddingStore(str(tmp_path), dim=4, initial_capacity=2)
+    keys = [embedding_key("m", str(i)) for i in range(5)]
+    store.put_many(keys, vectors(5))
+    store.close()
+    with open(tmp_path / "keys.bin", "ab") as keys_file:
+        keys_file.write(b"\x01\x02\x03")
+
+    store = DiskEmbeddingStore(str(tmp_path), dim=4)
+    assert len(store) == 5
+    np.testing.assert_array_equal(store.get(keys[4]), vectors(5)[4])
+    store.close()
+
+
+def _append_rows(directory, worker):
+    store = DiskEmbeddingStore(directory, dim=4, initial_capacity=1)
+    for batch in range(20):
+        keys = [embedding_key("m", f"{worker}-{batch}-{i}") for i in range(5)]
+        store.put_many(keys, np.full((5, 4), worker * 1000 + batch, dtype=np.float32))
+    store.close()
+
+
+def test_processes_append_to_one_store_without_clobbering(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_append_rows, args=(str(tmp_path), worker)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+        assert process.exitcode == 0
+
+    store = DiskEmbeddingStore(str(tmp_path), dim=4)
+    assert len(store) == 300
+    for worker in range(3):
+        for batch in range(20):
+            vector = store.get(embedding_key("m", f"{worker}-{batch}-3"))
+            assert vector is not None and (vector == worker * 1000 + batch).all()
+    store.close()
+
+
+def test_wrapper_encodes_each_missing_text_once(fake_embeddings):
+    wrapper = SentenceTransformerWrapper()
+    first = wrapper.encode(["alpha beta", "gamma", "alpha beta"])
+    assert fake_embeddings.calls == [2]
+    second = wrapper.encode(["gamma", "alpha beta"])
+    assert fake_embeddings.calls == [2]
+    np.testing.assert_array_equal(second, first[[1, 0]])
+    assert wrapper.encode("gamma").shape == (first.shape[1],)
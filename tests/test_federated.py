@@ -0,0 +1,141 @@
+import threading
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.core.federated import FederatedTrainer, _train_shard, compress_delta, decompress_delta, local_update
+
+NUM_ACTIONS = 3
+HIDDEN = 4
+
+
+class FakeFNRL:
+    """Embeds a state as a fixed random vector per text; heads are kept as NumPy arrays."""
+
+    def __init__(self, clusters=None, gate=None):
+        self.clusters = clusters or {}
+        self.gate = gate
+        self.heads = {}
+        self.rng = np.random.default_rng(0)
+
+    def embed(self, states):
+        if self.gate is not None:
+            self.gate.wait(10)
+        return torch.tensor(np.stack([np.random.default_rng(zlib.crc32(state.encode())).normal(size=HIDDEN) for state in states]),
+                            dtype=torch.float32)
+
+    def head_key(self, agent_id):
+        return self.clusters.get(agent_id, agent_id)
+
+    def get_head_weights(self, key):
+        if key not in self.heads:
+            self.heads[key] = (self.rng.normal(size=(NUM_ACTIONS, HIDDEN)).astype(np.float32), np.zeros(NUM_ACTIONS, np.float32))
+        weight, bias = self.heads[key]
+        return weight.copy(), bias.copy()
+
+    def set_head_weights(self, key, weight, bias):
+        self.heads[key] = (np.asarray(weight, np.float32), np.asarray(bias, np.float32))
+
+
+EXAMPLES = {
+    "a": (["idle", "busy", "moving"], [0, 1, 2]),
+    "b": (["idle", "idle"], [1, 1]),
+    "c": (["state"], [2]),
+}
+
+
+def expected_heads(fnrl, config):
+    # FedAvg computed directly: the example-weighted mean of each cluster's client deltas
+    heads = {key: fnrl.get_head_weights(key) for key in {fnrl.head_key(agent) for agent in EXAMPLES}}
+    sums = {}
+    for agent, (states, actions) in EXAMPLES.items():
+        key = fnrl.head_key(agent)
+        weight, bias = heads[key]
+        deltas = local_update(weight, bias, fnrl.embed(states).numpy(), np.asarray(actions),
+                              config["epochs"], config["learning_rate"], config["mu"])
+        entry = sums.setdefault(key, [0, 0, 0])
+        entry[0] = entry[0] + len(actions) * deltas[0]
+        entry[1] = entry[1] + len(actions) * deltas[1]
+        entry[2] += len(actions)
+    return {key: (heads[key][0] + w / n, heads[key][1] + b / n) for key, (w, b, n) in sums.items()}
+
+
+def test_compression_round_trips():
+    delta = np.random.default_rng(1).normal(size=(4, 5)).astype(np.float32)
+    assert np.array_equal(decompress_delta(compress_delta(delta, "none")), delta)
+    assert np.allclose(decompress_delta(compress_delta(delta, "fp16")), delta, atol=1e-2)
+    sparse = decompress_delta(compress_delta(delta, "topk", topk_ratio=0.1))
+    assert np.count_nonzero(sparse) == 2 and sparse.shape == delta.shape
+    assert set(np.flatnonzero(sparse)) == set(np.argsort(np.abs(delta).ravel())[-2:])
+    with pytest.raises(ValueError):
+        compress_delta(delta, "zip")
+
+
+def test_shards_return_one_compressed_payload_per_cluster():
+    fnrl = FakeFNRL()
+    weight, bias = fnrl.get_head_weights("k")
+    clients = [("k", fnrl.embed(["idle", "busy"]).numpy(), np.array([0, 1])),
+               ("k", fnrl.embed(["moving"]).numpy(), np.array([2]))]
+    config = {"epochs": 2, "learning_rate": 0.1, "mu": 0.0, "compression": "fp16", "topk_ratio": 0.01}
+    partial, raw_bytes, compressed_bytes = _train_shard((clients, {"k": (weight, bias)}, config))
+    (payloads, count), = partial.values()
+    assert count == 3 and all(payload["values"].dtype == np.float16 for payload in payloads)
+    assert compressed_bytes == raw_bytes // 2 == sum(payload["values"].nbytes for payload in payloads)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_a_round_averages_client_deltas_per_cluster(max_workers):
+    fnrl = FakeFNRL(clusters={"a": "shared", "b": "shared"})
+    trainer = FederatedTrainer(fnrl, compression="none", local_epochs=3, max_workers=max_workers)
+    try:
+        expected = expected_heads(fnrl, trainer.config)
+        for agent, (states, actions) in EXAMPLES.items():
+            trainer.add_examples(agent, states, actions)
+        stats = trainer.run_round()
+        assert stats["clients"] == 3 and stats["clusters"] == 2 and stats["examples"] == 6
+        assert stats["compressed_bytes"] == stats["raw_bytes"]
+        for key, (weight, bias) in expected.items():
+            assert np.allclose(fnrl.heads[key][0], weight, atol=1e-5)
+            assert np.allclose(fnrl.heads[key][1], bias, atol=1e-5)
+        assert trainer.run_round() == {}
+    finally:
+        trainer.close()
+
+
+def test_compressed_rounds_exchange_fewer_bytes():
+    fnrl = FakeFNRL()
+    trainer = FederatedTrainer(fnrl, compression="topk", topk_ratio=0.25, max_workers=1)
+    for agent, (states, actions) in EXAMPLES.items():
+        trainer.add_examples(agent, states, actions)
+    stats = trainer.run_round()
+    assert 0 < stats["compressed_bytes"] < stats["raw_bytes"]
+    trainer.close()
+
+
+def test_rounds_run_in_the_background_when_due():
+    fnrl = FakeFNRL()
+    trainer = FederatedTrainer(fnrl, round_interval=2, min_clients=2, max_workers=1)
+    trainer.add_examples("a", *EXAMPLES["a"])
+    assert not trainer.maybe_run_round(2)
+    trainer.add_examples("b", *EXAMPLES["b"])
+    assert not trainer.maybe_run_round(3)
+    assert trainer.maybe_run_round(4)
+    assert trainer.flush_rounds(timeout=10)
+    assert trainer.rounds == 1 and trainer.last_round_stats["clients"] == 2
+    trainer.close()
+
+
+def test_close_gives_up_on_a_round_that_overruns_its_timeout():
+    gate = threading.Event()
+    trainer = FederatedTrainer(FakeFNRL(gate=gate), round_interval=1, max_workers=1, close_timeout=0.1)
+    trainer.add_examples("a", *EXAMPLES["a"])
+    assert trainer.maybe_run_round(1)
+    started = time.monotonic()
+    trainer.close()
+    assert time.monotonic() - started < 5
+    gate.set()
+    assert trainer.flush_rounds(timeout=10) and trainer.rounds == 1
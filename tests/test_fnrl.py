@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app.core.fnrl import FNRL, PredictionBatcher
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "idle", "busy", "moving", "state", "agent"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    # A two-layer BERT with random weights, so the test runs on CPU without downloads
+    path = tmp_path_factory.mktemp("tiny-bert")
+    (path / "vocab.txt").write_text("\n".join(VOCAB) + "\n")
+    transformers.BertTokenizerFast(vocab_file=str(path / "vocab.txt")).save_pretrained(path)
+    config = transformers.BertConfig(vocab_size=len(VOCAB), hidden_size=16, num_hidden_layers=2,
+                                     num_attention_heads=2, intermediate_size=32, max_position_embeddings=32)
+    torch.manual_seed(0)
+    transformers.BertModel(config).save_pretrained(path)
+    return str(path)
+
+
+def test_predict_matches_predict_batch(tiny_model):
+    model = FNRL(num_agents=2, model_name=tiny_model, num_actions=3)
+    single = model.predict(0, "idle")
+    batch = model.predict_batch([0, 1], ["idle", "busy"])
+    assert single.shape == (1, 3)
+    assert batch.shape == (2, 3)
+    np.testing.assert_allclose(batch.sum(axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_allclose(single[0], batch[0], rtol=1e-5)
+
+
+def test_single_caller_does_not_wait_for_a_batch(tiny_model):
+    model = FNRL(model_name=tiny_model, num_actions=3, max_delay=5.0)
+    model.predict(0, "idle")
+    started = time.perf_counter()
+    model.predict(0, "busy")
+    assert time.perf_counter() - started < 2.5
+
+
+def test_training_moves_the_policy_towards_the_taken_action(tiny_model):
+    model = FNRL(model_name=tiny_model, num_actions=3, learning_rate=0.1)
+    before = model.predict(0, "moving")[0, 2]
+    for _ in range(20):
+        model.train(0, ["moving"], [2])
+    assert model.flush_training(timeout=30)
+    assert model.predict(0, "moving")[0, 2] > before
+
+
+def test_batcher_coalesces_concurrent_callers():
+    batches = []
+
+    def predict_batch(agent_ids, states):
+        batches.append(len(agent_ids))
+        time.sleep(0.01)
+        return [np.array([state]) for state in states]
+
+    batcher = PredictionBatcher(predict_batch, max_batch=64, max_delay=0.05)
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda i: batcher.submit(i, i).result(), range(64)))
+    assert [result[0] for result in results] == list(range(64))
+    assert sum(batches) == 64
+    assert len(batches) < 64
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from app.core.hybrid_query import reciprocal_rank_fusion, run_legs, weighted_fusion
+from app.models.knowledge_base import KnowledgeBase, KnowledgeItem
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    scores = reciprocal_rank_fusion({"symbolic": ["a", "b"], "neural": ["b", "c"]}, k=1)
+    assert scores == pytest.approx({"a": 1 / 2, "b": 1 / 3 + 1 / 2, "c": 1 / 3})
+    weighted = reciprocal_rank_fusion({"symbolic": ["a"], "neural": ["b"]}, k=1, weights={"neural": 3.0})
+    assert weighted["b"] == pytest.approx(3 * weighted["a"])
+
+
+def test_weighted_fusion_sums_weighted_scores():
+    scores = weighted_fusion({"symbolic": {"a": 1.0}, "neural": {"a": 0.5, "b": 0.9}}, weights={"symbolic": 0.5})
+    assert scores == pytest.approx({"a": 1.0, "b": 0.9})
+
+
+def test_run_legs_stops_once_a_leg_is_sufficient():
+    release = threading.Event()
+
+    def slow():
+        release.wait(10)
+        return {"late": 1}
+
+    try:
+        results = run_legs({"slow": slow, "fast": lambda: {"hit": 1}}, lambda result: "hit" in result)
+    finally:
+        release.set()
+    assert results == {"slow": {}, "fast": {"hit": 1}}
+
+
+def test_run_legs_waits_for_every_leg_otherwise():
+    results = run_legs({"a": lambda: {"x": 1}, "b": lambda: {"y": 2}}, lambda result: False)
+    assert results == {"a": {"x": 1}, "b": {"y": 2}}
+
+
+@pytest.fixture
+def kb(fake_embeddings):
+    kb = KnowledgeBase(id="hybrid")
+    kb.add_symbolic_knowledge(KnowledgeItem(id="rule", content="red apple"))
+    kb.add_neural_knowledge_batch([
+        KnowledgeItem(id="rule", content="red apple"),
+        KnowledgeItem(id="fruit", content="red apple pie"),
+        KnowledgeItem(id="car", content="blue car"),
+    ])
+    return kb
+
+
+def test_query_fuses_both_legs(kb):
+    results = kb.query("red apple", threshold=0.1)
+    assert list(results["symbolic"]) == ["rule"]
+    assert list(results["combined"])[0] == "rule"
+    assert "car" not in results["combined"]
+    assert results["combined"]["rule"]["value"] == "red apple"
+
+    weighted = kb.query("red apple", threshold=0.1, fusion="weighted")
+    assert weighted["combined"]["rule"]["score"] == pytest.approx(1.0 + weighted["neural"]["rule"]["similarity"])
+    with pytest.raises(ValueError):
+        kb.query("red apple", fusion="max")
+
+
+def test_query_respects_the_limit(kb):
+    results = kb.query("red apple", limit=1, threshold=0.1)
+    assert len(results["neural"]) == 1 and len(results["combined"]) == 1
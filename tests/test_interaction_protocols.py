@@ -0,0 +1,156 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.core.interaction_protocols import FIPA_CONTRACT_NET, FIPA_REQUEST, ProtocolEngine, ProtocolViolation
+from app.models.message import ACLMessage, Performative
+
+INITIATOR = uuid4()
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=10))
+
+
+def answer(message, performative, content=None):
+    return ACLMessage(sender_id=message.receiver_id, receiver_id=message.sender_id, performative=performative,
+                      content=content, conversation_id=message.conversation_id, protocol=message.protocol)
+
+
+class Participants:
+    """A send function whose receivers answer each message with the performatives they were given."""
+
+    def __init__(self, answers=None):
+        self.answers = answers or {}
+        self.sent = []
+        self.engine = ProtocolEngine(self.send, tick=0.01)
+
+    async def send(self, messages):
+        messages = list(messages)
+        self.sent.extend(messages)
+        loop = asyncio.get_running_loop()
+        for message in messages:
+            for performative in self.answers.get((message.receiver_id, message.performative), ()):
+                loop.call_soon(self.engine.observe, answer(message, performative, str(message.receiver_id)))
+        return len(messages)
+
+
+def test_request_runs_through_agree_to_inform():
+    participant = uuid4()
+    participants = Participants({(participant, Performative.REQUEST): (Performative.AGREE, Performative.INFORM)})
+
+    async def scenario():
+        result = await participants.engine.request(INITIATOR, participant, "task", timeout=5)
+        await participants.engine.close()
+        return result
+
+    result = run(scenario())
+    assert result.performative == Performative.INFORM
+    assert participants.engine.conversations == {}
+
+
+def test_messages_outside_the_protocol_are_rejected():
+    engine = ProtocolEngine(lambda messages: None)
+    participant = uuid4()
+    request = ACLMessage(sender_id=INITIATOR, receiver_id=participant, performative=Performative.REQUEST,
+                         content="task", conversation_id=uuid4(), protocol=FIPA_REQUEST)
+    with pytest.raises(ProtocolViolation):
+        engine.observe(answer(request, Performative.INFORM))
+    engine.observe(request)
+    assert engine.state(request.conversation_id)["participants"] == {participant: "requested"}
+    with pytest.raises(ProtocolViolation):
+        engine.observe(answer(request, Performative.ACCEPT_PROPOSAL))
+    engine.observe(answer(request, Performative.INFORM))
+    # The conversation is finished and dropped, so a second answer opens nothing
+    with pytest.raises(ProtocolViolation):
+        engine.observe(answer(request, Performative.INFORM))
+    assert engine.violations == 3
+
+
+def test_contract_net_call_award_and_results():
+    bidders = [uuid4() for _ in range(3)]
+    participants = Participants({
+        (bidders[0], Performative.CFP): (Performative.PROPOSE,),
+        (bidders[1], Performative.CFP): (Performative.PROPOSE,),
+        (bidders[2], Performative.CFP): (Performative.REFUSE,),
+        (bidders[0], Performative.ACCEPT_PROPOSAL): (Performative.INFORM,),
+    })
+    engine = participants.engine
+
+    async def scenario():
+        conversation_id, bids = await engine.call_for_proposals(INITIATOR, bidders, "task", timeout=5)
+        states = engine.state(conversation_id)["participants"]
+        results = await engine.award(conversation_id, [bidders[0]], timeout=5)
+        await engine.close()
+        return conversation_id, bids, states, results
+
+    conversation_id, bids, states, results = run(scenario())
+    assert sorted(bid.performative.value for bid in bids) == ["propose", "propose", "refuse"]
+    assert states == {bidders[0]: "proposed", bidders[1]: "proposed", bidders[2]: "refused"}
+    assert [result.performative for result in results] == [Performative.INFORM]
+    assert [message.performative for message in participants.sent[3:]] == [Performative.ACCEPT_PROPOSAL,
+                                                                          Performative.REJECT_PROPOSAL]
+    assert engine.state(conversation_id) is None
+
+
+def test_silent_bidders_time_out():
+    bidders = [uuid4(), uuid4()]
+    participants = Participants({(bidders[0], Performative.CFP): (Performative.REFUSE,)})
+
+    async def scenario():
+        conversation_id, bids = await participants.engine.call_for_proposals(INITIATOR, bidders, "task", timeout=0.05)
+        await participants.engine.close()
+        return conversation_id, bids
+
+    conversation_id, bids = run(scenario())
+    assert [bid.performative for bid in bids] == [Performative.REFUSE]
+    assert participants.engine.state(conversation_id) is None
+
+
+def test_open_proposals_are_rejected_after_the_decision_deadline():
+    bidder = uuid4()
+    participants = Participants({(bidder, Performative.CFP): (Performative.PROPOSE,)})
+    engine = participants.engine
+
+    async def scenario():
+        conversation_id, _ = await engine.call_for_proposals(INITIATOR, [bidder], "task", timeout=5,
+                                                             decision_timeout=0.05)
+        assert engine.state(conversation_id)["participants"] == {bidder: "proposed"}
+        while engine.state(conversation_id) is not None:
+            await asyncio.sleep(0.01)
+        await engine.close()
+        return conversation_id
+
+    conversation_id = run(scenario())
+    rejection = participants.sent[-1]
+    assert rejection.performative == Performative.REJECT_PROPOSAL
+    assert rejection.receiver_id == bidder and rejection.conversation_id == conversation_id
+    with pytest.raises(ProtocolViolation):
+        run(engine.award(conversation_id, [bidder]))
+
+
+def test_cancelled_initiators_drop_their_conversations():
+    participants = Participants()
+    engine = participants.engine
+
+    async def scenario():
+        task = asyncio.ensure_future(engine.request(INITIATOR, uuid4(), "task", timeout=60))
+        await asyncio.sleep(0.01)
+        assert len(engine.conversations) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await engine.close()
+
+    run(scenario())
+    assert engine.conversations == {}
+    assert len(engine.timers) == 0
+
+
+def test_contract_net_protocol_name_is_tracked():
+    engine = ProtocolEngine(lambda messages: None)
+    cfp = ACLMessage(sender_id=INITIATOR, receiver_id=uuid4(), performative=Performative.CFP, content="task",
+                     conversation_id=uuid4())
+    engine.observe(cfp)
+    assert engine.state(cfp.conversation_id)["protocol"] == FIPA_CONTRACT_NET
@@ -0,0 +1,131 @@
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.core.kinetic_engine import KineticEngine, KineticRule
+from app.core.stochastic_kinetic_model import StochasticKineticModel
+
+
+def decay(rate=0.5):
+    return KineticEngine(2, [KineticRule(source=0, target=1, rate=rate)])
+
+
+def infection(rate=2.0):
+    return KineticEngine(2, [KineticRule(source=0, target=1, rate=rate, catalyst=1)])
+
+
+def test_transition_matrices_match_the_closed_form():
+    engine = decay()
+    generator = engine.generator()
+    assert np.allclose(generator.sum(axis=1), 0)
+    matrix = engine.transition_matrix(3.0)
+    assert np.allclose(matrix, [[np.exp(-1.5), 1 - np.exp(-1.5)], [0, 1]])
+    assert np.allclose(engine.transition_matrix(40.0).sum(axis=1), 1)
+
+
+def test_catalysed_rules_scale_with_the_population():
+    engine = infection()
+    assert np.allclose(engine.propensities([[10, 0], [5, 5]]), [[0], [5.0]])
+    assert np.allclose(engine.generator([5, 5])[0], [-1.0, 1.0])
+    with pytest.raises(ValueError):
+        engine.generator()
+    with pytest.raises(ValueError):
+        KineticEngine(2, [KineticRule(source=0, target=2, rate=1)])
+
+
+@pytest.mark.parametrize("method", ["gillespie", "tau_leap", "mean_field"])
+def test_forecasts_conserve_agents_and_follow_the_mean(method):
+    times, counts = decay(0.5).forecast([1000, 0], t_end=2.0, method=method, dt=0.1, replicates=50, seed=0)
+    assert times[0] == 0 and times[-1] == pytest.approx(2.0)
+    assert np.allclose(counts.sum(axis=1), 1000)
+    assert counts[-1, 0] == pytest.approx(1000 * np.exp(-1.0), rel=0.05)
+    with pytest.raises(ValueError):
+        decay().forecast([1, 0], 1.0, method="euler")
+
+
+def test_tau_leaping_never_takes_more_agents_than_a_state_holds():
+    _, trajectory = decay(50.0).tau_leap([3, 0], t_end=1.0, tau=1.0, replicates=200, seed=1)
+    assert trajectory.min() >= 0 and np.all(trajectory.sum(axis=2) == 3)
+
+
+def test_gillespie_stops_when_no_rule_can_fire():
+    times, trajectory = infection().gillespie([10, 0], t_end=5.0, num_samples=6, replicates=3, seed=0)
+    assert len(times) == 6 and np.all(trajectory == [10, 0])
+
+
+def test_updates_multiply_likelihoods_in_log_space():
+    model = StochasticKineticModel(2, 3)
+    for _ in range(2000):
+        model.update([[1e-3, 1.0, 1e-3], [1.0, 1.0, 1.0]])
+    assert np.isfinite(model.log_probabilities).all()
+    assert model.predict_next_state().tolist() == [1, 0]
+    # Repeated agents receive the product of their observations
+    model.update([[0.0, 0.0, 1.0], [1.0, 0.0, 1.0]], agents=[1, 1])
+    assert np.allclose(model.state_probabilities[1], [0, 0, 1])
+    # An observation ruling out every state leaves the distribution unchanged
+    before = model.log_probabilities.copy()
+    model.update([[0.0, 0.0, 0.0]], agents=[0])
+    assert np.array_equal(model.log_probabilities, before)
+
+
+def test_agents_are_addressed_by_key_after_removals():
+    model = StochasticKineticModel(0, 2)
+    for key in "abc":
+        model.add_agent(key)
+    model.update([[0.0, 1.0]], agents=["c"])
+    assert model.remove_agent("a") and not model.remove_agent("a")
+    assert model.num_agents == 2 and model.predict_agent_state("c") == 1
+    assert np.allclose(model.state_probabilities[model.rows(["b"])[0]], [0.5, 0.5])
+    model.resize(5)
+    assert model.num_agents == 5 and np.allclose(model.state_probabilities[4], [0.5, 0.5])
+    # Shrinking drops the keys of the rows cut off
+    model.resize(1)
+    assert model.predict_agent_state("c") == 1
+    with pytest.raises(KeyError):
+        model.rows(["b"])
+
+
+def test_transition_matrices_are_cached_until_invalidated():
+    model = StochasticKineticModel(0, 2, infection())
+    for key in range(4):
+        model.add_agent(f"agent-{key}")
+    model.update([[0.0, 1.0]], agents=["agent-0"])
+    matrix = model.transition_matrix(1.0)
+    assert model.transition_matrix(1.0) is matrix
+    # Observations within a step do not move the population the dynamics depend on
+    model.update([[0.0, 1.0]] * 3, agents=["agent-1", "agent-2", "agent-3"])
+    assert model.transition_matrix(1.0) is matrix
+    model.invalidate()
+    refreshed = model.transition_matrix(1.0)
+    assert refreshed is not matrix and refreshed[0, 1] > matrix[0, 1]
+    model.add_agent("agent-4")
+    assert model.transition_matrix(1.0) is not refreshed
+    model.engine = decay()
+    assert np.allclose(model.transition_matrix(1.0), decay().transition_matrix(1.0))
+
+
+def test_predictions_advance_by_the_engine_dynamics():
+    model = StochasticKineticModel(0, 2)
+    model.add_agent("a")
+    model.update([[0.9, 0.1]], agents=["a"])
+    assert model.predict_agent_state("a") == 0
+    model.engine = decay(5.0)
+    assert model.predict_agent_state("a") == 1
+    assert np.allclose(model.forecast_distribution(["a"]).sum(axis=1), 1)
+
+
+def test_world_forecasts_start_from_the_most_likely_states(world_model):
+    num_states = world_model.stochastic_kinetic_model.num_states
+    with pytest.raises(ValueError):
+        world_model.forecast_population(1.0)
+    world_model.set_kinetic_rules([KineticRule(source=0, target=1, rate=0.0)])
+    for _ in range(3):
+        agent_id = uuid4()
+        world_model.add_agent(agent_id, {})
+        world_model.update_agent(agent_id, {"observation": np.eye(num_states)[0]})
+    times, counts = world_model.forecast_population(2.0, method="mean_field")
+    assert counts.shape == (len(times), num_states) and np.allclose(counts[:, 0], 3)
+    matrix = world_model.stochastic_kinetic_model.transition_matrix(1.0)
+    world_model.advance_tick()
+    assert world_model.stochastic_kinetic_model.transition_matrix(1.0) is not matrix
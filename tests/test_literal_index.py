@@ -0,0 +1,89 @@
+import pytest
+from rdflib import XSD, Graph, Literal, URIRef
+
+from app.core.literal_index import LiteralIndex, tokenize
+from app.core.triple_store import SQLiteLiteralIndex, SQLiteStore
+from app.models.knowledge_base import KnowledgeBase, KnowledgeItem
+
+NAME = URIRef("name")
+AGE = URIRef("age")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def index(request, tmp_path):
+    """A literal index over a small graph, on each backend."""
+    triples = [(URIRef(f"s{i:02}"), NAME, Literal(f"red apple {i}")) for i in range(20)]
+    triples += [
+        (URIRef("upper"), NAME, Literal("Red Apple")),
+        (URIRef("lower"), NAME, Literal("red apple")),
+        (URIRef("typed"), AGE, Literal("42", datatype=XSD.integer)),
+        (URIRef("plain"), AGE, Literal("42")),
+    ]
+    if request.param == "memory":
+        index = LiteralIndex()
+        index.rebuild(triples)
+        yield index
+        return
+    store = SQLiteStore(str(tmp_path / "graph.sqlite"))
+    graph = Graph(store=store)
+    for triple in triples:
+        graph.add(triple)
+    yield SQLiteLiteralIndex(store)
+    graph.close()
+
+
+def subjects(triples):
+    return [str(subject) for subject, _, _ in triples]
+
+
+def test_tokenize_casefolds_words():
+    assert tokenize("Red-Apple pie_2!") == ["red", "apple", "pie_2"]
+
+
+def test_exact_lookup_respects_case_and_datatype(index):
+    assert subjects(index.lookup("red apple")) == ["lower"]
+    assert subjects(index.lookup("Red Apple")) == ["upper"]
+    assert subjects(index.lookup("42")) == ["plain"]
+    assert subjects(index.lookup(Literal("42", datatype=XSD.integer))) == ["typed"]
+
+
+def test_case_insensitive_lookup_ignores_case_and_datatype(index):
+    assert subjects(index.lookup("RED APPLE", ignore_case=True)) == ["lower", "upper"]
+    assert subjects(index.lookup("42", ignore_case=True)) == ["plain", "typed"]
+
+
+def test_search_truncates_a_stable_order(index):
+    everything = index.search("apple red")
+    assert len(everything) == 22
+    assert index.search("apple red", limit=5) == everything[:5]
+    assert subjects(index.search("apple red", limit=3)) == ["lower", "s00", "s01"]
+
+
+def test_search_modes(index):
+    assert subjects(index.search("apple 7")) == ["s07"]
+    assert len(index.search("appl", prefix=True)) == 22
+    assert index.search("appl") == []
+    assert len(index.search("7 42", match_all=False)) == 3
+
+
+def test_memory_index_forgets_removed_subjects():
+    index = LiteralIndex()
+    index.add(URIRef("a"), NAME, Literal("green pear"))
+    index.add(URIRef("b"), NAME, Literal("green apple"))
+    index.add(URIRef("b"), NAME, URIRef("not-a-literal"))
+    index.remove_subject(URIRef("b"))
+    assert subjects(index.search("green")) == ["a"]
+    assert index.search("appl", prefix=True) == []
+    assert len(index) == 1
+
+
+def test_knowledge_base_match_modes(fake_embeddings):
+    kb = KnowledgeBase(id="literal-modes")
+    kb.add_symbolic_knowledge(KnowledgeItem(id="upper", content="Red Apple"))
+    kb.add_symbolic_knowledge(KnowledgeItem(id="count", content={"count": 3}))
+    assert list(kb._query_symbolic("red apple")) == []
+    assert list(kb._query_symbolic("red apple", match="iexact")) == ["upper"]
+    assert list(kb._query_symbolic("3")) == []
+    assert list(kb._query_symbolic("3", match="iexact")) == ["count"]
+    with pytest.raises(ValueError):
+        kb._query_symbolic("red", match="fuzzy")
@@ -0,0 +1,171 @@
+import asyncio
+from collections import namedtuple
+
+import pytest
+
+from app.core.message_bus import MailboxFull, MessageBus
+
+Note = namedtuple("Note", "receiver_id body")
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=10))
+
+
+def test_each_receiver_sees_its_messages_in_order():
+    received = {}
+
+    async def handler(message):
+        await asyncio.sleep(0)
+        received.setdefault(message.receiver_id, []).append(message.body)
+
+    async def scenario():
+        bus = MessageBus(handler, workers=4, batch_size=3)
+        for i in range(50):
+            for receiver in "abc":
+                await bus.send(Note(receiver, i))
+        await bus.join()
+        await bus.stop()
+        return bus
+
+    bus = run(scenario())
+    assert received == {receiver: list(range(50)) for receiver in "abc"}
+    assert bus.stats()["delivered"] == 150
+
+
+@pytest.mark.parametrize("policy, kept, dropped", [("drop_oldest", [2, 3], 2), ("drop_newest", [0, 1], 2)])
+def test_drop_policies(policy, kept, dropped):
+    received = []
+
+    async def handler(message):
+        received.append(message.body)
+
+    async def scenario():
+        bus = MessageBus(handler, mailbox_size=2, overflow=policy)
+        # Enqueued before the workers get a chance to run, so the mailbox overflows
+        results = [bus.post(Note("a", i)) for i in range(4)]
+        await bus.join()
+        await bus.stop()
+        return bus, results
+
+    bus, results = run(scenario())
+    assert received == kept
+    assert bus.dropped == dropped
+    assert results == ([True] * 4 if policy == "drop_oldest" else [True, True, False, False])
+
+
+def test_reject_policy_raises():
+    async def scenario():
+        bus = MessageBus(lambda message: asyncio.sleep(0), mailbox_size=1, overflow="reject")
+        bus.post(Note("a", 0))
+        with pytest.raises(MailboxFull):
+            await bus.send(Note("a", 1))
+        await bus.stop()
+
+    run(scenario())
+
+
+def test_block_policy_waits_for_space():
+    received = []
+
+    async def handler(message):
+        received.append(message.body)
+
+    async def scenario():
+        bus = MessageBus(handler, mailbox_size=1, overflow="block", workers=1, batch_size=1)
+        await asyncio.gather(*(bus.send(Note("a", i)) for i in range(5)))
+        await bus.join()
+        await bus.stop()
+
+    run(scenario())
+    assert sorted(received) == list(range(5))
+
+
+def test_replies_from_handlers_do_not_block_the_workers():
+    # Two agents flood each other; with replies waiting for space every worker would block
+    received = []
+    bus = None
+
+    async def handler(message):
+        received.append(message)
+        if message.body > 0:
+            bus.reply(Note("b" if message.receiver_id == "a" else "a", message.body - 1))
+
+    async def scenario():
+        nonlocal bus
+        bus = MessageBus(handler, mailbox_size=2, overflow="block", workers=1)
+        await asyncio.gather(*(bus.send(Note(receiver, 5)) for receiver in "abab"))
+        await bus.join()
+        await bus.stop()
+
+    run(scenario())
+    assert len(received) == 4 * 6
+
+
+def test_join_raises_the_first_handler_error_and_counts_all():
+    async def handler(message):
+        raise RuntimeError(message.body)
+
+    async def scenario():
+        bus = MessageBus(handler)
+        for i in range(3):
+            bus.post(Note("a", i))
+        with pytest.raises(RuntimeError, match="0"):
+            await bus.join()
+        await bus.stop()
+        return bus
+
+    assert run(scenario()).failed == 3
+
+
+def test_removing_a_mailbox_mid_batch_keeps_the_worker_alive():
+    received = []
+    bus = None
+
+    async def handler(message):
+        received.append(message)
+        if message == Note("a", 0):
+            await asyncio.sleep(0)
+            bus.remove_mailbox("a")
+
+    async def scenario():
+        nonlocal bus
+        bus = MessageBus(handler, workers=1, batch_size=10)
+        for i in range(3):
+            bus.post(Note("a", i))
+        await bus.join()
+        bus.post(Note("b", 0))
+        bus.post(Note("a", 3))
+        await bus.join()
+        await bus.stop()
+
+    run(scenario())
+    assert received == [Note("a", 0), Note("b", 0), Note("a", 3)]
+
+
+def test_senders_blocked_on_a_removed_mailbox_are_released():
+    received = []
+    gate = None
+
+    async def handler(message):
+        await gate.wait()
+        received.append(message.body)
+
+    async def scenario():
+        nonlocal gate
+        gate = asyncio.Event()
+        bus = MessageBus(handler, mailbox_size=1, overflow="block", workers=1)
+        bus.post(Note("a", 0))
+        await asyncio.sleep(0)
+        bus.post(Note("a", 1))
+        blocked = asyncio.ensure_future(bus.send(Note("a", 2)))
+        await asyncio.sleep(0)
+        assert not blocked.done()
+        bus.remove_mailbox("a")
+        assert await blocked
+        gate.set()
+        await bus.join()
+        await bus.stop()
+
+    run(scenario())
+    assert received == [0, 2]
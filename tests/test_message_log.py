@@ -0,0 +1,152 @@
+import os
+import time
+from uuid import uuid4
+
+import pytest
+
+from app.core import message_log
+from app.core.message_log import MessageLog
+from app.models.message import ACLMessage, Performative
+
+ALICE, BOB = uuid4(), uuid4()
+
+
+def message(receiver_id, content, conversation_id=None):
+    return ACLMessage(sender_id=uuid4(), receiver_id=receiver_id, performative=Performative.INFORM,
+                      content=content, conversation_id=conversation_id)
+
+
+def contents(records):
+    return [record.content for _, record in records]
+
+
+def test_torn_tail_is_truncated_on_open(tmp_path):
+    log = MessageLog(str(tmp_path))
+    for i in range(3):
+        log.append(message(ALICE, i))
+    log.close()
+    segment = next(path for path in tmp_path.iterdir() if path.suffix == ".log")
+    size = segment.stat().st_size
+    with open(segment, "ab") as torn:
+        torn.write(b"\x03\x00\x00\x00\x00\x00\x00\x00\xff\x00")
+
+    log = MessageLog(str(tmp_path))
+    assert contents(log.read()) == [0, 1, 2]
+    assert segment.stat().st_size == size
+    assert log.append(message(ALICE, 3)) == 3
+    assert contents(log.read(after=2)) == [3]
+    log.close()
+
+
+def test_corrupt_record_ends_recovery(tmp_path):
+    log = MessageLog(str(tmp_path))
+    for i in range(3):
+        log.append(message(ALICE, f"message {i}"))
+    log.close()
+    segment = next(path for path in tmp_path.iterdir() if path.suffix == ".log")
+    data = bytearray(segment.read_bytes())
+    data[-1] ^= 0xFF
+    segment.write_bytes(bytes(data))
+
+    log = MessageLog(str(tmp_path))
+    assert contents(log.read()) == ["message 0", "message 1"]
+    log.close()
+
+
+def test_consumers_resume_after_their_committed_offset(tmp_path):
+    log = MessageLog(str(tmp_path))
+    for i in range(6):
+        log.append(message(ALICE if i % 2 == 0 else BOB, i))
+    offset, _ = log.poll(ALICE)[1]
+    log.commit(str(ALICE), offset)
+    log.close()
+
+    log = MessageLog(str(tmp_path))
+    assert log.committed(str(ALICE)) == 2
+    assert contents(log.poll(ALICE)) == [4]
+    assert contents(log.poll(BOB)) == [1, 3, 5]
+    log.close()
+
+
+def test_lookups_span_segments(tmp_path):
+    conversation_id = uuid4()
+    log = MessageLog(str(tmp_path), segment_bytes=512)
+    for i in range(20):
+        log.append(message(ALICE if i % 2 == 0 else BOB, i, conversation_id if i % 5 == 0 else None))
+    assert log.stats()["segments"] > 1
+    assert contents(log.messages_for(BOB, limit=3)) == [1, 3, 5]
+    assert contents(log.conversation(conversation_id)) == [0, 5, 10, 15]
+    assert contents(log.read(after=16)) == [17, 18, 19]
+    log.close()
+
+
+def test_retention_by_size_keeps_the_active_segment(tmp_path):
+    log = MessageLog(str(tmp_path), segment_bytes=512, retention_bytes=1024)
+    for i in range(40):
+        log.append(message(ALICE, i))
+    stats = log.stats()
+    assert stats["bytes"] <= 1024 + 512
+    remaining = contents(log.read())
+    assert remaining == list(range(40 - len(remaining), 40))
+    log.close()
+
+
+def test_retention_by_age(tmp_path):
+    log = MessageLog(str(tmp_path), segment_bytes=512, retention_seconds=0.05)
+    for i in range(20):
+        log.append(message(ALICE, i))
+    segments = log.stats()["segments"]
+    time.sleep(0.1)
+    assert log.enforce_retention() == segments - 1
+    assert log.stats()["segments"] == 1
+    log.close()
+
+
+def test_compaction_drops_consumed_messages_and_keeps_offsets(tmp_path):
+    log = MessageLog(str(tmp_path), segment_bytes=512, compaction="consumed")
+    for i in range(20):
+        log.append(message(ALICE if i % 2 == 0 else BOB, i))
+    log.commit(str(ALICE), 10)
+    dropped = log.compact()
+    assert dropped > 0
+    offsets = [offset for offset, _ in log.read()]
+    assert offsets == sorted(offsets)
+    assert all(record.content == offset for offset, record in log.read())
+    assert contents(log.messages_for(BOB)) == list(range(1, 20, 2))
+    alice = contents(log.messages_for(ALICE))
+    assert dropped == len([content for content in range(0, 11, 2) if content not in alice])
+    assert alice[-4:] == [12, 14, 16, 18]
+    log.close()
+
+    log = MessageLog(str(tmp_path), segment_bytes=512, compaction="consumed")
+    assert contents(log.messages_for(ALICE)) == alice
+    log.close()
+
+
+def test_committed_offsets_are_flushed_by_the_timer(tmp_path):
+    log = MessageLog(str(tmp_path), fsync_batch=1000, fsync_interval=0.05)
+    log.append(message(ALICE, 0))
+    log.commit(str(ALICE), 0)
+    deadline = time.monotonic() + 5
+    while not os.path.exists(tmp_path / "consumer-offsets.json") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (tmp_path / "consumer-offsets.json").read_text() == '{"%s": 0}' % ALICE
+    log.close()
+
+
+def test_open_message_log_is_shared_per_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(message_log.settings, "message_log_dir", str(tmp_path))
+    try:
+        first = message_log.open_message_log("human")
+        assert message_log.open_message_log("human") is first
+        assert message_log.open_message_log("agents") is not first
+    finally:
+        message_log.close_message_logs()
+    assert first._log_file.closed
+    assert message_log.open_message_log("human") is not first
+    message_log.close_message_logs()
+
+
+def test_unknown_compaction_policy_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        MessageLog(str(tmp_path), compaction="everything")
@@ -0,0 +1,59 @@
+import threading
+import time
+
+from app.core.model_registry import ModelRegistry
+
+
+class SlowRegistry(ModelRegistry):
+    """A registry whose loads block until released and record what they loaded."""
+
+    def __init__(self):
+        super().__init__()
+        self.loads = []
+        self.release = threading.Event()
+
+    def _load(self, model_name, backend):
+        self.loads.append((model_name, backend))
+        if model_name == "slow":
+            self.release.wait(10)
+        return object()
+
+
+def test_a_cold_load_blocks_neither_caches_nor_other_models():
+    registry = SlowRegistry()
+    loader = threading.Thread(target=registry.get_model, args=("slow",))
+    loader.start()
+    while not registry.loads:
+        time.sleep(0.001)
+
+    started = time.perf_counter()
+    registry.get_cache("slow")
+    registry.get_model("fast")
+    assert time.perf_counter() - started < 1
+    assert not registry.is_loaded("slow")
+
+    registry.release.set()
+    loader.join(10)
+    assert registry.is_loaded("slow")
+
+
+def test_concurrent_loads_of_one_model_load_it_once():
+    registry = SlowRegistry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_model("slow"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    registry.release.set()
+    for thread in threads:
+        thread.join(10)
+    assert registry.loads == [("slow", "torch")]
+    assert len(results) == 4 and all(result is results[0] for result in results)
+
+
+def test_models_and_caches_are_kept_per_backend():
+    registry = SlowRegistry()
+    assert registry.get_model("fast", backend="onnx") is not registry.get_model("fast", backend="torch")
+    assert registry.get_cache("fast", backend="onnx") is not registry.get_cache("fast", backend="torch")
+    assert registry.get_cache("fast", backend="onnx") is registry.get_cache("fast", backend="onnx")
+    assert len(registry.loads) == 2
@@ -0,0 +1,81 @@
+from uuid import uuid4
+
+import pytest
+from pydantic import PrivateAttr
+
+from app.core import message_log
+from app.core.message_log import MessageLog
+from app.models.agent import Agent
+from app.models.multiagent_system import MultiAgentSystem
+
+
+class InboxAgent(Agent):
+    _inbox: list = PrivateAttr(default_factory=list)
+
+    def receive_message(self, message):
+        self._inbox.append(message.content)
+
+
+def system(**options):
+    return MultiAgentSystem(num_agents=0, num_states=4, state_size=4, action_size=2, ontology_path="", **options)
+
+
+@pytest.fixture
+def log_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(message_log.settings, "message_log_dir", str(tmp_path))
+    yield tmp_path
+    message_log.close_message_logs()
+
+
+def test_each_system_delivers_from_its_own_log(log_dir):
+    first, second = system(), system()
+    try:
+        alice = first.add_agent(InboxAgent(agent_id="", name="alice"))
+        bob = second.add_agent(InboxAgent(agent_id="", name="bob"))
+        first.send_message(uuid4(), first.list_agents()[0].agent_id, "to alice")
+        second.send_message(uuid4(), second.list_agents()[0].agent_id, "to bob")
+        second.process_messages()
+        first.process_messages()
+        assert alice._inbox == ["to alice"] and bob._inbox == ["to bob"]
+        assert first.message_log is not second.message_log
+        assert sorted(path.name for path in (log_dir / "multiagent_system").iterdir()) == sorted([first.name, second.name])
+    finally:
+        first.close()
+        second.close()
+    assert first.message_log._log_file.closed
+
+
+def test_systems_sharing_a_log_keep_separate_delivery_offsets(tmp_path):
+    log = MessageLog(str(tmp_path))
+    first, second = system(message_log=log), system(message_log=log)
+    try:
+        alice = first.add_agent(InboxAgent(agent_id="", name="alice"))
+        bob = second.add_agent(InboxAgent(agent_id="", name="bob"))
+        first.send_message(uuid4(), first.list_agents()[0].agent_id, "to alice")
+        second.send_message(uuid4(), second.list_agents()[0].agent_id, "to bob")
+        # The first system reading past bob's message must not make the second skip it
+        first.process_messages()
+        second.process_messages()
+        assert alice._inbox == ["to alice"] and bob._inbox == ["to bob"]
+    finally:
+        first.close()
+        second.close()
+    assert not log._log_file.closed
+    log.close()
+
+
+def test_a_named_system_resumes_its_delivery_offset(log_dir):
+    first = system(name="shared")
+    first.send_message(uuid4(), uuid4(), "before the restart")
+    first.process_messages()
+    first.close()
+
+    reopened = system(name="shared")
+    try:
+        agent = reopened.add_agent(InboxAgent(agent_id="", name="late"))
+        reopened.send_message(uuid4(), reopened.list_agents()[0].agent_id, "after the restart")
+        reopened.process_messages()
+        assert agent._inbox == ["after the restart"]
+        assert reopened.message_log.committed("multiagent_system:shared") == 1
+    finally:
+        reopened.close()
@@ -0,0 +1,51 @@
+import pytest
+from pydantic import ValidationError
+
+from app.models.knowledge_base import KnowledgeBase, KnowledgeItem
+
+
+def items(count, start=0):
+    return [KnowledgeItem(id=f"item-{i}", content=f"fact number {i} " + "word " * (i % 7)) for i in range(start, start + count)]
+
+
+def test_batch_ingestion_encodes_in_batches_and_indexes_everything(fake_embeddings):
+    kb = KnowledgeBase(id="ingest-batch")
+    batch = items(10) + [KnowledgeItem(id="structured", content={"not": "text"})]
+    kb.add_neural_knowledge_batch(batch, batch_size=4)
+    assert fake_embeddings.calls == [4, 4, 2]
+    assert len(kb.neural_kb) == 11
+    assert len(kb.vector_index) == 10
+    assert kb.get_neural_knowledge("structured").embedding is None
+    assert kb.vector_index.search(kb.get_neural_knowledge("item-3").embedding, top_k=1)[0][0] == "item-3"
+
+
+def test_batch_ingestion_matches_single_adds(fake_embeddings):
+    single, batched = KnowledgeBase(id="ingest-single"), KnowledgeBase(id="ingest-batched")
+    for item in items(5):
+        single.add_neural_knowledge(item)
+    batched.add_neural_knowledge_batch(items(5))
+    for item_id, item in single.neural_kb.items():
+        assert batched.neural_kb[item_id].embedding == pytest.approx(item.embedding)
+
+
+def test_stream_ingestion_is_all_or_nothing(fake_embeddings):
+    kb = KnowledgeBase(id="ingest-stream")
+
+    def broken_stream():
+        yield from items(5)
+        yield KnowledgeItem.model_validate({"id": "bad"})
+
+    with pytest.raises(ValidationError):
+        kb.add_neural_knowledge_stream(broken_stream(), chunk_size=2)
+    assert kb.neural_kb == {} and len(kb.vector_index) == 0
+
+    assert kb.add_neural_knowledge_stream(iter(items(7)), batch_size=2, chunk_size=3) == 7
+    assert len(kb.neural_kb) == len(kb.vector_index) == 7
+
+
+def test_reingesting_an_item_without_text_drops_its_vector(fake_embeddings):
+    kb = KnowledgeBase(id="ingest-replace")
+    kb.add_neural_knowledge_batch(items(2))
+    kb.add_neural_knowledge_batch([KnowledgeItem(id="item-0", content=42)])
+    assert "item-0" not in kb.vector_index
+    assert len(kb.neural_kb) == 2
@@ -0,0 +1,92 @@
+import os
+import threading
+
+import pytest
+from owlready2 import DataPropertyClass, ObjectPropertyClass
+
+from app.core.ontology_manager import OntologyManager
+from app.core.ontology_sync import OntologyWriteBehind
+
+
+class RecordingManager:
+    """Stands in for an OntologyManager, recording each batch; blocks while `gate` is clear."""
+
+    def __init__(self, error=None):
+        self.batches = []
+        self.error = error
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def apply_updates(self, batch):
+        self.gate.wait(10)
+        self.batches.append(batch)
+        if self.error is not None:
+            raise self.error
+
+
+def test_updates_are_coalesced_per_individual():
+    manager = RecordingManager()
+    manager.gate.clear()
+    queue = OntologyWriteBehind(manager, linger=0)
+    queue.add_individual("blocker", "Thing")
+    while queue.pending:
+        pass
+    queue.add_individual("a", "Agent")
+    queue.update_properties("a", {"x": 1, "y": 2})
+    queue.update_property("a", "x", 3)
+    queue.add_individual("b", "Object")
+    manager.gate.set()
+    assert queue.flush(timeout=10)
+    assert manager.batches[-1] == {"a": ({"Agent"}, {"x": 3, "y": 2}), "b": ({"Object"}, {})}
+    assert queue.pending == 0
+    queue.close(timeout=10)
+
+
+def test_batches_are_capped_and_flush_waits_for_all_of_them():
+    manager = RecordingManager()
+    manager.gate.clear()
+    queue = OntologyWriteBehind(manager, max_batch=2, linger=0)
+    for i in range(5):
+        queue.add_individual(str(i), "Thing")
+    manager.gate.set()
+    assert queue.flush(timeout=10)
+    assert sorted(name for batch in manager.batches for name in batch) == [str(i) for i in range(5)]
+    assert all(len(batch) <= 2 for batch in manager.batches)
+    queue.close(timeout=10)
+
+
+def test_errors_surface_on_the_next_flush_and_close_stops_writes():
+    queue = OntologyWriteBehind(RecordingManager(error=ValueError("bad")), linger=0)
+    queue.add_individual("a", "Agent")
+    with pytest.raises(ValueError):
+        queue.flush(timeout=10)
+    assert queue.flush(timeout=10)
+    queue.close(timeout=10)
+    with pytest.raises(RuntimeError):
+        queue.add_individual("b", "Agent")
+
+
+@pytest.fixture
+def ontology():
+    return OntologyManager(os.environ["ONTOLOGY_PATH"])
+
+
+def test_a_batch_creates_its_individuals_before_setting_properties(ontology):
+    # Coalescing put the subject, with its property, ahead of the individual the property names
+    ontology.apply_updates({
+        "Agent_x": ({"Agent"}, {"holds": "Object_y"}),
+        "Object_y": ({"Object"}, {"colour": "red"}),
+    })
+    assert isinstance(ontology.onto["holds"], ObjectPropertyClass)
+    assert isinstance(ontology.onto["colour"], DataPropertyClass)
+    assert ontology.onto["Agent_x"].holds == [ontology.onto["Object_y"]]
+
+
+def test_world_relationships_become_object_properties(world_model):
+    world_model.add_object("box", {"colour": "red"})
+    world_model.add_object("shelf", {})
+    world_model.add_relationship({"subject": "Object_box", "predicate": "on_top_of", "object": "Object_shelf"})
+    world_model.flush()
+    onto = world_model.ontology_manager.onto
+    assert isinstance(onto["on_top_of"], ObjectPropertyClass)
+    assert onto["Object_box"].on_top_of == [onto["Object_shelf"]]
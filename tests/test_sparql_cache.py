@@ -0,0 +1,117 @@
+import os
+import threading
+
+import pytest
+from rdflib import Graph, Literal, Namespace
+
+from app.core import sparql_cache
+from app.core.ontology_manager import OntologyManager
+from app.core.sparql_cache import SPARQLQueryCache, prepare_query
+
+EX = Namespace("http://example.org/")
+NAMES = "SELECT ?name WHERE { ?s ex:name ?name } ORDER BY ?name"
+NAME_OF = "SELECT ?name WHERE { ?s ex:name ?name }"
+
+
+class CountingGraph(Graph):
+    def __init__(self):
+        super().__init__()
+        self.queries = 0
+        self.before_query = None
+
+    def query(self, *args, **kwargs):
+        self.queries += 1
+        if self.before_query is not None:
+            self.before_query()
+        return super().query(*args, **kwargs)
+
+
+@pytest.fixture
+def graph():
+    graph = CountingGraph()
+    graph.add((EX.a, EX.name, Literal("alice")))
+    graph.add((EX.b, EX.name, Literal("bob")))
+    return graph
+
+
+@pytest.fixture
+def cache(graph):
+    return SPARQLQueryCache(lambda: graph, namespaces=lambda: {"ex": EX})
+
+
+def names(rows):
+    return [str(row[0]) for row in rows]
+
+
+def test_plans_are_shared_per_text_and_prefixes(monkeypatch):
+    monkeypatch.setattr(sparql_cache, "_plans", sparql_cache.OrderedDict())
+    monkeypatch.setattr(sparql_cache, "MAX_PLANS", 2)
+    plan = prepare_query(NAMES, {"ex": EX})
+    assert prepare_query(NAMES, {"ex": str(EX)}) is plan
+    assert prepare_query(NAMES, {"ex": "http://example.com/"}) is not plan
+    prepare_query(NAME_OF, {"ex": EX})
+    assert len(sparql_cache._plans) == 2 and prepare_query(NAMES, {"ex": EX}) is not plan
+
+
+def test_repeated_queries_are_answered_from_the_cache(cache, graph):
+    assert names(cache.query(NAMES)) == ["alice", "bob"]
+    rows = cache.query(NAMES)
+    rows.clear()
+    assert names(cache.query(NAMES)) == ["alice", "bob"]
+    assert graph.queries == 1 and cache.stats() == {"version": 0, "results": 1, "hits": 2, "misses": 1}
+
+
+def test_bindings_are_part_of_the_key(cache, graph):
+    assert names(cache.query(NAME_OF, {"s": EX.a})) == ["alice"]
+    assert names(cache.query(NAME_OF, {"s": EX.b})) == ["bob"]
+    assert names(cache.query(NAME_OF, {"s": EX.a})) == ["alice"]
+    assert graph.queries == 2
+
+
+def test_invalidation_discards_every_result(cache, graph):
+    cache.query(NAMES)
+    cache.query(NAME_OF, {"s": EX.a})
+    graph.add((EX.c, EX.name, Literal("carol")))
+    assert names(cache.query(NAMES)) == ["alice", "bob"]
+    cache.invalidate()
+    assert cache.stats()["results"] == 0 and cache.version == 1
+    assert names(cache.query(NAMES)) == ["alice", "bob", "carol"]
+
+
+def test_results_from_a_query_overlapping_a_write_are_not_cached(cache, graph):
+    graph.before_query = cache.invalidate
+    cache.query(NAMES)
+    graph.before_query = None
+    cache.query(NAMES)
+    assert graph.queries == 2 and cache.stats()["results"] == 1
+
+
+def test_the_least_recently_used_results_are_evicted(graph):
+    cache = SPARQLQueryCache(lambda: graph, max_results=2, namespaces=lambda: {"ex": EX})
+    cache.query(NAME_OF, {"s": EX.a})
+    cache.query(NAME_OF, {"s": EX.b})
+    cache.query(NAME_OF, {"s": EX.a})
+    cache.query(NAMES)
+    assert cache.stats()["results"] == 2
+    cache.query(NAME_OF, {"s": EX.a})
+    cache.query(NAME_OF, {"s": EX.b})
+    assert graph.queries == 4
+
+
+def test_the_graph_lock_is_held_while_querying(graph):
+    lock = threading.RLock()
+    held = []
+    graph.before_query = lambda: held.append(lock._is_owned())
+    SPARQLQueryCache(lambda: graph, namespaces=lambda: {"ex": EX}, lock=lock).query(NAMES)
+    assert held == [True]
+
+
+def test_ontology_writes_invalidate_cached_queries():
+    manager = OntologyManager(os.environ["ONTOLOGY_PATH"])
+    query = "SELECT ?s WHERE { ?s a onto:Agent }"
+    before = {str(row[0]) for row in manager.query_ontology(query)}
+    assert {str(row[0]) for row in manager.query_ontology(query)} == before
+    manager.apply_updates({"Agent_cached": ({"Agent"}, {})})
+    after = {str(row[0]) for row in manager.query_ontology(query)}
+    assert after - before == {str(manager.individual_iri("Agent_cached"))}
+    assert manager.queries.stats()["version"] >= 1
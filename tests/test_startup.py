@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from app.core import world_model_provider
+from app.core.startup import COLD, FAILED, WARM, StartupRegistry
+
+
+def test_readiness_waits_for_required_subsystems():
+    registry = StartupRegistry()
+    registry.register("ontology", lambda: None)
+    registry.register("embeddings", lambda: None, required=False)
+    assert not registry.is_ready() and registry.status()["subsystems"]["ontology"]["status"] == COLD
+    with registry.track("ontology"):
+        assert registry.status()["subsystems"]["ontology"]["status"] == "warming"
+    status = registry.status()
+    assert registry.is_ready() and status["ready"] and status["required"] == ["ontology"]
+    assert status["subsystems"]["ontology"]["seconds"] >= 0
+    assert status["subsystems"]["embeddings"]["status"] == COLD
+
+
+def test_warm_up_records_failures_and_keeps_going():
+    registry = StartupRegistry()
+    loaded = []
+
+    def broken():
+        with registry.track("broken"):
+            raise RuntimeError("no model")
+
+    registry.register("broken", broken)
+    registry.register("plain", lambda: 1 / 0)
+    registry.register("tracked", lambda: loaded.append(1))
+    registry.warm_up()
+    subsystems = registry.status()["subsystems"]
+    assert subsystems["broken"]["status"] == FAILED and "no model" in subsystems["broken"]["error"]
+    assert subsystems["broken"]["seconds"] is not None
+    assert subsystems["plain"]["status"] == FAILED and "ZeroDivisionError" in subsystems["plain"]["error"]
+    assert loaded == [1] and not registry.is_ready()
+    registry.record_phase("imports", 1.23456)
+    assert registry.status()["phases"] == {"imports": 1.235}
+
+
+class SlowWorldModel:
+    built = 0
+
+    def __init__(self, **options):
+        SlowWorldModel.built += 1
+        time.sleep(0.05)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    registry = StartupRegistry()
+    SlowWorldModel.built = 0
+    monkeypatch.setattr(world_model_provider, "WorldModel", SlowWorldModel)
+    monkeypatch.setattr(world_model_provider, "startup_registry", registry)
+    monkeypatch.setattr(world_model_provider, "_world_model", None)
+    return registry
+
+
+def test_concurrent_first_calls_build_one_world_model(provider):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(world_model_provider.get_world_model())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert SlowWorldModel.built == 1 and all(result is results[0] for result in results)
+    assert provider.status()["subsystems"]["world_model"]["status"] == WARM
+
+
+def test_closing_the_world_model_lets_the_next_call_rebuild_it(provider):
+    world_model_provider.close_world_model()
+    first = world_model_provider.get_world_model()
+    world_model_provider.close_world_model()
+    assert first.closed
+    assert world_model_provider.get_world_model() is not first and SlowWorldModel.built == 2
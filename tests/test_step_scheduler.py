@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.core import step_scheduler
+from app.core.step_scheduler import AsyncioScheduler, SerialScheduler, StepScheduler, create_scheduler
+from app.models.agent import Agent
+from app.models.multiagent_system import MultiAgentSystem
+
+
+def square(value):
+    return value * value
+
+
+async def async_square(value):
+    await asyncio.sleep(0.001 * (value % 3))
+    return value * value
+
+
+@pytest.mark.parametrize("kind, options", [
+    ("serial", {}), ("thread", {"max_workers": 2}), ("process", {"max_workers": 2}), ("asyncio", {"concurrency": 3}),
+])
+def test_every_scheduler_returns_results_in_input_order(kind, options):
+    with create_scheduler(kind, **options) as scheduler:
+        assert scheduler.map(square, list(range(23))) == [value * value for value in range(23)]
+        assert scheduler.map(square, []) == []
+        assert asyncio.run(scheduler.amap(square, [3, 1, 2])) == [9, 1, 4]
+
+
+def test_asyncio_scheduler_awaits_coroutines_and_maps_inside_a_running_loop():
+    scheduler = AsyncioScheduler(concurrency=2)
+    assert asyncio.run(scheduler.amap(async_square, list(range(6)))) == [0, 1, 4, 9, 16, 25]
+
+    async def blocking_map_on_the_loop():
+        return scheduler.map(async_square, [2, 3])
+
+    assert asyncio.run(blocking_map_on_the_loop()) == [4, 9]
+
+
+def test_create_scheduler_follows_the_settings(monkeypatch):
+    monkeypatch.setattr(step_scheduler.settings, "step_scheduler", "asyncio")
+    monkeypatch.setattr(step_scheduler.settings, "step_scheduler_workers", 7)
+    scheduler = create_scheduler()
+    assert isinstance(scheduler, AsyncioScheduler) and scheduler.concurrency == 7
+    assert isinstance(create_scheduler("serial"), SerialScheduler)
+    with pytest.raises(ValueError):
+        create_scheduler("gpu")
+
+
+class RecordingScheduler(SerialScheduler):
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def system(scheduler=None):
+    return MultiAgentSystem(num_agents=0, num_states=4, state_size=4, action_size=2, ontology_path="", scheduler=scheduler)
+
+
+def test_a_system_closes_only_the_scheduler_it_created(monkeypatch):
+    created = RecordingScheduler()
+    monkeypatch.setattr("app.models.multiagent_system.create_scheduler", lambda: created)
+    mas = system()
+    mas.close()
+    assert created.closed
+
+    given = RecordingScheduler()
+    mas = system(given)
+    mas.close()
+    assert not given.closed
+
+
+def test_astep_matches_step():
+    mas = system(create_scheduler("thread", max_workers=2))
+    try:
+        agents = [mas.add_agent(Agent(agent_id="", name=str(i))) for i in range(4)]
+        asyncio.run(mas.astep())
+        assert all(agent.current_state for agent in agents)
+        assert mas.world_model.tick == 1
+        mas.step()
+        assert mas.world_model.tick == 2
+    finally:
+        mas.scheduler.close()
+        mas.close()
+
+
+def test_the_base_scheduler_is_abstract():
+    with pytest.raises(NotImplementedError):
+        StepScheduler().map(square, [1])
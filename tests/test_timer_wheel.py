@@ -0,0 +1,69 @@
+from app.core.timer_wheel import TimerWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_keys_expire_once_their_deadline_passes():
+    clock = Clock()
+    wheel = TimerWheel(tick=1.0, slots=8, clock=clock)
+    wheel.schedule("a", 3.0)
+    wheel.schedule("b", 5.0)
+    assert wheel.advance(2.0) == []
+    assert wheel.advance(3.0) == ["a"]
+    assert "a" not in wheel and "b" in wheel
+    assert wheel.advance(10.0) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_deadlines_beyond_one_turn_wait_for_their_turn():
+    wheel = TimerWheel(tick=1.0, slots=4, clock=Clock())
+    wheel.schedule("near", 2.0)
+    wheel.schedule("far", 6.0)
+    assert wheel.advance(2.0) == ["near"]
+    assert wheel.advance(5.0) == []
+    assert wheel.advance(6.0) == ["far"]
+
+
+def test_advancing_several_turns_at_once_expires_everything_due():
+    wheel = TimerWheel(tick=1.0, slots=4, clock=Clock())
+    for i in range(1, 20):
+        wheel.schedule(i, float(i))
+    assert sorted(wheel.advance(12.0)) == list(range(1, 13))
+    assert len(wheel) == 7
+
+
+def test_past_deadlines_expire_on_the_next_tick():
+    clock = Clock()
+    clock.now = 10.0
+    wheel = TimerWheel(tick=1.0, slots=8, clock=clock)
+    wheel.schedule("late", 3.0)
+    assert wheel.advance(10.0) == []
+    assert wheel.advance(11.0) == ["late"]
+
+
+def test_rescheduling_and_cancelling():
+    wheel = TimerWheel(tick=1.0, slots=8, clock=Clock())
+    wheel.schedule("a", 2.0)
+    wheel.schedule("a", 4.0)
+    assert len(wheel) == 1
+    assert wheel.advance(3.0) == []
+    assert wheel.cancel("a")
+    assert not wheel.cancel("a")
+    assert wheel.advance(5.0) == []
+
+
+def test_advance_reads_the_clock_and_never_goes_back():
+    clock = Clock()
+    wheel = TimerWheel(tick=0.5, slots=16, clock=clock)
+    wheel.schedule("a", 1.0)
+    clock.now = 1.2
+    assert wheel.advance() == ["a"]
+    wheel.schedule("b", 1.6)
+    assert wheel.advance(0.0) == []
+    assert "b" in wheel
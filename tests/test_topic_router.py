@@ -0,0 +1,79 @@
+import pytest
+
+from app.core.topic_router import TopicRouter
+
+
+@pytest.fixture
+def router():
+    router = TopicRouter()
+    router.subscribe("exact", "orders.eu.created")
+    router.subscribe("single", "orders.*.created")
+    router.subscribe("multi", "orders.#")
+    router.subscribe("any", "#")
+    router.subscribe("middle", "orders.#.created")
+    return router
+
+
+@pytest.mark.parametrize("topic, expected", [
+    ("orders", {"multi", "any"}),
+    ("orders.created", {"multi", "any", "middle"}),
+    ("orders.eu.created", {"exact", "single", "multi", "any", "middle"}),
+    ("orders.eu.fr.created", {"multi", "any", "middle"}),
+    ("orders.eu.cancelled", {"multi", "any"}),
+    ("invoices.eu.created", {"any"}),
+])
+def test_wildcard_matching(router, topic, expected):
+    assert router.match(topic) == expected
+
+
+def test_single_wildcard_matches_exactly_one_segment():
+    router = TopicRouter()
+    router.subscribe("a", "orders.*")
+    assert router.match("orders.created") == {"a"}
+    assert router.match("orders") == frozenset()
+    assert router.match("orders.eu.created") == frozenset()
+
+
+def test_subscribing_twice_is_a_no_op():
+    router = TopicRouter()
+    assert router.subscribe("a", "orders.#")
+    assert not router.subscribe("a", "orders.#")
+    assert len(router) == 1
+
+
+def test_unsubscribe_prunes_empty_branches(router):
+    assert router.unsubscribe("exact", "orders.eu.created")
+    assert not router.unsubscribe("exact", "orders.eu.created")
+    assert "eu" not in router._root.children["orders"].children
+    # The "*" branch is still used by another subscriber
+    assert "*" in router._root.children["orders"].children
+    assert router.match("orders.eu.created") == {"single", "multi", "any", "middle"}
+
+
+def test_unsubscribe_all_empties_the_trie():
+    router = TopicRouter()
+    router.subscribe("a", "orders.*.created")
+    router.subscribe("a", "orders.#")
+    router.subscribe("b", "orders.#")
+    assert router.unsubscribe_all("a") == 2
+    assert "a" not in router
+    assert router.subscriptions("b") == {"orders.#"}
+    router.unsubscribe_all("b")
+    assert router._root.children == {}
+    assert len(router) == 0
+
+
+def test_cached_matches_follow_subscription_changes():
+    router = TopicRouter(max_cached_topics=1)
+    router.subscribe("a", "orders.#")
+    assert router.match("orders.created") == {"a"}
+    router.subscribe("b", "orders.created")
+    assert router.match("orders.created") == {"a", "b"}
+    assert router.match("orders.other") == {"a"}
+    router.unsubscribe("a", "orders.#")
+    assert router.match("orders.created") == {"b"}
+
+
+def test_empty_topics_are_rejected():
+    with pytest.raises(ValueError):
+        TopicRouter().match("")
@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+from rdflib import Graph, Literal, URIRef
+
+from app.core.triple_store import SQLiteStore, graph_is_empty, open_graph
+from app.models.knowledge_base import KnowledgeBase, KnowledgeItem
+
+A, B = URIRef("a"), URIRef("b")
+KNOWS, NAME = URIRef("knows"), URIRef("name")
+
+
+def test_store_answers_every_triple_pattern(tmp_path):
+    graph = open_graph("sqlite", str(tmp_path / "graph.sqlite"))
+    assert graph_is_empty(graph)
+    graph.add((A, KNOWS, B))
+    graph.add((A, NAME, Literal("Alice")))
+    graph.add((B, NAME, Literal("Bob")))
+    assert len(graph) == 3 and not graph_is_empty(graph)
+    assert set(graph.objects(A, None)) == {B, Literal("Alice")}
+    assert set(graph.subjects(NAME, None)) == {A, B}
+    assert list(graph.triples((None, None, Literal("Bob")))) == [(B, NAME, Literal("Bob"))]
+    graph.remove((A, None, None))
+    assert list(graph.subjects(None, None)) == [B]
+    graph.close()
+
+
+def test_store_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "graph.sqlite")
+    graph = open_graph("sqlite", path, commit_interval=0)
+    graph.bind("ex", URIRef("http://example.org/"))
+    graph.add((A, NAME, Literal("Alice")))
+    graph.close()
+
+    reopened = open_graph("sqlite", path)
+    assert list(reopened.triples((None, None, None))) == [(A, NAME, Literal("Alice"))]
+    assert reopened.store.namespace("ex") == URIRef("http://example.org/")
+    reopened.close()
+
+
+def test_writes_are_committed_in_batches(tmp_path):
+    path = str(tmp_path / "graph.sqlite")
+    store = SQLiteStore(path, batch_size=3, commit_interval=0)
+    graph = Graph(store=store)
+
+    def committed():
+        with sqlite3.connect(path) as reader:
+            return reader.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    graph.add((A, KNOWS, B))
+    graph.add((B, KNOWS, A))
+    assert committed() == 0
+    graph.add((A, NAME, Literal("Alice")))
+    assert committed() == 3
+    graph.add((B, NAME, Literal("Bob")))
+    store.rollback()
+    assert len(graph) == 3
+    graph.close()
+
+
+def test_an_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        open_graph("berkeleydb", "graph.db")
+    with pytest.raises(ValueError):
+        open_graph("sqlite")
+
+
+@pytest.fixture
+def sqlite_backend(monkeypatch, tmp_path, fake_embeddings):
+    monkeypatch.setenv("TRIPLE_STORE_BACKEND", "sqlite")
+    monkeypatch.setenv("TRIPLE_STORE_DIR", str(tmp_path))
+
+
+def test_a_reopened_knowledge_base_keeps_its_items(sqlite_backend):
+    kb = KnowledgeBase(id="reopen")
+    kb.add_symbolic_knowledge(KnowledgeItem(id="rule", content={"colour": "red"}))
+    kb.add_symbolic_knowledge(KnowledgeItem(id="gone", content="temporary"))
+    kb.add_neural_knowledge_batch([KnowledgeItem(id="apple", content="red apple"),
+                                   KnowledgeItem(id="car", content="blue car")])
+    kb.add_neural_knowledge(KnowledgeItem(id="pie", content="apple pie", metadata={"source": "test"}))
+    kb.remove_symbolic_knowledge("gone")
+    kb.remove_neural_knowledge("car")
+    kb.close()
+
+    kb = KnowledgeBase(id="reopen")
+    assert set(kb.symbolic_kb) == {"rule"} and kb.get_symbolic_knowledge("rule").content == {"colour": "red"}
+    assert set(kb.neural_kb) == {"apple", "pie"} and kb.get_neural_knowledge("pie").metadata == {"source": "test"}
+    assert len(kb.vector_index) == 2
+    assert kb.find_most_similar("red apple", top_k=1)[0]["id"] == "apple"
+    assert list(kb._query_symbolic("red")) == ["rule"]
+
+    kb.remove_symbolic_knowledge("rule")
+    kb.remove_neural_knowledge("apple")
+    kb.close()
+    kb = KnowledgeBase(id="reopen")
+    assert kb.symbolic_kb == {} and list(kb.neural_kb) == ["pie"]
+    assert list(kb._query_symbolic("red")) == []
+    kb.close()
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.core import vector_index
+from app.core.vector_index import ExactVectorIndex, VectorIndex, create_vector_index, normalize
+
+
+def random_vectors(count, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def brute_force(vectors, query, top_k):
+    scores = normalize(vectors) @ normalize(query)[0]
+    return list(np.argsort(-scores)[:top_k])
+
+
+def test_normalize_returns_unit_rows_and_keeps_zero_vectors():
+    matrix = normalize([[3.0, 4.0], [0.0, 0.0]])
+    np.testing.assert_allclose(matrix, [[0.6, 0.8], [0.0, 0.0]])
+    assert matrix.dtype == np.float32 and matrix.flags["C_CONTIGUOUS"]
+
+
+def test_exact_search_matches_brute_force():
+    vectors = random_vectors(200)
+    index = ExactVectorIndex(initial_capacity=4)
+    index.add_batch([str(i) for i in range(200)], vectors)
+    query = random_vectors(1, seed=1)[0]
+    results = index.search(query, top_k=5)
+    assert [int(key) for key, _ in results] == brute_force(vectors, query, 5)
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_exact_threshold_and_upsert():
+    index = ExactVectorIndex()
+    index.add("a", [1.0, 0.0])
+    index.add("b", [0.0, 1.0])
+    assert [key for key, _ in index.search([1.0, 0.1], threshold=0.5)] == ["a"]
+    index.add("a", [0.0, -1.0])
+    assert len(index) == 2
+    assert index.search([0.0, 1.0], top_k=1)[0][0] == "b"
+    assert index.search([0.0, -1.0], top_k=1)[0][0] == "a"
+
+
+def test_exact_remove_moves_the_last_row():
+    index = ExactVectorIndex()
+    index.add_batch(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [-1.0, 0.0]])
+    index.remove("a")
+    index.remove("missing")
+    assert "a" not in index and len(index) == 2
+    assert index.search([-1.0, 0.0], top_k=1)[0][0] == "c"
+    assert index.search([1.0, 0.0])[-1][0] == "c"
+
+
+def test_dimension_mismatch_is_rejected():
+    index = ExactVectorIndex()
+    index.add("a", [1.0, 0.0])
+    with pytest.raises(ValueError):
+        index.add("b", [1.0, 0.0, 0.0])
+
+
+def test_vector_index_is_abstract():
+    with pytest.raises(TypeError):
+        VectorIndex()
+
+
+def test_create_vector_index_follows_the_setting(monkeypatch):
+    monkeypatch.setenv("VECTOR_INDEX_KIND", "exact")
+    assert isinstance(create_vector_index(), ExactVectorIndex)
+    with pytest.raises(ValueError):
+        create_vector_index("annoy")
+
+
+def test_hnsw_search_tracks_adds_and_removes(monkeypatch):
+    pytest.importorskip("hnswlib")
+    monkeypatch.setenv("VECTOR_INDEX_KIND", "hnsw")
+    monkeypatch.setenv("VECTOR_INDEX_MAX_ELEMENTS", "8")
+    index = create_vector_index()
+    assert isinstance(index, vector_index.HNSWVectorIndex)
+    vectors = random_vectors(100)
+    index.add_batch([str(i) for i in range(100)], vectors)
+    query = vectors[7]
+    assert index.search(query, top_k=1)[0][0] == "7"
+    index.remove("7")
+    assert "7" not in index and len(index) == 99
+    assert index.search(query, top_k=1)[0][0] != "7"
+    index.add("new", vectors[7])
+    assert index.search(query, top_k=1)[0][0] == "new"
@@ -0,0 +1,103 @@
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+from app.core import world_model as world_model_module
+from app.core.world_event_log import WorldEventLog, dumps, encode_value, loads
+from app.core.world_model import WorldModel
+
+
+def test_values_round_trip_through_the_json_encoding():
+    agent_id = uuid4()
+    value = {
+        "agents": {agent_id: {"position": (1.5, 2), "tags": ["a", None, True]}},
+        "$literal": {"$uuid": "not a uuid"},
+        "observation": np.array([0.25, 0.75], dtype=np.float32),
+        "count": np.int64(3),
+    }
+    decoded = loads(dumps(value))
+    assert decoded["agents"] == {agent_id: {"position": (1.5, 2), "tags": ["a", None, True]}}
+    assert decoded["$literal"] == {"$uuid": "not a uuid"}
+    assert decoded["observation"].dtype == np.float32 and decoded["observation"].tolist() == [0.25, 0.75]
+    assert decoded["count"] == 3 and type(decoded["count"]) is int
+    with pytest.raises(TypeError):
+        encode_value({"callback": print})
+
+
+def test_history_is_rebuilt_from_snapshots_and_events(tmp_path):
+    log = WorldEventLog(str(tmp_path), snapshot_interval=2)
+    world = {"tick": 0, "state": {}, "agents": {}, "objects": {}, "relationships": []}
+    agent_id = uuid4()
+    log.append(0, "add_agent", agent_id, {"position": (0, 0)})
+    for tick in range(1, 5):
+        log.append(tick, "update_state", {"tick_seen": tick})
+        world["state"] = {"tick_seen": tick}
+        world["tick"] = tick
+        if log.should_snapshot(tick):
+            log.snapshot({**world, "agents": {agent_id: {"position": (0, 0)}}})
+    log.append(5, "update_agent", agent_id, {"position": (3, 4)})
+
+    assert log.world_at(1)["state"] == {"tick_seen": 1}
+    assert log.world_at(3)["state"] == {"tick_seen": 3}
+    assert log.world_at()["agents"] == {agent_id: {"position": (3, 4)}}
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".json", ".log"]
+    with pytest.raises(ValueError):
+        log.append(4, "update_state", {})
+    log.close()
+
+
+def test_a_torn_record_is_truncated_on_open(tmp_path):
+    log = WorldEventLog(str(tmp_path))
+    log.append(1, "update_state", {"a": 1})
+    log.append(2, "update_state", {"b": 2})
+    log.close()
+    with open(tmp_path / "events.log", "r+b") as events:
+        events.truncate(events.seek(0, 2) - 3)
+
+    log = WorldEventLog(str(tmp_path))
+    assert log.last_tick == 1 and log.world_at()["state"] == {"a": 1}
+    log.append(2, "update_state", {"c": 3})
+    assert log.world_at()["state"] == {"a": 1, "c": 3}
+    log.close()
+
+
+@pytest.fixture
+def log_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(world_model_module.settings, "world_event_log_dir", str(tmp_path))
+    return tmp_path
+
+
+def test_each_world_model_records_in_its_own_directory(log_dir):
+    first, second = WorldModel(), WorldModel()
+    try:
+        first.update_state({"owner": "first"})
+        second.update_state({"owner": "second"})
+        assert first.world_at()["state"] == {"owner": "first"}
+        assert second.world_at()["state"] == {"owner": "second"}
+        assert sorted(path.name for path in log_dir.iterdir()) == sorted([str(first.id), str(second.id)])
+    finally:
+        first.close()
+        second.close()
+
+
+def test_a_named_world_model_resumes_its_history(log_dir):
+    agent_id = uuid4()
+    world_model = WorldModel(event_log_name="shared")
+    world_model.add_agent(agent_id, {"position": [1, 2]})
+    world_model.advance_tick()
+    world_model.update_object("missing", {})
+    world_model.add_object("box", {"position": (5, 5)})
+    world_model.advance_tick()
+    world_model.close()
+
+    reopened = WorldModel(event_log_name="shared")
+    try:
+        # The last recorded tick; ticks without events leave no trace
+        assert reopened.tick == 1
+        assert reopened.agents == {agent_id: {"position": [1, 2]}}
+        assert set(reopened.objects_near([5, 5], 1)) == {"box"}
+        reopened.update_state({"resumed": True})
+        assert reopened.world_at(0)["objects"] == {} and reopened.world_at()["state"] == {"resumed": True}
+    finally:
+        reopened.close()
@@ -0,0 +1,76 @@
+import math
+import random
+
+import pytest
+
+from app.core.world_index import AttributeIndex, RelationshipIndex, SpatialGrid
+
+
+def test_grid_radius_queries_match_brute_force():
+    rng = random.Random(0)
+    grid = SpatialGrid(cell_size=3.0)
+    positions = {str(i): (rng.uniform(-20, 20), rng.uniform(-20, 20)) for i in range(300)}
+    for key, position in positions.items():
+        grid.insert(key, position)
+    for center, radius in [((0, 0), 5), ((10, -4), 0.5), ((0, 0), 100)]:
+        expected = {key for key, position in positions.items() if math.dist(center, position) <= radius}
+        assert set(grid.within(center, radius)) == expected
+
+
+def test_grid_moves_and_removes_keys():
+    grid = SpatialGrid(cell_size=10)
+    grid.insert("a", [1, 1])
+    assert grid.cell_of("a") == (0, 0)
+    grid.insert("a", [25, -5])
+    assert grid.cell_of("a") == (2, -1) and grid.within([1, 1], 2) == []
+    with pytest.raises(TypeError):
+        grid.insert("a", None)
+    assert grid.cell_of("a") == (2, -1)
+    grid.remove("a")
+    assert "a" not in grid and len(grid) == 0 and grid.cell_of("a") is None
+    with pytest.raises(ValueError):
+        SpatialGrid(cell_size=0)
+
+
+def test_attribute_index_tracks_updates():
+    records = {"a": {"colour": "red", "tags": ["x", "y"]}, "b": {"colour": "blue"}}
+    index = AttributeIndex(["colour"])
+    for key, record in records.items():
+        index.update(key, None, record)
+    index.add_attribute("tags", records)
+    assert index.lookup("colour", "red") == {"a"}
+    assert index.lookup("tags", ["x", "y"]) == {"a"}
+    index.update("a", records["a"], {"colour": "blue"})
+    assert index.lookup("colour", "blue") == {"a", "b"} and index.lookup("colour", "red") == set()
+    assert index.lookup("tags", ["x", "y"]) == set()
+    assert index.lookup("size", 3) is None
+
+
+def test_unhashable_lookups_fall_back_to_a_scan():
+    index = AttributeIndex(["meta"])
+    index.update("none", None, {"meta": None})
+    index.update("dict", None, {"meta": {"k": 1}})
+    assert index.lookup("meta", {"k": 1}) is None
+    assert index.lookup("meta", None) == {"none"}
+
+
+def test_world_model_finds_unhashable_values_by_scanning(world_model):
+    world_model.index_attribute("meta")
+    world_model.add_object("none", {"meta": None})
+    world_model.add_object("dict", {"meta": {"k": 1}})
+    assert set(world_model.find_objects(meta={"k": 1})) == {"dict"}
+    assert set(world_model.find_objects(meta=None)) == {"none"}
+
+
+def test_relationship_index_intersects_terms():
+    relationships = [
+        {"subject": "a", "predicate": "knows", "object": "b"},
+        {"subject": "a", "predicate": "owns", "object": "c"},
+        {"subject": "b", "predicate": "knows", "object": "a"},
+    ]
+    index = RelationshipIndex()
+    index.rebuild(relationships)
+    assert index.find(subject="a") == [0, 1]
+    assert index.find(subject="a", predicate="knows") == [0]
+    assert index.find(object="a", predicate="owns") == []
+    assert index.find() is None
@@ -0,0 +1,50 @@
+from uuid import uuid4
+
+import numpy as np
+import pytest
+
+
+def likelihood(num_states, state, weight=0.9):
+    observation = np.full(num_states, (1 - weight) / (num_states - 1))
+    observation[state] = weight
+    return observation
+
+
+@pytest.fixture
+def agents(world_model):
+    agent_ids = [uuid4(), uuid4()]
+    for agent_id in agent_ids:
+        world_model.add_agent(agent_id, {"position": [0, 0]})
+    return world_model, agent_ids
+
+
+def test_observations_are_applied_in_one_batch(agents):
+    world_model, (first, second) = agents
+    num_states = world_model.stochastic_kinetic_model.num_states
+    world_model.update_agent(first, {"observation": likelihood(num_states, 3)})
+    world_model.update_agent(second, {"observation": likelihood(num_states, 7).tolist()})
+    assert world_model.predict_agent_state(first) == 3
+    assert world_model.predict_next_state([first, second]).tolist() == [3, 7]
+
+
+@pytest.mark.parametrize("observation", [
+    [0.5, 0.5], "high", [[0.1] * 10], [float("nan")] + [0.1] * 9, [-0.1] + [0.1] * 9, None,
+])
+def test_a_malformed_observation_is_rejected_and_the_queue_kept(agents, observation):
+    world_model, (first, second) = agents
+    num_states = world_model.stochastic_kinetic_model.num_states
+    world_model.update_agent(first, {"observation": likelihood(num_states, 3)})
+    with pytest.raises(ValueError):
+        world_model.update_agent(second, {"observation": observation, "colour": "red"})
+    assert "colour" not in world_model.agents[second]
+    assert world_model.predict_agent_state(first) == 3
+
+
+def test_unknown_agents_raise_key_error(agents):
+    world_model, (first, _) = agents
+    with pytest.raises(KeyError):
+        world_model.predict_agent_state(uuid4())
+    with pytest.raises(KeyError):
+        world_model.predict_next_state([first, uuid4()])
+    with pytest.raises(KeyError):
+        world_model.stochastic_kinetic_model.predict_agent_state("missing")